@@ -0,0 +1,114 @@
+"""Benchmark the time to the first bar loading the datasets of a run one after
+the other vs concurrently on the load thread pool.
+
+A year of 1m OHLCV and mark price bars and the 8h funding rates are written
+in the layout of the repositories. The cold runs drop the files from the page
+cache with posix_fadvise before every load, so they include the file reads.
+
+Run from the repository root:
+
+    python -m benchmarks.concurrent_load_benchmark --years 1
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.util import timeit, write_synthetic_data
+from benchmarks.vectorized_simulation_benchmark import BARS_PER_YEAR
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.market_timeline import MarketTimeline
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.mark_price_repository import MarkPriceRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+
+def drop_page_cache(data_base_path: Path) -> None:
+    """Drop the files of the datasets from the page cache."""
+    for path in data_base_path.iterdir():
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def main(years: int) -> None:
+    bars = years * BARS_PER_YEAR
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    end_time = start_time + timedelta(minutes=bars)
+    args = (Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_base_path = Path(tmp_dir)
+        write_synthetic_data(
+            data_base_path, "2019-01-01T00:00:00", bars, mark_price=True
+        )
+        ohlcv_repository = OHLCVRepository(str(data_base_path))
+        funding_rate_repository = FundingRateRepository(str(data_base_path))
+        mark_price_repository = MarkPriceRepository(str(data_base_path))
+        market_timeline_repository = MarketTimelineRepository(
+            ohlcv_repository, funding_rate_repository, mark_price_repository
+        )
+
+        def load_sequentially() -> MarketTimeline:
+            ohlcv_series = ohlcv_repository.get_historical_series(*args)
+            funding_rate_df = funding_rate_repository.get_historical_dataframe(*args)
+            mark_price_df = mark_price_repository.get_historical_dataframe(*args)
+            return MarketTimelineRepository.align(
+                ohlcv_series,
+                Timeframe.ONE_MIN,
+                DataProcessingService.index_to_ts(funding_rate_df),
+                funding_rate_df["funding_rate"].to_numpy(dtype=np.float64),
+                DataProcessingService.index_to_ts(mark_price_df),
+                mark_price_df["close"].to_numpy(dtype=np.float64),
+                mark_price_df["low"].to_numpy(dtype=np.float64),
+                mark_price_df["high"].to_numpy(dtype=np.float64),
+            )
+
+        def load_concurrently() -> MarketTimeline:
+            return market_timeline_repository.get_historical_timeline(*args)
+
+        print(
+            f"bars: {bars} ({years} years of 1m OHLCV and mark price bars), "
+            f"cpus: {os.cpu_count()}"
+        )
+        for name, load in (
+            ("sequential", load_sequentially),
+            ("concurrent", load_concurrently),
+        ):
+            for cache in ("cold", "warm"):
+
+                def time_to_first_bar() -> MarketTimeline:
+                    market_timeline = load()
+                    next(iter(market_timeline))
+                    return market_timeline
+
+                if cache == "cold":
+                    seconds = min(
+                        timeit(
+                            lambda: (
+                                drop_page_cache(data_base_path),
+                                time_to_first_bar(),
+                            ),
+                            repeat=1,
+                        )[0]
+                        for _ in range(3)
+                    )
+                else:
+                    seconds, _ = timeit(time_to_first_bar)
+                print(f"{name} {cache}: time to first bar {seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    args = parser.parse_args()
+    main(args.years)
@@ -0,0 +1,132 @@
+"""Benchmark RunSimulation on coarse bars drilling down to 1m bars near the liquidation.
+
+The 1m bars are resampled to 1h and 8h bars, and every account is simulated
+on the 1m bars and on the coarse bars stepping the 1m bars of the coarse bars
+that get within the drill down distance of its liquidation price. The
+liquidation ts of both runs is compared, it must be the same.
+
+Run from the repository root:
+
+    python -m benchmarks.drill_down_benchmark --years 1 --distance 0.01
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.util import (
+    create_synthetic_funding_rate_df,
+    create_synthetic_ohlcv_df,
+    timeit,
+)
+from benchmarks.vectorized_simulation_benchmark import BARS_PER_YEAR, create_account
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.multi_resolution_timeline_repository import (
+    MultiResolutionTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+
+LEVERAGES = (2.0, 10.0, 50.0)
+
+
+def get_liquidation_ts(account_snapshots: AccountSnapshotStore) -> int:
+    is_flat = np.diff(account_snapshots.position_offsets) == 0
+    return int(account_snapshots.ts[np.argmax(is_flat)]) if is_flat.any() else -1
+
+
+def main(years: int, distance: float) -> None:
+    bars = years * BARS_PER_YEAR
+    ohlcv_df = DataProcessingService.index_raw_df(
+        create_synthetic_ohlcv_df("2019-01-01T00:00:00", bars)
+    )
+    funding_rate_df = DataProcessingService.index_raw_df(
+        create_synthetic_funding_rate_df("2019-01-01T00:00:00", bars // 480)
+    )
+    funding_rate_ts = DataProcessingService.index_to_ts(funding_rate_df)
+    funding_rate = funding_rate_df["open"].to_numpy()
+    series = OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=DataProcessingService.index_to_ts(ohlcv_df),
+        open=ohlcv_df["open"].to_numpy(),
+        high=ohlcv_df["high"].to_numpy(),
+        low=ohlcv_df["low"].to_numpy(),
+        close=ohlcv_df["close"].to_numpy(),
+        volume=ohlcv_df["volume"].to_numpy(),
+    )
+    market_timeline_1min = MarketTimelineRepository.align(
+        series, Timeframe.ONE_MIN, funding_rate_ts, funding_rate
+    )
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    entry_price = float(series.close[0])
+    run_simulation = setup_run_simulation_use_case(
+        ".", intrabar_liquidation=True, drill_down_distance=distance
+    )
+
+    print(f"bars: {bars} ({years} years of 1m bars), drill down distance: {distance}")
+    reference = {}
+    for leverage in LEVERAGES:
+        seconds, simulation = timeit(
+            lambda: run_simulation.simulate(
+                start_time,
+                start_time,
+                Timeframe.ONE_MIN,
+                Symbol.BTCUSD,
+                create_account(10000.0, leverage, entry_price),
+                market_timeline_1min,
+            ),
+            repeat=1,
+        )
+        reference[leverage] = (
+            seconds,
+            get_liquidation_ts(simulation.account_snapshots),
+        )
+        print(
+            f"1m x{leverage:.0f}: {seconds:.3f} s, "
+            f"liquidation ts: {reference[leverage][1]}"
+        )
+
+    for timeframe in (Timeframe.ONE_HOUR, Timeframe.EIGHT_HOUR):
+        build_s, (market_timeline, fine_timeline_loader) = timeit(
+            lambda: MultiResolutionTimelineRepository.build(
+                ohlcv_df, Symbol.BTCUSD, timeframe, funding_rate_ts, funding_rate
+            ),
+            repeat=1,
+        )
+        print(f"{timeframe} resample: {build_s:.3f} s, bars: {len(market_timeline)}")
+        for leverage in LEVERAGES:
+            seconds, simulation = timeit(
+                lambda: run_simulation.simulate(
+                    start_time,
+                    start_time,
+                    timeframe,
+                    Symbol.BTCUSD,
+                    create_account(10000.0, leverage, entry_price),
+                    market_timeline,
+                    fine_timeline_loader=fine_timeline_loader,
+                ),
+                repeat=1,
+            )
+            reference_s, reference_ts = reference[leverage]
+            liquidation_ts = get_liquidation_ts(simulation.account_snapshots)
+            assert liquidation_ts == reference_ts
+            print(
+                f"{timeframe} x{leverage:.0f}: {seconds:.3f} s "
+                f"({reference_s / seconds:.0f}x), "
+                f"snapshots: {len(simulation.account_snapshots)}, "
+                f"liquidation ts: {liquidation_ts}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--distance", type=float, default=0.01)
+    args = parser.parse_args()
+    main(args.years, args.distance)
@@ -0,0 +1,77 @@
+"""Benchmark RunSimulation fast-forwarding the bars after the account is flat.
+
+Every account is liquidated at a different point of the series depending on
+its leverage, and the rest of its bars are fast-forwarded or stepped.
+
+Run from the repository root:
+
+    python -m benchmarks.fast_forward_benchmark --bars 100000
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.util import timeit
+from benchmarks.vectorized_simulation_benchmark import create_account, create_series
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+
+LEVERAGES = (2.0, 10.0, 25.0, 50.0, 100.0)
+
+
+def main(bars: int) -> None:
+    series = create_series(bars)
+    funding_rate_ts = series.ts[::480]
+    market_timeline = MarketTimelineRepository.align(
+        series,
+        Timeframe.ONE_MIN,
+        funding_rate_ts,
+        np.full(len(funding_rate_ts), 0.0001),
+    )
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    price = float(series.close[0])
+
+    print(f"bars: {bars}")
+    for leverage in LEVERAGES:
+        results = {}
+        for fast_forward in (False, True):
+            run_simulation = setup_run_simulation_use_case(
+                ".", fast_forward=fast_forward
+            )
+            results[fast_forward] = timeit(
+                lambda: run_simulation.simulate(
+                    start_time,
+                    start_time,
+                    Timeframe.ONE_MIN,
+                    Symbol.BTCUSD,
+                    create_account(10000.0, leverage, price),
+                    market_timeline,
+                )
+            )
+        (stepped_s, stepped), (fast_forward_s, fast_forwarded) = (
+            results[False],
+            results[True],
+        )
+        account_snapshots = fast_forwarded.account_snapshots
+        assert np.array_equal(
+            account_snapshots.balance, stepped.account_snapshots.balance
+        )
+        flat = np.diff(account_snapshots.position_offsets) == 0
+        liquidation_bar = int(np.argmax(flat)) if flat.any() else None
+        print(
+            f"leverage {leverage:g}: liquidated at bar {liquidation_bar}, "
+            f"stepped {stepped_s:.3f} s, fast-forwarded {fast_forward_s:.3f} s "
+            f"({stepped_s / fast_forward_s:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.bars)
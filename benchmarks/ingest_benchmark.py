@@ -0,0 +1,100 @@
+"""Benchmark ingesting raw data dumps of many symbols on the process pool, and
+loading a year of 1m bars from a raw dump vs from the canonical layout.
+
+The raw dumps are unsorted Feather files with string dates and duplicated
+rows, named as the files of the repositories under a symbol per dump.
+
+Run from the repository root:
+
+    python -m benchmarks.ingest_benchmark --years 1 --symbols 4
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.util import create_synthetic_ohlcv_df, timeit
+from benchmarks.vectorized_simulation_benchmark import BARS_PER_YEAR
+from perp_simulation.constant import DataType, Symbol, Timeframe
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.use_case.ingest_raw_data import IngestRawData
+
+
+def main(years: int, symbols: int) -> None:
+    bars = years * BARS_PER_YEAR
+    file_name = f"{Timeframe.ONE_MIN}-{DataType.OHLCV}.feather"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        raw_data_path = Path(tmp_dir) / "raw"
+        raw_data_path.mkdir()
+        raw_df = create_synthetic_ohlcv_df("2019-01-01T00:00:00", bars)
+        raw_df = pd.concat([raw_df, raw_df.iloc[: bars // 100]]).sample(
+            frac=1.0, random_state=7
+        )
+        raw_df["date"] = raw_df["date"].dt.strftime("%Y-%m-%dT%H:%M:%S%z")
+        raw_df = raw_df.reset_index(drop=True)
+        for i in range(symbols):
+            raw_df.to_feather(raw_data_path / f"SYMBOL{i}_USDT_USDT-{file_name}")
+        sources = IngestRawData.find_sources(str(raw_data_path))
+        print(
+            f"bars: {bars} ({years} years of 1m bars) per symbol, symbols: {symbols}, "
+            f"cpus: {os.cpu_count()}"
+        )
+
+        data_base_path = Path(tmp_dir) / "canonical"
+        reference_s = None
+        for max_workers in sorted({1, 2, symbols}):
+            seconds, _ = timeit(
+                lambda: IngestRawData(str(data_base_path), max_workers).run(sources),
+                repeat=1,
+            )
+            reference_s = reference_s or seconds
+            print(
+                f"ingest, {max_workers} workers: {seconds:.3f} s "
+                f"({reference_s / seconds:.1f}x)"
+            )
+
+        # The raw dump of a symbol, sorted and without duplicates so that the
+        # repository can load it, only the dates are left as strings, and the
+        # dump with parsed dates, as the files of the repositories before ingestion
+        raw_base_path = Path(tmp_dir) / "raw_sorted"
+        raw_base_path.mkdir()
+        sorted_raw_df = (
+            raw_df.drop_duplicates("date").sort_values("date").reset_index(drop=True)
+        )
+        sorted_raw_df.to_feather(
+            raw_base_path / f"{Symbol.normalize(Symbol.BTCUSD)}-{file_name}"
+        )
+        parsed_base_path = Path(tmp_dir) / "parsed"
+        parsed_base_path.mkdir()
+        sorted_raw_df["date"] = pd.to_datetime(sorted_raw_df["date"], utc=True)
+        sorted_raw_df.to_feather(
+            parsed_base_path / f"{Symbol.normalize(Symbol.BTCUSD)}-{file_name}"
+        )
+        (data_base_path / f"SYMBOL0_USDT_USDT-{file_name}").rename(
+            data_base_path / f"{Symbol.normalize(Symbol.BTCUSD)}-{file_name}"
+        )
+        start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+        for layout, base_path in (
+            ("raw", raw_base_path),
+            ("parsed", parsed_base_path),
+            ("canonical", data_base_path),
+        ):
+            repository = OHLCVRepository(str(base_path))
+            seconds, df = timeit(
+                lambda: repository.get_historical_dataframe(
+                    Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+                )
+            )
+            print(f"load {layout}: {seconds * 1000:.1f} ms, bars: {len(df)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--symbols", type=int, default=4)
+    args = parser.parse_args()
+    main(args.years, args.symbols)
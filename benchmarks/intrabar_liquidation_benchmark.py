@@ -0,0 +1,150 @@
+"""Benchmark parameter sweeps on coarse bars with intrabar liquidation against 1m bars.
+
+The 1m bars are resampled to 1h and 8h bars and swept liquidating with the
+close or inside the bars (low). The liquidations are compared with the ones of
+the 1m sweep: a liquidation is missed if the 1m sweep liquidates the
+configuration and the coarse one doesn't, and it's late if it's liquidated
+after the end of the coarse bar of the 1m liquidation.
+
+The sweep costs about the same whatever the timeframe is, the per bar loop of
+RunSimulation is the one that gets cheaper, so it is also timed for one
+account on every timeframe.
+
+Run from the repository root:
+
+    python -m benchmarks.intrabar_liquidation_benchmark --years 1 --configs 1000
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.util import create_synthetic_funding_rate_df, timeit
+from benchmarks.vectorized_simulation_benchmark import (
+    BARS_PER_YEAR,
+    create_account,
+    create_series,
+)
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+from perp_simulation.use_case.run_parameter_sweep import RunParameterSweep
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+
+# Number of 1m bars of every coarse timeframe
+TIMEFRAMES = {Timeframe.ONE_HOUR: 60, Timeframe.EIGHT_HOUR: 480}
+
+
+def resample(series: OHLCVSeries, minutes: int) -> OHLCVSeries:
+    """Resample regular 1m bars to bars of the given minutes."""
+    bars = len(series) // minutes * minutes
+
+    def reshape(values: np.ndarray) -> np.ndarray:
+        return np.asarray(values[:bars]).reshape(-1, minutes)
+
+    return OHLCVSeries(
+        symbol=series.symbol,
+        ts=reshape(series.ts)[:, 0],
+        open=reshape(series.open)[:, 0],
+        high=reshape(series.high).max(axis=1),
+        low=reshape(series.low).min(axis=1),
+        close=reshape(series.close)[:, -1],
+        volume=reshape(series.volume).sum(axis=1),
+    )
+
+
+def main(years: int, configs: int) -> None:
+    bars = years * BARS_PER_YEAR
+    series = create_series(bars)
+    funding_rate_df = DataProcessingService.index_raw_df(
+        create_synthetic_funding_rate_df("2019-01-01T00:00:00", bars // 480)
+    )
+    funding_rate_ts = DataProcessingService.index_to_ts(funding_rate_df)
+    funding_rate = funding_rate_df["open"].to_numpy()
+
+    side = max(int(round(configs ** (1 / 3))), 1)
+    grid = (
+        np.linspace(1000.0, 100000.0, side),
+        np.linspace(1.0, 50.0, side),
+        float(series.close[0]) * np.linspace(0.9, 1.1, side),
+    )
+
+    def sweep(ohlcv_series: OHLCVSeries, timeframe: str, intrabar: bool):
+        return RunParameterSweep(
+            ohlcv_repository=None,
+            funding_rate_repository=None,
+            update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+            intrabar_liquidation=intrabar,
+        ).sweep(ohlcv_series, funding_rate_ts, funding_rate, timeframe, *grid)
+
+    def simulate(ohlcv_series: OHLCVSeries, timeframe: str, intrabar: bool) -> float:
+        market_timeline = MarketTimelineRepository.align(
+            ohlcv_series, timeframe, funding_rate_ts, funding_rate
+        )
+        run_simulation = setup_run_simulation_use_case(
+            ".", intrabar_liquidation=intrabar
+        )
+        start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+        seconds, _ = timeit(
+            lambda: run_simulation.simulate(
+                start_time,
+                start_time,
+                timeframe,
+                Symbol.BTCUSD,
+                create_account(10000.0, 2.0, float(ohlcv_series.close[0])),
+                market_timeline,
+            ),
+            repeat=1,
+        )
+        return seconds
+
+    reference_s, reference = timeit(lambda: sweep(series, Timeframe.ONE_MIN, False))
+    reference_simulate_s = simulate(series, Timeframe.ONE_MIN, False)
+    is_liquidated = reference.is_liquidated()
+    print(f"bars: {bars} ({years} years of 1m bars), configurations: {len(reference)}")
+    print(
+        f"1m close: {reference_s * 1000:.1f} ms, "
+        f"liquidated: {int(is_liquidated.sum())}, "
+        f"RunSimulation: {reference_simulate_s:.3f} s"
+    )
+    for timeframe, minutes in TIMEFRAMES.items():
+        coarse_series = resample(series, minutes)
+        coarse_seconds = minutes * 60
+        # End of the coarse bar of the 1m liquidations
+        reference_ts = (
+            (reference.liquidation_ts - 60 - coarse_series.ts[0]) // coarse_seconds + 1
+        ) * coarse_seconds + coarse_series.ts[0]
+        for intrabar in (False, True):
+            seconds, parameter_sweep = timeit(
+                lambda: sweep(coarse_series, timeframe, intrabar)
+            )
+            coarse_is_liquidated = parameter_sweep.is_liquidated()
+            missed = is_liquidated & ~coarse_is_liquidated
+            late = (
+                is_liquidated
+                & coarse_is_liquidated
+                & (parameter_sweep.liquidation_ts > reference_ts)
+            )
+            simulate_s = simulate(coarse_series, timeframe, intrabar)
+            print(
+                f"{timeframe} {'intrabar' if intrabar else 'close'}: "
+                f"{seconds * 1000:.1f} ms, "
+                f"liquidated: {int(coarse_is_liquidated.sum())}, "
+                f"missed: {int(missed.sum())}, late: {int(late.sum())}, "
+                f"RunSimulation: {simulate_s:.3f} s ({reference_simulate_s / simulate_s:.0f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--configs", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.years, args.configs)
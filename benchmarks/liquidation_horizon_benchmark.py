@@ -0,0 +1,98 @@
+"""Benchmark the liquidation horizon index against scanning the bars of every setup.
+
+Run from the repository root:
+
+    python -m benchmarks.liquidation_horizon_benchmark --years 1 --setups 10000
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.util import timeit
+from benchmarks.vectorized_simulation_benchmark import (
+    BARS_PER_YEAR,
+    create_account,
+    create_series,
+)
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.liquidation_horizon_index import LiquidationHorizonIndex
+from perp_simulation.use_case.find_liquidation_horizon import FindLiquidationHorizon
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+
+SCANNED_SETUPS = 200
+
+
+def main(years: int, setups: int) -> None:
+    bars = years * BARS_PER_YEAR
+    series = create_series(bars)
+    rng = np.random.default_rng(0)
+    balances = rng.uniform(1000.0, 100000.0, setups)
+    leverages = rng.uniform(1.0, 50.0, setups)
+    start_index = rng.integers(0, bars, setups)
+    update_position_maintenance_margin_use_case = UpdatePositionMaintenanceMargin()
+    positions = [
+        update_position_maintenance_margin_use_case.update_maintenance_margin(
+            create_account(balance, leverage, float(series.close[start])).positions[0]
+        )
+        for balance, leverage, start in zip(
+            balances.tolist(), leverages.tolist(), start_index.tolist()
+        )
+    ]
+
+    build_s, index = timeit(lambda: LiquidationHorizonIndex.from_series(series))
+    use_case = FindLiquidationHorizon(UpdatePositionLiquidationPrice())
+    find_s, liquidation_ts = timeit(
+        lambda: use_case.find_liquidation_ts(
+            index, Timeframe.ONE_MIN, positions, balances, start_index
+        )
+    )
+    liquidation_price = np.array([position.liquidation_price for position in positions])
+    query_s, liquidation_bar = timeit(
+        lambda: index.first_at_or_below(liquidation_price, start_index)
+    )
+
+    # Scanning the bars is timed on a few setups and extrapolated
+    n_scanned = min(SCANNED_SETUPS, setups)
+
+    def scan() -> np.ndarray:
+        scanned_bar = np.full(n_scanned, -1)
+        for i in range(n_scanned):
+            crossed = np.flatnonzero(
+                series.close[start_index[i] :] <= liquidation_price[i]
+            )
+            if len(crossed):
+                scanned_bar[i] = start_index[i] + crossed[0]
+        return scanned_bar
+
+    scan_s, scanned_bar = timeit(scan, repeat=1)
+    assert (scanned_bar == liquidation_bar[:n_scanned]).all()
+    extrapolated_s = scan_s / n_scanned * setups
+
+    print(f"bars: {bars} ({years} years of 1m bars), setups: {setups}")
+    print(
+        f"build index: {build_s * 1000:.1f} ms, "
+        f"{(index.block_min.nbytes + index.block_max.nbytes) / 2**20:.1f} MiB"
+    )
+    print(
+        f"find liquidation ts: {find_s * 1000:.1f} ms, {setups / find_s:,.0f} setups/s, "
+        f"liquidated: {int((liquidation_ts >= 0).sum())}"
+    )
+    print(f"query index: {query_s * 1000:.1f} ms, {setups / query_s:,.0f} setups/s")
+    print(
+        f"scan: {scan_s:.3f} s for {n_scanned} setups, "
+        f"extrapolated {extrapolated_s:.1f} s ({extrapolated_s / query_s:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--setups", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.years, args.setups)
@@ -0,0 +1,63 @@
+"""Benchmark the OHLCV iteration, DataFrame.iterrows vs columnar arrays.
+
+Run from the repository root:
+
+    python -m benchmarks.ohlcv_iterator_benchmark --bars 525600
+"""
+
+import argparse
+import tempfile
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.util import timeit, write_synthetic_data
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.ohlcv import OHLCV
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+
+def iterrows_iterator(df, symbol):
+    """The iteration as it was done before the columnar fast path."""
+    for index, values in df.iterrows():
+        yield OHLCV(
+            ts=int(index.timestamp()),
+            symbol=symbol,
+            open=values.open,
+            high=values.high,
+            low=values.low,
+            close=values.close,
+            volume=values.volume,
+        )
+
+
+def consume(iterator) -> None:
+    deque(iterator, maxlen=0)
+
+
+def main(bars: int) -> None:
+    symbol = Symbol.BTCUSD
+    timeframe = Timeframe.ONE_MIN
+    start = "2023-01-01T00:00:00"
+    start_time = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_base_path = Path(tmp_dir)
+        write_synthetic_data(data_base_path, start, bars, symbol)
+        repository = OHLCVRepository(data_base_path)
+        df = repository.get_historical_dataframe(symbol, start_time, timeframe)
+        series = repository.get_historical_series(symbol, start_time, timeframe)
+
+        iterrows_s, _ = timeit(lambda: consume(iterrows_iterator(df, symbol)), repeat=1)
+        columnar_s, _ = timeit(lambda: consume(iter(series)))
+
+    print(f"bars: {bars}")
+    print(f"iterrows: {iterrows_s:.3f} s, {bars / iterrows_s:,.0f} bars/s")
+    print(f"columnar: {columnar_s:.3f} s, {bars / columnar_s:,.0f} bars/s")
+    print(f"speedup: {iterrows_s / columnar_s:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=525_600)
+    args = parser.parse_args()
+    main(args.bars)
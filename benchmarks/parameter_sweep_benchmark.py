@@ -0,0 +1,119 @@
+"""Benchmark the parameter sweep against simulating every configuration one by one.
+
+Run from the repository root:
+
+    python -m benchmarks.parameter_sweep_benchmark --years 1 --configs 1000
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.util import create_synthetic_funding_rate_df, timeit
+from benchmarks.vectorized_simulation_benchmark import (
+    BARS_PER_YEAR,
+    create_account,
+    create_series,
+)
+from perp_simulation.constant import Timeframe
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.use_case.run_parameter_sweep import RunParameterSweep
+from perp_simulation.use_case.run_vectorized_simulation import RunVectorizedSimulation
+from perp_simulation.use_case.update_position_initial_margin import (
+    UpdatePositionInitialMargin,
+)
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from perp_simulation.use_case.update_position_unrealized_pnl import (
+    UpdatePositionUnrealizedPnl,
+)
+
+ONE_BY_ONE_CONFIGS = 20
+
+
+def main(years: int, configs: int) -> None:
+    bars = years * BARS_PER_YEAR
+    series = create_series(bars)
+    funding_rate_df = DataProcessingService.index_raw_df(
+        create_synthetic_funding_rate_df("2019-01-01T00:00:00", bars // 480)
+    )
+    funding_rate_ts = DataProcessingService.index_to_ts(funding_rate_df)
+    funding_rate = funding_rate_df["open"].to_numpy()
+    timeframe = Timeframe.ONE_MIN
+
+    # Grid of balances x leverages x entry prices with about `configs` combinations
+    side = max(int(round(configs ** (1 / 3))), 1)
+    balances = np.linspace(1000.0, 100000.0, side)
+    leverages = np.linspace(1.0, 50.0, side)
+    entry_prices = float(series.close[0]) * np.linspace(0.9, 1.1, side)
+
+    sweep_use_case = RunParameterSweep(
+        ohlcv_repository=None,
+        funding_rate_repository=None,
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+    )
+    sweep_s, parameter_sweep = timeit(
+        lambda: sweep_use_case.sweep(
+            series,
+            funding_rate_ts,
+            funding_rate,
+            timeframe,
+            balances,
+            leverages,
+            entry_prices,
+        )
+    )
+
+    # The one by one simulation is timed on a few configurations and extrapolated
+    vectorized = RunVectorizedSimulation(
+        ohlcv_repository=None,
+        funding_rate_repository=None,
+        update_position_unrealized_pnl_use_case=UpdatePositionUnrealizedPnl(),
+        update_position_initial_margin_use_case=UpdatePositionInitialMargin(),
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+        update_position_liquidation_price_use_case=UpdatePositionLiquidationPrice(),
+    )
+    n_one_by_one = min(ONE_BY_ONE_CONFIGS, len(parameter_sweep))
+    one_by_one_s, _ = timeit(
+        lambda: [
+            vectorized.compute_equity_curve(
+                create_account(
+                    parameter_sweep.balance[i],
+                    parameter_sweep.leverage[i],
+                    parameter_sweep.entry_price[i],
+                ),
+                series,
+                funding_rate_ts,
+                funding_rate,
+                timeframe,
+            )
+            for i in range(n_one_by_one)
+        ],
+        repeat=1,
+    )
+    extrapolated_s = one_by_one_s / n_one_by_one * len(parameter_sweep)
+
+    print(
+        f"bars: {bars} ({years} years of 1m bars), configurations: {len(parameter_sweep)}"
+    )
+    print(
+        f"sweep: {sweep_s * 1000:.1f} ms, "
+        f"{len(parameter_sweep) / sweep_s:,.0f} configurations/s, "
+        f"liquidated: {int(parameter_sweep.is_liquidated().sum())}"
+    )
+    print(
+        f"one by one: {one_by_one_s:.3f} s for {n_one_by_one} configurations, "
+        f"extrapolated {extrapolated_s:.1f} s ({extrapolated_s / sweep_s:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--configs", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.years, args.configs)
@@ -0,0 +1,96 @@
+"""Benchmark loading a window of bars from a single Feather file vs a
+PartitionedFeatherDataset with a file per month, and appending a month.
+
+Years of 1m OHLCV bars are written in both layouts of the repositories, and
+an hour, a day and a month of bars are loaded with OHLCVRepository. Appending
+a month rewrites the single file and writes one partition of the dataset.
+
+Run from the repository root:
+
+    python -m benchmarks.partitioned_dataset_benchmark --years 5
+"""
+
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.util import create_synthetic_ohlcv_df, timeit, write_synthetic_data
+from benchmarks.vectorized_simulation_benchmark import BARS_PER_YEAR
+from perp_simulation.constant import DataType, Symbol, Timeframe
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.partitioned_feather_dataset import (
+    PartitionedFeatherDataset,
+)
+
+
+def main(years: int) -> None:
+    bars = years * BARS_PER_YEAR
+    file_name = f"{Symbol.normalize(Symbol.BTCUSD)}-{Timeframe.ONE_MIN}-{DataType.OHLCV}.feather"
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_base_path = Path(tmp_dir) / "file"
+        write_synthetic_data(file_base_path, "2019-01-01T00:00:00", bars)
+        partitioned_base_path = Path(tmp_dir) / "partitioned"
+        dataset = PartitionedFeatherDataset.from_file_path(
+            partitioned_base_path / file_name
+        )
+        dataset.append(pd.read_feather(file_base_path / file_name))
+        print(
+            f"bars: {bars} ({years} years of 1m bars), "
+            f"partitions: {len(dataset.get_partitions())}"
+        )
+
+        start_time = datetime(2019, 1, 1, tzinfo=timezone.utc) + timedelta(
+            days=365 * years // 2
+        )
+        for window_name, window in (
+            ("an hour", timedelta(hours=1)),
+            ("a day", timedelta(days=1)),
+            ("a month", timedelta(days=30)),
+        ):
+            results = {}
+            for layout, base_path in (
+                ("file", file_base_path),
+                ("partitioned", partitioned_base_path),
+            ):
+                repository = OHLCVRepository(str(base_path))
+                results[layout] = timeit(
+                    lambda: repository.get_historical_dataframe(
+                        Symbol.BTCUSD,
+                        start_time,
+                        Timeframe.ONE_MIN,
+                        start_time + window,
+                    ),
+                    repeat=5,
+                )
+            pd.testing.assert_frame_equal(results["file"][1], results["partitioned"][1])
+            print(
+                f"{window_name}: file {results['file'][0] * 1000:.1f} ms, "
+                f"partitioned {results['partitioned'][0] * 1000:.1f} ms "
+                f"({results['file'][0] / results['partitioned'][0]:.1f}x)"
+            )
+
+        month_df = create_synthetic_ohlcv_df(
+            (datetime(2019, 1, 1) + timedelta(minutes=bars)).isoformat(), 30 * 1440
+        )
+        file_s, _ = timeit(
+            lambda: pd.concat(
+                [pd.read_feather(file_base_path / file_name), month_df],
+                ignore_index=True,
+            ).to_feather(file_base_path / file_name),
+            repeat=1,
+        )
+        partitioned_s, _ = timeit(lambda: dataset.append(month_df), repeat=1)
+        print(
+            f"append a month: file {file_s * 1000:.1f} ms, "
+            f"partitioned {partitioned_s * 1000:.1f} ms ({file_s / partitioned_s:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+    main(args.years)
@@ -0,0 +1,102 @@
+"""Benchmark the per bar cost of the fused position risk metrics against the use cases.
+
+Run from the repository root:
+
+    python -m benchmarks.position_risk_benchmark --bars 100000
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.util import timeit
+from benchmarks.vectorized_simulation_benchmark import create_account
+from perp_simulation.use_case.liquidate_positions import LiquidatePositions
+from perp_simulation.use_case.update_position_effective_leverage import (
+    UpdatePositionEffectiveLeverage,
+)
+from perp_simulation.use_case.update_position_initial_margin import (
+    UpdatePositionInitialMargin,
+)
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
+from perp_simulation.use_case.update_position_unrealized_pnl import (
+    UpdatePositionUnrealizedPnl,
+)
+
+
+def main(bars: int) -> None:
+    # Prices that never reach the liquidation price, so every bar does the same work
+    rng = np.random.default_rng(7)
+    prices = (40000.0 * (1.0 + rng.uniform(-0.05, 0.05, bars))).tolist()
+    account = create_account(10000.0, 2.0, 40000.0)
+    position = account.positions[0]
+    balance = account.balance
+
+    update_position_unrealized_pnl_use_case = UpdatePositionUnrealizedPnl()
+    update_position_initial_margin_use_case = UpdatePositionInitialMargin()
+    update_position_maintenance_margin_use_case = UpdatePositionMaintenanceMargin()
+    update_position_effective_leverage_use_case = UpdatePositionEffectiveLeverage()
+    update_position_liquidation_price_use_case = UpdatePositionLiquidationPrice()
+    update_position_risk_use_case = UpdatePositionRisk()
+
+    def update_with_use_cases() -> None:
+        for price in prices:
+            update_position_unrealized_pnl_use_case.update_unrealized_pnl(
+                position, price
+            )
+            update_position_initial_margin_use_case.update_initial_margin(position)
+            update_position_maintenance_margin_use_case.update_maintenance_margin(
+                position
+            )
+            update_position_effective_leverage_use_case.update_effective_leverage(
+                position, balance
+            )
+            update_position_liquidation_price_use_case.update_liquidation_price(
+                position, balance
+            )
+
+    def update_with_risk() -> None:
+        for price in prices:
+            update_position_risk_use_case.update_risk(position, price, balance)
+
+    liquidate_with_use_cases = LiquidatePositions(
+        update_position_liquidation_price_use_case,
+        update_position_unrealized_pnl_use_case,
+    )
+    liquidate_with_risk = LiquidatePositions(
+        update_position_liquidation_price_use_case,
+        update_position_unrealized_pnl_use_case,
+        update_position_risk_use_case,
+    )
+
+    use_cases_s, _ = timeit(update_with_use_cases)
+    risk_s, _ = timeit(update_with_risk)
+    liquidate_use_cases_s, _ = timeit(
+        lambda: [liquidate_with_use_cases.liquidate(account, price) for price in prices]
+    )
+    liquidate_risk_s, _ = timeit(
+        lambda: [liquidate_with_risk.liquidate(account, price) for price in prices]
+    )
+
+    print(f"bars: {bars}, one position")
+    print(
+        f"update, use cases: {use_cases_s / bars * 1e9:,.0f} ns/bar, "
+        f"fused: {risk_s / bars * 1e9:,.0f} ns/bar ({use_cases_s / risk_s:.1f}x)"
+    )
+    print(
+        f"liquidate, use cases: {liquidate_use_cases_s / bars * 1e9:,.0f} ns/bar, "
+        f"fused: {liquidate_risk_s / bars * 1e9:,.0f} ns/bar"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.bars)
@@ -0,0 +1,63 @@
+"""Benchmark the cost of profiling the phases of RunSimulation and print the profile.
+
+Run from the repository root:
+
+    python -m benchmarks.profile_benchmark --bars 50000
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.util import timeit
+from benchmarks.vectorized_simulation_benchmark import create_account, create_series
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+
+
+def main(bars: int) -> None:
+    series = create_series(bars)
+    funding_rate_ts = series.ts[::480]
+    market_timeline = MarketTimelineRepository.align(
+        series,
+        Timeframe.ONE_MIN,
+        funding_rate_ts,
+        np.full(len(funding_rate_ts), 0.0001),
+    )
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+
+    print(f"bars: {bars}")
+    simulation = None
+    for profile in (False, True, False, True):
+        run_simulation = setup_run_simulation_use_case(".", profile=profile)
+        seconds, simulation = timeit(
+            lambda: run_simulation.simulate(
+                start_time,
+                start_time,
+                Timeframe.ONE_MIN,
+                Symbol.BTCUSD,
+                create_account(10000.0, 2.0, float(series.close[0])),
+                market_timeline,
+            )
+        )
+        print(
+            f"profile {'enabled' if profile else 'disabled'}: {bars / seconds:,.0f} bars/s"
+        )
+
+    print(f"profile: {simulation.profile.bars_per_second:,.0f} bars/s in the loop")
+    for name, phase_profile in simulation.profile.phases.items():
+        print(
+            f"  {name}: {phase_profile.calls} calls, "
+            f"{phase_profile.total_ns / 1e6:,.1f} ms, {phase_profile.mean_ns:,.0f} ns/call"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=50_000)
+    args = parser.parse_args()
+    main(args.bars)
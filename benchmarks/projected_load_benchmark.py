@@ -0,0 +1,70 @@
+"""Benchmark reading a whole Feather file vs the columns and time range used.
+
+A year of 1m OHLCV bars is written in the layout of the repositories, and
+read with pandas.read_feather, the previous load of the repositories, and with
+the memory-mapped Arrow reads of HistoricalFeatherRepository._load_data with
+one column and with a window of a day and of a month.
+
+Run from the repository root:
+
+    python -m benchmarks.projected_load_benchmark --years 1
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.util import timeit, write_synthetic_data
+from benchmarks.vectorized_simulation_benchmark import BARS_PER_YEAR
+from perp_simulation.constant import DataType, Symbol, Timeframe
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+
+def main(years: int) -> None:
+    bars = years * BARS_PER_YEAR
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_base_path = Path(tmp_dir)
+        write_synthetic_data(data_base_path, "2019-01-01T00:00:00", bars)
+        path = (
+            data_base_path
+            / f"{Symbol.normalize(Symbol.BTCUSD)}-{Timeframe.ONE_MIN}-{DataType.OHLCV}.feather"
+        )
+        repository = OHLCVRepository(str(data_base_path))
+
+        loads = {
+            "read_feather, all": lambda: pd.read_feather(path),
+            "_load_data, all": lambda: repository._load_data(path),
+            "_load_data, date and open": lambda: repository._load_data(
+                path, ("date", "open")
+            ),
+            "_load_data, a month": lambda: repository._load_data(
+                path,
+                repository.COLUMNS,
+                "2019-06-01T00:00:00+00:00",
+                "2019-07-01T00:00:00+00:00",
+            ),
+            "_load_data, a day": lambda: repository._load_data(
+                path,
+                repository.COLUMNS,
+                "2019-06-01T00:00:00+00:00",
+                "2019-06-02T00:00:00+00:00",
+            ),
+        }
+        print(f"bars: {bars} ({years} years of 1m bars)")
+        reference_s = None
+        for name, load in loads.items():
+            seconds, df = timeit(load, repeat=5)
+            reference_s = reference_s or seconds
+            print(
+                f"{name}: {seconds * 1000:.1f} ms ({reference_s / seconds:.1f}x), "
+                f"shape: {df.shape}, memory: {df.memory_usage().sum() / 2**20:.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=1)
+    args = parser.parse_args()
+    main(args.years)
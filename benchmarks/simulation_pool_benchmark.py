@@ -0,0 +1,69 @@
+"""Benchmark the process pool runner against the number of workers.
+
+Run from the repository root:
+
+    python -m benchmarks.simulation_pool_benchmark --bars 20000 --jobs 16
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from benchmarks.util import timeit, write_synthetic_data
+from benchmarks.vectorized_simulation_benchmark import create_account
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.main import (
+    setup_run_simulation_pool_use_case,
+    setup_run_simulation_use_case,
+)
+
+
+def main(bars: int, jobs: int, max_workers: int) -> None:
+    start = "2019-01-01T00:00:00"
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    end_time = start_time + timedelta(minutes=bars)
+    timeframe = Timeframe.ONE_MIN
+    symbol = Symbol.BTCUSD
+    accounts = [create_account(10000.0, 1.0 + i % 10, 40000.0) for i in range(jobs)]
+
+    with tempfile.TemporaryDirectory() as data_base_path:
+        write_synthetic_data(Path(data_base_path), start, bars)
+
+        # Today: a full run, loading the data, per account
+        run_simulation = setup_run_simulation_use_case(data_base_path)
+        sequential_s, _ = timeit(
+            lambda: [
+                run_simulation.run(start_time, end_time, timeframe, symbol, account)
+                for account in accounts
+            ],
+            repeat=1,
+        )
+        print(f"bars: {bars}, jobs: {jobs}, cpus: {os.cpu_count()}")
+        print(f"sequential runs: {sequential_s:.2f} s")
+
+        workers = 1
+        while workers <= max_workers:
+            pool = setup_run_simulation_pool_use_case(data_base_path, workers)
+            pool_s, _ = timeit(
+                lambda: pool.run(start_time, end_time, timeframe, symbol, accounts),
+                repeat=1,
+            )
+            print(
+                f"pool with {workers} workers: {pool_s:.2f} s, "
+                f"speedup {sequential_s / pool_s:.2f}x"
+            )
+            workers *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=20_000)
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    # The per bar loop warns on every bar once the funding rates are exhausted
+    logging.basicConfig(level=logging.ERROR)
+    main(args.bars, args.jobs, args.max_workers)
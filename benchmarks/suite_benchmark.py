@@ -0,0 +1,318 @@
+"""Benchmark the stages of a simulation on 1 month, 1 year and 5 years of 1m bars.
+
+The write_columnar and open_columnar stages write the simulation to the
+columnar format and memory-map it back.
+
+The stream stage simulates writing the snapshots to NDJSON as they are made,
+before the simulate stage keeps them in memory, so its peak RSS is not
+hidden by the later stages.
+
+The synthetic OHLCV and 8h funding rate feather files are written in the layout
+of the repositories and are reproducible, so the JSON results of two commits
+can be compared. Every size runs in a fresh process, so its peak RSS is its own.
+
+Run from the repository root:
+
+    python -m benchmarks.suite_benchmark --sizes 1_month 1_year --output ./output/suite_benchmark.json
+
+Serializing years of snapshots to JSON takes minutes and gigabytes, so the
+serialize stage can be skipped with `--skip serialize`.
+"""
+
+# pylint: disable=protected-access
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.util import timeit, write_synthetic_data
+from benchmarks.vectorized_simulation_benchmark import create_account
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.market_timeline import MarketTimeline
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.simulation_serializer import SimulationSerializer
+from perp_simulation.gateway.simulation_writer import (
+    ArrowSimulationReader,
+    ArrowSimulationWriter,
+    NDJSONSimulationWriter,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+
+START = "2019-01-01T00:00:00"
+START_TIME = datetime(2019, 1, 1, tzinfo=timezone.utc)
+BARS_PER_DAY = 24 * 60
+# Number of 1m bars of every size
+SIZES = {
+    "1_month": 30 * BARS_PER_DAY,
+    "1_year": 365 * BARS_PER_DAY,
+    "5_years": 5 * 365 * BARS_PER_DAY,
+}
+
+
+def get_peak_rss_bytes() -> int:
+    """Get the peak resident set size of the process so far."""
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def get_commit() -> Optional[str]:
+    """Get the current git commit, None if it is not available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def process(
+    ohlcv_repository: OHLCVRepository,
+    funding_rate_repository: FundingRateRepository,
+    raw_ohlcv_df,
+    raw_funding_rate_df,
+    end_time: datetime,
+) -> MarketTimeline:
+    """Process the raw data like the repositories and align it to the bars."""
+    start_time_str = START_TIME.isoformat()
+    end_time_str = end_time.isoformat()
+    ohlcv_df = ohlcv_repository._data_processing_service.process_raw_data(
+        raw_ohlcv_df,
+        start_time_str,
+        Timeframe.ONE_MIN,
+        end_time_str,
+        ohlcv_repository.NEAREST_START,
+    )
+    funding_rate = funding_rate_repository._data_processing_service.process_raw_data(
+        raw_funding_rate_df,
+        start_time_str,
+        Timeframe.ONE_MIN,
+        end_time_str,
+        funding_rate_repository.NEAREST_START,
+    )
+    ohlcv_series = OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=DataProcessingService.index_to_ts(ohlcv_df),
+        open=ohlcv_df["open"].to_numpy(dtype=np.float64),
+        high=ohlcv_df["high"].to_numpy(dtype=np.float64),
+        low=ohlcv_df["low"].to_numpy(dtype=np.float64),
+        close=ohlcv_df["close"].to_numpy(dtype=np.float64),
+        volume=ohlcv_df["volume"].to_numpy(dtype=np.float64),
+    )
+    return MarketTimelineRepository.align(
+        ohlcv_series,
+        Timeframe.ONE_MIN,
+        DataProcessingService.index_to_ts(funding_rate),
+        funding_rate.to_numpy(dtype=np.float64),
+    )
+
+
+def stream(
+    run_simulation, market_timeline: MarketTimeline, end_time: datetime, path: Path
+) -> int:
+    """Simulate writing the snapshots to NDJSON and get the size of the file."""
+    with NDJSONSimulationWriter(path) as writer:
+        run_simulation.simulate(
+            START_TIME,
+            end_time,
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            create_account(10000.0, 2.0, float(market_timeline.ohlcv_series.close[0])),
+            market_timeline,
+            writer=writer,
+        )
+    return path.stat().st_size
+
+
+def run_size(data_base_path: str, bars: int, repeat: int, skip: List[str]) -> Dict:
+    """Time every stage on the data of a size. It runs in its own process."""
+    end_time = START_TIME + timedelta(minutes=bars)
+    ohlcv_repository = OHLCVRepository(data_base_path)
+    funding_rate_repository = FundingRateRepository(data_base_path)
+    run_simulation = setup_run_simulation_use_case(data_base_path)
+    stages = {}
+
+    def add_stage(name: str, seconds: float) -> None:
+        stages[name] = {
+            "seconds": seconds,
+            "bars_per_second": bars / seconds,
+            "peak_rss_bytes": get_peak_rss_bytes(),
+        }
+
+    seconds, (raw_ohlcv_df, raw_funding_rate_df) = timeit(
+        lambda: (
+            ohlcv_repository._get_df(Timeframe.ONE_MIN, Symbol.BTCUSD),
+            funding_rate_repository._get_df(Timeframe.ONE_MIN, Symbol.BTCUSD),
+        ),
+        repeat,
+    )
+    add_stage("load", seconds)
+
+    seconds, market_timeline = timeit(
+        lambda: process(
+            ohlcv_repository,
+            funding_rate_repository,
+            raw_ohlcv_df,
+            raw_funding_rate_df,
+            end_time,
+        ),
+        repeat,
+    )
+    add_stage("process", seconds)
+    del raw_ohlcv_df, raw_funding_rate_df
+
+    def iterate() -> int:
+        count = 0
+        for _ in market_timeline:
+            count += 1
+        return count
+
+    seconds, _ = timeit(iterate, repeat)
+    add_stage("iterate", seconds)
+
+    streamed_bytes = None
+    if "stream" not in skip:
+        seconds, streamed_bytes = timeit(
+            lambda: stream(
+                run_simulation,
+                market_timeline,
+                end_time,
+                Path(data_base_path) / "simulation_result.ndjson",
+            ),
+            repeat,
+        )
+        add_stage("stream", seconds)
+
+    seconds, simulation = timeit(
+        lambda: run_simulation.simulate(
+            START_TIME,
+            end_time,
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            create_account(10000.0, 2.0, float(market_timeline.ohlcv_series.close[0])),
+            market_timeline,
+        ),
+        repeat,
+    )
+    add_stage("simulate", seconds)
+
+    columnar_path = Path(data_base_path) / "simulation_result.arrow"
+    seconds, _ = timeit(
+        lambda: ArrowSimulationWriter.write(simulation, columnar_path), repeat
+    )
+    add_stage("write_columnar", seconds)
+
+    seconds, _ = timeit(
+        lambda: ArrowSimulationReader(columnar_path)
+        .read()
+        .account_snapshots.to_frame(),
+        repeat,
+    )
+    add_stage("open_columnar", seconds)
+
+    serialized_bytes = None
+    if "serialize" not in skip:
+        seconds, simulation_json = timeit(
+            lambda: SimulationSerializer.to_json(simulation), repeat
+        )
+        add_stage("serialize", seconds)
+        serialized_bytes = len(simulation_json)
+
+    return {
+        "bars": len(market_timeline),
+        "funding_rates": len(market_timeline.funding_rate_ts),
+        "serialized_bytes": serialized_bytes,
+        "streamed_bytes": streamed_bytes,
+        "columnar_bytes": columnar_path.stat().st_size,
+        "stages": stages,
+        "peak_rss_bytes": get_peak_rss_bytes(),
+    }
+
+
+def main(
+    sizes: List[str],
+    output: Path,
+    data_path: Optional[Path],
+    repeat: int,
+    skip: List[str],
+) -> None:
+    with tempfile.TemporaryDirectory() as tmp_path:
+        data_path = data_path or Path(tmp_path)
+        results = {}
+        for size in sizes:
+            bars = SIZES[size]
+            size_data_path = data_path / size
+            # The data is reproducible, so it is only written if it is missing
+            if not size_data_path.exists():
+                write_synthetic_data(size_data_path, START, bars)
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(
+                    run_size, str(size_data_path), bars, repeat, skip
+                ).result()
+            results[size] = result
+            print(
+                f"{size}: {result['bars']} bars, "
+                f"peak RSS {result['peak_rss_bytes'] / 2**20:,.0f} MiB"
+            )
+            for name, stage in result["stages"].items():
+                print(
+                    f"  {name}: {stage['seconds']:.3f} s, "
+                    f"{stage['bars_per_second']:,.0f} bars/s"
+                )
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="UTF-8") as output_file:
+        json.dump(
+            {
+                "commit": get_commit(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": repeat,
+                "skip": skip,
+                "results": results,
+            },
+            output_file,
+            indent=2,
+        )
+    print(f"results written to {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=list(SIZES))
+    parser.add_argument(
+        "--output", type=Path, default=Path("./output/suite_benchmark.json")
+    )
+    parser.add_argument(
+        "--data-path",
+        type=Path,
+        default=None,
+        help="Directory to keep the synthetic data between runs, a temporary one by default",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument(
+        "--skip", nargs="*", choices=["stream", "serialize"], default=[]
+    )
+    args = parser.parse_args()
+    main(args.sizes, args.output, args.data_path, args.repeat, args.skip)
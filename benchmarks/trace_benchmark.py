@@ -0,0 +1,87 @@
+"""Benchmark the per bar logging cost of RunSimulation with the trace disabled,
+sampled and enabled for every bar.
+
+Run from the repository root:
+
+    python -m benchmarks.trace_benchmark --bars 50000
+"""
+
+import argparse
+import logging
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.util import timeit
+from benchmarks.vectorized_simulation_benchmark import (
+    BARS_PER_YEAR,
+    create_account,
+    create_series,
+)
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+from perp_simulation.trace import TRACE_LOGGER_NAME, Tracer
+
+# (name, level of the root logger, level of the trace logger, sample every)
+SCENARIOS = [
+    ("production (INFO, trace disabled)", logging.INFO, logging.INFO, 1),
+    ("trace sampled every 1440 bars", logging.INFO, logging.DEBUG, 1440),
+    ("trace every bar", logging.INFO, logging.DEBUG, 1),
+    ("DEBUG everything", logging.DEBUG, logging.DEBUG, 1),
+]
+
+
+def main(bars: int) -> None:
+    series = create_series(bars)
+    funding_rate_ts = series.ts[::480]
+    market_timeline = MarketTimelineRepository.align(
+        series,
+        Timeframe.ONE_MIN,
+        funding_rate_ts,
+        np.full(len(funding_rate_ts), 0.0001),
+    )
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    root_logger = logging.getLogger()
+    trace_logger = logging.getLogger(TRACE_LOGGER_NAME)
+
+    print(f"bars: {bars}, extrapolated to a year of 1m bars")
+    with tempfile.TemporaryDirectory() as log_path:
+        handler = logging.FileHandler(Path(log_path) / "benchmark.log", mode="w")
+        root_logger.addHandler(handler)
+        try:
+            for name, root_level, trace_level, sample_every in SCENARIOS:
+                root_logger.setLevel(root_level)
+                trace_logger.setLevel(trace_level)
+                run_simulation = setup_run_simulation_use_case(
+                    ".", Tracer(sample_every)
+                )
+                seconds, _ = timeit(
+                    lambda: run_simulation.simulate(
+                        start_time,
+                        start_time,
+                        Timeframe.ONE_MIN,
+                        Symbol.BTCUSD,
+                        create_account(10000.0, 2.0, float(series.close[0])),
+                        market_timeline,
+                    ),
+                    repeat=1,
+                )
+                print(
+                    f"{name}: {bars / seconds:,.0f} bars/s, "
+                    f"{BARS_PER_YEAR / bars * seconds:.1f} s per year"
+                )
+        finally:
+            root_logger.removeHandler(handler)
+            handler.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=50_000)
+    args = parser.parse_args()
+    main(args.bars)
@@ -0,0 +1,112 @@
+"""Helpers shared by the benchmarks."""
+
+import time
+from pathlib import Path
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from perp_simulation.constant import DataType, Symbol, Timeframe
+
+
+def create_synthetic_ohlcv_df(
+    start: str, periods: int, timeframe: str = Timeframe.ONE_MIN, seed: int = 42
+) -> pd.DataFrame:
+    """Create a reproducible random walk OHLCV DataFrame in the raw feather layout."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(
+        start=start,
+        periods=periods,
+        freq=f"{Timeframe.to_seconds(timeframe)}s",
+        tz="UTC",
+    )
+    returns = rng.normal(0.0, 0.0008, periods)
+    close = 40000.0 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([40000.0], close[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.0004, periods)) * close
+    df = pd.DataFrame(
+        {
+            "date": dates,
+            "open": open_,
+            "high": np.maximum(open_, close) + spread,
+            "low": np.minimum(open_, close) - spread,
+            "close": close,
+            "volume": rng.gamma(2.0, 100.0, periods),
+        }
+    )
+    return df
+
+
+def create_synthetic_funding_rate_df(
+    start: str, periods: int, seed: int = 42
+) -> pd.DataFrame:
+    """Create a reproducible 8h funding rate DataFrame in the raw feather layout.
+
+    The funding rate timeseries is at the "open" column. The rest is zero.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(
+        start=start,
+        periods=periods,
+        freq=f"{Timeframe.to_seconds(Timeframe.EIGHT_HOUR)}s",
+        tz="UTC",
+    )
+    zeros = np.zeros(periods)
+    df = pd.DataFrame(
+        {
+            "date": dates,
+            "open": rng.normal(0.0001, 0.0001, periods),
+            "high": zeros,
+            "low": zeros,
+            "close": zeros,
+            "volume": zeros,
+        }
+    )
+    return df
+
+
+def write_synthetic_data(
+    data_base_path: Path,
+    start: str,
+    periods: int,
+    symbol: str = Symbol.BTCUSD,
+    mark_price: bool = False,
+) -> None:
+    """Write 1m OHLCV and 8h funding rate feather files covering the same period,
+    and 1m mark price bars 0.01% below the OHLCV bars if mark_price is True."""
+    data_base_path.mkdir(parents=True, exist_ok=True)
+    normalized_symbol = Symbol.normalize(symbol)
+    ohlcv_df = create_synthetic_ohlcv_df(start, periods)
+    ohlcv_df.to_feather(
+        data_base_path
+        / f"{normalized_symbol}-{Timeframe.ONE_MIN}-{DataType.OHLCV}.feather"
+    )
+    if mark_price:
+        mark_price_df = ohlcv_df.copy()
+        for column in ("open", "high", "low", "close"):
+            mark_price_df[column] = mark_price_df[column] * 0.9999
+        mark_price_df.to_feather(
+            data_base_path
+            / f"{normalized_symbol}-{Timeframe.ONE_MIN}-{DataType.MARK_PRICE}.feather"
+        )
+    funding_periods = periods // (
+        Timeframe.to_seconds(Timeframe.EIGHT_HOUR)
+        // Timeframe.to_seconds(Timeframe.ONE_MIN)
+    )
+    funding_rate_df = create_synthetic_funding_rate_df(start, max(funding_periods, 1))
+    funding_rate_df.to_feather(
+        data_base_path
+        / f"{normalized_symbol}-{Timeframe.EIGHT_HOUR}-{DataType.FUNDING_RATE}.feather"
+    )
+
+
+def timeit(func: Callable, repeat: int = 3) -> Tuple[float, object]:
+    """Run func repeat times and return the best wall time in seconds and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
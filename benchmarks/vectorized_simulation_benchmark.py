@@ -0,0 +1,145 @@
+"""Benchmark the vectorized engine against the per bar loop for a static book.
+
+Run from the repository root:
+
+    python -m benchmarks.vectorized_simulation_benchmark --years 5 --loop-bars 50000
+"""
+
+import argparse
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.util import (
+    create_synthetic_funding_rate_df,
+    create_synthetic_ohlcv_df,
+    timeit,
+)
+from perp_simulation.constant import BINANCE_FUTURES_TAKER_FEE_PCT, Symbol, Timeframe
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.entity.position import Position
+from perp_simulation.entity.trade import Trade
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+from perp_simulation.use_case.run_vectorized_simulation import RunVectorizedSimulation
+from perp_simulation.use_case.update_position_initial_margin import (
+    UpdatePositionInitialMargin,
+)
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from perp_simulation.use_case.update_position_unrealized_pnl import (
+    UpdatePositionUnrealizedPnl,
+)
+
+BARS_PER_YEAR = 365 * 24 * 60
+
+
+def create_account(balance: float, leverage: float, price: float) -> Account:
+    notional = balance * leverage
+    quantity = notional / price
+    trade = Trade(
+        ts=0,
+        symbol=Symbol.BTCUSD,
+        type=Trade.BUY,
+        quantity=quantity,
+        price=price,
+        fee=notional * BINANCE_FUTURES_TAKER_FEE_PCT,
+    )
+    return Account(balance=balance, positions=[Position.from_trade(trade)])
+
+
+def create_series(bars: int) -> OHLCVSeries:
+    df = DataProcessingService.index_raw_df(
+        create_synthetic_ohlcv_df("2019-01-01T00:00:00", bars)
+    )
+    return OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=DataProcessingService.index_to_ts(df),
+        open=df["open"].to_numpy(),
+        high=df["high"].to_numpy(),
+        low=df["low"].to_numpy(),
+        close=df["close"].to_numpy(),
+        volume=df["volume"].to_numpy(),
+    )
+
+
+def main(years: int, loop_bars: int) -> None:
+    bars = years * BARS_PER_YEAR
+    series = create_series(bars)
+    funding_rate_df = DataProcessingService.index_raw_df(
+        create_synthetic_funding_rate_df("2019-01-01T00:00:00", bars // 480)
+    )
+    funding_rate_ts = DataProcessingService.index_to_ts(funding_rate_df)
+    funding_rate = funding_rate_df["open"].to_numpy()
+    start_time = datetime(2019, 1, 1, tzinfo=timezone.utc)
+    timeframe = Timeframe.ONE_MIN
+
+    vectorized = RunVectorizedSimulation(
+        ohlcv_repository=None,
+        funding_rate_repository=None,
+        update_position_unrealized_pnl_use_case=UpdatePositionUnrealizedPnl(),
+        update_position_initial_margin_use_case=UpdatePositionInitialMargin(),
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+        update_position_liquidation_price_use_case=UpdatePositionLiquidationPrice(),
+    )
+    vectorized_s, equity_curve = timeit(
+        lambda: vectorized.compute_equity_curve(
+            create_account(10000.0, 2.0, float(series.close[0])),
+            series,
+            funding_rate_ts,
+            funding_rate,
+            timeframe,
+        )
+    )
+
+    # The loop is timed on the first bars only and extrapolated
+    loop_series = OHLCVSeries(
+        symbol=series.symbol,
+        ts=series.ts[:loop_bars],
+        open=series.open[:loop_bars],
+        high=series.high[:loop_bars],
+        low=series.low[:loop_bars],
+        close=series.close[:loop_bars],
+        volume=series.volume[:loop_bars],
+    )
+    loop_market_timeline = MarketTimelineRepository.align(
+        loop_series, timeframe, funding_rate_ts, funding_rate
+    )
+    run_simulation = setup_run_simulation_use_case(".")
+    loop_s, _ = timeit(
+        lambda: run_simulation.simulate(
+            start_time,
+            start_time,
+            timeframe,
+            Symbol.BTCUSD,
+            create_account(10000.0, 2.0, float(series.close[0])),
+            loop_market_timeline,
+        ),
+        repeat=1,
+    )
+
+    print(f"bars: {bars} ({years} years of 1m bars)")
+    print(
+        f"vectorized: {vectorized_s * 1000:.1f} ms, {bars / vectorized_s:,.0f} bars/s, "
+        f"liquidated: {np.any(equity_curve.liquidation_index >= 0)}"
+    )
+    print(
+        f"loop: {loop_s:.3f} s for {loop_bars} bars, {loop_bars / loop_s:,.0f} bars/s, "
+        f"extrapolated {bars / loop_bars * loop_s:.1f} s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--loop-bars", type=int, default=50_000)
+    args = parser.parse_args()
+    main(args.years, args.loop_bars)
@@ -13,7 +13,7 @@ class Symbol:
     def all() -> List[str]:
         """Return all available symbols."""
         return [Symbol.BTCUSD, Symbol.ETHUSD]
-    
+
     @staticmethod
     def normalize(symbol: str) -> str:
         """Normalize the symbol."""
@@ -40,18 +40,25 @@ class Timeframe:
     FIVE_MIN = "5m"
     ONE_HOUR = "1h"
     EIGHT_HOUR = "8h"
+    ONE_DAY = "1d"
 
     @staticmethod
     def to_seconds(t: str) -> int:
         """Convert the timeframe to seconds."""
-        timeframe_to_sec = {"1m": 60, "5m": 5 * 60, "1h": 60 * 60, "8h": 60 * 60 * 8}
+        timeframe_to_sec = {
+            "1m": 60,
+            "5m": 5 * 60,
+            "1h": 60 * 60,
+            "8h": 60 * 60 * 8,
+            "1d": 60 * 60 * 24,
+        }
         return timeframe_to_sec[t]
 
     @staticmethod
     def to_pd(t: str) -> str:
         """Convert the timeframe to a Pandas-compatible timeframe string."""
         # TODO: warning: T for minute is going to be deprecated
-        return t.replace("m", "T").replace("h", "H")
+        return t.replace("m", "T").replace("h", "H").replace("d", "D")
 
     @staticmethod
     def all() -> List[str]:
@@ -61,6 +68,7 @@ class Timeframe:
             Timeframe.FIVE_MIN,
             Timeframe.ONE_HOUR,
             Timeframe.EIGHT_HOUR,
+            Timeframe.ONE_DAY,
         ]
 
 
@@ -0,0 +1,436 @@
+from copy import deepcopy
+from dataclasses import replace
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.position import Position
+
+
+class AccountSnapshotStore:
+    """
+    Stores the account snapshots of a simulation by columns.
+
+    The balance of every snapshot and the metrics of every position in every
+    snapshot are appended to growable numpy columns keyed by the snapshot ts,
+    instead of keeping a copy of the account objects. The static data of a
+    position (open ts, symbol, side and trade) is stored once per position.
+
+    The store behaves as a sequence of AccountSnapshot objects, which are
+    made lazily when accessed. None values of the position metrics are
+    stored as NaN.
+
+    The columns can be exported and imported as numpy arrays without
+    copying them, e.g., to read a stored result from a memory-mapped file.
+    """
+
+    POSITION_COLUMNS = (
+        "quantity",
+        "entry_price",
+        "avg_price",
+        "unrealized_pnl",
+        "initial_margin",
+        "maintenance_margin",
+        "effective_leverage",
+        "liquidation_price",
+    )
+
+    def __init__(self, capacity: int = 1024) -> None:
+        capacity = max(capacity, 1)
+        self._size = 0
+        self._ts: Optional[np.ndarray] = None
+        self._balance = np.empty(capacity, dtype=np.float64)
+        self._has_positions = np.empty(capacity, dtype=bool)
+        # Position rows of snapshot i are in [offsets[i], offsets[i + 1])
+        self._position_offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._position_size = 0
+        self._position_id = np.empty(capacity, dtype=np.int64)
+        self._position_columns = {
+            name: np.empty(capacity, dtype=np.float64) for name in self.POSITION_COLUMNS
+        }
+        # Number of funding rate costs of the position, -1 if they are None
+        self._funding_rate_costs_count = np.empty(capacity, dtype=np.int64)
+        # Registry of positions, referenced by id from the position rows
+        self._position_ids: Dict[int, int] = {}
+        self._positions: List[Position] = []
+        self._position_refs: List[Position] = []
+        self._funding_rate_costs: List[List[float]] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[AccountSnapshot]:
+        for i in range(self._size):
+            yield self._make_account_snapshot(i)
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[AccountSnapshot, List[AccountSnapshot]]:
+        if isinstance(index, slice):
+            return [
+                self._make_account_snapshot(i)
+                for i in range(*index.indices(self._size))
+            ]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Account snapshot index out of range")
+        return self._make_account_snapshot(index)
+
+    @property
+    def ts(self) -> np.ndarray:
+        """
+        Gets the ts of the snapshots.
+        """
+        if self._ts is None:
+            return np.empty(0, dtype=np.int64)
+        return self._ts[: self._size]
+
+    @property
+    def balance(self) -> np.ndarray:
+        """
+        Gets the account balance of the snapshots.
+        """
+        return self._balance[: self._size]
+
+    @property
+    def has_positions(self) -> np.ndarray:
+        """
+        Gets a mask of the snapshots where the positions of the account are not None.
+        """
+        return self._has_positions[: self._size]
+
+    @property
+    def position_offsets(self) -> np.ndarray:
+        """
+        Gets the offsets of the position rows, the ones of snapshot i are in
+        [offsets[i], offsets[i + 1]).
+        """
+        return self._position_offsets[: self._size + 1]
+
+    @property
+    def positions(self) -> List[Position]:
+        """
+        Gets the static data of the positions referenced by the position rows,
+        without funding rate costs.
+        """
+        return self._positions
+
+    @property
+    def funding_rate_costs(self) -> List[List[float]]:
+        """
+        Gets all the funding rate costs of every position.
+        """
+        return self._funding_rate_costs
+
+    def get_position_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Gets the position rows by columns: the position id, the position
+        columns and the number of funding rate costs, -1 if they are None.
+        """
+        position_size = self._position_size
+        return {
+            "position_id": self._position_id[:position_size],
+            **{
+                name: column[:position_size]
+                for name, column in self._position_columns.items()
+            },
+            "funding_rate_costs_count": self._funding_rate_costs_count[:position_size],
+        }
+
+    @classmethod
+    def from_arrays(
+        cls,
+        ts: np.ndarray,
+        balance: np.ndarray,
+        has_positions: np.ndarray,
+        position_offsets: np.ndarray,
+        position_arrays: Dict[str, np.ndarray],
+        positions: List[Position],
+        funding_rate_costs: List[List[float]],
+    ) -> "AccountSnapshotStore":
+        """
+        Creates a store from the columns of another one without copying them.
+
+        The arrays may be read-only. They are copied if more snapshots are
+        recorded, as the store grows.
+
+        Args:
+            ts: The ts of the snapshots.
+            balance: The account balance of the snapshots.
+            has_positions: Mask of the snapshots with positions not None.
+            position_offsets: The offsets of the position rows of every snapshot.
+            position_arrays: The position rows by columns, as in get_position_arrays.
+            positions: The static data of the positions referenced by id.
+            funding_rate_costs: All the funding rate costs of every position.
+        """
+        store = cls(capacity=1)
+        size = len(ts)
+        store._size = size
+        store._ts = ts
+        store._balance = balance
+        store._has_positions = has_positions
+        store._position_offsets = position_offsets
+        store._position_size = int(position_offsets[size])
+        store._position_id = position_arrays["position_id"]
+        store._position_columns = {
+            name: position_arrays[name] for name in cls.POSITION_COLUMNS
+        }
+        store._funding_rate_costs_count = position_arrays["funding_rate_costs_count"]
+        store._positions = positions
+        store._funding_rate_costs = funding_rate_costs
+        return store
+
+    def clear(self) -> None:
+        """
+        Removes the snapshots, keeping the registry of the positions, so the
+        positions of the snapshots recorded next have the same ids.
+        """
+        self._size = 0
+        self._position_size = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Gets the ts and the account balance of the snapshots as a DataFrame
+        without copying them.
+        """
+        return pd.DataFrame({"ts": self.ts, "balance": self.balance}, copy=False)
+
+    def positions_to_frame(self) -> pd.DataFrame:
+        """
+        Gets the position rows as a DataFrame with the ts of their snapshot.
+
+        The position columns are not copied, only the ts is repeated per row.
+        """
+        ts = np.repeat(self.ts, np.diff(self.position_offsets))
+        return pd.DataFrame({"ts": ts, **self.get_position_arrays()}, copy=False)
+
+    def at(self, ts: float) -> AccountSnapshot:
+        """
+        Gets the account snapshot with the given ts.
+        """
+        index = int(np.searchsorted(self.ts, ts))
+        if index >= self._size or self.ts[index] != ts:
+            raise KeyError(f"No account snapshot with ts {ts}")
+        return self._make_account_snapshot(index)
+
+    def append(self, account_snapshot: AccountSnapshot) -> None:
+        """
+        Appends an account snapshot to the store.
+        """
+        self.record(account_snapshot.account, account_snapshot.ts)
+
+    def record(self, account: Account, ts: float) -> None:
+        """
+        Records the state of the account at the given ts.
+        """
+        positions = account.positions or []
+        self._reserve(1, len(positions))
+        if self._ts is None:
+            self._ts = np.empty(len(self._balance), dtype=self._get_ts_dtype(ts))
+
+        i = self._size
+        self._ts[i] = ts
+        self._balance[i] = account.balance
+        self._has_positions[i] = account.positions is not None
+        row = self._position_size
+        for position in positions:
+            position_id = self._register_position(position)
+            self._position_id[row] = position_id
+            for name, column in self._position_columns.items():
+                value = getattr(position, name)
+                column[row] = np.nan if value is None else value
+            self._funding_rate_costs_count[row] = self._record_funding_rate_costs(
+                position_id, position.funding_rate_costs
+            )
+            row += 1
+        self._position_size = row
+        self._position_offsets[i + 1] = row
+        self._size = i + 1
+
+    def record_flat(self, account: Account, ts: np.ndarray) -> None:
+        """
+        Records the state of an account without positions at many ts at once.
+
+        The account can't change while it has no positions, so the snapshots
+        of the rest of a simulation are recorded as a single segment.
+        """
+        if account.positions:
+            raise ValueError("The account must not have positions to record it as flat")
+        ts = np.asarray(ts)
+        n_snapshots = len(ts)
+        self._reserve(n_snapshots, 0)
+        if self._ts is None:
+            self._ts = np.empty(len(self._balance), dtype=ts.dtype)
+
+        start, end = self._size, self._size + n_snapshots
+        self._ts[start:end] = ts
+        self._balance[start:end] = account.balance
+        self._has_positions[start:end] = account.positions is not None
+        self._position_offsets[start + 1 : end + 1] = self._position_size
+        self._size = end
+
+    def extend(
+        self,
+        ts: np.ndarray,
+        balance: np.ndarray,
+        has_positions: bool,
+        positions: List[Position],
+        is_open: np.ndarray,
+        position_columns: Dict[str, np.ndarray],
+        funding_rate_costs: List[List[float]],
+        funding_rate_costs_count: np.ndarray,
+    ) -> None:
+        """
+        Appends many snapshots of the same book of positions at once.
+
+        Args:
+            ts: The ts of the snapshots.
+            balance: The account balance of the snapshots.
+            has_positions: False if the positions of the account are None.
+            positions: The book of positions.
+            is_open: Mask per snapshot (row) and position (column) of the open positions.
+            position_columns: Values per snapshot and position of the position columns.
+                Missing columns are taken from the positions.
+            funding_rate_costs: All the funding rate costs of every position.
+            funding_rate_costs_count: Number of funding rate costs per snapshot
+                and position, -1 if they are None.
+        """
+        n_snapshots = len(ts)
+        rows, cols = np.nonzero(is_open)
+        n_rows = len(rows)
+        self._reserve(n_snapshots, n_rows)
+        if self._ts is None:
+            self._ts = np.empty(len(self._balance), dtype=np.asarray(ts).dtype)
+
+        position_ids = np.array(
+            [self._register_position(position) for position in positions],
+            dtype=np.int64,
+        )
+        for position_id, costs in zip(position_ids.tolist(), funding_rate_costs):
+            self._record_funding_rate_costs(position_id, costs)
+
+        start, end = self._size, self._size + n_snapshots
+        self._ts[start:end] = ts
+        self._balance[start:end] = balance
+        self._has_positions[start:end] = has_positions
+
+        row_start, row_end = self._position_size, self._position_size + n_rows
+        self._position_id[row_start:row_end] = position_ids[cols]
+        for name, column in self._position_columns.items():
+            if name in position_columns:
+                column[row_start:row_end] = position_columns[name][rows, cols]
+            else:
+                values = np.array(
+                    [getattr(position, name) for position in positions],
+                    dtype=np.float64,
+                )
+                column[row_start:row_end] = values[cols]
+        self._funding_rate_costs_count[row_start:row_end] = funding_rate_costs_count[
+            rows, cols
+        ]
+        self._position_offsets[start + 1 : end + 1] = row_start + np.cumsum(
+            is_open.sum(axis=1)
+        )
+        self._size = end
+        self._position_size = row_end
+
+    def _get_ts_dtype(self, ts: float) -> type:
+        """Get the dtype of the ts column from the first ts recorded."""
+        if isinstance(ts, (int, np.integer)):
+            return np.int64
+        return np.float64
+
+    def _register_position(self, position: Position) -> int:
+        """Get the id of the position in the registry, adding it if it's new."""
+        position_id = self._position_ids.get(id(position))
+        if position_id is None:
+            position_id = len(self._positions)
+            self._position_ids[id(position)] = position_id
+            # Keep a reference so the id of the object is not reused
+            self._position_refs.append(position)
+            self._positions.append(replace(deepcopy(position), funding_rate_costs=None))
+            self._funding_rate_costs.append([])
+        return position_id
+
+    def _record_funding_rate_costs(
+        self, position_id: int, funding_rate_costs: Optional[List[float]]
+    ) -> int:
+        """Record the funding rate costs of the position and get their count.
+
+        The funding rate costs of a position only grow, so the new ones
+        are appended to the costs already recorded.
+        """
+        if funding_rate_costs is None:
+            return -1
+        recorded_costs = self._funding_rate_costs[position_id]
+        if len(funding_rate_costs) > len(recorded_costs):
+            recorded_costs.extend(funding_rate_costs[len(recorded_costs) :])
+        return len(funding_rate_costs)
+
+    def _reserve(self, n_snapshots: int, n_rows: int) -> None:
+        """Grow the columns, doubling their capacity, to fit the new data."""
+        capacity = len(self._balance)
+        if self._size + n_snapshots > capacity:
+            new_capacity = max(capacity * 2, self._size + n_snapshots)
+            self._balance = self._grow(self._balance, new_capacity)
+            self._has_positions = self._grow(self._has_positions, new_capacity)
+            self._position_offsets = self._grow(
+                self._position_offsets, new_capacity + 1
+            )
+            if self._ts is not None:
+                self._ts = self._grow(self._ts, new_capacity)
+
+        capacity = len(self._position_id)
+        if self._position_size + n_rows > capacity:
+            new_capacity = max(capacity * 2, self._position_size + n_rows)
+            self._position_id = self._grow(self._position_id, new_capacity)
+            self._funding_rate_costs_count = self._grow(
+                self._funding_rate_costs_count, new_capacity
+            )
+            self._position_columns = {
+                name: self._grow(column, new_capacity)
+                for name, column in self._position_columns.items()
+            }
+
+    @staticmethod
+    def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+        """Copy the array to a new one with more capacity."""
+        new_array = np.empty(capacity, dtype=array.dtype)
+        new_array[: len(array)] = array
+        return new_array
+
+    def _make_account_snapshot(self, index: int) -> AccountSnapshot:
+        """Make the account snapshot stored at the index."""
+        positions = None
+        if self._has_positions[index]:
+            positions = [
+                self._make_position(row)
+                for row in range(
+                    self._position_offsets[index], self._position_offsets[index + 1]
+                )
+            ]
+        account = Account(balance=self._balance[index].item(), positions=positions)
+        return AccountSnapshot(ts=self._ts[index].item(), account=account)
+
+    def _make_position(self, row: int) -> Position:
+        """Make the position stored at the row."""
+        position_id = self._position_id[row]
+        position = self._positions[position_id]
+        values = {}
+        for name, column in self._position_columns.items():
+            value = column[row].item()
+            values[name] = None if np.isnan(value) else value
+        count = self._funding_rate_costs_count[row]
+        funding_rate_costs = None
+        if count >= 0:
+            funding_rate_costs = self._funding_rate_costs[position_id][:count]
+        return replace(
+            position,
+            trade=replace(position.trade),
+            funding_rate_costs=funding_rate_costs,
+            **values,
+        )
@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class EquityCurve:
+    """
+    Represents the progression of an account with a static book of positions
+    stored by columns.
+
+    There is one row per bar and one column per position of the book.
+    Position metrics are NaN in the bars where the position is closed.
+    """
+
+    ts: np.ndarray
+    balance: np.ndarray
+    unrealized_pnl: np.ndarray
+    effective_leverage: np.ndarray
+    liquidation_price: np.ndarray
+    # Funding rate costs per settlement (row) and position (column)
+    funding_rate_costs: np.ndarray
+    # Number of funding rate settlements up to each bar
+    funding_rate_count: np.ndarray
+    # Bar where each position is liquidated, -1 if it is not liquidated
+    liquidation_index: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def is_open(self) -> np.ndarray:
+        """
+        Gets a boolean mask per bar and position with the open positions.
+        """
+        return ~np.isnan(self.unrealized_pnl)
@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+
+
+@dataclass
+class LiquidationHorizonIndex:
+    """
+    Represents an index over the prices of a series of bars to find the first
+    bar since a start bar where the price crosses a liquidation price.
+
+    The minimum (for long positions) and the maximum (for short positions) of
+    the prices are precomputed for aligned blocks of 1, 2, 4... bars, stored
+    level after level in flat arrays of about twice the number of bars. A
+    query climbs the levels skipping the blocks that are not crossed and then
+    descends into the first crossed block, so it takes O(log n) steps. The
+    queries are answered together, one numpy operation per step.
+    """
+
+    ts: np.ndarray
+    # Minimum and maximum price of every block, level after level
+    block_min: np.ndarray
+    block_max: np.ndarray
+    # Level k, with blocks of 2**k bars, is in [level_offsets[k], level_offsets[k + 1])
+    level_offsets: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def levels(self) -> int:
+        return len(self.level_offsets) - 1
+
+    @classmethod
+    def from_prices(
+        cls,
+        ts: np.ndarray,
+        low_price: np.ndarray,
+        high_price: Optional[np.ndarray] = None,
+    ) -> "LiquidationHorizonIndex":
+        """
+        Creates the index of the prices of the bars. The low prices are used
+        for long positions and the high prices, the low ones by default, for
+        short positions.
+        """
+        low_price = np.asarray(low_price, dtype=np.float64)
+        high_price = (
+            low_price
+            if high_price is None
+            else np.asarray(high_price, dtype=np.float64)
+        )
+        min_levels = [low_price]
+        max_levels = [high_price]
+        while len(min_levels[-1]) > 1:
+            min_levels.append(cls._reduce_pairs(min_levels[-1], np.minimum))
+            max_levels.append(cls._reduce_pairs(max_levels[-1], np.maximum))
+        level_offsets = np.concatenate(
+            ([0], np.cumsum([len(level) for level in min_levels]))
+        ).astype(np.int64)
+        return cls(
+            ts=np.asarray(ts),
+            block_min=np.concatenate(min_levels),
+            block_max=np.concatenate(max_levels),
+            level_offsets=level_offsets,
+        )
+
+    @classmethod
+    def from_series(
+        cls, ohlcv_series: OHLCVSeries, intrabar: bool = False
+    ) -> "LiquidationHorizonIndex":
+        """
+        Creates the index of the close prices of the series, the price used to
+        liquidate the positions in the simulations, or of the low and high
+        prices if the liquidation is intrabar.
+        """
+        if intrabar:
+            return cls.from_prices(ohlcv_series.ts, ohlcv_series.low, ohlcv_series.high)
+        return cls.from_prices(ohlcv_series.ts, ohlcv_series.close)
+
+    def first_at_or_below(
+        self, price: Union[float, np.ndarray], start: Union[int, np.ndarray] = 0
+    ) -> np.ndarray:
+        """
+        Gets the first bar since the start bar where the price is less than or
+        equal to the given price, -1 if there is none. It's the liquidation
+        bar of a long position with that liquidation price.
+        """
+        return self._find_first(self.block_min, price, start, is_below=True)
+
+    def first_at_or_above(
+        self, price: Union[float, np.ndarray], start: Union[int, np.ndarray] = 0
+    ) -> np.ndarray:
+        """
+        Gets the first bar since the start bar where the price is greater than
+        or equal to the given price, -1 if there is none. It's the liquidation
+        bar of a short position with that liquidation price.
+        """
+        return self._find_first(self.block_max, price, start, is_below=False)
+
+    def _find_first(
+        self,
+        blocks: np.ndarray,
+        price: Union[float, np.ndarray],
+        start: Union[int, np.ndarray],
+        is_below: bool,
+    ) -> np.ndarray:
+        """Find the first bar crossing the price of every query."""
+        price, start = np.broadcast_arrays(
+            np.asarray(price, dtype=np.float64), np.asarray(start, dtype=np.int64)
+        )
+        price = price.ravel()
+        pos = start.ravel().copy()
+        n_bars = len(self.ts)
+        level_offsets = self.level_offsets
+        top_level = self.levels - 1
+        level = np.zeros(len(pos), dtype=np.int64)
+
+        def is_crossed(active: np.ndarray) -> np.ndarray:
+            block = blocks[
+                level_offsets[level[active]] + (pos[active] >> level[active])
+            ]
+            if is_below:
+                return block <= price[active]
+            return block >= price[active]
+
+        # Climb: skip the blocks that are not crossed, going up a level every
+        # time the next block is aligned to the level above. A query is done
+        # when its block is crossed or it's past the last bar.
+        climbing = (pos >= 0) & (pos < n_bars)
+        while climbing.any():
+            active = np.flatnonzero(climbing)
+            crossed = is_crossed(active)
+            skipping = active[~crossed]
+            pos[skipping] += np.int64(1) << level[skipping]
+            climbing[active[crossed]] = False
+            climbing[skipping] = pos[skipping] < n_bars
+            going_up = skipping[
+                ((pos[skipping] >> level[skipping]) & 1 == 0)
+                & (level[skipping] < top_level)
+            ]
+            level[going_up] += 1
+
+        # Descend into the first crossed block to its first crossed bar
+        found = (pos >= 0) & (pos < n_bars)
+        descending = found & (level > 0)
+        while descending.any():
+            active = np.flatnonzero(descending)
+            level[active] -= 1
+            crossed = is_crossed(active)
+            skipping = active[~crossed]
+            pos[skipping] += np.int64(1) << level[skipping]
+            descending[active] = level[active] > 0
+
+        pos[~found] = -1
+        return pos.reshape(start.shape)
+
+    @staticmethod
+    def _reduce_pairs(level: np.ndarray, ufunc: np.ufunc) -> np.ndarray:
+        """Reduce every pair of blocks of a level to a block of the next one."""
+        if len(level) % 2:
+            level = np.append(level, level[-1])
+        return ufunc(level[0::2], level[1::2])
@@ -0,0 +1,87 @@
+from dataclasses import dataclass
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from perp_simulation.entity.funding_rate import FundingRate
+from perp_simulation.entity.ohlcv import OHLCV
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+
+
+@dataclass
+class MarketTimeline:
+    """
+    Represents the market data of a simulation aligned to the OHLCV bars.
+
+    The funding rate settlements are stored as events, and every bar has the
+    index of the event settled at its open, -1 if there is none. The mark
+    price, if any, has one value per bar and is NaN where it is missing, as
+    the low and high of the mark price bars.
+    """
+
+    ohlcv_series: OHLCVSeries
+    # Index of the funding rate event per bar, -1 if there is no settlement
+    funding_rate_index: np.ndarray
+    funding_rate_ts: np.ndarray
+    funding_rate: np.ndarray
+    mark_price: Optional[np.ndarray] = None
+    mark_price_low: Optional[np.ndarray] = None
+    mark_price_high: Optional[np.ndarray] = None
+
+    @property
+    def symbol(self) -> str:
+        return self.ohlcv_series.symbol
+
+    @property
+    def ts(self) -> np.ndarray:
+        return self.ohlcv_series.ts
+
+    def __len__(self) -> int:
+        return len(self.ohlcv_series)
+
+    def get_mark_prices(self) -> np.ndarray:
+        """
+        Gets the price to update and liquidate the positions at the close of
+        every bar: the mark price, or the close price where it is missing.
+        """
+        close = np.asarray(self.ohlcv_series.close, dtype=np.float64)
+        if self.mark_price is None:
+            return close
+        return np.where(np.isnan(self.mark_price), close, self.mark_price)
+
+    def get_liquidation_prices(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Gets the prices to check the liquidation of the positions inside every
+        bar: the low price for long positions and the high price for short
+        positions. They are the ones of the mark price bars, or the ones of
+        the OHLCV bars where the mark price is missing.
+        """
+        low_price = np.asarray(self.ohlcv_series.low, dtype=np.float64)
+        high_price = np.asarray(self.ohlcv_series.high, dtype=np.float64)
+        if self.mark_price_low is not None:
+            low_price = np.where(
+                np.isnan(self.mark_price_low), low_price, self.mark_price_low
+            )
+        if self.mark_price_high is not None:
+            high_price = np.where(
+                np.isnan(self.mark_price_high), high_price, self.mark_price_high
+            )
+        return low_price, high_price
+
+    def __iter__(self) -> Iterator[Tuple[OHLCV, Optional[FundingRate]]]:
+        """
+        Iterates over the bars yielding the OHLCV data point and the funding
+        rate settled at the bar, None if there is no settlement.
+
+        The funding rates are built once per event, so the loop only has to
+        look up the event of the bar.
+        """
+        symbol = self.symbol
+        funding_rates = [
+            FundingRate(ts=ts, symbol=symbol, rate=rate)
+            for ts, rate in zip(
+                self.funding_rate_ts.tolist(), self.funding_rate.tolist()
+            )
+        ]
+        for ohlcv, index in zip(self.ohlcv_series, self.funding_rate_index.tolist()):
+            yield ohlcv, funding_rates[index] if index >= 0 else None
@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+from perp_simulation.entity.ohlcv import OHLCV
+
+
+@dataclass
+class OHLCVSeries:
+    """
+    Represents a series of OHLCV data points stored by columns.
+
+    The timestamps are POSIX timestamps in seconds (int64) and
+    the prices and volume are float64 arrays of the same length.
+    """
+
+    symbol: str
+    ts: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __iter__(self) -> Iterator[OHLCV]:
+        """
+        Iterates over the series yielding OHLCV data points.
+
+        The columns are converted to python native objects once, which is
+        much faster than building the data points from pandas rows.
+        """
+        symbol = self.symbol
+        for ts, open_, high, low, close, volume in zip(
+            self.ts.tolist(),
+            self.open.tolist(),
+            self.high.tolist(),
+            self.low.tolist(),
+            self.close.tolist(),
+            self.volume.tolist(),
+        ):
+            yield OHLCV(
+                ts=ts,
+                symbol=symbol,
+                open=open_,
+                high=high,
+                low=low,
+                close=close,
+                volume=volume,
+            )
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class ParameterSweep:
+    """
+    Represents the result of simulating a grid of account configurations
+    stored by columns.
+
+    There is one row per combination of account balance, leverage and
+    entry price of a long position.
+    """
+
+    balance: np.ndarray
+    leverage: np.ndarray
+    entry_price: np.ndarray
+    final_balance: np.ndarray
+    # Ts of the account snapshot where the position is liquidated, -1 if it is not liquidated
+    liquidation_ts: np.ndarray
+    # Sum of the funding rate costs settled until the end or the liquidation
+    funding_paid: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.balance)
+
+    def is_liquidated(self) -> np.ndarray:
+        """
+        Gets a boolean mask with the liquidated configurations.
+        """
+        return self.liquidation_ts >= 0
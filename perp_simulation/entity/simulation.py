@@ -1,8 +1,11 @@
-from dataclasses import asdict, dataclass
-from typing import Dict, List, Literal, Optional
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Union
 
-from perp_simulation.entity.account import Account
+from perp_simulation.constant import Symbol
 from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
+from perp_simulation.entity.simulation_profile import SimulationProfile
 
 
 @dataclass
@@ -14,11 +17,15 @@ class Simulation:
     name: str
     simulation_start_ts: int
     simulation_end_ts: int
-    timeframe: Literal["1m", "5m", "1h", "8h"]  # TODO: make enum
+    timeframe: Literal["1m", "5m", "1h", "8h", "1d"]  # TODO: make enum
     symbol: str
     run_start_ts: Optional[int] = None
     run_end_ts: Optional[int] = None
-    account_snapshots: Optional[List[Account]] = None
+    account_snapshots: Optional[Union[List[AccountSnapshot], AccountSnapshotStore]] = (
+        None
+    )
+    # Per phase timings, only if the run is profiled
+    profile: Optional[SimulationProfile] = None
 
     def add_account_snapshot(self, account_snapshot: AccountSnapshot) -> None:
         """
@@ -28,11 +35,30 @@ class Simulation:
             self.account_snapshots = []
         self.account_snapshots.append(account_snapshot)
 
+    @staticmethod
+    def create_name(
+        start_time: datetime, end_time: datetime, timeframe: str, symbol: str
+    ) -> str:
+        """
+        Creates a simulation name based on the simulation parameters.
+        """
+        # TODO: add symbol and account name to the simulation name?
+        start_time_str = start_time.isoformat().replace(":", "-")
+        end_time_str = end_time.isoformat().replace(":", "-")
+        normalized_symbol = Symbol.normalize(symbol)
+        return f"{start_time_str}_{end_time_str}_{timeframe}_{normalized_symbol}"
+
     def to_dict(self) -> Dict:
         """
         Converts the simulation to a dictionary.
         """
-        return asdict(self)
+        account_snapshots = None
+        if self.account_snapshots is not None:
+            account_snapshots = [asdict(s) for s in self.account_snapshots]
+        data = asdict(replace(self, account_snapshots=None, profile=None))
+        data["account_snapshots"] = account_snapshots
+        data["profile"] = self.profile.to_dict() if self.profile is not None else None
+        return data
 
     @classmethod
     def from_dict(cls, data: Dict) -> "Simulation":
@@ -44,4 +70,6 @@ class Simulation:
             s.account_snapshots = [
                 AccountSnapshot.from_dict(snapshot) for snapshot in s.account_snapshots
             ]
+        if s.profile is not None:
+            s.profile = SimulationProfile.from_dict(s.profile)
         return s
@@ -0,0 +1,105 @@
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass
+class PhaseProfile:
+    """
+    Represents the time spent in a phase of a simulation run.
+    """
+
+    calls: int = 0
+    total_ns: int = 0
+
+    def add(self, elapsed_ns: int) -> None:
+        """
+        Adds a call to the phase that took elapsed_ns nanoseconds.
+        """
+        self.calls += 1
+        self.total_ns += elapsed_ns
+
+    @property
+    def mean_ns(self) -> float:
+        """
+        Gets the mean time per call in nanoseconds, 0 if there are no calls.
+        """
+        return self.total_ns / self.calls if self.calls else 0.0
+
+
+@dataclass
+class SimulationProfile:
+    """
+    Represents the time spent in each phase of a simulation run, measured
+    with perf_counter_ns.
+
+    The simulate phase is the whole loop over the bars, so the other phases
+    of the loop are part of it. The bars are the bars stepped, coarse and
+    fine, and the bars recorded without stepping them are counted apart.
+    """
+
+    LOAD = "load"
+    SIMULATE = "simulate"
+    SETTLE = "settle"
+    UPDATE = "update"
+    LIQUIDATE = "liquidate"
+    SIGNAL = "signal"
+    OPEN = "open"
+    SNAPSHOT = "snapshot"
+
+    bars: int = 0
+    fast_forwarded_bars: int = 0
+    phases: Dict[str, PhaseProfile] = field(default_factory=dict)
+
+    def phase(self, name: str) -> PhaseProfile:
+        """
+        Gets the profile of a phase, adding it if it's not profiled yet.
+        """
+        phase_profile = self.phases.get(name)
+        if phase_profile is None:
+            phase_profile = self.phases[name] = PhaseProfile()
+        return phase_profile
+
+    @property
+    def bars_per_second(self) -> float:
+        """
+        Gets the bars stepped per second, 0 if the loop is not profiled.
+        """
+        simulate_phase = self.phases.get(self.SIMULATE)
+        if simulate_phase is None or not simulate_phase.total_ns:
+            return 0.0
+        return self.bars / simulate_phase.total_ns * 1e9
+
+    def to_dict(self) -> Dict:
+        """
+        Converts the profile to a dictionary, including the mean time per call
+        of every phase and the bars per second.
+        """
+        return {
+            "bars": self.bars,
+            "fast_forwarded_bars": self.fast_forwarded_bars,
+            "bars_per_second": self.bars_per_second,
+            "phases": {
+                name: {
+                    "calls": phase_profile.calls,
+                    "total_ns": phase_profile.total_ns,
+                    "mean_ns": phase_profile.mean_ns,
+                }
+                for name, phase_profile in self.phases.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SimulationProfile":
+        """
+        Creates a new profile from a dictionary. The derived values are ignored.
+        """
+        return cls(
+            bars=data["bars"],
+            fast_forwarded_bars=data.get("fast_forwarded_bars", 0),
+            phases={
+                name: PhaseProfile(
+                    calls=phase_profile["calls"], total_ns=phase_profile["total_ns"]
+                )
+                for name, phase_profile in data["phases"].items()
+            },
+        )
@@ -1,11 +1,18 @@
 """Data service module for data ingestion and processing."""
 
 import logging
+import os
+import threading
 from pathlib import Path
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from perp_simulation.constant import DataType, Timeframe
+from perp_simulation.gateway.partitioned_feather_dataset import (
+    PartitionedFeatherDataset,
+)
 
 
 class FeatherRepository:
@@ -73,11 +80,53 @@ class FeatherRepository:
         _df.to_feather(file_path)
         self.logger.debug("Data stored successfully")
 
+    def load_raw(self, _raw_path: Path) -> pd.DataFrame:
+        """Loads a raw data dump from a CSV or Feather file."""
+        _raw_path = Path(_raw_path)
+        self.logger.debug("Loading raw data from %s", _raw_path)
+        if _raw_path.suffix == ".csv":
+            return pd.read_csv(_raw_path)
+        if _raw_path.suffix == ".feather":
+            return pd.read_feather(_raw_path)
+        raise ValueError(f"Invalid raw data file: {_raw_path}")
+
+    def store_canonical(
+        self,
+        _data_type: str,
+        _timeframe: str,
+        _symbol_market: str,
+        _df: pd.DataFrame,
+        _partitioned: bool = False,
+    ) -> Path:
+        """Validates the data in the canonical layout and stores it to the
+        Feather file for the given symbol_market, timeframe and data type, or
+        appends it to its PartitionedFeatherDataset if _partitioned is True.
+
+        The file is written through a temporary file so readers never see a
+        partial file. Returns the path of the file or of the dataset.
+        """
+        DataProcessingService.validate_canonical_df(_df, _timeframe)
+        file_path = self._get_feather_path(_data_type, _timeframe, _symbol_market)
+        if _partitioned:
+            dataset = PartitionedFeatherDataset.from_file_path(file_path)
+            dataset.append(_df)
+            self.logger.debug("Appended %s rows to %s", len(_df), dataset.path)
+            return dataset.path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = file_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        _df.to_feather(tmp_path)
+        os.replace(tmp_path, file_path)
+        self.logger.debug("Stored %s rows to %s", len(_df), file_path)
+        return file_path
+
 
 # TODO: think on use cases depending on timeframe and data type, and refactor
 class DataProcessingService:
     """Service class to process raw data."""
 
+    # Bump when the processing changes to invalidate the processed data caches
+    VERSION = "1"
+
     @staticmethod
     def index_raw_df(_df: pd.DataFrame) -> pd.DataFrame:
         """Indexes the raw data by date."""
@@ -91,27 +140,129 @@ class DataProcessingService:
 
         if "datetime64" not in str(_df["date"].dtype):
             _df["date"] = pd.to_datetime(_df["date"])
-        
+
         _df.set_index("date", inplace=True)
         return _df
 
     @staticmethod
-    def since(_df: pd.DataFrame, _date: str) -> pd.DataFrame:
+    def normalize_raw_df(_df: pd.DataFrame, _timeframe: str) -> pd.DataFrame:
+        """Normalizes a raw data dump to the canonical layout.
+
+        - A "date" column of UTC timestamps in ns, stored as int64 by Arrow,
+          parsed from strings, datetimes or epoch milliseconds.
+        - The rest of the columns as float64.
+        - Sorted by date, keeping the last row of duplicated dates.
+        - Contiguous at the timeframe, the missing bars being NaN rows as
+          in resample_to.
+
+        Data in the canonical layout is indexed without parsing the dates
+        and resampled to its own timeframe without aggregating the bars.
+        """
+        if "date" not in _df.columns:
+            raise ValueError("The date column is missing in the raw data.")
+        if _timeframe not in Timeframe.all():
+            raise ValueError(f"Invalid timeframe: {_timeframe}")
+
+        dates = _df["date"]
+        if pd.api.types.is_numeric_dtype(dates):
+            dates = pd.to_datetime(dates, unit="ms", utc=True)
+        else:
+            dates = pd.to_datetime(dates, utc=True)
+        columns = [column for column in _df.columns if column != "date"]
+        _df = _df[columns].astype(np.float64)
+        _df.insert(0, "date", dates.dt.as_unit("ns"))
+        _df = _df.sort_values("date", kind="stable").drop_duplicates(
+            "date", keep="last"
+        )
+
+        step = Timeframe.to_seconds(_timeframe) * 1_000_000_000
+        ts = _df["date"].array.asi8
+        if (ts % step != 0).any():
+            raise ValueError(
+                f"The dates of the raw data are not at the timeframe {_timeframe}."
+            )
+        if len(ts) > 0:
+            # The missing bars are filled with NaN rows
+            index = pd.DatetimeIndex(
+                np.arange(ts[0], ts[-1] + step, step).astype("datetime64[ns]"),
+                name="date",
+            ).tz_localize("UTC")
+            _df = _df.set_index("date").reindex(index).reset_index()
+        DataProcessingService.validate_canonical_df(_df, _timeframe)
+        return _df
+
+    @staticmethod
+    def validate_canonical_df(_df: pd.DataFrame, _timeframe: str) -> None:
+        """Validates that the raw data is in the canonical layout of normalize_raw_df."""
+        if "date" not in _df.columns:
+            raise ValueError("The date column is missing in the raw data.")
+        if str(_df["date"].dtype) != "datetime64[ns, UTC]":
+            raise ValueError(
+                f"The date column is {_df['date'].dtype}, not datetime64[ns, UTC]."
+            )
+        not_float_columns = [
+            column
+            for column in _df.columns
+            if column != "date" and _df[column].dtype != np.float64
+        ]
+        if not_float_columns:
+            raise ValueError(f"The columns {not_float_columns} are not float64.")
+        step = Timeframe.to_seconds(_timeframe) * 1_000_000_000
+        steps = np.diff(_df["date"].array.asi8)
+        if (steps != step).any():
+            first_gap = int(np.argmax(steps != step))
+            raise ValueError(
+                f"The dates are not contiguous at the timeframe {_timeframe}: "
+                f"{_df['date'].iloc[first_gap]} is followed by "
+                f"{_df['date'].iloc[first_gap + 1]}."
+            )
+
+    @staticmethod
+    def since(_df: pd.DataFrame, _date: str, _nearest: bool = False) -> pd.DataFrame:
         """Filters the raw data since a given date."""
+        return DataProcessingService.between(_df, _date, None, _nearest)
+
+    @staticmethod
+    def between(
+        _df: pd.DataFrame,
+        _start_date: str,
+        _end_date: Optional[str] = None,
+        _nearest: bool = False,
+    ) -> pd.DataFrame:
+        """Slices the raw data in [_start_date, _end_date) with a binary search
+        on the sorted index.
+
+        The start date must be in the index unless _nearest is True, then the
+        data starts at the first bar since the start date. Without end date,
+        the data goes until the last bar.
+        """
         # TODO: check that _date is a valid format
         # Check that index is of type datetime
         if "datetime64" not in str(_df.index.dtype):
             raise ValueError("The index of _df is not of type datetime.")
 
-        # Check that _date is in the index
-        if _date not in _df.index:
+        start = _df.index.searchsorted(_start_date, side="left")
+        # Check that _start_date is in the index
+        is_in_index = _df.index.searchsorted(_start_date, side="right") > start
+        if not is_in_index and not (_nearest and start < len(_df.index)):
             raise ValueError(
-                f"The date {_date} is not in _df. "
-                "min date: {_df.index.min()}, max date: {_df.index.max()}"
+                f"The date {_start_date} is not in _df. "
+                f"min date: {_df.index.min()}, max date: {_df.index.max()}"
             )
 
-        _df = _df[_df.index >= _date]
-        return _df
+        end = len(_df.index)
+        if _end_date is not None:
+            end = _df.index.searchsorted(_end_date, side="left")
+        return _df.iloc[start:end]
+
+    @staticmethod
+    def index_to_ts(_df: pd.DataFrame) -> np.ndarray:
+        """Gets the datetime index as POSIX timestamps in seconds (int64)."""
+        # Check that index is of type datetime
+        if "datetime64" not in str(_df.index.dtype):
+            raise ValueError("The index of _df is not of type datetime.")
+
+        return _df.index.as_unit("ns").asi8 // 1_000_000_000
 
     @staticmethod
     def pct_change(_df: pd.DataFrame) -> pd.DataFrame:
@@ -130,12 +281,36 @@ class DataProcessingService:
         if _timeframe not in Timeframe.all():
             raise ValueError(f"Invalid timeframe: {_timeframe}")
 
+    @staticmethod
+    def is_at_timeframe(_df: pd.DataFrame, _timeframe: str) -> bool:
+        """Checks if the bars are contiguous at the timeframe, aligned to the
+        bins of resample_to and float64, as in the canonical layout."""
+        step = Timeframe.to_seconds(_timeframe) * 1_000_000_000
+        ts = _df.index.as_unit("ns").asi8
+        return (
+            len(ts) > 0
+            # The bins of resample_to start at midnight
+            and (24 * 60 * 60 * 1_000_000_000) % step == 0
+            and ts[0] % step == 0
+            and all(
+                column in _df.columns and _df[column].dtype == np.float64
+                for column in ("open", "high", "low", "close", "volume")
+            )
+            and bool((np.diff(ts) == step).all())
+        )
+
     @staticmethod
     def resample_to(_df: pd.DataFrame, _timeframe: str) -> pd.DataFrame:
         """Resamples the OHLCV data to a given timeframe."""
         DataProcessingService.validate_resample_to_args(_df, _timeframe)
         pd_tf = Timeframe.to_pd(_timeframe)
-        # TODO: Get frequency from the index and skip resample if it's the same
+        if DataProcessingService.is_at_timeframe(_df, _timeframe):
+            # Every bar is a bin, the aggregation of a NaN bar is NaN but
+            # for the volume, which is summed to 0
+            _df = _df[["open", "high", "low", "close", "volume"]].copy()
+            _df["volume"] = _df["volume"].fillna(0.0)
+            _df.index = pd.DatetimeIndex(_df.index, freq=pd_tf)
+            return _df
         _df = _df.resample(pd_tf).agg(
             {
                 "open": "first",
@@ -149,17 +324,27 @@ class DataProcessingService:
 
     @staticmethod
     def process_raw_data(
-        _df: pd.DataFrame, _since_date: str, _timeframe: str
+        _df: pd.DataFrame,
+        _since_date: str,
+        _timeframe: str,
+        _end_date: Optional[str] = None,
+        _nearest: bool = False,
     ) -> pd.DataFrame:
         """Processes the raw data."""
         _df = DataProcessingService.index_raw_df(_df)
-        _df = DataProcessingService.since(_df, _since_date)
+        _df = DataProcessingService.between(_df, _since_date, _end_date, _nearest)
         _df = DataProcessingService.resample_to(_df, _timeframe)
         return _df
 
 
 class FundingRateDataProcessingService(DataProcessingService):
-    """Service class to process funding rate data."""
+    """Service class to process funding rate data.
+
+    The funding rates are kept as sparse settlement events instead of being
+    resampled to the timeframe of the bars.
+    """
+
+    VERSION = "2"
 
     @staticmethod
     def to_series(_df: pd.DataFrame) -> pd.Series:
@@ -176,9 +361,19 @@ class FundingRateDataProcessingService(DataProcessingService):
 
     @staticmethod
     def process_raw_data(
-        _df: pd.DataFrame, _since_date: str, _timeframe: str
+        _df: pd.DataFrame,
+        _since_date: str,
+        _timeframe: str,
+        _end_date: Optional[str] = None,
+        _nearest: bool = False,
     ) -> pd.Series:
-        """Processes the raw data."""
-        _df = DataProcessingService.process_raw_data(_df, _since_date, _timeframe)
-        _df = FundingRateDataProcessingService.to_series(_df)
-        return _df
+        """Processes the raw data into a Series with a row per settlement.
+
+        The timeframe is not used, the settlements are aligned to the bars
+        of any timeframe by the consumer.
+        """
+        _df = DataProcessingService.index_raw_df(_df)
+        _df = DataProcessingService.between(_df, _since_date, _end_date, _nearest)
+        ser = FundingRateDataProcessingService.to_series(_df)
+        ser = ser.dropna()
+        return ser
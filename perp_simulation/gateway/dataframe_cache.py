@@ -0,0 +1,113 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+import pandas as pd
+
+_default_dataframe_cache: Optional["DataFrameCache"] = None
+_default_dataframe_cache_lock = threading.Lock()
+
+
+def get_default_dataframe_cache() -> "DataFrameCache":
+    """Get the DataFrameCache shared by the repositories of the process,
+    created on first use with the default memory budget."""
+    global _default_dataframe_cache  # pylint: disable=global-statement
+    with _default_dataframe_cache_lock:
+        if _default_dataframe_cache is None:
+            _default_dataframe_cache = DataFrameCache()
+        return _default_dataframe_cache
+
+
+class DataFrameCache:
+    """Thread-safe in-memory LRU cache of processed DataFrames.
+
+    The cache is meant to be shared by all the repositories of a process.
+    The cached DataFrames are stored with read-only columns and index and
+    returned as shallow copies, so callers can add columns to the DataFrame
+    they get but cannot modify the cached values. The least recently used
+    entries are evicted when the cache exceeds its memory budget.
+    """
+
+    def __init__(self, max_size_bytes: int = 512 * 1024**2) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, pd.DataFrame]" = OrderedDict()
+        self._entry_sizes: Dict[Hashable, int] = {}
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[pd.DataFrame]:
+        """Gets a read-only view of the cached DataFrame, None if it's not cached."""
+        with self._lock:
+            _df = self._entries.get(key)
+            if _df is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+        self.logger.debug("Cache hit for %s", key)
+        return _df.copy(deep=False)
+
+    def put(self, key: Hashable, _df: pd.DataFrame) -> pd.DataFrame:
+        """Caches a read-only copy of the DataFrame and evicts old entries.
+
+        Args:
+            key: The key of the DataFrame.
+            _df: The DataFrame to cache.
+        Returns:
+            A read-only view of the cached DataFrame.
+        """
+        cached_df = self._make_read_only(_df)
+        size_bytes = int(cached_df.memory_usage(index=True, deep=True).sum())
+        if size_bytes > self._max_size_bytes:
+            self.logger.debug("DataFrame for %s exceeds the cache budget", key)
+            return cached_df.copy(deep=False)
+
+        with self._lock:
+            if key in self._entries:
+                self._size_bytes -= self._entry_sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = cached_df
+            self._entry_sizes[key] = size_bytes
+            self._size_bytes += size_bytes
+            while self._size_bytes > self._max_size_bytes:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._size_bytes -= self._entry_sizes.pop(evicted_key)
+                self._evictions += 1
+                self.logger.debug("Evicted %s from cache", evicted_key)
+        return cached_df.copy(deep=False)
+
+    def clear(self) -> None:
+        """Removes all the entries, keeping the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._entry_sizes.clear()
+            self._size_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Gets the hit, miss and eviction counters, the entries and the size in bytes."""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "size_bytes": self._size_bytes,
+            }
+
+    @staticmethod
+    def _make_read_only(_df: pd.DataFrame) -> pd.DataFrame:
+        """Copy the DataFrame to one with a read-only array per column and a
+        read-only index, shared by the views of the cached DataFrame."""
+        columns = {}
+        for name in _df.columns:
+            values = _df[name].to_numpy(copy=True)
+            values.flags.writeable = False
+            columns[name] = values
+        index = _df.index.copy(deep=True)
+        index.values.flags.writeable = False
+        return pd.DataFrame(columns, index=index, copy=False)
@@ -1,25 +1,46 @@
 import math
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator
+from typing import Iterator, Optional
 
 import pandas as pd
 
-from perp_simulation.constant import DataType, Timeframe
+from perp_simulation.constant import (
+    BINANCE_FUTURES_BTC_FUNDING_RATE_FREQ,
+    DataType,
+    Timeframe,
+)
 from perp_simulation.entity.funding_rate import FundingRate
 from perp_simulation.gateway.data_service import FundingRateDataProcessingService
+from perp_simulation.gateway.dataframe_cache import DataFrameCache
 from perp_simulation.gateway.historical_feather_repository import (
     HistoricalFeatherRepository,
 )
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
 
 
 class FundingRateRepository(HistoricalFeatherRepository):
     """Repository class for funding rate data."""
 
-    def __init__(self, data_base_path: str):
+    # Funding rates are settled every 8h, so the start time is usually between settlements
+    NEAREST_START = True
+
+    # The funding rate is at the "open" column, the rest is zero
+    COLUMNS = ("date", "open")
+
+    def __init__(
+        self,
+        data_base_path: str,
+        processed_data_cache: Optional[ProcessedDataCache] = None,
+        dataframe_cache: Optional[DataFrameCache] = None,
+    ):
         _data_processing_service = FundingRateDataProcessingService()
         super().__init__(
-            data_base_path, DataType.FUNDING_RATE, _data_processing_service
+            data_base_path,
+            DataType.FUNDING_RATE,
+            _data_processing_service,
+            processed_data_cache,
+            dataframe_cache,
         )
 
     def _get_data_path(self, timeframe: str, symbol: str) -> Path:
@@ -27,32 +48,55 @@ class FundingRateRepository(HistoricalFeatherRepository):
         return super()._get_data_path(Timeframe.EIGHT_HOUR, symbol)
 
     def get_historical_dataframe(
-        self, symbol: str, start_time: datetime, timeframe: str
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
     ) -> pd.DataFrame:
-        """Get historical data from the Feather file."""
-        # TODO: implement
-        pass
+        """Get historical data from the Feather file.
+
+        The DataFrame has a single "funding_rate" column with a row per
+        funding rate settlement, whatever the timeframe is.
+        """
+        self.logger.info(
+            "Getting historical dataframe for %s from %s to %s with timeframe %s",
+            symbol,
+            start_time,
+            end_time,
+            timeframe,
+        )
+        # The settlements don't depend on the timeframe of the bars,
+        # so they are processed and cached once at their own frequency
+        df = self._get_processed_df(
+            BINANCE_FUTURES_BTC_FUNDING_RATE_FREQ, symbol, start_time, end_time
+        )
+        return df
 
     def get_historical_data(
-        self, symbol: str, start_time: datetime, timeframe: str
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
     ) -> Iterator[FundingRate]:
-        """Get historical data from the Feather file."""
+        """Get historical data from the Feather file, a funding rate per settlement."""
         self.logger.info(
-            "Getting historical data for %s from %s with timeframe %s",
+            "Getting historical data for %s from %s to %s with timeframe %s",
             symbol,
             start_time,
+            end_time,
             timeframe,
         )
-        df = self._get_df(timeframe, symbol)
-        self.logger.debug("Processing raw data")
-        start_time_str = start_time.isoformat()
-        ser = self._data_processing_service.process_raw_data(
-            df, start_time_str, timeframe
-        )
-        # TODO: optimize. in freqtrade it is converted to python native objects to get a faster loop
-        for index, value in ser.items():
+        ser = self.get_historical_dataframe(symbol, start_time, timeframe, end_time)[
+            "funding_rate"
+        ]
+        for ts, value in zip(
+            self._data_processing_service.index_to_ts(ser.to_frame()).tolist(),
+            ser.tolist(),
+        ):
             funding_rate = FundingRate(
-                ts=int(index.timestamp()),
+                ts=ts,
                 symbol=symbol,
                 rate=value if not math.isnan(value) else None,
             )
@@ -1,27 +1,100 @@
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Callable, Iterator, List, Optional, Sequence
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
 
 from perp_simulation.constant import DataType, Symbol, Timeframe
 from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.dataframe_cache import DataFrameCache
+from perp_simulation.gateway.partitioned_feather_dataset import (
+    PartitionedFeatherDataset,
+)
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
+
+# Threads of the pool shared by the repositories to load datasets concurrently
+LOAD_MAX_WORKERS = 4
+
+_load_executor: Optional[ThreadPoolExecutor] = None
+_load_executor_lock = threading.Lock()
+_load_thread = threading.local()
+
+
+def _init_load_thread() -> None:
+    _load_thread.is_load_thread = True
+
+
+def get_load_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by the repositories to load datasets,
+    created on first use.
+
+    Reading a feather file and most of the processing release the GIL, so
+    the datasets of a run are loaded in about the time of the largest one.
+    """
+    global _load_executor  # pylint: disable=global-statement
+    with _load_executor_lock:
+        if _load_executor is None:
+            _load_executor = ThreadPoolExecutor(
+                max_workers=LOAD_MAX_WORKERS,
+                thread_name_prefix="load",
+                initializer=_init_load_thread,
+            )
+        return _load_executor
+
+
+def load_concurrently(*loads: Callable[[], Any]) -> List[Any]:
+    """Run a batch of loads concurrently on the load thread pool and join them.
+
+    The loads are run in the calling thread if it is a thread of the pool,
+    so a load that loads a batch itself can't exhaust the pool waiting for it.
+
+    Args:
+        *loads: The loads, callables without arguments.
+    Returns:
+        List[Any]: The result of every load, in order. The first exception
+            raised by a load, if any, is raised once all of them are done.
+    """
+    if len(loads) <= 1 or getattr(_load_thread, "is_load_thread", False):
+        return [load() for load in loads]
+    executor = get_load_executor()
+    futures = [executor.submit(load) for load in loads]
+    # Join all the loads before raising, so none is left running
+    for future in futures:
+        future.exception()
+    return [future.result() for future in futures]
 
 
 class HistoricalFeatherRepository:
     # TODO review docstring
     # TODO: think on use cases depending on timeframe and data type, and refactor
+
+    # If True, the data starts at the first bar since the start time when
+    # there is no bar at the start time
+    NEAREST_START = False
+
+    # Columns read from the Feather file, None to read all of them
+    COLUMNS: Optional[Sequence[str]] = None
+
     def __init__(
         self,
         data_base_path: str,
         data_type: str,
         data_processing_service: DataProcessingService,
+        processed_data_cache: Optional[ProcessedDataCache] = None,
+        dataframe_cache: Optional[DataFrameCache] = None,
     ):
         # TODO from config
         self._data_base_path = Path(data_base_path)
         self._data_type = data_type
         self._data_processing_service = data_processing_service
+        self._processed_data_cache = processed_data_cache
+        self._dataframe_cache = dataframe_cache
         self.logger = logging.getLogger(__name__)
 
     def _get_data_path(self, timeframe: str, symbol: str) -> Path:
@@ -30,6 +103,9 @@ class HistoricalFeatherRepository:
         - Normalize symbol with underscores. Example: BTC-USDT:USDT -> BTC_USDT_USDT
         - Available data types are: "futures", "funding_rate", "mark".
         - Available timeframes are: "1m", "5m", "8h".
+
+        If the data is stored as a PartitionedFeatherDataset, the path of its
+        manifest is returned instead, which is replaced on every append.
         """
         # Checks if the data type is valid
         if self._data_type not in DataType.all():
@@ -51,35 +127,303 @@ class HistoricalFeatherRepository:
 
         file_name = f"{symbol}-{timeframe}-{self._data_type}.feather"
         feather_path = self._data_base_path / file_name
+        dataset = PartitionedFeatherDataset.from_file_path(feather_path)
+        if dataset.exists():
+            feather_path = dataset.manifest_path
 
         self.logger.debug("Returning path: %s", feather_path)
 
         return feather_path
 
-    def _load_data(self, path: Path) -> pd.DataFrame:
-        """Load data from the Feather file."""
-        self.logger.debug("Loading data from %s", path)
-        _df = pd.read_feather(path)
+    def _load_data(
+        self,
+        path: Path,
+        columns: Optional[Sequence[str]] = None,
+        start_time_str: Optional[str] = None,
+        end_time_str: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Load data from the Feather file.
+
+        The file is memory-mapped and read with Arrow, materializing only the
+        columns of the projection and the rows in [start_time_str, end_time_str)
+        of the "date" column. Only the record batches overlapping the range
+        are read, so a short window of a large file reads a few batches.
+        From a partitioned dataset, only the partitions overlapping the range
+        are read.
+
+        Args:
+            path (Path): The path of the Feather file or of the manifest of
+                a partitioned dataset.
+            columns (Optional[Sequence[str]]): The columns to read, all of them
+                if None. Columns missing in the file are left to the validation
+                of the processing.
+            start_time_str (Optional[str]): The start of the range, from the
+                first row if None.
+            end_time_str (Optional[str]): The end of the range, excluded,
+                until the last row if None.
+        Returns:
+            pd.DataFrame: The raw data with a RangeIndex.
+        """
+        self.logger.debug(
+            "Loading data from %s, columns %s in [%s, %s)",
+            path,
+            columns,
+            start_time_str,
+            end_time_str,
+        )
+        if PartitionedFeatherDataset.is_manifest_path(path):
+            dataset = PartitionedFeatherDataset(path.parent)
+            partitions = dataset.get_partitions()
+            if not partitions:
+                raise ValueError(f"The partitioned dataset {dataset.path} is empty.")
+            overlapping_partitions = dataset.get_overlapping_partitions(
+                self._to_ts(start_time_str), self._to_ts(end_time_str)
+            )
+            self.logger.debug(
+                "Reading %s of %s partitions",
+                len(overlapping_partitions),
+                len(partitions),
+            )
+            # Without overlapping partitions, the range of the first one is empty
+            table = pa.concat_tables(
+                self._read_table(
+                    dataset.path / partition.file_name,
+                    columns,
+                    start_time_str,
+                    end_time_str,
+                )
+                for partition in overlapping_partitions or partitions[:1]
+            )
+        else:
+            table = self._read_table(path, columns, start_time_str, end_time_str)
+        _df = table.to_pandas()
         self.logger.debug("Data loaded successfully")
         return _df
 
-    def _get_df(self, timeframe: str, symbol: str) -> pd.DataFrame:
-        """Get the DataFrame from the Feather file."""
+    def _read_table(
+        self,
+        path: Path,
+        columns: Optional[Sequence[str]],
+        start_time_str: Optional[str],
+        end_time_str: Optional[str],
+    ) -> pa.Table:
+        """Read the columns and the rows in [start_time_str, end_time_str)
+        of a memory-mapped Feather file."""
+        with pa.memory_map(str(path)) as source:
+            schema = ipc.open_file(source).schema
+            included_fields = None
+            if columns is not None:
+                included_fields = [
+                    schema.get_field_index(column)
+                    for column in columns
+                    if schema.get_field_index(column) != -1
+                ]
+            reader = ipc.open_file(
+                source, options=ipc.IpcReadOptions(included_fields=included_fields)
+            )
+            if self._is_range_readable(schema, start_time_str, end_time_str):
+                table = self._read_range(
+                    source, schema, reader, start_time_str, end_time_str
+                )
+            else:
+                table = reader.read_all()
+        return table
+
+    @staticmethod
+    def _is_range_readable(
+        schema: pa.Schema, start_time_str: Optional[str], end_time_str: Optional[str]
+    ) -> bool:
+        """Check if the rows of a range can be found without reading the file,
+        which needs a "date" column of timestamps."""
+        if start_time_str is None and end_time_str is None:
+            return False
+        date_index = schema.get_field_index("date")
+        return date_index != -1 and pa.types.is_timestamp(schema.field(date_index).type)
+
+    @staticmethod
+    def _to_ts(time_str: Optional[str]) -> Optional[int]:
+        """Convert a time to POSIX seconds, naive times being UTC."""
+        if time_str is None:
+            return None
+        ts = pd.Timestamp(time_str)
+        if ts.tzinfo is None:
+            ts = ts.tz_localize("UTC")
+        return int(ts.timestamp())
+
+    @staticmethod
+    def _to_utc_datetime64(time_str: str) -> np.datetime64:
+        """Convert a time to a naive UTC datetime64, naive times being UTC."""
+        ts = pd.Timestamp(time_str)
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert("UTC").tz_localize(None)
+        return ts.to_datetime64()
+
+    def _read_range(
+        self,
+        source: pa.MemoryMappedFile,
+        schema: pa.Schema,
+        reader: ipc.RecordBatchFileReader,
+        start_time_str: Optional[str],
+        end_time_str: Optional[str],
+    ) -> pa.Table:
+        """Read the rows in [start_time_str, end_time_str) of the sorted "date"
+        column from the record batches overlapping them."""
+        date_reader = ipc.open_file(
+            source,
+            options=ipc.IpcReadOptions(
+                included_fields=[schema.get_field_index("date")]
+            ),
+        )
+        if reader.num_record_batches == 0:
+            return reader.read_all()
+        date_batches = [
+            date_reader.get_batch(i).column(0).to_numpy()
+            for i in range(date_reader.num_record_batches)
+        ]
+        dates = np.concatenate(date_batches)
+        batch_offsets = np.cumsum([0] + [len(batch) for batch in date_batches])
+        start = 0
+        if start_time_str is not None:
+            start = int(
+                np.searchsorted(dates, self._to_utc_datetime64(start_time_str), "left")
+            )
+        end = len(dates)
+        if end_time_str is not None:
+            end = int(
+                np.searchsorted(dates, self._to_utc_datetime64(end_time_str), "left")
+            )
+        end = max(start, end)
+
+        batch_indices = np.flatnonzero(
+            (batch_offsets[:-1] < end) & (batch_offsets[1:] > start)
+        )
+        if len(batch_indices) == 0:
+            # An empty range keeps the schema of the projection
+            return pa.Table.from_batches([reader.get_batch(0)]).slice(0, 0)
+        table = pa.Table.from_batches([reader.get_batch(i) for i in batch_indices])
+        return table.slice(start - batch_offsets[batch_indices[0]], end - start)
+
+    def _get_df(
+        self,
+        timeframe: str,
+        symbol: str,
+        start_time_str: Optional[str] = None,
+        end_time_str: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Get the DataFrame from the Feather file with the columns of the
+        repository, in [start_time_str, end_time_str) if given."""
         self.logger.debug("Getting DataFrame for %s %s", timeframe, symbol)
         path = self._get_data_path(timeframe, symbol)
         self.logger.debug("Got path %s", path)
-        _df = self._load_data(path)
+        _df = self._load_data(path, self.COLUMNS, start_time_str, end_time_str)
         self.logger.debug("Loaded DataFrame with shape %s", _df.shape)
         return _df
 
+    def _get_processed_df(
+        self,
+        timeframe: str,
+        symbol: str,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+    ) -> pd.DataFrame:
+        """Get the processed DataFrame in [start_time, end_time), from the
+        DataFrame cache or the processed data cache if available.
+
+        Processed Series are returned as single column DataFrames. DataFrames
+        from the DataFrame cache are read-only.
+        """
+        start_time_str = start_time.isoformat()
+        end_time_str = end_time.isoformat() if end_time is not None else None
+        path = self._get_data_path(timeframe, symbol)
+        version = (
+            f"{type(self._data_processing_service).__name__}"
+            f"-{self._data_processing_service.VERSION}"
+        )
+        if self._dataframe_cache is None:
+            return self._process_df(
+                path, timeframe, symbol, start_time_str, end_time_str, version
+            )
+
+        key = (
+            str(path.resolve()),
+            path.stat().st_mtime_ns,
+            timeframe,
+            start_time_str,
+            end_time_str,
+            version,
+        )
+        _df = self._dataframe_cache.get(key)
+        if _df is not None:
+            self.logger.debug("Got processed DataFrame from memory")
+            return _df
+        _df = self._process_df(
+            path, timeframe, symbol, start_time_str, end_time_str, version
+        )
+        return self._dataframe_cache.put(key, _df)
+
+    def _process_df(
+        self,
+        path: Path,
+        timeframe: str,
+        symbol: str,
+        start_time_str: str,
+        end_time_str: Optional[str],
+        version: str,
+    ) -> pd.DataFrame:
+        """Load and process the raw data, from the processed data cache if available."""
+        if self._processed_data_cache is not None:
+            _df = self._processed_data_cache.get(
+                path, timeframe, start_time_str, end_time_str, version
+            )
+            if _df is not None:
+                self.logger.debug("Got processed DataFrame from cache")
+                return _df
+
+        _df = self._get_df(timeframe, symbol, start_time_str, end_time_str)
+        self.logger.debug("Processing raw data")
+        _df = self._data_processing_service.process_raw_data(
+            _df, start_time_str, timeframe, end_time_str, self.NEAREST_START
+        )
+        if isinstance(_df, pd.Series):
+            _df = _df.to_frame()
+        if self._processed_data_cache is not None:
+            self._processed_data_cache.put(
+                path, timeframe, start_time_str, end_time_str, version, _df
+            )
+        return _df
+
     def get_historical_dataframe(
-        self, symbol: str, start_time: datetime, timeframe: str
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
     ) -> pd.DataFrame:
         """Get historical data from the Feather file."""
         raise NotImplementedError
 
+    def get_historical_dataframe_async(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> "Future[pd.DataFrame]":
+        """Start loading the historical data on the load thread pool.
+
+        Returns:
+            Future[pd.DataFrame]: The future of get_historical_dataframe.
+        """
+        return get_load_executor().submit(
+            self.get_historical_dataframe, symbol, start_time, timeframe, end_time
+        )
+
     def get_historical_data(
-        self, symbol: str, start_time: datetime, timeframe: str
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
     ) -> Iterator:
         """Get historical data from the Feather file."""
         raise NotImplementedError
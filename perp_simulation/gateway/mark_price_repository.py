@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import Optional
+
+import pandas as pd
+
+from perp_simulation.constant import DataType
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.dataframe_cache import DataFrameCache
+from perp_simulation.gateway.historical_feather_repository import (
+    HistoricalFeatherRepository,
+)
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
+
+
+class MarkPriceRepository(HistoricalFeatherRepository):
+    """Repository class for mark price data.
+
+    The mark price files have the layout of the OHLCV files, so they are
+    processed into bars of the timeframe in the same way.
+    """
+
+    # The mark price may start after the OHLCV bars, the missing bars fall
+    # back to the last price in the simulation
+    NEAREST_START = True
+
+    COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+    def __init__(
+        self,
+        data_base_path: str,
+        processed_data_cache: Optional[ProcessedDataCache] = None,
+        dataframe_cache: Optional[DataFrameCache] = None,
+    ):
+        _data_processing_service = DataProcessingService()
+        super().__init__(
+            data_base_path,
+            DataType.MARK_PRICE,
+            _data_processing_service,
+            processed_data_cache,
+            dataframe_cache,
+        )
+
+    def get_historical_dataframe(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> pd.DataFrame:
+        """Get historical data from the Feather file.
+
+        The DataFrame has the "open", "high", "low", "close" and "volume"
+        columns of the mark price bars.
+        """
+        self.logger.info(
+            "Getting historical dataframe for %s from %s to %s with timeframe %s",
+            symbol,
+            start_time,
+            end_time,
+            timeframe,
+        )
+        df = self._get_processed_df(timeframe, symbol, start_time, end_time)
+        return df
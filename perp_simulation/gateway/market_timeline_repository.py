@@ -0,0 +1,225 @@
+import logging
+from datetime import datetime
+from functools import partial
+from typing import Optional, Tuple
+
+import numpy as np
+
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.market_timeline import MarketTimeline
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.historical_feather_repository import load_concurrently
+from perp_simulation.gateway.mark_price_repository import MarkPriceRepository
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+
+class MarketTimelineRepository:
+    """Repository class for the market data aligned to the OHLCV bars.
+
+    The OHLCV bars and the funding rate settlements are loaded from their
+    repositories and aligned once with a binary search, so the simulation
+    does not have to match the data points bar by bar. The settlements are
+    sparse events, so any timeframe of the bars is supported.
+
+    If a mark price repository is given, the mark price bars are aligned to
+    the OHLCV bars too. The datasets are loaded concurrently on the load
+    thread pool, the file reads and most of the processing release the GIL,
+    so a third dataset doesn't add a third sequential load.
+    """
+
+    def __init__(
+        self,
+        ohlcv_repository: OHLCVRepository,
+        funding_rate_repository: FundingRateRepository,
+        mark_price_repository: Optional[MarkPriceRepository] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self._ohlcv_repository = ohlcv_repository
+        self._funding_rate_repository = funding_rate_repository
+        self._mark_price_repository = mark_price_repository
+
+    def get_historical_timeline(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> MarketTimeline:
+        """Get the historical OHLCV bars aligned with the funding rate
+        settlements and the mark price bars, if any."""
+        self.logger.info(
+            "Getting historical timeline for %s from %s to %s with timeframe %s",
+            symbol,
+            start_time,
+            end_time,
+            timeframe,
+        )
+        args = (symbol, start_time, timeframe, end_time)
+        loads = [
+            partial(self._ohlcv_repository.get_historical_series, *args),
+            partial(self._funding_rate_repository.get_historical_dataframe, *args),
+        ]
+        if self._mark_price_repository is not None:
+            loads.append(
+                partial(self._mark_price_repository.get_historical_dataframe, *args)
+            )
+        ohlcv_series, funding_rate_df, *mark_price_dfs = load_concurrently(*loads)
+        mark_price_df = mark_price_dfs[0] if mark_price_dfs else None
+
+        mark_prices = {}
+        if mark_price_df is not None:
+            mark_prices = {
+                "mark_price_ts": DataProcessingService.index_to_ts(mark_price_df),
+                "mark_price": mark_price_df["close"].to_numpy(dtype=np.float64),
+                "mark_price_low": mark_price_df["low"].to_numpy(dtype=np.float64),
+                "mark_price_high": mark_price_df["high"].to_numpy(dtype=np.float64),
+            }
+        return self.align(
+            ohlcv_series,
+            timeframe,
+            DataProcessingService.index_to_ts(funding_rate_df),
+            funding_rate_df["funding_rate"].to_numpy(dtype=np.float64),
+            **mark_prices,
+        )
+
+    @classmethod
+    def align(
+        cls,
+        ohlcv_series: OHLCVSeries,
+        timeframe: str,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+        mark_price_ts: Optional[np.ndarray] = None,
+        mark_price: Optional[np.ndarray] = None,
+        mark_price_low: Optional[np.ndarray] = None,
+        mark_price_high: Optional[np.ndarray] = None,
+    ) -> MarketTimeline:
+        """Align the funding rate settlements and the mark price to the OHLCV bars.
+
+        A funding rate is settled at the open of the bar that contains it. If
+        the bars are longer than the funding rate interval, the rates of a bar
+        are added up in a single settlement with the ts of the first one.
+        Funding rates that are NaN are not settlements. Events out of the
+        period of the bars are dropped. The alignment is checked once for all
+        the events, so a funding rate in a gap of the bars or a mark price
+        without a bar at its ts raises.
+
+        Args:
+            ohlcv_series (OHLCVSeries): The OHLCV bars, sorted by ts.
+            timeframe (str): The timeframe of the bars.
+            funding_rate_ts (np.ndarray): The ts of the funding rates.
+            funding_rate (np.ndarray): The funding rates.
+            mark_price_ts (np.ndarray): The ts of the mark prices, if any.
+            mark_price (np.ndarray): The mark prices, if any.
+            mark_price_low (np.ndarray): The low of the mark price bars, if any.
+            mark_price_high (np.ndarray): The high of the mark price bars, if any.
+        Returns:
+            MarketTimeline: The market data aligned to the bars.
+        """
+        bar_ts = np.asarray(ohlcv_series.ts)
+        if np.any(np.diff(bar_ts) <= 0):
+            raise ValueError("The OHLCV bars are not sorted by ts or have duplicates.")
+        bar_index, funding_rate_ts, funding_rate = cls.align_funding_rates(
+            bar_ts, timeframe, funding_rate_ts, funding_rate
+        )
+        funding_rate_index = np.full(len(bar_ts), -1, dtype=np.int64)
+        funding_rate_index[bar_index] = np.arange(len(bar_index))
+
+        aligned_mark_prices = [None, None, None]
+        if mark_price_ts is not None:
+            mark_price_ts = np.asarray(mark_price_ts)
+            # Mark prices are bars of the same timeframe, so they must be at a bar ts
+            bar_index, in_period = cls._match_to_bars(
+                bar_ts, mark_price_ts, 1, "mark price"
+            )
+            for i, prices in enumerate((mark_price, mark_price_low, mark_price_high)):
+                if prices is None:
+                    continue
+                aligned_prices = np.full(len(bar_ts), np.nan)
+                aligned_prices[bar_index] = np.asarray(prices, dtype=np.float64)[
+                    in_period
+                ]
+                aligned_mark_prices[i] = aligned_prices
+        aligned_mark_price, aligned_mark_price_low, aligned_mark_price_high = (
+            aligned_mark_prices
+        )
+
+        return MarketTimeline(
+            ohlcv_series=ohlcv_series,
+            funding_rate_index=funding_rate_index,
+            funding_rate_ts=funding_rate_ts,
+            funding_rate=funding_rate,
+            mark_price=aligned_mark_price,
+            mark_price_low=aligned_mark_price_low,
+            mark_price_high=aligned_mark_price_high,
+        )
+
+    @classmethod
+    def align_funding_rates(
+        cls,
+        bar_ts: np.ndarray,
+        timeframe: str,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Align the funding rate settlements to the bars as align does.
+
+        Args:
+            bar_ts (np.ndarray): The ts of the bars, sorted.
+            timeframe (str): The timeframe of the bars.
+            funding_rate_ts (np.ndarray): The ts of the funding rates.
+            funding_rate (np.ndarray): The funding rates.
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The index of the bar of
+                every settlement, increasing, and the ts and the sum of the
+                rates of the settlement.
+        """
+        bar_ts = np.asarray(bar_ts)
+        funding_rate_ts = np.asarray(funding_rate_ts)
+        funding_rate = np.asarray(funding_rate, dtype=np.float64)
+        is_settlement = ~np.isnan(funding_rate)
+        funding_rate_ts = funding_rate_ts[is_settlement]
+        funding_rate = funding_rate[is_settlement]
+        bar_index, in_period = cls._match_to_bars(
+            bar_ts, funding_rate_ts, Timeframe.to_seconds(timeframe), "funding rate"
+        )
+        funding_rate_ts = funding_rate_ts[in_period]
+        funding_rate = funding_rate[in_period]
+        # Settle the rates of the same bar together
+        is_first = np.ones(len(bar_index), dtype=bool)
+        is_first[1:] = bar_index[1:] != bar_index[:-1]
+        if not np.all(is_first):
+            first_index = np.flatnonzero(is_first)
+            funding_rate = np.add.reduceat(funding_rate, first_index)
+            funding_rate_ts = funding_rate_ts[first_index]
+            bar_index = bar_index[first_index]
+        return bar_index, funding_rate_ts, funding_rate
+
+    @staticmethod
+    def _match_to_bars(
+        bar_ts: np.ndarray, event_ts: np.ndarray, duration: int, name: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the index of the bar that contains every event in the period of
+        the bars and the mask of those events.
+
+        An event is contained in a bar if it is in [bar ts, bar ts + duration),
+        it raises if any event in the period is not contained in a bar.
+        """
+        if np.any(np.diff(event_ts) <= 0):
+            raise ValueError(
+                f"The {name} events are not sorted by ts or have duplicates."
+            )
+        if len(bar_ts) == 0:
+            return np.empty(0, dtype=np.int64), np.zeros(len(event_ts), dtype=bool)
+
+        in_period = (event_ts >= bar_ts[0]) & (event_ts < bar_ts[-1] + duration)
+        bar_index = np.searchsorted(bar_ts, event_ts[in_period], side="right") - 1
+        misaligned = event_ts[in_period] >= bar_ts[bar_index] + duration
+        if np.any(misaligned):
+            raise ValueError(
+                f"{np.count_nonzero(misaligned)} {name} events are not aligned to "
+                f"the OHLCV bars, first at ts {event_ts[in_period][misaligned][0]}."
+            )
+        return bar_index, in_period
@@ -0,0 +1,194 @@
+import logging
+from datetime import datetime
+from functools import partial
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.market_timeline import MarketTimeline
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.historical_feather_repository import load_concurrently
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+
+class FineTimelineLoader:
+    """Loader of the fine bars of a coarse market timeline by index range.
+
+    The fine bars are kept as the processed DataFrame, and only the ranges
+    that are loaded are converted to columns and aligned with the funding
+    rate settlements, so a simulation that steps a few coarse bars on the
+    fine bars doesn't build the fine timeline of the whole period.
+    """
+
+    def __init__(
+        self,
+        ohlcv_df: pd.DataFrame,
+        symbol: str,
+        timeframe: str,
+        coarse_ts: np.ndarray,
+        coarse_timeframe: str,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self._ohlcv_df = ohlcv_df
+        self._symbol = symbol
+        self._timeframe = timeframe
+        self._funding_rate_ts = funding_rate_ts
+        self._funding_rate = funding_rate
+        self._ts = DataProcessingService.index_to_ts(ohlcv_df)
+        # Range of the fine bars of every coarse bar, [start, end)
+        coarse_ts = np.asarray(coarse_ts)
+        self._bar_start = np.searchsorted(self._ts, coarse_ts)
+        self._bar_end = np.searchsorted(
+            self._ts, coarse_ts + Timeframe.to_seconds(coarse_timeframe)
+        )
+
+    @property
+    def timeframe(self) -> str:
+        return self._timeframe
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def get_bar_range(self, coarse_index: int) -> Tuple[int, int]:
+        """Get the index range [start, end) of the fine bars of a coarse bar."""
+        return int(self._bar_start[coarse_index]), int(self._bar_end[coarse_index])
+
+    def load(self, start_index: int, end_index: int) -> MarketTimeline:
+        """Load the fine bars in the index range [start_index, end_index)
+        aligned with the funding rate settlements."""
+        self.logger.debug("Loading fine bars [%s, %s)", start_index, end_index)
+        df = self._ohlcv_df.iloc[start_index:end_index]
+        ohlcv_series = OHLCVSeries(
+            symbol=self._symbol,
+            ts=self._ts[start_index:end_index],
+            open=df["open"].to_numpy(dtype=np.float64),
+            high=df["high"].to_numpy(dtype=np.float64),
+            low=df["low"].to_numpy(dtype=np.float64),
+            close=df["close"].to_numpy(dtype=np.float64),
+            volume=df["volume"].to_numpy(dtype=np.float64),
+        )
+        return MarketTimelineRepository.align(
+            ohlcv_series, self._timeframe, self._funding_rate_ts, self._funding_rate
+        )
+
+    def load_bar(self, coarse_index: int) -> MarketTimeline:
+        """Load the fine bars of a coarse bar."""
+        return self.load(*self.get_bar_range(coarse_index))
+
+
+class MultiResolutionTimelineRepository:
+    """Repository class for the market data on coarse bars with their fine
+    bars loaded on demand.
+
+    The coarse bars are the 1m bars resampled to the timeframe, so both
+    resolutions come from the same data, and the fine bars of any coarse
+    bar are loaded lazily by index range.
+    """
+
+    FINE_TIMEFRAME = Timeframe.ONE_MIN
+
+    def __init__(
+        self,
+        ohlcv_repository: OHLCVRepository,
+        funding_rate_repository: FundingRateRepository,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self._ohlcv_repository = ohlcv_repository
+        self._funding_rate_repository = funding_rate_repository
+
+    def get_historical_timelines(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> Tuple[MarketTimeline, FineTimelineLoader]:
+        """Get the historical coarse bars aligned with the funding rate
+        settlements and the loader of their fine bars."""
+        self.logger.info(
+            "Getting historical timelines for %s from %s to %s with timeframe %s",
+            symbol,
+            start_time,
+            end_time,
+            timeframe,
+        )
+        ohlcv_df, funding_rate_df = load_concurrently(
+            partial(
+                self._ohlcv_repository.get_historical_dataframe,
+                symbol,
+                start_time,
+                self.FINE_TIMEFRAME,
+                end_time,
+            ),
+            partial(
+                self._funding_rate_repository.get_historical_dataframe,
+                symbol,
+                start_time,
+                timeframe,
+                end_time,
+            ),
+        )
+        return self.build(
+            ohlcv_df,
+            symbol,
+            timeframe,
+            DataProcessingService.index_to_ts(funding_rate_df),
+            funding_rate_df["funding_rate"].to_numpy(dtype=np.float64),
+        )
+
+    @classmethod
+    def build(
+        cls,
+        ohlcv_df: pd.DataFrame,
+        symbol: str,
+        timeframe: str,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+    ) -> Tuple[MarketTimeline, FineTimelineLoader]:
+        """Resample the fine bars to the timeframe and align both resolutions
+        with the funding rate settlements.
+
+        Args:
+            ohlcv_df (pd.DataFrame): The fine OHLCV bars indexed by date.
+            symbol (str): The symbol of the data.
+            timeframe (str): The timeframe of the coarse bars.
+            funding_rate_ts (np.ndarray): The ts of the funding rates.
+            funding_rate (np.ndarray): The funding rates.
+        Returns:
+            Tuple[MarketTimeline, FineTimelineLoader]: The coarse bars and the
+                loader of their fine bars.
+        """
+        coarse_df = DataProcessingService.resample_to(ohlcv_df, timeframe)
+        coarse_series = OHLCVSeries(
+            symbol=symbol,
+            ts=DataProcessingService.index_to_ts(coarse_df),
+            open=coarse_df["open"].to_numpy(dtype=np.float64),
+            high=coarse_df["high"].to_numpy(dtype=np.float64),
+            low=coarse_df["low"].to_numpy(dtype=np.float64),
+            close=coarse_df["close"].to_numpy(dtype=np.float64),
+            volume=coarse_df["volume"].to_numpy(dtype=np.float64),
+        )
+        funding_rate_ts = np.asarray(funding_rate_ts)
+        funding_rate = np.asarray(funding_rate, dtype=np.float64)
+        market_timeline = MarketTimelineRepository.align(
+            coarse_series, timeframe, funding_rate_ts, funding_rate
+        )
+        fine_timeline_loader = FineTimelineLoader(
+            ohlcv_df,
+            symbol,
+            cls.FINE_TIMEFRAME,
+            coarse_series.ts,
+            timeframe,
+            funding_rate_ts,
+            funding_rate,
+        )
+        return market_timeline, fine_timeline_loader
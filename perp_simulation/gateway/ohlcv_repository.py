@@ -1,61 +1,123 @@
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Iterator
+from typing import Iterator, Optional
 
+import numpy as np
 import pandas as pd
 
 from perp_simulation.constant import DataType
 from perp_simulation.entity.ohlcv import OHLCV
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
 from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.dataframe_cache import DataFrameCache
 from perp_simulation.gateway.historical_feather_repository import (
     HistoricalFeatherRepository,
+    get_load_executor,
 )
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
 
 
 class OHLCVRepository(HistoricalFeatherRepository):
     """Repository class for OHLCV data."""
 
-    def __init__(self, data_base_path: str):
+    COLUMNS = ("date", "open", "high", "low", "close", "volume")
+
+    def __init__(
+        self,
+        data_base_path: str,
+        processed_data_cache: Optional[ProcessedDataCache] = None,
+        dataframe_cache: Optional[DataFrameCache] = None,
+    ):
         _data_processing_service = DataProcessingService()
-        super().__init__(data_base_path, DataType.OHLCV, _data_processing_service)
+        super().__init__(
+            data_base_path,
+            DataType.OHLCV,
+            _data_processing_service,
+            processed_data_cache,
+            dataframe_cache,
+        )
 
     def get_historical_dataframe(
-        self, symbol: str, start_time: datetime, timeframe: str
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
     ) -> pd.DataFrame:
         """Get historical data from the Feather file."""
         self.logger.info(
-            "Getting historical dataframe for %s from %s with timeframe %s",
+            "Getting historical dataframe for %s from %s to %s with timeframe %s",
             symbol,
             start_time,
+            end_time,
             timeframe,
         )
-        df = self._get_df(timeframe, symbol)
-        self.logger.debug("Processing raw data")
-        start_time_str = start_time.isoformat()
-        df = self._data_processing_service.process_raw_data(
-            df, start_time_str, timeframe
-        )
+        df = self._get_processed_df(timeframe, symbol, start_time, end_time)
         return df
 
+    def get_historical_series(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> OHLCVSeries:
+        """Get historical data from the Feather file as columns."""
+        self.logger.info(
+            "Getting historical series for %s from %s to %s with timeframe %s",
+            symbol,
+            start_time,
+            end_time,
+            timeframe,
+        )
+        df = self.get_historical_dataframe(symbol, start_time, timeframe, end_time)
+        series = OHLCVSeries(
+            symbol=symbol,
+            ts=self._data_processing_service.index_to_ts(df),
+            open=df["open"].to_numpy(dtype=np.float64),
+            high=df["high"].to_numpy(dtype=np.float64),
+            low=df["low"].to_numpy(dtype=np.float64),
+            close=df["close"].to_numpy(dtype=np.float64),
+            volume=df["volume"].to_numpy(dtype=np.float64),
+        )
+        return series
+
+    def get_historical_series_async(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> "Future[OHLCVSeries]":
+        """Start loading the historical data as columns on the load thread pool."""
+        return get_load_executor().submit(
+            self.get_historical_series, symbol, start_time, timeframe, end_time
+        )
+
     def get_historical_iterator(
-        self, symbol: str, start_time: datetime, timeframe: str
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
     ) -> Iterator[OHLCV]:
         """Get historical data from the Feather file."""
         self.logger.info(
-            "Getting historical iterator for %s from %s with timeframe %s",
+            "Getting historical iterator for %s from %s to %s with timeframe %s",
             symbol,
             start_time,
+            end_time,
             timeframe,
         )
-        df = self.get_historical_dataframe(symbol, start_time, timeframe)
-        # TODO: optimize. in freqtrade it is converted to python native objects to get a faster loop
-        for index, values in df.iterrows():
-            ohlcv = OHLCV(
-                ts=int(index.timestamp()),
-                symbol=symbol,
-                open=values.open,
-                high=values.high,
-                low=values.low,
-                close=values.close,
-                volume=values.volume,
-            )
-            yield ohlcv
+        series = self.get_historical_series(symbol, start_time, timeframe, end_time)
+        return iter(series)
+
+    def get_historical_data(
+        self,
+        symbol: str,
+        start_time: datetime,
+        timeframe: str,
+        end_time: Optional[datetime] = None,
+    ) -> Iterator[OHLCV]:
+        """Get historical data from the Feather file."""
+        return self.get_historical_iterator(symbol, start_time, timeframe, end_time)
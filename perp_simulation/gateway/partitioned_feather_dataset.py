@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class FeatherPartition:
+    """Entry of a partition in the manifest of a PartitionedFeatherDataset."""
+
+    file_name: str
+    min_ts: int
+    max_ts: int
+    rows: int
+
+
+class PartitionedFeatherDataset:
+    """Dataset stored as a Feather file per month with a manifest.
+
+    The dataset of "{symbol}-{timeframe}-{data_type}.feather" is the directory
+    "{symbol}-{timeframe}-{data_type}/" with a "YYYY-MM.feather" file per month
+    of the "date" column and a "manifest.json" file with the file name,
+    min and max ts (POSIX seconds) and rows of every partition, sorted by ts.
+
+    Appending data only writes the months of the data. A month merged with
+    its partition is written to a new version of the file, "YYYY-MM.{n}.feather",
+    referenced only by the new manifest. The manifest is replaced last, so
+    readers see the dataset before or after the append, and the replaced
+    versions are deleted once the manifest is replaced.
+    """
+
+    MANIFEST_FILE_NAME = "manifest.json"
+    MANIFEST_VERSION = 1
+
+    def __init__(self, path: Path) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._path = Path(path)
+
+    @classmethod
+    def from_file_path(cls, file_path: Path) -> "PartitionedFeatherDataset":
+        """Get the partitioned dataset of the path of a monolithic Feather file."""
+        return cls(Path(file_path).with_suffix(""))
+
+    @classmethod
+    def is_manifest_path(cls, path: Path) -> bool:
+        """Check if the path is the manifest of a partitioned dataset."""
+        return Path(path).name == cls.MANIFEST_FILE_NAME
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def manifest_path(self) -> Path:
+        return self._path / self.MANIFEST_FILE_NAME
+
+    def exists(self) -> bool:
+        return self.manifest_path.is_file()
+
+    def get_partitions(self) -> List[FeatherPartition]:
+        """Get the partitions of the manifest, sorted by ts."""
+        with open(self.manifest_path, encoding="UTF-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("version") != self.MANIFEST_VERSION:
+            raise ValueError(
+                f"Invalid manifest version {manifest.get('version')} in "
+                f"{self.manifest_path}"
+            )
+        return [FeatherPartition(**partition) for partition in manifest["partitions"]]
+
+    def get_overlapping_partitions(
+        self, start_ts: Optional[int] = None, end_ts: Optional[int] = None
+    ) -> List[FeatherPartition]:
+        """Get the partitions with rows in [start_ts, end_ts).
+
+        Args:
+            start_ts: The start of the range in POSIX seconds, unbounded if None.
+            end_ts: The end of the range in POSIX seconds, excluded,
+                unbounded if None.
+        Returns:
+            The overlapping partitions, sorted by ts.
+        """
+        return [
+            partition
+            for partition in self.get_partitions()
+            if (start_ts is None or partition.max_ts >= start_ts)
+            and (end_ts is None or partition.min_ts < end_ts)
+        ]
+
+    def append(self, _df: pd.DataFrame) -> List[FeatherPartition]:
+        """Append the rows of the DataFrame to the partitions of their month.
+
+        The partitions of the months without rows aren't read nor written.
+        The rows of a month with a partition are merged with it, the rows of
+        the DataFrame replacing the rows with the same date.
+
+        Args:
+            _df: The raw data with a "date" column of timestamps.
+        Returns:
+            The partitions of the dataset after the append.
+        """
+        if "date" not in _df.columns:
+            raise ValueError("The date column is missing in the raw data.")
+        if "datetime64" not in str(_df["date"].dtype):
+            raise ValueError("The date column of _df is not of type datetime.")
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        partitions = {
+            self._get_month(partition.file_name): partition
+            for partition in (self.get_partitions() if self.exists() else [])
+        }
+        replaced_file_names = []
+        dates = _df["date"]
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_convert("UTC").dt.tz_localize(None)
+        months = dates.to_numpy().astype("datetime64[M]")
+        for month, month_df in _df.groupby(months, sort=True):
+            # A datetime64[M] is formatted as YYYY-MM
+            month = str(np.datetime64(month, "M"))
+            file_name = f"{month}.feather"
+            if month in partitions:
+                replaced_file_name = partitions[month].file_name
+                self.logger.debug(
+                    "Merging %s rows into %s", len(month_df), replaced_file_name
+                )
+                month_df = pd.concat(
+                    [pd.read_feather(self._path / replaced_file_name), month_df],
+                    ignore_index=True,
+                )
+                file_name = self._get_next_file_name(replaced_file_name)
+                replaced_file_names.append(replaced_file_name)
+            month_df = (
+                month_df.drop_duplicates("date", keep="last")
+                .sort_values("date", kind="stable")
+                .reset_index(drop=True)
+            )
+            partitions[month] = self._write_partition(file_name, month_df)
+
+        sorted_partitions = sorted(
+            partitions.values(), key=lambda partition: partition.min_ts
+        )
+        self._write_manifest(sorted_partitions)
+        # Deleted after the manifest swap, so the manifest never references a
+        # missing file. A reader of the previous manifest has to read it again.
+        for replaced_file_name in replaced_file_names:
+            self.logger.debug("Deleting replaced partition %s", replaced_file_name)
+            (self._path / replaced_file_name).unlink(missing_ok=True)
+        return sorted_partitions
+
+    @staticmethod
+    def _get_month(file_name: str) -> str:
+        """Get the YYYY-MM month of a "YYYY-MM[.{n}].feather" file name."""
+        return file_name.split(".", 1)[0]
+
+    @classmethod
+    def _get_next_file_name(cls, file_name: str) -> str:
+        """Get the file name of the next version of a partition,
+        "YYYY-MM.feather" being the version 0."""
+        parts = file_name.split(".")
+        version = int(parts[1]) + 1 if len(parts) == 3 else 1
+        return f"{cls._get_month(file_name)}.{version}.feather"
+
+    def _write_partition(self, file_name: str, _df: pd.DataFrame) -> FeatherPartition:
+        """Write a partition through a temporary file so readers never see
+        a partial file."""
+        partition_path = self._path / file_name
+        tmp_path = partition_path.with_suffix(
+            f".{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        _df.to_feather(tmp_path)
+        os.replace(tmp_path, partition_path)
+        ts = _df["date"].array.as_unit("s").asi8
+        self.logger.debug("Wrote %s rows to %s", len(_df), partition_path)
+        return FeatherPartition(
+            file_name=file_name,
+            min_ts=int(ts[0]),
+            max_ts=int(ts[-1]),
+            rows=len(_df),
+        )
+
+    def _write_manifest(self, partitions: List[FeatherPartition]) -> None:
+        tmp_path = self.manifest_path.with_suffix(
+            f".{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_path, "w", encoding="UTF-8") as manifest_file:
+            json.dump(
+                {
+                    "version": self.MANIFEST_VERSION,
+                    "partitions": [asdict(partition) for partition in partitions],
+                },
+                manifest_file,
+                indent=2,
+            )
+        os.replace(tmp_path, self.manifest_path)
@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+
+
+class ProcessedDataCache:
+    """Persistent cache of processed DataFrames stored as feather files.
+
+    An entry is keyed by the fingerprint of the source file (size and
+    modification time), the processing arguments and the processing
+    version, so it is invalidated when the source file or the processing
+    changes. The least recently used entries are evicted when the cache
+    exceeds its maximum size.
+    """
+
+    def __init__(self, cache_path: str, max_size_bytes: int = 1024**3) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._cache_path = Path(cache_path)
+        self._max_size_bytes = max_size_bytes
+
+    def get(
+        self,
+        source_path: Path,
+        timeframe: str,
+        since_date: str,
+        end_date: Optional[str],
+        version: str,
+    ) -> Optional[pd.DataFrame]:
+        """Gets the processed DataFrame of the source file, None if it's not cached.
+
+        Args:
+            source_path: The path of the source file.
+            timeframe: The timeframe of the processed data.
+            since_date: The date since the data is processed.
+            end_date: The date until the data is processed, None if it's not bounded.
+            version: The version of the processing.
+        Returns:
+            The processed DataFrame indexed by date or None.
+        """
+        entry_path = self._get_entry_path(
+            source_path, timeframe, since_date, end_date, version
+        )
+        try:
+            _df = pd.read_feather(entry_path)
+        except FileNotFoundError:
+            self.logger.debug("Cache miss for %s", source_path)
+            return None
+        # Mark the entry as recently used
+        os.utime(entry_path)
+        self.logger.debug("Cache hit for %s in %s", source_path, entry_path)
+        _df.set_index("date", inplace=True)
+        return _df
+
+    def put(
+        self,
+        source_path: Path,
+        timeframe: str,
+        since_date: str,
+        end_date: Optional[str],
+        version: str,
+        _df: pd.DataFrame,
+    ) -> None:
+        """Stores the processed DataFrame of the source file and evicts old entries.
+
+        Args:
+            source_path: The path of the source file.
+            timeframe: The timeframe of the processed data.
+            since_date: The date since the data is processed.
+            end_date: The date until the data is processed, None if it's not bounded.
+            version: The version of the processing.
+            _df: The processed DataFrame indexed by date.
+        """
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        entry_path = self._get_entry_path(
+            source_path, timeframe, since_date, end_date, version
+        )
+        # Write to a temporary file of the thread first so readers never see a
+        # partial entry
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        _df.reset_index().to_feather(tmp_path)
+        os.replace(tmp_path, entry_path)
+        self.logger.debug("Cached %s in %s", source_path, entry_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits its maximum size."""
+        if not self._cache_path.exists():
+            return
+        entries = []
+        for entry in self._cache_path.glob("*.feather"):
+            entry_stat = entry.stat()
+            entries.append((entry_stat.st_mtime_ns, entry_stat.st_size, entry))
+        entries.sort()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry in entries:
+            if size <= self._max_size_bytes:
+                break
+            self.logger.debug("Evicting cache entry %s", entry)
+            entry.unlink(missing_ok=True)
+            size -= entry_size
+
+    def _get_entry_path(
+        self,
+        source_path: Path,
+        timeframe: str,
+        since_date: str,
+        end_date: Optional[str],
+        version: str,
+    ) -> Path:
+        """Get the path of the entry for the source file and the processing arguments."""
+        source_stat = source_path.stat()
+        key = "|".join(
+            [
+                str(source_path.resolve()),
+                str(source_stat.st_size),
+                str(source_stat.st_mtime_ns),
+                timeframe,
+                since_date,
+                str(end_date),
+                version,
+            ]
+        )
+        digest = hashlib.sha1(key.encode("UTF-8")).hexdigest()[:16]
+        return self._cache_path / f"{source_path.stem}-{timeframe}-{digest}.feather"
@@ -0,0 +1,131 @@
+import logging
+import shutil
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from perp_simulation.entity.market_timeline import MarketTimeline
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+
+
+@dataclass(frozen=True)
+class SharedMarketDataHandle:
+    """Picklable reference to market data shared by SharedMarketData."""
+
+    path: str
+    symbol: str
+
+
+class SharedMarketData:
+    """Shares the arrays of a market timeline between processes.
+
+    The owner writes every array once to a .npy file in a directory and
+    the other processes attach to it with its handle. The arrays are
+    memory-mapped read-only, so all the processes read the same pages of
+    the page cache instead of loading, processing and aligning the data
+    again.
+    """
+
+    OHLCV_COLUMNS = ("ts", "open", "high", "low", "close", "volume")
+    FUNDING_RATE_COLUMNS = ("funding_rate_index", "funding_rate_ts", "funding_rate")
+
+    def __init__(
+        self, path: Path, symbol: str, arrays: Dict[str, np.ndarray], owner: bool
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._path = path
+        self._symbol = symbol
+        self._arrays = arrays
+        self._owner = owner
+
+    @classmethod
+    def create(
+        cls,
+        market_timeline: MarketTimeline,
+        base_path: Optional[str] = None,
+    ) -> "SharedMarketData":
+        """Writes the market timeline to a new directory and maps it.
+
+        Args:
+            market_timeline: The market data aligned to the bars, without mark price.
+            base_path: Directory where the data directory is created.
+                Defaults to the temporary directory of the system.
+        Returns:
+            The shared market data, owner of the directory.
+        Raises:
+            ValueError: If the market timeline has mark prices.
+        """
+        if market_timeline.mark_price is not None:
+            raise ValueError("The shared market data doesn't support the mark price.")
+        path = Path(tempfile.mkdtemp(prefix="perp_simulation_", dir=base_path))
+        columns = {
+            name: getattr(market_timeline.ohlcv_series, name)
+            for name in cls.OHLCV_COLUMNS
+        }
+        for name in cls.FUNDING_RATE_COLUMNS:
+            columns[name] = getattr(market_timeline, name)
+        for name, values in columns.items():
+            np.save(path / f"{name}.npy", np.ascontiguousarray(values))
+        shared_market_data = cls(
+            path, market_timeline.symbol, cls._map_arrays(path), owner=True
+        )
+        shared_market_data.logger.debug(
+            "Shared %s bars and %s funding rates in %s",
+            len(market_timeline),
+            len(market_timeline.funding_rate),
+            path,
+        )
+        return shared_market_data
+
+    @classmethod
+    def attach(cls, handle: SharedMarketDataHandle) -> "SharedMarketData":
+        """Maps the market data shared by another process."""
+        path = Path(handle.path)
+        return cls(path, handle.symbol, cls._map_arrays(path), owner=False)
+
+    @classmethod
+    def _map_arrays(cls, path: Path) -> Dict[str, np.ndarray]:
+        """Memory-map the arrays of the directory read-only."""
+        return {
+            name: np.load(path / f"{name}.npy", mmap_mode="r")
+            for name in cls.OHLCV_COLUMNS + cls.FUNDING_RATE_COLUMNS
+        }
+
+    @property
+    def handle(self) -> SharedMarketDataHandle:
+        """Gets the handle to attach to the market data from other processes."""
+        return SharedMarketDataHandle(path=str(self._path), symbol=self._symbol)
+
+    def get_ohlcv_series(self) -> OHLCVSeries:
+        """Gets the OHLCV data as read-only arrays."""
+        return OHLCVSeries(
+            symbol=self._symbol,
+            **{name: self._arrays[name] for name in self.OHLCV_COLUMNS},
+        )
+
+    def get_funding_rate(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Gets the funding rate timestamps and rates as read-only arrays."""
+        return self._arrays["funding_rate_ts"], self._arrays["funding_rate"]
+
+    def get_market_timeline(self) -> MarketTimeline:
+        """Gets the market timeline as read-only arrays, already aligned to the bars."""
+        return MarketTimeline(
+            ohlcv_series=self.get_ohlcv_series(),
+            **{name: self._arrays[name] for name in self.FUNDING_RATE_COLUMNS},
+        )
+
+    def close(self) -> None:
+        """Unmaps the arrays and, if it is the owner, removes the directory."""
+        self._arrays = {}
+        if self._owner:
+            self.logger.debug("Removing shared market data in %s", self._path)
+            shutil.rmtree(self._path, ignore_errors=True)
+
+    def __enter__(self) -> "SharedMarketData":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,490 @@
+import json
+import logging
+from dataclasses import asdict, replace
+from pathlib import Path
+from typing import IO, Dict, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
+from perp_simulation.entity.position import Position
+from perp_simulation.entity.simulation import Simulation
+from perp_simulation.entity.simulation_profile import SimulationProfile
+
+
+class SimulationWriter:
+    """Sink of the result of a simulation, written while it is simulated.
+
+    The simulation writes a header with its metadata, then a snapshot of the
+    account per bar as it is produced, and a footer when it is completed, so
+    the snapshots are not kept in memory.
+    """
+
+    def write_header(self, simulation: Simulation) -> None:
+        """Write the metadata of the simulation before the first snapshot."""
+        raise NotImplementedError
+
+    def write_snapshot(self, account: Account, ts: float) -> None:
+        """Write a snapshot of the account at the ts, without keeping it."""
+        raise NotImplementedError
+
+    def write_flat_snapshots(self, account: Account, ts: np.ndarray) -> None:
+        """Write the snapshots of an account without positions at many ts."""
+        for snapshot_ts in ts.tolist():
+            self.write_snapshot(account, snapshot_ts)
+
+    def write_footer(self, simulation: Simulation) -> None:
+        """Write the metadata known when the simulation is completed."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Close the sink."""
+        raise NotImplementedError
+
+    def __enter__(self) -> "SimulationWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class NDJSONSimulationWriter(SimulationWriter):
+    """Write the result of a simulation as newline delimited JSON.
+
+    Every line is a record with a "type": the "header" with the simulation
+    without its snapshots, a "snapshot" per bar with the account in the
+    same layout as `Simulation.to_dict`, and the "footer" with the run end
+    ts, the number of snapshots and the profile, if any.
+
+    The records are written through a buffered file, so the memory used is
+    the same whatever the length of the simulation is.
+    """
+
+    HEADER = "header"
+    SNAPSHOT = "snapshot"
+    FOOTER = "footer"
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._path = Path(path)
+        self._file: Optional[IO[str]] = None
+        self._snapshot_count = 0
+
+    def write_header(self, simulation: Simulation) -> None:
+        self.logger.info("Writing simulation %s to %s", simulation.name, self._path)
+        self._file = open(self._path, "w", encoding="UTF-8")
+        self._snapshot_count = 0
+        data = asdict(replace(simulation, account_snapshots=None, profile=None))
+        del data["account_snapshots"], data["profile"]
+        self._write_record({"type": self.HEADER, "simulation": data})
+
+    def write_snapshot(self, account: Account, ts: float) -> None:
+        if self._file is None:
+            raise ValueError("The header must be written before the snapshots")
+        self._write_record(
+            {"type": self.SNAPSHOT, "ts": ts, "account": self._account_to_dict(account)}
+        )
+        self._snapshot_count += 1
+
+    def write_flat_snapshots(self, account: Account, ts: np.ndarray) -> None:
+        if self._file is None:
+            raise ValueError("The header must be written before the snapshots")
+        # The account is the same in every record, so it is converted once
+        account_json = json.dumps(self._account_to_dict(account))
+        for snapshot_ts in ts.tolist():
+            self._file.write(
+                f'{{"type": "{self.SNAPSHOT}", "ts": {json.dumps(snapshot_ts)}, '
+                f'"account": {account_json}}}\n'
+            )
+        self._snapshot_count += len(ts)
+
+    def write_footer(self, simulation: Simulation) -> None:
+        if self._file is None:
+            raise ValueError("The header must be written before the footer")
+        self._write_record(
+            {
+                "type": self.FOOTER,
+                "run_end_ts": simulation.run_end_ts,
+                "snapshot_count": self._snapshot_count,
+                "profile": (
+                    simulation.profile.to_dict()
+                    if simulation.profile is not None
+                    else None
+                ),
+            }
+        )
+        self.logger.info("Written %s snapshots", self._snapshot_count)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_record(self, record: Dict) -> None:
+        """Write a record as a line."""
+        self._file.write(json.dumps(record))
+        self._file.write("\n")
+
+    @classmethod
+    def _account_to_dict(cls, account: Account) -> Dict:
+        """Convert the account to a dictionary without copying it first,
+        like `asdict` does."""
+        positions = None
+        if account.positions is not None:
+            positions = [cls._position_to_dict(p) for p in account.positions]
+        return {"balance": account.balance, "positions": positions}
+
+    @staticmethod
+    def _position_to_dict(position: Position) -> Dict:
+        """Convert the position to a dictionary."""
+        trade = position.trade
+        return {
+            "open_ts": position.open_ts,
+            "symbol": position.symbol,
+            "side": position.side,
+            "quantity": position.quantity,
+            "entry_price": position.entry_price,
+            "avg_price": position.avg_price,
+            "trade": {
+                "ts": trade.ts,
+                "symbol": trade.symbol,
+                "type": trade.type,
+                "quantity": trade.quantity,
+                "price": trade.price,
+                "fee": trade.fee,
+            },
+            "unrealized_pnl": position.unrealized_pnl,
+            "funding_rate_costs": position.funding_rate_costs,
+            "initial_margin": position.initial_margin,
+            "maintenance_margin": position.maintenance_margin,
+            "effective_leverage": position.effective_leverage,
+            "liquidation_price": position.liquidation_price,
+        }
+
+
+class NDJSONSimulationReader:
+    """Read the result of a simulation written by NDJSONSimulationWriter."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._path = Path(path)
+
+    def iter_snapshots(self) -> Iterator[AccountSnapshot]:
+        """Iterate over the snapshots one line at a time."""
+        with open(self._path, encoding="UTF-8") as file:
+            for line in file:
+                record = json.loads(line)
+                if record["type"] == NDJSONSimulationWriter.SNAPSHOT:
+                    yield AccountSnapshot(
+                        ts=record["ts"], account=self._to_account(record["account"], {})
+                    )
+
+    def read(self) -> Simulation:
+        """Read the simulation with its snapshots in an AccountSnapshotStore.
+
+        Raises:
+            ValueError: If the file has no header or no footer, e.g., the
+                simulation was interrupted.
+        """
+        self.logger.info("Reading simulation from %s", self._path)
+        simulation = None
+        footer = None
+        account_snapshots = AccountSnapshotStore()
+        positions: Dict[Tuple, Position] = {}
+        with open(self._path, encoding="UTF-8") as file:
+            for line in file:
+                record = json.loads(line)
+                record_type = record["type"]
+                if record_type == NDJSONSimulationWriter.SNAPSHOT:
+                    account_snapshots.record(
+                        self._to_account(record["account"], positions), record["ts"]
+                    )
+                elif record_type == NDJSONSimulationWriter.HEADER:
+                    simulation = Simulation(**record["simulation"])
+                elif record_type == NDJSONSimulationWriter.FOOTER:
+                    footer = record
+        if simulation is None or footer is None:
+            raise ValueError(f"Incomplete simulation file: {self._path}")
+        simulation.run_end_ts = footer["run_end_ts"]
+        if footer["profile"] is not None:
+            simulation.profile = SimulationProfile.from_dict(footer["profile"])
+        simulation.account_snapshots = account_snapshots
+        return simulation
+
+    @staticmethod
+    def _to_account(data: Dict, positions: Dict[Tuple, Position]) -> Account:
+        """Create the account of a snapshot, reusing the positions of the
+        previous snapshots, so the store keeps their static data once."""
+        if data["positions"] is None:
+            return Account(balance=data["balance"])
+        account_positions = []
+        for position_data in data["positions"]:
+            key = (
+                position_data["open_ts"],
+                position_data["symbol"],
+                position_data["side"],
+                tuple(position_data["trade"].values()),
+            )
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = Position.from_dict(position_data)
+            else:
+                for name in AccountSnapshotStore.POSITION_COLUMNS:
+                    setattr(position, name, position_data[name])
+                position.funding_rate_costs = (
+                    position_data["funding_rate_costs"] or None
+                )
+            account_positions.append(position)
+        return Account(balance=data["balance"], positions=account_positions)
+
+
+class ArrowSimulationWriter(SimulationWriter):
+    """Write the result of a simulation as a columnar Arrow IPC (Feather v2) file.
+
+    The file has a row per snapshot with its ts, its account balance and a
+    list of position rows with the position id, the position metrics and
+    the number of funding rate costs. The simulation metadata is stored in
+    the metadata of the schema, and the static data of the positions, their
+    funding rate costs, the run end ts and the profile in the custom
+    metadata of the last record batch, written with the footer.
+
+    The snapshots are recorded by columns in an AccountSnapshotStore and
+    written uncompressed as a record batch every batch_size snapshots, so
+    the memory used doesn't grow with the length of the simulation and the
+    file can be memory-mapped by ArrowSimulationReader. If the writer is
+    closed before the footer, the snapshots recorded are written in a last
+    batch without the footer, so the file is still a valid Arrow file.
+    """
+
+    FORMAT_VERSION = "2"
+    DEFAULT_BATCH_SIZE = 65536
+
+    def __init__(
+        self, path: Union[str, Path], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._path = Path(path)
+        self._batch_size = max(batch_size, 1)
+        self._account_snapshots: Optional[AccountSnapshotStore] = None
+        self._schema_metadata: Optional[Dict[str, str]] = None
+        self._sink: Optional[pa.OSFile] = None
+        # Opened with the first batch, the type of the ts is the one of the first snapshot
+        self._schema: Optional[pa.Schema] = None
+        self._file_writer: Optional[pa.ipc.RecordBatchFileWriter] = None
+        self._snapshot_count = 0
+
+    def write_header(self, simulation: Simulation) -> None:
+        self.logger.info("Writing simulation %s to %s", simulation.name, self._path)
+        self._sink = pa.OSFile(str(self._path), "wb")
+        self._schema = self._file_writer = None
+        self._account_snapshots = AccountSnapshotStore()
+        self._snapshot_count = 0
+        data = asdict(replace(simulation, account_snapshots=None, profile=None))
+        del data["account_snapshots"], data["profile"]
+        self._schema_metadata = {
+            "format_version": self.FORMAT_VERSION,
+            "simulation": json.dumps(data),
+        }
+
+    def write_snapshot(self, account: Account, ts: float) -> None:
+        if self._account_snapshots is None:
+            raise ValueError("The header must be written before the snapshots")
+        self._account_snapshots.record(account, ts)
+        if len(self._account_snapshots) >= self._batch_size:
+            self._write_batch()
+
+    def write_flat_snapshots(self, account: Account, ts: np.ndarray) -> None:
+        if self._account_snapshots is None:
+            raise ValueError("The header must be written before the snapshots")
+        batch_size = self._batch_size
+        for start in range(0, len(ts), batch_size):
+            self._account_snapshots.record_flat(account, ts[start : start + batch_size])
+            if len(self._account_snapshots) >= batch_size:
+                self._write_batch()
+
+    def write_footer(self, simulation: Simulation) -> None:
+        if self._account_snapshots is None:
+            raise ValueError("The header must be written before the footer")
+        self._write_batch(
+            {
+                "run_end_ts": simulation.run_end_ts,
+                "profile": (
+                    simulation.profile.to_dict()
+                    if simulation.profile is not None
+                    else None
+                ),
+            },
+            is_last=True,
+        )
+        self.logger.info("Written %s snapshots", self._snapshot_count)
+
+    def close(self) -> None:
+        if self._account_snapshots is not None:
+            self.logger.warning(
+                "Closing %s before the footer, the file has no footer", self._path
+            )
+            self._write_batch(is_last=True)
+
+    @classmethod
+    def write(cls, simulation: Simulation, path: Union[str, Path]) -> None:
+        """Write a simulation with its snapshots to the file in a single batch,
+        e.g., to convert a simulation read by NDJSONSimulationReader.
+
+        Args:
+            simulation (Simulation): The simulation. Its snapshots are recorded
+                in an AccountSnapshotStore first if they are a list.
+            path (Union[str, Path]): The path of the file.
+        """
+        account_snapshots = simulation.account_snapshots
+        if not isinstance(account_snapshots, AccountSnapshotStore):
+            account_snapshots = AccountSnapshotStore()
+            for account_snapshot in simulation.account_snapshots or []:
+                account_snapshots.append(account_snapshot)
+
+        writer = cls(path)
+        writer.write_header(simulation)
+        writer._account_snapshots = account_snapshots
+        writer.write_footer(simulation)
+
+    def _write_batch(
+        self, footer: Optional[Dict] = None, is_last: bool = False
+    ) -> None:
+        """Write the snapshots recorded as a record batch and clear them.
+
+        The last batch has the static data of the positions and their funding
+        rate costs, and the footer, if any, and the file is closed after it.
+        """
+        account_snapshots = self._account_snapshots
+        custom_metadata = None
+        if is_last:
+            custom_metadata = {
+                "positions": json.dumps(
+                    [asdict(position) for position in account_snapshots.positions]
+                ),
+                "funding_rate_costs": json.dumps(account_snapshots.funding_rate_costs),
+            }
+            if footer is not None:
+                custom_metadata["footer"] = json.dumps(footer)
+
+        batch = self._to_record_batch(account_snapshots, self._schema)
+        if self._file_writer is None:
+            self._schema = batch.schema
+            self._file_writer = pa.ipc.new_file(
+                self._sink, self._schema.with_metadata(self._schema_metadata)
+            )
+        self._file_writer.write_batch(batch, custom_metadata=custom_metadata)
+        self._snapshot_count += len(account_snapshots)
+        if is_last:
+            self._file_writer.close()
+            self._sink.close()
+            self._file_writer = self._sink = None
+            self._account_snapshots = None
+        else:
+            # The registry of the positions is kept for the next batches
+            account_snapshots.clear()
+
+    @staticmethod
+    def _to_record_batch(
+        account_snapshots: AccountSnapshotStore, schema: Optional[pa.Schema] = None
+    ) -> pa.RecordBatch:
+        """Get the snapshots of the store as a record batch, with the types of
+        the schema if given."""
+        position_arrays = account_snapshots.get_position_arrays()
+        positions = pa.LargeListArray.from_arrays(
+            pa.array(account_snapshots.position_offsets),
+            pa.StructArray.from_arrays(
+                [pa.array(array) for array in position_arrays.values()],
+                names=list(position_arrays),
+            ),
+            mask=pa.array(~account_snapshots.has_positions),
+        )
+        ts_type = schema.field("ts").type if schema is not None else None
+        return pa.record_batch(
+            {
+                "ts": pa.array(account_snapshots.ts, type=ts_type),
+                "balance": pa.array(account_snapshots.balance),
+                "positions": positions,
+            }
+        )
+
+
+class ArrowSimulationReader:
+    """Read the result of a simulation written by ArrowSimulationWriter.
+
+    The file is memory-mapped and, if its snapshots are in a single batch,
+    its columns are used in place by the AccountSnapshotStore of the
+    simulation, so opening a result doesn't depend on its length. The
+    columns of many batches are concatenated once. Either way, the
+    snapshots are made when they are accessed.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._path = Path(path)
+
+    def read(self) -> Simulation:
+        """Read the simulation with its snapshots in a read-only AccountSnapshotStore.
+
+        Raises:
+            ValueError: If the format version of the file is not supported or
+                the file has no footer, e.g., the simulation was interrupted.
+        """
+        self.logger.info("Reading simulation from %s", self._path)
+        with pa.memory_map(str(self._path), "r") as source:
+            file_reader = pa.ipc.open_file(source)
+            table = file_reader.read_all()
+            last_batch = file_reader.get_batch_with_custom_metadata(
+                file_reader.num_record_batches - 1
+            )
+        metadata = {
+            key.decode(): value.decode() for key, value in table.schema.metadata.items()
+        }
+        if metadata["format_version"] != ArrowSimulationWriter.FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported simulation format version: {metadata['format_version']}"
+            )
+        metadata.update(
+            (key.decode(), value.decode())
+            for key, value in last_batch.custom_metadata.items()
+        )
+        if "footer" not in metadata:
+            raise ValueError(f"Incomplete simulation file: {self._path}")
+
+        positions = self._get_array(table.column("positions"))
+        position_rows = positions.values
+        account_snapshots = AccountSnapshotStore.from_arrays(
+            ts=self._get_array(table.column("ts")).to_numpy(),
+            balance=self._get_array(table.column("balance")).to_numpy(),
+            has_positions=positions.is_valid().to_numpy(zero_copy_only=False),
+            position_offsets=positions.offsets.to_numpy(),
+            position_arrays={
+                field.name: position_rows.field(field.name).to_numpy()
+                for field in position_rows.type
+            },
+            positions=[
+                Position.from_dict(position)
+                for position in json.loads(metadata["positions"])
+            ],
+            funding_rate_costs=json.loads(metadata["funding_rate_costs"]),
+        )
+
+        footer = json.loads(metadata["footer"])
+        simulation = Simulation(
+            **json.loads(metadata["simulation"]), account_snapshots=account_snapshots
+        )
+        simulation.run_end_ts = footer["run_end_ts"]
+        if footer["profile"] is not None:
+            simulation.profile = SimulationProfile.from_dict(footer["profile"])
+        return simulation
+
+    @staticmethod
+    def _get_array(column: pa.ChunkedArray) -> pa.Array:
+        """Get the array of a column, without copying it if it has a single
+        chunk with rows, as a simulation shorter than a batch."""
+        chunks = [chunk for chunk in column.chunks if len(chunk)]
+        if len(chunks) == 1:
+            return chunks[0]
+        return column.combine_chunks()
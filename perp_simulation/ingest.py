@@ -0,0 +1,42 @@
+"""Ingest raw data dumps into the canonical layout of the repositories.
+
+The dumps are CSV or Feather files named as the files of the repositories,
+"{symbol}-{timeframe}-{data_type}.{csv|feather}", e.g.
+"BTC_USDT_USDT-1m-futures.csv", with a "date" column and a column per value.
+
+Run from the repository root:
+
+    poetry run python -m perp_simulation.ingest ./data/raw ./data/binance-futures --max-workers 4
+"""
+
+import argparse
+import logging
+
+from perp_simulation.main import setup_ingest_raw_data_use_case
+from perp_simulation.use_case.ingest_raw_data import IngestRawData
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("raw_data_path", help="Directory of the raw data dumps")
+    parser.add_argument("data_base_path", help="Directory of the repositories")
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument(
+        "--partitioned",
+        action="store_true",
+        help="Append to a dataset with a file per month instead of a single file",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    ingest_raw_data_use_case = setup_ingest_raw_data_use_case(
+        args.data_base_path, args.max_workers, args.partitioned
+    )
+    sources = IngestRawData.find_sources(args.raw_data_path)
+    rows = ingest_raw_data_use_case.run(sources)
+    for source, source_rows in zip(sources, rows):
+        print(f"{source.path}: {source_rows} rows")
+
+
+if __name__ == "__main__":
+    main()
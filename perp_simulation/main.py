@@ -1,17 +1,29 @@
 import logging
 from datetime import datetime
+from functools import partial
+from typing import Optional
 
 from perp_simulation.constant import BINANCE_FUTURES_TAKER_FEE_PCT, Symbol, Timeframe
 from perp_simulation.entity.account import Account
 from perp_simulation.entity.position import Position
 from perp_simulation.entity.trade import Trade
+from perp_simulation.gateway.dataframe_cache import (
+    DataFrameCache,
+    get_default_dataframe_cache,
+)
 from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.mark_price_repository import MarkPriceRepository
 from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
-from perp_simulation.gateway.simulation_serializer import SimulationSerializer
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
+from perp_simulation.gateway.simulation_writer import ArrowSimulationWriter
+from perp_simulation.trace import TRACE_LOGGER_NAME, Tracer
+from perp_simulation.use_case.ingest_raw_data import IngestRawData
 from perp_simulation.use_case.liquidate_positions import LiquidatePositions
 from perp_simulation.use_case.make_account_snapshot import MakeAccountSnapshot
 from perp_simulation.use_case.open_cross_margin_position import OpenCrossMarginPosition
+from perp_simulation.use_case.run_parameter_sweep import RunParameterSweep
 from perp_simulation.use_case.run_simulation import RunSimulation
+from perp_simulation.use_case.run_simulation_pool import RunSimulationPool
 from perp_simulation.use_case.settle_funding_rate_costs import SettleFundingRateCosts
 from perp_simulation.use_case.update_position_effective_leverage import (
     UpdatePositionEffectiveLeverage,
@@ -25,15 +37,36 @@ from perp_simulation.use_case.update_position_liquidation_price import (
 from perp_simulation.use_case.update_position_maintenance_margin import (
     UpdatePositionMaintenanceMargin,
 )
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
 from perp_simulation.use_case.update_position_unrealized_pnl import (
     UpdatePositionUnrealizedPnl,
 )
 
 
-def setup_run_simulation_use_case(data_base_path: str) -> RunSimulation:
-    # Repositories
-    ohlcv_repository = OHLCVRepository(data_base_path)
-    funding_rate_repository = FundingRateRepository(data_base_path)
+def setup_run_simulation_use_case(
+    data_base_path: str,
+    tracer: Optional[Tracer] = None,
+    profile: bool = False,
+    fast_forward: bool = True,
+    intrabar_liquidation: bool = False,
+    drill_down_distance: Optional[float] = None,
+    use_mark_price: bool = False,
+    processed_data_cache: Optional[ProcessedDataCache] = None,
+    dataframe_cache: Optional[DataFrameCache] = None,
+) -> RunSimulation:
+    # Repositories, sharing the DataFrame cache of the process by default
+    dataframe_cache = dataframe_cache or get_default_dataframe_cache()
+    ohlcv_repository = OHLCVRepository(
+        data_base_path, processed_data_cache, dataframe_cache
+    )
+    funding_rate_repository = FundingRateRepository(
+        data_base_path, processed_data_cache, dataframe_cache
+    )
+    mark_price_repository = (
+        MarkPriceRepository(data_base_path, processed_data_cache, dataframe_cache)
+        if use_mark_price
+        else None
+    )
 
     # Use cases
     update_position_initial_margin_use_case = UpdatePositionInitialMargin()
@@ -47,9 +80,11 @@ def setup_run_simulation_use_case(data_base_path: str) -> RunSimulation:
         update_position_effective_leverage_use_case=update_position_effective_leverage_use_case,
         update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
     )
+    update_position_risk_use_case = UpdatePositionRisk()
     liquidate_position_use_case = LiquidatePositions(
         update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
         update_position_unrealized_pnl_use_case=update_position_unrealized_pnl_use_case,
+        update_position_risk_use_case=update_position_risk_use_case,
     )
     run_simulation_use_case = RunSimulation(
         ohlcv_repository=ohlcv_repository,
@@ -63,10 +98,74 @@ def setup_run_simulation_use_case(data_base_path: str) -> RunSimulation:
         update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
         liquidate_position_use_case=liquidate_position_use_case,
         make_account_snapshot_use_case=MakeAccountSnapshot(),
+        update_position_risk_use_case=update_position_risk_use_case,
+        tracer=tracer,
+        profile=profile,
+        fast_forward=fast_forward,
+        intrabar_liquidation=intrabar_liquidation,
+        drill_down_distance=drill_down_distance,
+        mark_price_repository=mark_price_repository,
     )
     return run_simulation_use_case
 
 
+def setup_run_parameter_sweep_use_case(
+    data_base_path: str,
+    intrabar_liquidation: bool = False,
+    processed_data_cache: Optional[ProcessedDataCache] = None,
+    dataframe_cache: Optional[DataFrameCache] = None,
+) -> RunParameterSweep:
+    dataframe_cache = dataframe_cache or get_default_dataframe_cache()
+    run_parameter_sweep_use_case = RunParameterSweep(
+        ohlcv_repository=OHLCVRepository(
+            data_base_path, processed_data_cache, dataframe_cache
+        ),
+        funding_rate_repository=FundingRateRepository(
+            data_base_path, processed_data_cache, dataframe_cache
+        ),
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+        intrabar_liquidation=intrabar_liquidation,
+    )
+    return run_parameter_sweep_use_case
+
+
+def setup_run_simulation_pool_use_case(
+    data_base_path: str,
+    max_workers: Optional[int] = None,
+    processed_data_cache: Optional[ProcessedDataCache] = None,
+    dataframe_cache: Optional[DataFrameCache] = None,
+) -> RunSimulationPool:
+    dataframe_cache = dataframe_cache or get_default_dataframe_cache()
+    run_simulation_pool_use_case = RunSimulationPool(
+        ohlcv_repository=OHLCVRepository(
+            data_base_path, processed_data_cache, dataframe_cache
+        ),
+        funding_rate_repository=FundingRateRepository(
+            data_base_path, processed_data_cache, dataframe_cache
+        ),
+        # The workers share the processed data cache on disk, and every one
+        # uses the DataFrame cache of its process
+        run_simulation_factory=partial(
+            setup_run_simulation_use_case,
+            data_base_path,
+            processed_data_cache=processed_data_cache,
+        ),
+        max_workers=max_workers,
+    )
+    return run_simulation_pool_use_case
+
+
+def setup_ingest_raw_data_use_case(
+    data_base_path: str, max_workers: Optional[int] = None, partitioned: bool = False
+) -> IngestRawData:
+    ingest_raw_data_use_case = IngestRawData(
+        data_base_path=data_base_path,
+        max_workers=max_workers,
+        partitioned=partitioned,
+    )
+    return ingest_raw_data_use_case
+
+
 def main(
     data_base_path: str,
     output_path: str,
@@ -77,8 +176,27 @@ def main(
     account_balance: float,
     leverage: float,
     trade_price: float,
+    trace_sample_every: int = 1,
+    profile: bool = False,
+    intrabar_liquidation: bool = False,
+    drill_down_distance: Optional[float] = None,
+    use_mark_price: bool = False,
+    processed_data_cache_path: Optional[str] = None,
 ):
-    run_simulation_use_case = setup_run_simulation_use_case(data_base_path)
+    processed_data_cache = (
+        ProcessedDataCache(processed_data_cache_path)
+        if processed_data_cache_path is not None
+        else None
+    )
+    run_simulation_use_case = setup_run_simulation_use_case(
+        data_base_path,
+        Tracer(trace_sample_every),
+        profile,
+        intrabar_liquidation=intrabar_liquidation,
+        drill_down_distance=drill_down_distance,
+        use_mark_price=use_mark_price,
+        processed_data_cache=processed_data_cache,
+    )
 
     trade_ts = start_time.timestamp() - 60
     position_notional = account_balance * leverage
@@ -107,18 +225,19 @@ def main(
         ],
     )
 
-    simulation_result = run_simulation_use_case.run(
-        account=account,
-        start_time=start_time,
-        end_time=end_time,
-        timeframe=timeframe,
-        symbol=symbol,
-    )
-
-    output_file_path = f"{output_path}/simulation_result.json"
-    simulation_json = SimulationSerializer.to_json(simulation_result)
-    with open(output_file_path, "w", encoding="UTF-8") as output_file:
-        output_file.write(simulation_json)
+    # The snapshots are written to a columnar file in batches as they are made,
+    # so the memory used doesn't grow with the run, and the file can be
+    # memory-mapped by ArrowSimulationReader
+    output_file_path = f"{output_path}/simulation_result.arrow"
+    with ArrowSimulationWriter(output_file_path) as writer:
+        run_simulation_use_case.run(
+            account=account,
+            start_time=start_time,
+            end_time=end_time,
+            timeframe=timeframe,
+            symbol=symbol,
+            writer=writer,
+        )
 
 
 if __name__ == "__main__":
@@ -126,15 +245,32 @@ if __name__ == "__main__":
 
     # Config
     # TODO: configure log file
-    logging.basicConfig(level=logging.DEBUG, filename="./logs/perp_simulation.log", filemode="w")
+    logging.basicConfig(
+        level=logging.INFO, filename="./logs/perp_simulation.log", filemode="w"
+    )
+    # Set to DEBUG to trace one bar every TRACE_SAMPLE_EVERY bars, it slows down the simulation
+    logging.getLogger(TRACE_LOGGER_NAME).setLevel(logging.INFO)
+    TRACE_SAMPLE_EVERY = 60
+    # Set to True to add the time spent in every phase to the simulation result
+    PROFILE = False
+    # Set to True to liquidate with the low and high of the bars instead of the close
+    INTRABAR_LIQUIDATION = False
+    # Set to a relative distance to the liquidation price, e.g. 0.01, to step the
+    # bars resampled from the 1m bars and the 1m bars only near the liquidation
+    DRILL_DOWN_DISTANCE = None
+    # Set to True to update and liquidate the positions with the mark price bars,
+    # not supported with DRILL_DOWN_DISTANCE
+    USE_MARK_PRICE = False
 
     # Data parameters
     DATA_BASE_PATH = "./data/binance-futures"
     OUTPUT_PATH = "./output"
+    # Set to None to process the data on every run instead of caching it on disk
+    PROCESSED_DATA_CACHE_PATH = "./cache/processed_data"
 
     # Simulation parameters
     start_time = datetime.fromisoformat("2024-01-01T00:00:00Z")
-    end_time = datetime.fromisoformat("2024-01-01T00:00:00Z")
+    end_time = datetime.fromisoformat("2024-02-01T00:00:00Z")
     timeframe = Timeframe.ONE_MIN
     symbol = Symbol.BTCUSD
 
@@ -153,4 +289,10 @@ if __name__ == "__main__":
         account_balance,
         leverage,
         trade_price,
+        TRACE_SAMPLE_EVERY,
+        PROFILE,
+        INTRABAR_LIQUIDATION,
+        DRILL_DOWN_DISTANCE,
+        USE_MARK_PRICE,
+        PROCESSED_DATA_CACHE_PATH,
     )
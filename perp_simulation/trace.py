@@ -0,0 +1,60 @@
+"""Define the structured trace of the per bar path of the simulation."""
+
+import logging
+from typing import Any
+
+TRACE_LOGGER_NAME = "perp_simulation.trace"
+
+
+class Tracer:
+    """Structured trace of the bars of a simulation, sampled every N bars.
+
+    Every event is logged at DEBUG level by the trace logger as a record with
+    the event name and its fields as key=value pairs. The fields are also in
+    the `trace` attribute of the record for structured handlers.
+
+    The level is checked once per simulation with `start`, so a disabled
+    trace costs a bool check per bar and the fields are never formatted.
+    """
+
+    def __init__(
+        self, sample_every: int = 1, logger_name: str = TRACE_LOGGER_NAME
+    ) -> None:
+        if sample_every < 1:
+            raise ValueError(f"Invalid sample_every: {sample_every}")
+        self.logger = logging.getLogger(logger_name)
+        self.sample_every = sample_every
+        self.enabled = False
+
+    def start(self) -> bool:
+        """Check if the trace is enabled for the next simulation.
+
+        Returns:
+            bool: True if the trace logger is enabled for DEBUG.
+        """
+        self.enabled = self.logger.isEnabledFor(logging.DEBUG)
+        return self.enabled
+
+    def is_traced(self, bar_index: int) -> bool:
+        """Check if a bar is traced.
+
+        Args:
+            bar_index (int): The index of the bar in the simulation.
+        Returns:
+            bool: True if the trace is enabled and the bar is sampled.
+        """
+        return self.enabled and bar_index % self.sample_every == 0
+
+    def trace(self, event: str, **fields: Any) -> None:
+        """Log a trace event.
+
+        Args:
+            event (str): The name of the event.
+            **fields: The fields of the event.
+        """
+        self.logger.debug(
+            "%s %s",
+            event,
+            " ".join(f"{name}={value!r}" for name, value in fields.items()),
+            extra={"trace": {"event": event, **fields}},
+        )
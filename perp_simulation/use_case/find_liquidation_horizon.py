@@ -0,0 +1,121 @@
+import logging
+from typing import Sequence, Union
+
+import numpy as np
+
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.liquidation_horizon_index import LiquidationHorizonIndex
+from perp_simulation.entity.position import Position
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+
+
+class FindLiquidationHorizon:
+    """Find the bar where every setup of a position is liquidated on one price path.
+
+    The liquidation price of every setup is calculated as in the simulation and
+    the first bar crossing it is searched in a LiquidationHorizonIndex of the
+    price path, without stepping the bars. The balance of the setups is
+    constant, so funding rate settlements are not taken into account.
+
+    - Actor: User
+    - Scenario:
+        1. User provides the index of the price path, the positions, the account balances and the start bars.
+        2. The system updates the liquidation price of every position.
+        3. The system searches the first bar crossing the liquidation price of every position.
+        4. The system returns the liquidation bar of every position.
+    - Preconditions:
+        - The maintenance margin of the positions is updated.
+    """
+
+    def __init__(
+        self, update_position_liquidation_price_use_case: UpdatePositionLiquidationPrice
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._update_position_liquidation_price_use_case = (
+            update_position_liquidation_price_use_case
+        )
+
+    def find_liquidation_bar(
+        self,
+        liquidation_horizon_index: LiquidationHorizonIndex,
+        positions: Sequence[Position],
+        account_balances: Union[float, np.ndarray],
+        start_index: Union[int, np.ndarray] = 0,
+    ) -> np.ndarray:
+        """Find the liquidation bar of every position.
+
+        Args:
+            liquidation_horizon_index (LiquidationHorizonIndex): The index of the price path.
+            positions (Sequence[Position]): The positions to liquidate.
+            account_balances (Union[float, np.ndarray]): The account balance of every position.
+            start_index (Union[int, np.ndarray]): The bar where every position is held from.
+        Returns:
+            np.ndarray: The index of the liquidation bar of every position, -1 if it's not liquidated.
+        """
+        self.logger.info("Finding the liquidation bar of %s positions", len(positions))
+        account_balances = np.broadcast_to(
+            np.asarray(account_balances, dtype=np.float64), (len(positions),)
+        )
+        start_index = np.broadcast_to(
+            np.asarray(start_index, dtype=np.int64), (len(positions),)
+        )
+        liquidation_price = np.array(
+            [
+                self._update_position_liquidation_price_use_case.update_liquidation_price(
+                    position, account_balance
+                ).liquidation_price
+                for position, account_balance in zip(
+                    positions, account_balances.tolist()
+                )
+            ],
+            dtype=np.float64,
+        )
+        is_long = np.array(
+            [position.side == Position.LONG for position in positions], dtype=bool
+        )
+
+        liquidation_bar = np.full(len(positions), -1, dtype=np.int64)
+        liquidation_bar[is_long] = liquidation_horizon_index.first_at_or_below(
+            liquidation_price[is_long], start_index[is_long]
+        )
+        liquidation_bar[~is_long] = liquidation_horizon_index.first_at_or_above(
+            liquidation_price[~is_long], start_index[~is_long]
+        )
+        self.logger.info(
+            "Liquidated %s of %s positions",
+            int((liquidation_bar >= 0).sum()),
+            len(positions),
+        )
+        return liquidation_bar
+
+    def find_liquidation_ts(
+        self,
+        liquidation_horizon_index: LiquidationHorizonIndex,
+        timeframe: str,
+        positions: Sequence[Position],
+        account_balances: Union[float, np.ndarray],
+        start_index: Union[int, np.ndarray] = 0,
+    ) -> np.ndarray:
+        """Find the liquidation ts of every position, the ts of the account
+        snapshot of the liquidation bar as in the simulation.
+
+        Args:
+            liquidation_horizon_index (LiquidationHorizonIndex): The index of the price path.
+            timeframe (str): The timeframe of the bars.
+            positions (Sequence[Position]): The positions to liquidate.
+            account_balances (Union[float, np.ndarray]): The account balance of every position.
+            start_index (Union[int, np.ndarray]): The bar where every position is held from.
+        Returns:
+            np.ndarray: The liquidation ts of every position, -1 if it's not liquidated.
+        """
+        liquidation_bar = self.find_liquidation_bar(
+            liquidation_horizon_index, positions, account_balances, start_index
+        )
+        ts = np.asarray(liquidation_horizon_index.ts)
+        return np.where(
+            liquidation_bar >= 0,
+            ts[liquidation_bar] + Timeframe.to_seconds(timeframe),
+            -1,
+        )
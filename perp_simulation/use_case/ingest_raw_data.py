@@ -0,0 +1,150 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from perp_simulation.constant import DataType, Timeframe
+from perp_simulation.gateway.data_service import (
+    DataProcessingService,
+    FeatherRepository,
+)
+
+RAW_DATA_SUFFIXES = (".csv", ".feather")
+
+
+@dataclass(frozen=True)
+class RawDataSource:
+    """Raw data dump of a symbol, timeframe and data type."""
+
+    path: str
+    symbol: str
+    timeframe: str
+    data_type: str
+
+    @classmethod
+    def from_path(cls, path: Path) -> "RawDataSource":
+        """Get the source of a dump named "{symbol}-{timeframe}-{data_type}.{csv|feather}",
+        the naming of the Feather files of the repositories."""
+        path = Path(path)
+        parts = path.stem.split("-")
+        if path.suffix not in RAW_DATA_SUFFIXES or len(parts) != 3:
+            raise ValueError(f"Invalid raw data file name: {path.name}")
+        symbol, timeframe, data_type = parts
+        if timeframe not in Timeframe.all():
+            raise ValueError(f"Invalid timeframe: {timeframe}")
+        if data_type not in DataType.all():
+            raise ValueError(f"Invalid data type: {data_type}")
+        return cls(str(path), symbol, timeframe, data_type)
+
+
+def _check_unique_datasets(sources: List[RawDataSource]) -> None:
+    """Raise a ValueError if two dumps are of the same symbol, timeframe and
+    data type, e.g. X.csv and X.feather, since their jobs would race on the
+    same file or dataset."""
+    paths: Dict[Tuple[str, str, str], str] = {}
+    for source in sources:
+        key = (source.symbol, source.timeframe, source.data_type)
+        if key in paths:
+            raise ValueError(
+                f"Duplicated raw data dumps of {'-'.join(key)}: "
+                f"{paths[key]} and {source.path}"
+            )
+        paths[key] = source.path
+
+
+def _ingest_job(data_base_path: str, source: RawDataSource, partitioned: bool) -> int:
+    """Normalize a raw data dump and store it in the canonical layout."""
+    feather_repository = FeatherRepository(Path(data_base_path))
+    _df = feather_repository.load_raw(Path(source.path))
+    _df = DataProcessingService.normalize_raw_df(_df, source.timeframe)
+    feather_repository.store_canonical(
+        source.data_type, source.timeframe, source.symbol, _df, partitioned
+    )
+    return len(_df)
+
+
+class IngestRawData:
+    """Ingest raw data dumps of many symbols into the canonical layout of the
+    repositories on a pool of processes.
+
+    The canonical layout has UTC dates in ns, float64 columns and contiguous
+    sorted bars without duplicates, so the repositories index it without
+    parsing the dates and resample it to its own timeframe without
+    aggregating the bars.
+
+    - Actor: User
+    - Scenario:
+        1. User provides the raw data dumps, named as the files of the repositories, a dump per dataset.
+        2. The system submits a job per dump to the pool.
+        3. Every job loads the dump and normalizes it to the canonical layout.
+        4. Every job validates and stores the data, to a file or appending it to a partitioned dataset.
+        5. The system returns the rows stored of every dump, in order.
+    """
+
+    def __init__(
+        self,
+        data_base_path: str,
+        max_workers: Optional[int] = None,
+        partitioned: bool = False,
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._data_base_path = data_base_path
+        self._max_workers = max_workers or os.cpu_count() or 1
+        # Append to a PartitionedFeatherDataset per dump instead of a single file
+        self._partitioned = partitioned
+
+    @staticmethod
+    def find_sources(raw_data_path: str) -> List[RawDataSource]:
+        """Get the sources of the dumps in a directory, sorted by name.
+
+        Args:
+            raw_data_path (str): The directory of the raw data dumps.
+        Returns:
+            List[RawDataSource]: The sources of the CSV and Feather files.
+        Raises:
+            ValueError: If two files are dumps of the same dataset.
+        """
+        sources = [
+            RawDataSource.from_path(path)
+            for path in sorted(Path(raw_data_path).iterdir())
+            if path.suffix in RAW_DATA_SUFFIXES
+        ]
+        _check_unique_datasets(sources)
+        return sources
+
+    def run(self, sources: List[RawDataSource]) -> List[int]:
+        """Ingest the raw data dumps.
+
+        Args:
+            sources (List[RawDataSource]): The raw data dumps.
+        Returns:
+            List[int]: The rows stored of every dump. The first error of a
+                dump, if any, is raised once all the jobs are done.
+        Raises:
+            ValueError: If two dumps are of the same dataset, before any job.
+        """
+        _check_unique_datasets(sources)
+        self.logger.info(
+            "Ingesting %s raw data dumps into %s with %s workers",
+            len(sources),
+            self._data_base_path,
+            self._max_workers,
+        )
+        with ProcessPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _ingest_job, self._data_base_path, source, self._partitioned
+                )
+                for source in sources
+            ]
+            # Join all the jobs before raising, so no dump is left half done
+            for source, future in zip(sources, futures):
+                if future.exception() is not None:
+                    self.logger.error(
+                        "Ingesting %s failed: %s", source.path, future.exception()
+                    )
+        rows = [future.result() for future in futures]
+        self.logger.info("Ingesting raw data completed")
+        return rows
@@ -1,9 +1,12 @@
 import logging
+from typing import Optional
 
 from perp_simulation.entity.account import Account
+from perp_simulation.entity.position import Position
 from perp_simulation.use_case.update_position_liquidation_price import (
     UpdatePositionLiquidationPrice,
 )
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
 from perp_simulation.use_case.update_position_unrealized_pnl import (
     UpdatePositionUnrealizedPnl,
 )
@@ -13,6 +16,10 @@ class LiquidatePositions:
     """Liquidate positions in the account.
 
     For now, the liquidation doesn't take into account liquidation fees.
+    If the position risk use case is given, the liquidation price is
+    calculated with it. Either way, only the liquidation price of the
+    positions is updated, so the positions left open keep the risk metrics
+    of the last position update.
 
     - Actor: Market.
     - Scenario:
@@ -27,6 +34,7 @@ class LiquidatePositions:
         self,
         update_position_liquidation_price_use_case: UpdatePositionLiquidationPrice,
         update_position_unrealized_pnl_use_case: UpdatePositionUnrealizedPnl,
+        update_position_risk_use_case: Optional[UpdatePositionRisk] = None,
     ) -> None:
         self.logger = logging.getLogger(__name__)
         self._update_position_liquidation_price_use_case = (
@@ -35,47 +43,101 @@ class LiquidatePositions:
         self._update_position_unrealized_pnl_use_case = (
             update_position_unrealized_pnl_use_case
         )
+        self._update_position_risk_use_case = update_position_risk_use_case
 
-    def liquidate(self, account: Account, market_price: float) -> Account:
+    def liquidate(
+        self,
+        account: Account,
+        market_price: float,
+        low_price: Optional[float] = None,
+        high_price: Optional[float] = None,
+        open_price: Optional[float] = None,
+    ) -> Account:
         """Liquidate positions in the account.
 
+        By default, a position is liquidated if the market price reaches its
+        liquidation price, and it's closed at the market price. If the low or
+        the high price of the bar is given, the liquidation is checked inside
+        the bar: a long position is liquidated if the low price reaches its
+        liquidation price and a short position if the high price does, and
+        it's closed at its liquidation price. If the open price of the bar is
+        given and the bar gaps past the liquidation price, the position is
+        closed at the open price instead, the first price it can be closed at.
+
         Args:
             account: The account to liquidate positions.
             market_price: The market price to liquidate positions.
+            low_price: The low price of the bar to liquidate long positions, if any.
+            high_price: The high price of the bar to liquidate short positions, if any.
+            open_price: The open price of the bar to close the positions of an
+                intrabar liquidation when the bar gaps past their liquidation price.
         Returns:
             The updated account.
         """
+        # Called every bar, so the level is checked once per call
+        is_debug = self.logger.isEnabledFor(logging.DEBUG)
         if account.positions is None:
-            self.logger.info("No positions to liquidate")
+            if is_debug:
+                self.logger.debug("No positions to liquidate")
             return account
 
-        self.logger.info(
-            "Liquidating positions with market price %s for account: %s",
-            market_price,
-            account,
-        )
-        for position in account.positions:
-            # TODO get from position info
-            updated_position = (
-                self._update_position_liquidation_price_use_case.update_liquidation_price(
+        is_intrabar = low_price is not None or high_price is not None
+        if is_intrabar:
+            low_price = market_price if low_price is None else low_price
+            high_price = market_price if high_price is None else high_price
+
+        if is_debug:
+            self.logger.debug(
+                "Liquidating positions with market price %s for account: %s",
+                market_price,
+                account,
+            )
+        # Iterate over a copy, the liquidated positions are removed from the account
+        for position in list(account.positions):
+            if self._update_position_risk_use_case is not None:
+                updated_position = (
+                    self._update_position_risk_use_case.update_liquidation_price(
+                        position, account.balance
+                    )
+                )
+            else:
+                # TODO get from position info
+                updated_position = self._update_position_liquidation_price_use_case.update_liquidation_price(
                     position, account.balance
                 )
-            )
-            # TODO: set logging level to debug
-            self.logger.info(
-                "Liquidation price for position is %s",
-                updated_position.liquidation_price,
-            )
-            if market_price <= updated_position.liquidation_price:
+            if is_debug:
+                self.logger.debug(
+                    "Liquidation price for position is %s",
+                    updated_position.liquidation_price,
+                )
+            liquidation_price = updated_position.liquidation_price
+            if not is_intrabar:
+                is_liquidated = market_price <= liquidation_price
+            elif position.side == Position.LONG:
+                is_liquidated = low_price <= liquidation_price
+            else:
+                is_liquidated = high_price >= liquidation_price
+            if is_liquidated:
+                exit_price = market_price
+                if is_intrabar:
+                    # The liquidation price is crossed inside the bar, or at its
+                    # open if the bar gaps past it
+                    exit_price = liquidation_price
+                    if open_price is not None:
+                        exit_price = (
+                            min(open_price, liquidation_price)
+                            if position.side == Position.LONG
+                            else max(open_price, liquidation_price)
+                        )
                 self.logger.info(
                     "Liquidating position %s with market price %s",
                     position,
-                    market_price,
+                    exit_price,
                 )
                 # TODO create a trade and create a use case to close the position
                 updated_position = (
                     self._update_position_unrealized_pnl_use_case.update_unrealized_pnl(
-                        updated_position, market_price
+                        updated_position, exit_price
                     )
                 )
                 account.update_balance(updated_position.unrealized_pnl)
@@ -84,5 +146,6 @@ class LiquidatePositions:
                     "Position liquidated. Account balance updated to %s",
                     account.balance,
                 )
-        self.logger.info("Account and positions updated with liquidation")
+        if is_debug:
+            self.logger.debug("Account and positions updated with liquidation")
         return account
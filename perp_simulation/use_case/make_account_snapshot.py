@@ -1,8 +1,11 @@
 import logging
 from copy import deepcopy
 
+import numpy as np
+
 from perp_simulation.entity.account import Account
 from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
 
 
 class MakeAccountSnapshot:
@@ -33,3 +36,33 @@ class MakeAccountSnapshot:
         account_snapshot = AccountSnapshot(ts=ts, account=account_copy)
         self.logger.info("Account snapshot made: %s", account_snapshot)
         return account_snapshot
+
+    def record(
+        self, account: Account, ts: float, account_snapshot_store: AccountSnapshotStore
+    ) -> None:
+        """Record a snapshot of the account in a store, without copying the account.
+
+        Args:
+            account (Account): The account.
+            ts (float): The timestamp.
+            account_snapshot_store (AccountSnapshotStore): The store to record the snapshot.
+        """
+        self.logger.debug("Recording account snapshot at %s.", ts)
+        account_snapshot_store.record(account, ts)
+
+    def record_flat(
+        self,
+        account: Account,
+        ts: np.ndarray,
+        account_snapshot_store: AccountSnapshotStore,
+    ) -> None:
+        """Record the snapshots of an account without positions at many
+        timestamps at once in a store.
+
+        Args:
+            account (Account): The account without positions.
+            ts (np.ndarray): The timestamps.
+            account_snapshot_store (AccountSnapshotStore): The store to record the snapshots.
+        """
+        self.logger.debug("Recording %s flat account snapshots.", len(ts))
+        account_snapshot_store.record_flat(account, ts)
@@ -0,0 +1,313 @@
+import logging
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from perp_simulation.constant import BINANCE_FUTURES_TAKER_FEE_PCT, Timeframe
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.entity.parameter_sweep import ParameterSweep
+from perp_simulation.entity.position import Position
+from perp_simulation.entity.trade import Trade
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.historical_feather_repository import load_concurrently
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+
+
+class RunParameterSweep:
+    """Run a simulation over historical data for every combination of account
+    balance, leverage and entry price of a long position.
+
+    The data is loaded once and the configurations are evaluated together:
+    the balance paths of all of them are a cumulative sum of the funding rate
+    fees, and the liquidation is found comparing the minimum close price
+    between settlements against the liquidation prices of every configuration.
+    The result of every configuration is the same as the one of
+    RunVectorizedSimulation for an account built as main does.
+
+    If the liquidation is intrabar, the low price of the bars is compared
+    instead of the close and the position is closed at its liquidation
+    price, or at the open of the bar if the bar gaps past it, as
+    RunSimulation does with intrabar liquidation.
+
+    - Actor: User
+    - Scenario:
+        1. User provides the start and end time, and the balances, leverages and entry prices.
+        2. The system retrieves the data from the repositories once.
+        3. The system makes the grid of configurations.
+        4. The system settles the funding rate fees of every configuration.
+        5. The system finds the liquidation bar of every configuration.
+        6. The system returns the final balance, liquidation ts and funding paid.
+    - Preconditions:
+        - No positions are opened during the simulation.
+    """
+
+    def __init__(
+        self,
+        ohlcv_repository: OHLCVRepository,
+        funding_rate_repository: FundingRateRepository,
+        update_position_maintenance_margin_use_case: UpdatePositionMaintenanceMargin,
+        chunk_size: int = 1024,
+        intrabar_liquidation: bool = False,
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._ohlcv_repository = ohlcv_repository
+        self._funding_rate_repository = funding_rate_repository
+        self._update_position_maintenance_margin_use_case = (
+            update_position_maintenance_margin_use_case
+        )
+        # Configurations evaluated at once, it bounds the memory of the balance paths
+        self._chunk_size = chunk_size
+        # If True, the positions are liquidated with the low of the bars
+        self._intrabar_liquidation = intrabar_liquidation
+
+    def run(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        timeframe: str,
+        symbol: str,
+        balances: np.ndarray,
+        leverages: np.ndarray,
+        entry_prices: np.ndarray,
+    ) -> ParameterSweep:
+        """Run the parameter sweep over historical data.
+
+        Args:
+            start_time (datetime): The start time of the simulation.
+            end_time (datetime): The end time of the simulation.
+            timeframe (str): The timeframe of the data.
+            symbol (str): The symbol of the data.
+            balances (np.ndarray): The account balances.
+            leverages (np.ndarray): The leverages of the position.
+            entry_prices (np.ndarray): The entry prices of the position.
+        Returns:
+            ParameterSweep: The result of every combination.
+        """
+        self.logger.info(
+            "Running parameter sweep from %s to %s with timeframe %s and symbol %s",
+            start_time,
+            end_time,
+            timeframe,
+            symbol,
+        )
+        self.logger.info("Retrieving historical OHLCV and funding rate data")
+        ohlcv_series, funding_rate_df = load_concurrently(
+            partial(
+                self._ohlcv_repository.get_historical_series,
+                symbol,
+                start_time,
+                timeframe,
+                end_time,
+            ),
+            partial(
+                self._funding_rate_repository.get_historical_dataframe,
+                symbol,
+                start_time,
+                timeframe,
+                end_time,
+            ),
+        )
+        funding_rate_ts = DataProcessingService.index_to_ts(funding_rate_df)
+        funding_rate = funding_rate_df["funding_rate"].to_numpy(dtype=np.float64)
+
+        parameter_sweep = self.sweep(
+            ohlcv_series,
+            funding_rate_ts,
+            funding_rate,
+            timeframe,
+            balances,
+            leverages,
+            entry_prices,
+        )
+        self.logger.info("Running parameter sweep completed")
+        return parameter_sweep
+
+    def sweep(
+        self,
+        ohlcv_series: OHLCVSeries,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+        timeframe: str,
+        balances: np.ndarray,
+        leverages: np.ndarray,
+        entry_prices: np.ndarray,
+    ) -> ParameterSweep:
+        """Evaluate every combination of balance, leverage and entry price.
+
+        Args:
+            ohlcv_series (OHLCVSeries): The OHLCV data.
+            funding_rate_ts (np.ndarray): The funding rate timestamps.
+            funding_rate (np.ndarray): The funding rates, NaN if there is no settlement.
+            timeframe (str): The timeframe of the data.
+            balances (np.ndarray): The account balances.
+            leverages (np.ndarray): The leverages of the position.
+            entry_prices (np.ndarray): The entry prices of the position.
+        Returns:
+            ParameterSweep: The result of every combination.
+        """
+        balance, leverage, entry_price = (
+            grid.ravel()
+            for grid in np.meshgrid(
+                np.asarray(balances, dtype=np.float64),
+                np.asarray(leverages, dtype=np.float64),
+                np.asarray(entry_prices, dtype=np.float64),
+                indexing="ij",
+            )
+        )
+        n_configs = len(balance)
+        self.logger.info("Sweeping %s configurations", n_configs)
+
+        positions = [
+            self._make_position(ohlcv_series.symbol, b, lev, price)
+            for b, lev, price in zip(
+                balance.tolist(), leverage.tolist(), entry_price.tolist()
+            )
+        ]
+        quantity = np.array([p.quantity for p in positions], dtype=np.float64)
+        maintenance_margin = np.array(
+            [p.maintenance_margin for p in positions], dtype=np.float64
+        )
+
+        bar_ts = np.asarray(ohlcv_series.ts)
+        open_price = np.asarray(ohlcv_series.open, dtype=np.float64)
+        close = np.asarray(ohlcv_series.close, dtype=np.float64)
+        if not len(close):
+            raise ValueError("There is no OHLCV data to sweep")
+        # A funding rate is settled at the open of the bar that contains it,
+        # adding up the rates of the same bar, as in the market timeline
+        funding_rate_index, _, settled_funding_rate = (
+            MarketTimelineRepository.align_funding_rates(
+                bar_ts, timeframe, funding_rate_ts, funding_rate
+            )
+        )
+        self.logger.debug(
+            "Matched %s funding rate settlements with the bars", len(funding_rate_index)
+        )
+
+        # Price compared with the liquidation price of the long positions
+        liquidation_check_price = (
+            np.asarray(ohlcv_series.low, dtype=np.float64)
+            if self._intrabar_liquidation
+            else close
+        )
+        # The balance is constant between settlements, so every segment of bars
+        # between settlements is reduced to its minimum price
+        segment_start = np.unique(np.concatenate(([0], funding_rate_index)))
+        segment_end = np.append(segment_start[1:], len(close))
+        segment_settlements = np.searchsorted(
+            funding_rate_index, segment_start, side="right"
+        )
+        segment_min_price = np.minimum.reduceat(liquidation_check_price, segment_start)
+        cumulative_funding_rate = np.concatenate(
+            ([0.0], np.cumsum(settled_funding_rate))
+        )
+
+        final_balance = np.empty(n_configs, dtype=np.float64)
+        liquidation_ts = np.full(n_configs, -1, dtype=bar_ts.dtype)
+        funding_paid = np.empty(n_configs, dtype=np.float64)
+        liquidation_ts_offset = Timeframe.to_seconds(timeframe)
+        for start in range(0, n_configs, self._chunk_size):
+            cols = slice(start, min(start + self._chunk_size, n_configs))
+            notional_value = quantity[cols] * entry_price[cols]
+
+            # Balance after every settlement, one column per configuration
+            funding_rate_costs = settled_funding_rate[:, np.newaxis] * notional_value
+            balance_path = np.cumsum(
+                np.vstack((balance[np.newaxis, cols], -funding_rate_costs)), axis=0
+            )
+            segment_balance = balance_path[segment_settlements]
+            segment_liquidation_price = (
+                -((segment_balance - maintenance_margin[cols]) / quantity[cols])
+                + entry_price[cols]
+            )
+            crossed = segment_min_price[:, np.newaxis] <= segment_liquidation_price
+            is_liquidated = crossed.any(axis=0)
+            liquidation_segment = np.argmax(crossed, axis=0)
+
+            # Settlements until the end or the liquidation bar of every configuration
+            settlements = np.where(
+                is_liquidated,
+                segment_settlements[liquidation_segment],
+                len(settled_funding_rate),
+            )
+            chunk_final_balance = balance_path[
+                settlements, np.arange(len(notional_value))
+            ]
+            funding_paid[cols] = cumulative_funding_rate[settlements] * notional_value
+
+            for segment in np.unique(liquidation_segment[is_liquidated]):
+                chunk_cols = np.flatnonzero(
+                    is_liquidated & (liquidation_segment == segment)
+                )
+                segment_price = liquidation_check_price[
+                    segment_start[segment] : segment_end[segment]
+                ]
+                liquidation_bar = segment_start[segment] + np.argmax(
+                    segment_price[:, np.newaxis]
+                    <= segment_liquidation_price[segment, chunk_cols],
+                    axis=0,
+                )
+                sweep_cols = chunk_cols + start
+                # Liquidated balance is the balance plus the unrealized pnl at the
+                # close price, or at the liquidation price if it's intrabar, or at
+                # the open price if the bar gaps past the liquidation price
+                exit_price = (
+                    np.minimum(
+                        open_price[liquidation_bar],
+                        segment_liquidation_price[segment, chunk_cols],
+                    )
+                    if self._intrabar_liquidation
+                    else close[liquidation_bar]
+                )
+                chunk_final_balance[chunk_cols] += (
+                    exit_price - entry_price[sweep_cols]
+                ) * quantity[sweep_cols]
+                liquidation_ts[sweep_cols] = (
+                    bar_ts[liquidation_bar] + liquidation_ts_offset
+                )
+            final_balance[cols] = chunk_final_balance
+
+        parameter_sweep = ParameterSweep(
+            balance=balance,
+            leverage=leverage,
+            entry_price=entry_price,
+            final_balance=final_balance,
+            liquidation_ts=liquidation_ts,
+            funding_paid=funding_paid,
+        )
+        self.logger.info(
+            "Liquidated %s of %s configurations",
+            int(parameter_sweep.is_liquidated().sum()),
+            n_configs,
+        )
+        return parameter_sweep
+
+    def _make_position(
+        self, symbol: str, balance: float, leverage: float, entry_price: float
+    ) -> Position:
+        """Make the long position of a configuration as main does and update
+        its maintenance margin."""
+        position_notional = balance * leverage
+        quantity = position_notional / entry_price
+        trade = Trade(
+            ts=0,
+            symbol=symbol,
+            type=Trade.BUY,
+            quantity=quantity,
+            price=entry_price,
+            fee=position_notional * BINANCE_FUTURES_TAKER_FEE_PCT,
+        )
+        position = Position.from_trade(trade)
+        return (
+            self._update_position_maintenance_margin_use_case.update_maintenance_margin(
+                position
+            )
+        )
@@ -1,19 +1,34 @@
 import logging
 from datetime import datetime
-from time import time
-from typing import Iterator, Optional
+from time import perf_counter_ns, time
+from typing import List, Optional
+
+import numpy as np
 
 from perp_simulation.constant import (
     BINANCE_FUTURES_BTC_FUNDING_RATE_FREQ,
-    Symbol,
     Timeframe,
 )
 from perp_simulation.entity.account import Account
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
+from perp_simulation.entity.position import Position
 from perp_simulation.entity.funding_rate import FundingRate
+from perp_simulation.entity.market_timeline import MarketTimeline
 from perp_simulation.entity.ohlcv import OHLCV
 from perp_simulation.entity.simulation import Simulation
+from perp_simulation.entity.simulation_profile import SimulationProfile
 from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.mark_price_repository import MarkPriceRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.multi_resolution_timeline_repository import (
+    FineTimelineLoader,
+    MultiResolutionTimelineRepository,
+)
 from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.simulation_writer import SimulationWriter
+from perp_simulation.trace import Tracer
 from perp_simulation.use_case.liquidate_positions import LiquidatePositions
 from perp_simulation.use_case.make_account_snapshot import MakeAccountSnapshot
 from perp_simulation.use_case.open_cross_margin_position import OpenCrossMarginPosition
@@ -30,6 +45,7 @@ from perp_simulation.use_case.update_position_liquidation_price import (
 from perp_simulation.use_case.update_position_maintenance_margin import (
     UpdatePositionMaintenanceMargin,
 )
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
 from perp_simulation.use_case.update_position_unrealized_pnl import (
     UpdatePositionUnrealizedPnl,
 )
@@ -41,14 +57,19 @@ class RunSimulation:
     - Actor: User
     - Scenario:
         1. User provides the start and end time of the simulation and an account.
-        2. The system retrieves the data from the repository.
+        2. The system retrieves the data from the repository aligned to the bars.
         3. For each bar of data, the system simulates:
-            3.1. Updates account info including positions.
-            3.2. Settles funding rate fees.
-            3.3. Liquidates positions.
-            3.4. Opens positions.
-            3.5. Takes a snapshot of the account.
-        4. Adds the snapshot to the simulation.
+            3.1. If a position is close to liquidation, simulates the 1m bars
+                of the bar instead.
+            3.2. Updates account info including positions.
+            3.3. Settles funding rate fees.
+            3.4. Liquidates positions.
+            3.5. Opens positions.
+            3.6. Records a snapshot of the account, or writes it to the sink of
+                the simulation result if any.
+            3.7. If the account is left flat, records the snapshots of the
+                rest of the bars at once and stops.
+        4. Adds the snapshots to the simulation.
         5. The system returns the simulation.
     """
 
@@ -65,10 +86,31 @@ class RunSimulation:
         update_position_liquidation_price_use_case: UpdatePositionLiquidationPrice,
         liquidate_position_use_case: LiquidatePositions,
         make_account_snapshot_use_case: MakeAccountSnapshot,
+        update_position_risk_use_case: Optional[UpdatePositionRisk] = None,
+        tracer: Optional[Tracer] = None,
+        profile: bool = False,
+        fast_forward: bool = True,
+        intrabar_liquidation: bool = False,
+        drill_down_distance: Optional[float] = None,
+        mark_price_repository: Optional[MarkPriceRepository] = None,
     ) -> None:
+        if drill_down_distance is not None and mark_price_repository is not None:
+            # The fine bars of the drill down have no mark price
+            raise ValueError(
+                "The drill down doesn't support the mark price, "
+                "set either drill_down_distance or mark_price_repository."
+            )
         self.logger = logging.getLogger(__name__)
         self._ohlcv_repository = ohlcv_repository
         self._funding_rate_repository = funding_rate_repository
+        # If given, the positions are updated and liquidated with the mark price
+        self._mark_price_repository = mark_price_repository
+        self._market_timeline_repository = MarketTimelineRepository(
+            ohlcv_repository, funding_rate_repository, mark_price_repository
+        )
+        self._multi_resolution_timeline_repository = MultiResolutionTimelineRepository(
+            ohlcv_repository, funding_rate_repository
+        )
         self._open_cross_margin_position_use_case = open_cross_margin_position_use_case
         self._settle_funding_rate_costs_use_case = settle_funding_rate_costs_use_case
         self._update_position_unrealized_pnl_use_case = (
@@ -88,14 +130,29 @@ class RunSimulation:
         )
         self._liquidate_position_use_case = liquidate_position_use_case
         self._make_account_snapshot_use_case = make_account_snapshot_use_case
+        # If given, it replaces the five position update use cases in every step
+        self._update_position_risk_use_case = update_position_risk_use_case
+        # Per bar trace, disabled unless its logger is enabled for DEBUG
+        self._tracer = tracer or Tracer()
+        # If True, the time spent in every phase is added to the simulations
+        self._profile = profile
+        # If True, the bars after the account is left flat are not stepped
+        self._fast_forward = fast_forward
+        # If True, the positions are liquidated with the low and high of the bars
+        self._intrabar_liquidation = intrabar_liquidation
+        # If given, the bars are resampled from the 1m bars, and the 1m bars are
+        # stepped instead where the prices get within this relative distance of
+        # the liquidation price of a position
+        self._drill_down_distance = drill_down_distance
 
     def run(
         self,
         start_time: datetime,
-        end_time: datetime,  # TODO: remove
+        end_time: datetime,
         timeframe: str,
         symbol: str,
         account: Account,
+        writer: Optional[SimulationWriter] = None,
     ) -> Simulation:
         """Run a simulation over historical data.
 
@@ -108,6 +165,8 @@ class RunSimulation:
             timeframe (str): The timeframe of the data.
             symbol (str): The symbol of the data.
             account (Account): The account to simulate.
+            writer (SimulationWriter): If given, the snapshots are written to it
+                instead of being added to the simulation.
         Returns:
             Simulation: The simulation.
         """
@@ -120,18 +179,30 @@ class RunSimulation:
             account,
         )
 
-        self.logger.info("Retrieving historical OHLCV data")
-        ohlcv_iterator = self._ohlcv_repository.get_historical_data(
-            symbol,
-            start_time,
-            timeframe,
-        )
-        self.logger.info("Retrieving historical funding rate data")
-        funding_rate_iterator = self._funding_rate_repository.get_historical_data(
-            symbol,
-            start_time,
-            timeframe,
-        )
+        profile = SimulationProfile() if self._profile else None
+
+        self.logger.info("Retrieving historical market timeline")
+        if profile is not None:
+            start_ns = perf_counter_ns()
+        fine_timeline_loader = None
+        if self._drill_down_distance is None:
+            market_timeline = self._market_timeline_repository.get_historical_timeline(
+                symbol,
+                start_time,
+                timeframe,
+                end_time,
+            )
+        else:
+            market_timeline, fine_timeline_loader = (
+                self._multi_resolution_timeline_repository.get_historical_timelines(
+                    symbol,
+                    start_time,
+                    timeframe,
+                    end_time,
+                )
+            )
+        if profile is not None:
+            profile.phase(SimulationProfile.LOAD).add(perf_counter_ns() - start_ns)
 
         self.logger.info("Simulating")
         simulation = self.simulate(
@@ -140,8 +211,10 @@ class RunSimulation:
             timeframe,
             symbol,
             account,
-            ohlcv_iterator,
-            funding_rate_iterator,
+            market_timeline,
+            profile,
+            writer,
+            fine_timeline_loader,
         )
         self.logger.info("Running simulation completed")
         return simulation
@@ -153,17 +226,52 @@ class RunSimulation:
         timeframe: str,
         symbol: str,
         account: Account,
-        ohlcv_iterator: Iterator,
-        funding_rate_iterator: Iterator,
+        market_timeline: MarketTimeline,
+        profile: Optional[SimulationProfile] = None,
+        writer: Optional[SimulationWriter] = None,
+        fine_timeline_loader: Optional[FineTimelineLoader] = None,
     ) -> Simulation:
         """Simulate the account over the historical data.
 
-        Use OHLCV iterator (and it's ts) to iterate over the historical data in
-        the main loop and simulate the account.
-        The funding rate iterator is handled manually because it's not guaranteed
-        to have the same length as the OHLCV iterator.
-
-        The data is assumed to be in the same timeframe and covering the same period.
+        Iterate over the bars of the market timeline in the main loop and
+        simulate the account. The funding rates are already aligned to the
+        bars, so every bar comes with its settlement, if any.
+
+        The bars are traced by the tracer instead of the logger, so the per
+        bar path doesn't format anything unless the trace is enabled.
+
+        If the use case is profiled, the time spent in every phase of the
+        steps is measured with perf_counter_ns and added to the profile of the
+        simulation. Otherwise, the phases are not timed at all.
+
+        If a writer is given, the snapshots are written to it as they are
+        made, between a header and a footer with the simulation metadata,
+        and the simulation has no snapshots. So the memory used doesn't grow
+        with the number of bars.
+
+        If the market timeline has mark prices, the positions are updated and
+        liquidated with the mark price of the bars instead of the close, as
+        in the exchange, and with the close where the mark price is missing.
+
+        If the liquidation is intrabar, a long position is liquidated when the
+        low of the bar reaches its liquidation price and a short one when the
+        high does, instead of the close, and it's closed at its liquidation
+        price or at the open of the bar if the bar gaps past it. The low and
+        high of the mark price bars are used where they are available.
+
+        If a loader of the fine bars is given and the drill down distance is
+        set, the bars whose low (long) or high (short) gets within that
+        relative distance of the liquidation price of a position are stepped
+        on their fine bars, with a snapshot per fine bar, so the liquidation
+        is found at the fine resolution while the rest of the bars are
+        stepped on the coarse one. The funding rates only move the
+        liquidation price at their settlements, so the distance has to cover
+        those moves within a bar.
+
+        Once the account is flat, without positions and no signal to open
+        them, nothing can change until the end of the simulation. So the
+        snapshots of the remaining bars are recorded as a single segment of
+        the same account instead of stepping every bar.
 
         Args:
             start_time (datetime): The start time of the simulation.
@@ -171,8 +279,12 @@ class RunSimulation:
             timeframe (str): The timeframe of the data.
             symbol (str): The symbol of the data.
             account (Account): The account to simulate.
-            ohlcv_iterator (Iterator): The OHLCV data iterator.
-            funding_rate_iterator (Iterator): The funding rate data iterator.
+            market_timeline (MarketTimeline): The market data aligned to the bars.
+            profile (SimulationProfile): The profile to add the timings to, if
+                the use case is profiled. A new one by default.
+            writer (SimulationWriter): The sink of the snapshots, if any.
+            fine_timeline_loader (FineTimelineLoader): The loader of the fine
+                bars of the bars, if any.
         Returns:
             Simulation: The simulation result.
         """
@@ -199,62 +311,262 @@ class RunSimulation:
             timeframe=timeframe,
             symbol=symbol,
             run_start_ts=run_start_ts,
+            account_snapshots=AccountSnapshotStore() if writer is None else None,
         )
+        if self._profile:
+            simulation.profile = profile or SimulationProfile()
+        profile = simulation.profile
+        is_profiled = profile is not None
+        if writer is not None:
+            writer.write_header(simulation)
 
         # Simulation
         self.logger.debug("Simulating account %s", account)
         timeframe_seconds = Timeframe.to_seconds(timeframe)
-        funding_rate = next(funding_rate_iterator)
-        for ohlcv in ohlcv_iterator:
-            # TODO: downsample iterator of OHLCV to avoid this.
-            #   Simulation should not be aware of matching the datapoints
-            # Simulate the step with funding rate if it matches the OHLCV timestamp
-            step_funding_rate = None
-            if funding_rate.ts == ohlcv.ts:
-                step_funding_rate = funding_rate
+        tracer = self._tracer
+        is_tracing = tracer.start()
+        sample_every = tracer.sample_every
+        ohlcv = None
+        mark_prices = None
+        if market_timeline.mark_price is not None:
+            mark_prices = market_timeline.get_mark_prices().tolist()
+        low_prices = high_prices = None
+        if self._intrabar_liquidation:
+            low_prices, high_prices = (
+                prices.tolist() for prices in market_timeline.get_liquidation_prices()
+            )
+        is_drilling_down = (
+            fine_timeline_loader is not None and self._drill_down_distance is not None
+        )
+        if is_drilling_down:
+            coarse_low_prices, coarse_high_prices = (
+                prices.tolist() for prices in market_timeline.get_liquidation_prices()
+            )
+        fast_forward_index = None
+        updated_account = account
+        if is_profiled:
+            snapshot_phase = profile.phase(SimulationProfile.SNAPSHOT)
+            simulate_start_ns = perf_counter_ns()
+        for bar_index, (ohlcv, funding_rate) in enumerate(market_timeline):
+            is_traced = is_tracing and bar_index % sample_every == 0
+            if is_drilling_down and self._is_near_liquidation(
+                updated_account,
+                coarse_low_prices[bar_index],
+                coarse_high_prices[bar_index],
+            ):
+                if is_profiled:
+                    start_ns = perf_counter_ns()
+                fine_timeline = fine_timeline_loader.load_bar(bar_index)
+                if is_profiled:
+                    profile.phase(SimulationProfile.LOAD).add(
+                        perf_counter_ns() - start_ns
+                    )
+                if is_traced:
+                    tracer.trace(
+                        "drill_down",
+                        ts=ohlcv.ts,
+                        bars=len(fine_timeline),
+                        account=updated_account,
+                    )
+                updated_account = self._simulate_fine_bars(
+                    updated_account,
+                    fine_timeline,
+                    fine_timeline_loader.timeframe,
+                    simulation,
+                    profile,
+                    writer,
+                )
+                if self._fast_forward and self._is_flat(updated_account):
+                    fast_forward_index = bar_index + 1
+                    break
+                continue
 
             # Simulate the step
-            updated_account = self.simulate_step(account, ohlcv, step_funding_rate)
-            self.logger.debug("Taking account snapshot for account %s", updated_account)
+            updated_account = self.simulate_step(
+                updated_account,
+                ohlcv,
+                funding_rate,
+                is_traced,
+                profile,
+                low_prices[bar_index] if low_prices is not None else None,
+                high_prices[bar_index] if high_prices is not None else None,
+                mark_prices[bar_index] if mark_prices is not None else None,
+            )
 
             # The account snapshot is taken after simulating the step, having the
             # data at the end of the step and so the timestamp should be the one
             # at the end of the step, i.e., the next timestamp
             account_snapshot_ts = ohlcv.ts + timeframe_seconds
-            account_snapshot = self._make_account_snapshot_use_case.make(
-                updated_account, account_snapshot_ts
-            )
-            simulation.add_account_snapshot(account_snapshot)
-
-            # Get the next funding rate
-            try:
-                funding_rate = next(funding_rate_iterator)
-            except StopIteration:
-                self.logger.warning(
-                    "No more funding rates, using the last one: %s", funding_rate
+            if is_traced:
+                tracer.trace(
+                    "snapshot", ts=account_snapshot_ts, account=updated_account
+                )
+            if is_profiled:
+                start_ns = perf_counter_ns()
+            if writer is None:
+                self._make_account_snapshot_use_case.record(
+                    updated_account, account_snapshot_ts, simulation.account_snapshots
                 )
+            else:
+                writer.write_snapshot(updated_account, account_snapshot_ts)
+            if is_profiled:
+                snapshot_phase.add(perf_counter_ns() - start_ns)
+
+            if self._fast_forward and self._is_flat(updated_account):
+                fast_forward_index = bar_index + 1
+                break
+
+        if fast_forward_index is not None and fast_forward_index < len(market_timeline):
+            # The snapshots of the rest of the bars are the same account
+            self._fast_forward_snapshots(
+                updated_account,
+                market_timeline.ts[fast_forward_index:] + timeframe_seconds,
+                simulation,
+                profile,
+                writer,
+            )
+        if is_profiled:
+            profile.phase(SimulationProfile.SIMULATE).add(
+                perf_counter_ns() - simulate_start_ns
+            )
 
-        # Log the last datapoints to be able to check divergence in timestamps
         self.logger.debug(
-            "Last datapoints: OHLCV=%s, funding rate=%s", ohlcv, funding_rate
+            "Last datapoint: OHLCV=%s, settled %s funding rates",
+            ohlcv,
+            len(market_timeline.funding_rate_ts),
         )
 
-        self.logger.debug(
-            "Made %s account snapshots", len(simulation.account_snapshots)
-        )
+        if writer is None:
+            self.logger.debug(
+                "Made %s account snapshots", len(simulation.account_snapshots)
+            )
 
         run_end_ts = int(time())
         simulation.run_end_ts = run_end_ts
         self.logger.info(
             "Simulation completed in %s seconds", run_end_ts - run_start_ts
         )
+        if is_profiled:
+            self.logger.info(
+                "Simulated %s bars at %.0f bars/s, fast-forwarded %s bars",
+                profile.bars,
+                profile.bars_per_second,
+                profile.fast_forwarded_bars,
+            )
+        if writer is not None:
+            writer.write_footer(simulation)
         return simulation
 
+    def _simulate_fine_bars(
+        self,
+        account: Account,
+        fine_timeline: MarketTimeline,
+        fine_timeframe: str,
+        simulation: Simulation,
+        profile: Optional[SimulationProfile] = None,
+        writer: Optional[SimulationWriter] = None,
+    ) -> Account:
+        """Simulate the fine bars of a bar, recording a snapshot per fine bar.
+
+        If the account is left flat, the snapshots of the rest of the fine
+        bars are recorded at once as in the main loop.
+
+        Args:
+            account (Account): The account to simulate.
+            fine_timeline (MarketTimeline): The fine bars of the bar.
+            fine_timeframe (str): The timeframe of the fine bars.
+            simulation (Simulation): The simulation to record the snapshots in.
+            profile (SimulationProfile): If given, the phases are timed into it.
+            writer (SimulationWriter): The sink of the snapshots, if any.
+        Returns:
+            Account: The updated account.
+        """
+        is_profiled = profile is not None
+        timeframe_seconds = Timeframe.to_seconds(fine_timeframe)
+        low_prices: Optional[List[float]] = None
+        high_prices: Optional[List[float]] = None
+        if self._intrabar_liquidation:
+            low_prices, high_prices = (
+                prices.tolist() for prices in fine_timeline.get_liquidation_prices()
+            )
+        updated_account = account
+        for bar_index, (ohlcv, funding_rate) in enumerate(fine_timeline):
+            updated_account = self.simulate_step(
+                updated_account,
+                ohlcv,
+                funding_rate,
+                False,
+                profile,
+                low_prices[bar_index] if low_prices is not None else None,
+                high_prices[bar_index] if high_prices is not None else None,
+            )
+            account_snapshot_ts = ohlcv.ts + timeframe_seconds
+            if is_profiled:
+                start_ns = perf_counter_ns()
+            if writer is None:
+                self._make_account_snapshot_use_case.record(
+                    updated_account, account_snapshot_ts, simulation.account_snapshots
+                )
+            else:
+                writer.write_snapshot(updated_account, account_snapshot_ts)
+            if is_profiled:
+                profile.phase(SimulationProfile.SNAPSHOT).add(
+                    perf_counter_ns() - start_ns
+                )
+
+            if self._fast_forward and self._is_flat(updated_account):
+                if bar_index + 1 < len(fine_timeline):
+                    self._fast_forward_snapshots(
+                        updated_account,
+                        fine_timeline.ts[bar_index + 1 :] + timeframe_seconds,
+                        simulation,
+                        profile,
+                        writer,
+                    )
+                break
+        return updated_account
+
+    def _fast_forward_snapshots(
+        self,
+        account: Account,
+        account_snapshot_ts: np.ndarray,
+        simulation: Simulation,
+        profile: Optional[SimulationProfile] = None,
+        writer: Optional[SimulationWriter] = None,
+    ) -> None:
+        """Record the snapshots of a flat account at many ts at once."""
+        self.logger.debug(
+            "Account flat, fast-forwarding %s bars", len(account_snapshot_ts)
+        )
+        if self._tracer.enabled:
+            self._tracer.trace(
+                "fast_forward",
+                ts=account_snapshot_ts[0].item(),
+                bars=len(account_snapshot_ts),
+                account=account,
+            )
+        if profile is not None:
+            profile.fast_forwarded_bars += len(account_snapshot_ts)
+            start_ns = perf_counter_ns()
+        if writer is None:
+            self._make_account_snapshot_use_case.record_flat(
+                account, account_snapshot_ts, simulation.account_snapshots
+            )
+        else:
+            writer.write_flat_snapshots(account, account_snapshot_ts)
+        if profile is not None:
+            profile.phase(SimulationProfile.SNAPSHOT).add(perf_counter_ns() - start_ns)
+
     def simulate_step(
         self,
         account: Account,
         ohlcv: OHLCV,
         funding_rate: Optional[FundingRate],
+        is_traced: bool = False,
+        profile: Optional[SimulationProfile] = None,
+        low_price: Optional[float] = None,
+        high_price: Optional[float] = None,
+        mark_price: Optional[float] = None,
     ) -> Account:
         """Simulate a step for the account.
 
@@ -265,92 +577,144 @@ class RunSimulation:
             account (Account): The account to simulate.
             ohlcv (OHLCV): The OHLCV data.
             funding_rate (FundingRate): The funding rate data.
+            is_traced (bool): If True, the step is traced.
+            profile (SimulationProfile): If given, the step is counted and its
+                phases are timed into it.
+            low_price (float): If given, the price to liquidate long positions inside the bar.
+            high_price (float): If given, the price to liquidate short positions inside the bar.
+            mark_price (float): If given, the price to update and liquidate the
+                positions instead of the close.
         Returns:
             Account: The updated account.
         """
-        self.logger.debug(
-            "Simulating step for account %s with OHLCV %s and funding rate %s",
-            account,
-            ohlcv,
-            funding_rate,
-        )
+        tracer = self._tracer
+        is_profiled = profile is not None
+        if is_profiled:
+            profile.bars += 1
+        if is_traced:
+            tracer.trace(
+                "step", account=account, ohlcv=ohlcv, funding_rate=funding_rate
+            )
         # Funding rate settlement is done at the beginning of the bar in the exchange
         updated_account = account
         if funding_rate is not None and funding_rate.rate is not None:
-            self.logger.debug("Settling funding rate fees to account")
+            if is_profiled:
+                start_ns = perf_counter_ns()
             updated_account = self._settle_funding_rate_costs_use_case.settle(
                 updated_account, funding_rate.rate
             )
-            self.logger.debug(
-                "Settled funding rate fees to account %s", updated_account
-            )
+            if is_profiled:
+                profile.phase(SimulationProfile.SETTLE).add(
+                    perf_counter_ns() - start_ns
+                )
+            if is_traced:
+                tracer.trace("settled", account=updated_account)
 
+        # The balance and the close price, or the mark price, are used to update the positions
         account_balance = account.balance
-        self.logger.debug("Using account balance %s to simulate step", account_balance)
-
-        market_price = ohlcv.close
-        self.logger.debug("Using close price %s to simulate step", market_price)
+        market_price = ohlcv.close if mark_price is None else mark_price
 
-        self.logger.debug("Updating account info including positions")
+        if is_profiled:
+            start_ns = perf_counter_ns()
         for position in updated_account.positions:
-            self.logger.debug("Updating position %s", position)
             updated_position = position
 
-            updated_position = (
-                self._update_position_unrealized_pnl_use_case.update_unrealized_pnl(
-                    updated_position, market_price
+            if self._update_position_risk_use_case is not None:
+                updated_position = self._update_position_risk_use_case.update_risk(
+                    updated_position, market_price, account_balance
                 )
-            )
-            updated_position = (
-                self._update_position_initial_margin_use_case.update_initial_margin(
+            else:
+                updated_position = (
+                    self._update_position_unrealized_pnl_use_case.update_unrealized_pnl(
+                        updated_position, market_price
+                    )
+                )
+                updated_position = (
+                    self._update_position_initial_margin_use_case.update_initial_margin(
+                        updated_position
+                    )
+                )
+                updated_position = self._update_position_maintenance_margin_use_case.update_maintenance_margin(
                     updated_position
                 )
-            )
-            updated_position = self._update_position_maintenance_margin_use_case.update_maintenance_margin(
-                updated_position
-            )
-            updated_position = self._update_position_effective_leverage_use_case.update_effective_leverage(
-                updated_position, account_balance
-            )
-            updated_position = self._update_position_liquidation_price_use_case.update_liquidation_price(
-                updated_position, account_balance
-            )
-            self.logger.debug("Updated position to %s", updated_position)
+                updated_position = self._update_position_effective_leverage_use_case.update_effective_leverage(
+                    updated_position, account_balance
+                )
+                updated_position = self._update_position_liquidation_price_use_case.update_liquidation_price(
+                    updated_position, account_balance
+                )
+            if is_traced:
+                tracer.trace(
+                    "position_updated",
+                    position=updated_position,
+                    balance=account_balance,
+                    price=market_price,
+                )
+        if is_profiled:
+            end_ns = perf_counter_ns()
+            profile.phase(SimulationProfile.UPDATE).add(end_ns - start_ns)
+            start_ns = end_ns
 
-        self.logger.debug("Liquidating positions")
         updated_account = self._liquidate_position_use_case.liquidate(
-            updated_account, market_price
+            updated_account, market_price, low_price, high_price, ohlcv.open
         )
-        self.logger.debug("Liquidated positions in account %s", updated_account)
+        if is_profiled:
+            end_ns = perf_counter_ns()
+            profile.phase(SimulationProfile.LIQUIDATE).add(end_ns - start_ns)
+            start_ns = end_ns
+        if is_traced:
+            tracer.trace("liquidated", account=updated_account)
 
-        self.logger.debug("Getting signal")
         signal = self._get_signal()
+        if is_profiled:
+            end_ns = perf_counter_ns()
+            profile.phase(SimulationProfile.SIGNAL).add(end_ns - start_ns)
+            start_ns = end_ns
 
         if signal != 0:
-            self.logger.debug("Opening positions")
             updated_account = self._open_cross_margin_position_use_case.open(
                 updated_account, ohlcv
             )
+            if is_profiled:
+                profile.phase(SimulationProfile.OPEN).add(perf_counter_ns() - start_ns)
+            if is_traced:
+                tracer.trace("opened", account=updated_account, signal=signal)
 
-        self.logger.debug("Simulating step completed")
         return updated_account
 
     def _create_simulation_name(self, start_time, end_time, timeframe, symbol):
         """Create a simulation name based on the simulation parameters."""
-        # TODO: add symbol and account name to the simulation name?
-        start_time_str = start_time.isoformat().replace(":", "-")
-        end_time_str = end_time.isoformat().replace(":", "-")
-        normalized_symbol = Symbol.normalize(symbol)
-        simulation_name = (
-            f"{start_time_str}_{end_time_str}_{timeframe}_{normalized_symbol}"
-        )
-
-        return simulation_name
+        return Simulation.create_name(start_time, end_time, timeframe, symbol)
 
     def _get_signal(self) -> int:
         """Temporary method to get a signal for opening positions. TODO: implement"""
         return 0
 
+    def _is_flat(self, account: Account) -> bool:
+        """Check if the account can't change anymore: it has no positions and
+        there is no signal to open positions."""
+        return not account.positions and self._get_signal() == 0
+
+    def _is_near_liquidation(
+        self, account: Account, low_price: float, high_price: float
+    ) -> bool:
+        """Check if the low (long) or high (short) price of a bar gets within
+        the drill down distance of the liquidation price of a position. A
+        position without liquidation price yet is taken as near."""
+        if not account.positions:
+            return False
+        distance = self._drill_down_distance
+        for position in account.positions:
+            liquidation_price = position.liquidation_price
+            if liquidation_price is None:
+                return True
+            if position.side == Position.LONG:
+                if low_price <= liquidation_price * (1.0 + distance):
+                    return True
+            elif high_price >= liquidation_price * (1.0 - distance):
+                return True
+        return False
+
     def _get_market_funding_rate_frequency(self) -> str:
         """Get the frequency of the market funding rate.
 
@@ -0,0 +1,200 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.market_timeline import MarketTimeline
+from perp_simulation.entity.simulation import Simulation
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.shared_market_data import (
+    SharedMarketData,
+    SharedMarketDataHandle,
+)
+from perp_simulation.use_case.run_simulation import RunSimulation
+
+# State of a worker process, set up once by its initializer
+_worker_run_simulation_use_case: Optional[RunSimulation] = None
+_worker_shared_market_data: Optional[SharedMarketData] = None
+_worker_market_timeline: Optional[MarketTimeline] = None
+
+
+def _init_worker(
+    run_simulation_factory: Callable[[], RunSimulation],
+    handle: SharedMarketDataHandle,
+) -> None:
+    """Build the simulation use case and attach to the market timeline of the
+    parent, already aligned to the bars, once for all the jobs."""
+    global _worker_run_simulation_use_case, _worker_shared_market_data, _worker_market_timeline  # pylint: disable=global-statement
+    _worker_run_simulation_use_case = run_simulation_factory()
+    _worker_shared_market_data = SharedMarketData.attach(handle)
+    _worker_market_timeline = _worker_shared_market_data.get_market_timeline()
+
+
+def _simulate_job(
+    start_time: datetime,
+    end_time: datetime,
+    timeframe: str,
+    symbol: str,
+    account: Account,
+) -> Simulation:
+    """Simulate an account over the market data of the worker."""
+    return _worker_run_simulation_use_case.simulate(
+        start_time,
+        end_time,
+        timeframe,
+        symbol,
+        account,
+        _worker_market_timeline,
+    )
+
+
+class RunSimulationPool:
+    """Run simulations of many accounts over the same historical data on a
+    pool of processes.
+
+    The data is loaded once by this process and shared with the workers
+    through memory-mapped files. Every worker runs RunSimulation.simulate,
+    so any signal of RunSimulation is supported.
+
+    - Actor: User
+    - Scenario:
+        1. User provides the start and end time of the simulation and the accounts.
+        2. The system retrieves the data from the repositories once, aligned to the bars.
+        3. The system shares the data with the worker processes.
+        4. The system submits a simulation job per account, with a bounded number in flight.
+        5. The system collects the simulation of every job.
+        6. The system returns the simulations in the order of the accounts.
+    """
+
+    def __init__(
+        self,
+        ohlcv_repository: OHLCVRepository,
+        funding_rate_repository: FundingRateRepository,
+        run_simulation_factory: Callable[[], RunSimulation],
+        max_workers: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._ohlcv_repository = ohlcv_repository
+        self._funding_rate_repository = funding_rate_repository
+        self._market_timeline_repository = MarketTimelineRepository(
+            ohlcv_repository, funding_rate_repository
+        )
+        # Picklable callable that builds the RunSimulation of every worker
+        self._run_simulation_factory = run_simulation_factory
+        self._max_workers = max_workers or os.cpu_count() or 1
+        # Jobs submitted and not collected, it bounds the memory of the pending results
+        self._max_in_flight = max_in_flight or 2 * self._max_workers
+
+    def run(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        timeframe: str,
+        symbol: str,
+        accounts: List[Account],
+    ) -> List[Simulation]:
+        """Run a simulation of every account over historical data.
+
+        Args:
+            start_time (datetime): The start time of the simulation.
+            end_time (datetime): The end time of the simulation.
+            timeframe (str): The timeframe of the data.
+            symbol (str): The symbol of the data.
+            accounts (List[Account]): The accounts to simulate.
+        Returns:
+            List[Simulation]: The simulation of every account.
+        """
+        self.logger.info(
+            "Running %s simulations from %s to %s with timeframe %s and symbol %s",
+            len(accounts),
+            start_time,
+            end_time,
+            timeframe,
+            symbol,
+        )
+        # The alignment is checked here, before starting the workers
+        self.logger.info("Retrieving historical market timeline")
+        market_timeline = self._market_timeline_repository.get_historical_timeline(
+            symbol, start_time, timeframe, end_time
+        )
+
+        simulations: List[Optional[Simulation]] = [None] * len(accounts)
+        with SharedMarketData.create(market_timeline) as shared_market_data:
+            for job_id, simulation in self.simulate_as_completed(
+                start_time,
+                end_time,
+                timeframe,
+                symbol,
+                accounts,
+                shared_market_data.handle,
+            ):
+                simulations[job_id] = simulation
+        self.logger.info("Running simulations completed")
+        return simulations
+
+    def simulate_as_completed(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        timeframe: str,
+        symbol: str,
+        accounts: List[Account],
+        handle: SharedMarketDataHandle,
+    ) -> Iterator[Tuple[int, Simulation]]:
+        """Simulate every account over shared market data on the pool.
+
+        Args:
+            start_time (datetime): The start time of the simulation.
+            end_time (datetime): The end time of the simulation.
+            timeframe (str): The timeframe of the data.
+            symbol (str): The symbol of the data.
+            accounts (List[Account]): The accounts to simulate.
+            handle (SharedMarketDataHandle): The handle of the shared market data.
+        Returns:
+            Iterator[Tuple[int, Simulation]]: The index of the account and its
+                simulation, in the order the jobs are completed.
+        """
+        self.logger.info(
+            "Simulating %s accounts with %s workers and up to %s jobs in flight",
+            len(accounts),
+            self._max_workers,
+            self._max_in_flight,
+        )
+        jobs = iter(enumerate(accounts))
+        with ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            initializer=_init_worker,
+            initargs=(self._run_simulation_factory, handle),
+        ) as executor:
+            in_flight: Dict[Future, int] = {}
+
+            def submit_next() -> None:
+                job = next(jobs, None)
+                if job is not None:
+                    job_id, account = job
+                    future = executor.submit(
+                        _simulate_job, start_time, end_time, timeframe, symbol, account
+                    )
+                    in_flight[future] = job_id
+
+            for _ in range(self._max_in_flight):
+                submit_next()
+            try:
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = in_flight.pop(future)
+                        simulation = future.result()
+                        self.logger.debug("Job %s completed", job_id)
+                        submit_next()
+                        yield job_id, simulation
+            finally:
+                for future in in_flight:
+                    future.cancel()
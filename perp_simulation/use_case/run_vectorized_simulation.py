@@ -0,0 +1,403 @@
+import logging
+from copy import deepcopy
+from datetime import datetime
+from functools import partial
+from time import time
+from typing import List
+
+import numpy as np
+
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
+from perp_simulation.entity.equity_curve import EquityCurve
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.entity.position import Position
+from perp_simulation.entity.simulation import Simulation
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.historical_feather_repository import load_concurrently
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.use_case.update_position_initial_margin import (
+    UpdatePositionInitialMargin,
+)
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from perp_simulation.use_case.update_position_unrealized_pnl import (
+    UpdatePositionUnrealizedPnl,
+)
+
+
+class RunVectorizedSimulation:
+    """Run a simulation over historical data for a static book of positions
+    using array operations instead of a per bar loop.
+
+    While no positions are opened, the position metrics and the balance are
+    closed-form functions of the close prices and the funding rate settlements.
+    The result is the same as the one of RunSimulation when its signal is 0.
+
+    - Actor: User
+    - Scenario:
+        1. User provides the start and end time of the simulation and an account.
+        2. The system retrieves the data from the repositories.
+        3. The system settles the funding rate fees with a cumulative sum.
+        4. The system finds the first bar where a position is liquidated.
+        5. The system calculates the position metrics for every bar until that bar.
+        6. The system liquidates the positions and repeats from step 3 with the rest.
+        7. The system returns the simulation.
+    - Preconditions:
+        - No positions are opened during the simulation.
+    """
+
+    def __init__(
+        self,
+        ohlcv_repository: OHLCVRepository,
+        funding_rate_repository: FundingRateRepository,
+        update_position_unrealized_pnl_use_case: UpdatePositionUnrealizedPnl,
+        update_position_initial_margin_use_case: UpdatePositionInitialMargin,
+        update_position_maintenance_margin_use_case: UpdatePositionMaintenanceMargin,
+        update_position_liquidation_price_use_case: UpdatePositionLiquidationPrice,
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._ohlcv_repository = ohlcv_repository
+        self._funding_rate_repository = funding_rate_repository
+        self._update_position_unrealized_pnl_use_case = (
+            update_position_unrealized_pnl_use_case
+        )
+        self._update_position_initial_margin_use_case = (
+            update_position_initial_margin_use_case
+        )
+        self._update_position_maintenance_margin_use_case = (
+            update_position_maintenance_margin_use_case
+        )
+        self._update_position_liquidation_price_use_case = (
+            update_position_liquidation_price_use_case
+        )
+
+    def run(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        timeframe: str,
+        symbol: str,
+        account: Account,
+    ) -> Simulation:
+        """Run a simulation over historical data.
+
+        Load historical data from the repositories as arrays and runs the simulation.
+
+        Args:
+            start_time (datetime): The start time of the simulation.
+            end_time (datetime): The end time of the simulation.
+            timeframe (str): The timeframe of the data.
+            symbol (str): The symbol of the data.
+            account (Account): The account to simulate.
+        Returns:
+            Simulation: The simulation.
+        """
+        self.logger.info(
+            "Running vectorized simulation from %s to %s with timeframe %s and symbol %s",
+            start_time,
+            end_time,
+            timeframe,
+            symbol,
+        )
+        self.logger.info("Retrieving historical OHLCV and funding rate data")
+        ohlcv_series, funding_rate_df = load_concurrently(
+            partial(
+                self._ohlcv_repository.get_historical_series,
+                symbol,
+                start_time,
+                timeframe,
+                end_time,
+            ),
+            partial(
+                self._funding_rate_repository.get_historical_dataframe,
+                symbol,
+                start_time,
+                timeframe,
+                end_time,
+            ),
+        )
+        funding_rate_ts = DataProcessingService.index_to_ts(funding_rate_df)
+        funding_rate = funding_rate_df["funding_rate"].to_numpy(dtype=np.float64)
+
+        self.logger.info("Simulating")
+        simulation = self.simulate(
+            start_time,
+            end_time,
+            timeframe,
+            symbol,
+            account,
+            ohlcv_series,
+            funding_rate_ts,
+            funding_rate,
+        )
+        self.logger.info("Running vectorized simulation completed")
+        return simulation
+
+    def simulate(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        timeframe: str,
+        symbol: str,
+        account: Account,
+        ohlcv_series: OHLCVSeries,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+    ) -> Simulation:
+        """Simulate the account over the historical data.
+
+        The account is not modified.
+
+        Args:
+            start_time (datetime): The start time of the simulation.
+            end_time (datetime): The end time of the simulation.
+            timeframe (str): The timeframe of the data.
+            symbol (str): The symbol of the data.
+            account (Account): The account to simulate.
+            ohlcv_series (OHLCVSeries): The OHLCV data.
+            funding_rate_ts (np.ndarray): The funding rate timestamps.
+            funding_rate (np.ndarray): The funding rates, NaN if there is no settlement.
+        Returns:
+            Simulation: The simulation result.
+        """
+        run_start_ts = int(time())
+        simulation = Simulation(
+            name=Simulation.create_name(start_time, end_time, timeframe, symbol),
+            simulation_start_ts=start_time.timestamp(),
+            simulation_end_ts=end_time.timestamp(),
+            timeframe=timeframe,
+            symbol=symbol,
+            run_start_ts=run_start_ts,
+        )
+
+        positions = self._prepare_positions(account)
+        equity_curve = self.compute_equity_curve(
+            account, ohlcv_series, funding_rate_ts, funding_rate, timeframe
+        )
+        simulation.account_snapshots = self._make_account_snapshot_store(
+            account, positions, equity_curve
+        )
+        self.logger.debug("Made %s account snapshots", len(equity_curve))
+
+        run_end_ts = int(time())
+        simulation.run_end_ts = run_end_ts
+        self.logger.info(
+            "Simulation completed in %s seconds", run_end_ts - run_start_ts
+        )
+        return simulation
+
+    def compute_equity_curve(
+        self,
+        account: Account,
+        ohlcv_series: OHLCVSeries,
+        funding_rate_ts: np.ndarray,
+        funding_rate: np.ndarray,
+        timeframe: str,
+    ) -> EquityCurve:
+        """Compute the balance and position metrics of the account for every bar.
+
+        The bars are split in segments ending at a liquidation. Within a segment the
+        book is static, so the funding rate fees are settled with a cumulative sum and
+        the liquidation bar is found comparing the close prices against the liquidation
+        prices of every bar at once. The liquidation bar itself is processed position
+        by position as LiquidatePositions does.
+
+        Args:
+            account (Account): The account to simulate.
+            ohlcv_series (OHLCVSeries): The OHLCV data.
+            funding_rate_ts (np.ndarray): The funding rate timestamps.
+            funding_rate (np.ndarray): The funding rates, NaN if there is no settlement.
+            timeframe (str): The timeframe of the data.
+        Returns:
+            EquityCurve: The progression of the account.
+        """
+        positions = self._prepare_positions(account)
+        n_bars = len(ohlcv_series)
+        n_positions = len(positions)
+        self.logger.debug(
+            "Computing equity curve for %s bars and %s positions", n_bars, n_positions
+        )
+
+        close = np.asarray(ohlcv_series.close, dtype=np.float64)
+        quantity = np.array([p.quantity for p in positions], dtype=np.float64)
+        entry_price = np.array([p.entry_price for p in positions], dtype=np.float64)
+        avg_price = np.array([p.avg_price for p in positions], dtype=np.float64)
+        maintenance_margin = np.array(
+            [p.maintenance_margin for p in positions], dtype=np.float64
+        )
+        notional_value = quantity * avg_price
+        side = np.array([self._get_side_sign(p) for p in positions], dtype=np.float64)
+
+        # A funding rate is settled at the open of the bar that contains it,
+        # adding up the rates of the same bar, as in the market timeline
+        funding_rate_index, _, settled_funding_rate = (
+            MarketTimelineRepository.align_funding_rates(
+                np.asarray(ohlcv_series.ts), timeframe, funding_rate_ts, funding_rate
+            )
+        )
+        self.logger.debug(
+            "Matched %s funding rate settlements with the bars", len(funding_rate_index)
+        )
+        # Long positions pay positive funding rates, short positions negative ones
+        funding_rate_costs = (
+            side[np.newaxis, :] * settled_funding_rate[:, np.newaxis]
+        ) * notional_value[np.newaxis, :]
+        funding_rate_count = np.searchsorted(
+            funding_rate_index, np.arange(n_bars), side="right"
+        )
+
+        balance = np.empty(n_bars, dtype=np.float64)
+        unrealized_pnl = np.full((n_bars, n_positions), np.nan)
+        effective_leverage = np.full((n_bars, n_positions), np.nan)
+        liquidation_price = np.full((n_bars, n_positions), np.nan)
+        liquidation_index = np.full(n_positions, -1, dtype=np.int64)
+        is_open = np.ones(n_positions, dtype=bool)
+
+        account_balance = float(account.balance)
+        start = 0
+        while start < n_bars:
+            cols = np.flatnonzero(is_open)
+
+            # Balance after settling the funding rate costs of the open positions
+            first_settlement = np.searchsorted(funding_rate_index, start, side="left")
+            segment_costs = funding_rate_costs[first_settlement:, cols]
+            balance_path = np.cumsum(
+                np.concatenate(([account_balance], -segment_costs.ravel()))
+            )
+            settlements = funding_rate_count[start:] - first_settlement
+            segment_balance = balance_path[settlements * len(cols)]
+
+            # Liquidation prices and first bar where the close price reaches them
+            segment_close = close[start:]
+            segment_liquidation_price = (
+                -(
+                    (segment_balance[:, np.newaxis] - maintenance_margin[cols])
+                    / quantity[cols]
+                )
+                + avg_price[cols]
+            )
+            crossed = segment_close[:, np.newaxis] <= segment_liquidation_price
+            liquidation_bars = np.flatnonzero(crossed.any(axis=1))
+            end = start + liquidation_bars[0] + 1 if liquidation_bars.size else n_bars
+            length = end - start
+
+            balance[start:end] = segment_balance[:length]
+            rows = slice(start, end)
+            unrealized_pnl[rows, cols] = (
+                segment_close[:length, np.newaxis] - entry_price[cols]
+            ) * quantity[cols]
+            effective_leverage[rows, cols] = (
+                notional_value[cols] / segment_balance[:length, np.newaxis]
+            )
+            liquidation_price[rows, cols] = segment_liquidation_price[:length]
+
+            if not liquidation_bars.size:
+                break
+
+            i = end - 1
+            account_balance = float(segment_balance[length - 1])
+            market_price = float(close[i])
+            self.logger.info("Liquidating positions at bar %s", i)
+            for col in cols:
+                position = self._update_position_liquidation_price_use_case.update_liquidation_price(
+                    positions[col], account_balance
+                )
+                liquidation_price[i, col] = position.liquidation_price
+                if market_price <= position.liquidation_price:
+                    position = self._update_position_unrealized_pnl_use_case.update_unrealized_pnl(
+                        position, market_price
+                    )
+                    account_balance += position.unrealized_pnl
+                    is_open[col] = False
+                    liquidation_index[col] = i
+                    unrealized_pnl[i, col] = np.nan
+                    effective_leverage[i, col] = np.nan
+                    liquidation_price[i, col] = np.nan
+            balance[i] = account_balance
+            start = end
+
+        equity_curve = EquityCurve(
+            ts=np.asarray(ohlcv_series.ts) + Timeframe.to_seconds(timeframe),
+            balance=balance,
+            unrealized_pnl=unrealized_pnl,
+            effective_leverage=effective_leverage,
+            liquidation_price=liquidation_price,
+            funding_rate_costs=funding_rate_costs,
+            funding_rate_count=funding_rate_count,
+            liquidation_index=liquidation_index,
+        )
+        return equity_curve
+
+    def _prepare_positions(self, account: Account) -> List[Position]:
+        """Copy the positions of the account and update their static metrics."""
+        positions = []
+        for position in account.positions or []:
+            updated_position = deepcopy(position)
+            updated_position = (
+                self._update_position_initial_margin_use_case.update_initial_margin(
+                    updated_position
+                )
+            )
+            updated_position = self._update_position_maintenance_margin_use_case.update_maintenance_margin(
+                updated_position
+            )
+            positions.append(updated_position)
+        return positions
+
+    def _get_side_sign(self, position: Position) -> float:
+        """Get the sign of the funding rate costs for the side of the position."""
+        if position.side == Position.LONG:
+            return 1.0
+        if position.side == Position.SHORT:
+            return -1.0
+        raise ValueError("Invalid position side")
+
+    def _make_account_snapshot_store(
+        self, account: Account, positions: List[Position], equity_curve: EquityCurve
+    ) -> AccountSnapshotStore:
+        """Make the account snapshots of every bar from the equity curve."""
+        is_open = equity_curve.is_open()
+        initial_funding_rate_costs = [
+            position.funding_rate_costs or [] for position in positions
+        ]
+        funding_rate_costs = [
+            costs + equity_curve.funding_rate_costs[:, col].tolist()
+            for col, costs in enumerate(initial_funding_rate_costs)
+        ]
+        funding_rate_costs_count = (
+            np.array(
+                [len(costs) for costs in initial_funding_rate_costs], dtype=np.int64
+            )
+            + equity_curve.funding_rate_count[:, np.newaxis]
+        )
+        has_no_costs = np.array(
+            [position.funding_rate_costs is None for position in positions], dtype=bool
+        )
+        funding_rate_costs_count[(funding_rate_costs_count == 0) & has_no_costs] = -1
+
+        account_snapshot_store = AccountSnapshotStore(capacity=len(equity_curve))
+        account_snapshot_store.extend(
+            ts=equity_curve.ts,
+            balance=equity_curve.balance,
+            has_positions=account.positions is not None,
+            positions=positions,
+            is_open=is_open,
+            position_columns={
+                "unrealized_pnl": equity_curve.unrealized_pnl,
+                "effective_leverage": equity_curve.effective_leverage,
+                "liquidation_price": equity_curve.liquidation_price,
+            },
+            funding_rate_costs=funding_rate_costs,
+            funding_rate_costs_count=funding_rate_costs_count,
+        )
+        return account_snapshot_store
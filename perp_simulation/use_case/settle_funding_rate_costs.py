@@ -29,32 +29,35 @@ class SettleFundingRateCosts:
         Returns:
             The updated account.
         """
+        # Called every settlement, so the level is checked once per call
+        is_debug = self.logger.isEnabledFor(logging.DEBUG)
         if account.positions is None:
-            self.logger.info("No positions to settle funding rate costs")
+            if is_debug:
+                self.logger.debug("No positions to settle funding rate costs")
             return account
 
-        self.logger.info(
-            "Settling funding rate %s for account: %s", funding_rate, account
-        )
+        if is_debug:
+            self.logger.debug(
+                "Settling funding rate %s for account: %s", funding_rate, account
+            )
         for position in account.positions:
             funding_rate_cost = self._calculate_funding_rate_cost(
-                position, funding_rate
-            )
-            self.logger.info(
-                "Adding funding rate cost %s to position %s",
-                funding_rate_cost,
-                position,
+                position, funding_rate, is_debug
             )
+            if is_debug:
+                self.logger.debug(
+                    "Adding funding rate cost %s to position %s",
+                    funding_rate_cost,
+                    position,
+                )
             position.add_funding_rate_cost(funding_rate_cost)
-            self.logger.info(
-                "Updating account balance with funding rate cost %s", funding_rate_cost
-            )
             account.update_balance(-funding_rate_cost)
-        self.logger.info("Account and positions updated with funding rate costs")
+        if is_debug:
+            self.logger.debug("Account and positions updated with funding rate costs")
         return account
 
     def _calculate_funding_rate_cost(
-        self, position: Position, funding_rate: float
+        self, position: Position, funding_rate: float, is_debug: bool = False
     ) -> float:
         """Calculate the funding rate cost for a position.
 
@@ -64,16 +67,17 @@ class SettleFundingRateCosts:
         Args:
             position: The position to calculate the funding rate cost.
             funding_rate: The funding rate to settle.
+            is_debug: Whether to log the calculation at DEBUG.
         Returns:
             The funding rate cost.
         """
-        self.logger.debug(
-            "Calculating funding rate cost for funding rate: %s; position: %s",
-            funding_rate,
-            position,
-        )
         position_notional_value = position.quantity * position.avg_price
-        self.logger.debug("Position notional value: %s", position_notional_value)
+        if is_debug:
+            self.logger.debug(
+                "Position notional value for funding rate %s: %s",
+                funding_rate,
+                position_notional_value,
+            )
         funding_rate_cost = 0.0
         if position.side == Position.LONG:
             funding_rate_cost = funding_rate * position_notional_value
@@ -81,5 +85,4 @@ class SettleFundingRateCosts:
             funding_rate_cost = -funding_rate * position_notional_value
         else:
             raise ValueError("Invalid position side")
-        self.logger.debug("Funding rate cost: %s", funding_rate_cost)
         return funding_rate_cost
@@ -27,11 +27,11 @@ class UpdatePositionEffectiveLeverage:
         Returns:
             The updated position with the effective leverage.
         """
-        self.logger.info("Getting effective leverage of position: %s", position)
+        self.logger.debug("Getting effective leverage of position: %s", position)
         position_notional_value = position.quantity * position.avg_price
         self.logger.debug("Position notional value: %s", position_notional_value)
         effective_leverage = position_notional_value / account_balance
         self.logger.debug("Effective leverage: %s", effective_leverage)
         position.effective_leverage = effective_leverage
-        self.logger.info("Position updated with effective leverage: %s", position)
+        self.logger.debug("Position updated with effective leverage: %s", position)
         return position
@@ -25,7 +25,7 @@ class UpdatePositionInitialMargin:
         Returns:
             The updated position with the initial margin.
         """
-        self.logger.info("Getting initial margin for position: %s", position)
+        self.logger.debug("Getting initial margin for position: %s", position)
         notional_value = position.quantity * position.avg_price
         self.logger.debug("Position notional value: %s", notional_value)
         leverage = self._get_market_leverage(position.symbol)
@@ -33,7 +33,7 @@ class UpdatePositionInitialMargin:
         initial_margin = notional_value / leverage
         self.logger.debug("Initial margin: %s", initial_margin)
         position.initial_margin = initial_margin
-        self.logger.info("Position updated with initial margin: %s", position)
+        self.logger.debug("Position updated with initial margin: %s", position)
         return position
 
     def _get_market_leverage(self, symbol: str) -> float:
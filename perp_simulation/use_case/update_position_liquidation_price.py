@@ -27,11 +27,11 @@ class UpdatePositionLiquidationPrice:
         Returns:
             The updated position with the liquidation price.
         """
-        self.logger.info("Getting liquidation price of position: %s", position)
+        self.logger.debug("Getting liquidation price of position: %s", position)
         liquidation_price = self._calculate_liquidation_price(position, account_balance)
         self.logger.debug("Liquidation price %s", liquidation_price)
         position.liquidation_price = liquidation_price
-        self.logger.info("Position updated with liquidation price: %s", position)
+        self.logger.debug("Position updated with liquidation price: %s", position)
         return position
 
     def _calculate_liquidation_price(
@@ -25,7 +25,7 @@ class UpdatePositionMaintenanceMargin:
         Returns:
             The updated position with the maintenance margin.
         """
-        self.logger.info("Getting maintenance margin for position: %s", position)
+        self.logger.debug("Getting maintenance margin for position: %s", position)
         position_notional_value = position.quantity * position.avg_price
         self.logger.debug("Position notional value: %s", position_notional_value)
         maintenance_margin_rate = self._get_market_maintenance_margin_rate(
@@ -35,7 +35,7 @@ class UpdatePositionMaintenanceMargin:
         maintenance_margin = position_notional_value * maintenance_margin_rate
         self.logger.debug("Maintenance margin: %s", maintenance_margin)
         position.maintenance_margin = maintenance_margin
-        self.logger.info("Position updated with maintenance margin: %s", position)
+        self.logger.debug("Position updated with maintenance margin: %s", position)
         return position
 
     def _get_market_maintenance_margin_rate(self, symbol: str) -> float:
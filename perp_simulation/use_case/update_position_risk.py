@@ -0,0 +1,106 @@
+import logging
+from typing import Dict, Tuple
+
+from perp_simulation.constant import (
+    BINANCE_FUTURES_BTC_LEVERAGE,
+    BINANCE_FUTURES_BTC_MAINTENANCE_MARGIN_RATE,
+    Symbol,
+)
+from perp_simulation.entity.position import Position
+
+
+class UpdatePositionRisk:
+    """Update the risk metrics of a position in a single pass.
+
+    It updates the unrealized PnL, the initial margin, the maintenance margin,
+    the effective leverage and the liquidation price with the same formulas
+    as their use cases, computing the notional value once and looking up the
+    market parameters once per symbol.
+
+    - Actor: User
+    - Scenario:
+        1. The system retrieves the market price and the account balance. For the moment, they are arguments.
+        2. The system retrieves the market leverage and maintenance margin rate. For the moment, they're fixed.
+        3. The system calculates the risk metrics of the position.
+        4. The system returns the updated position.
+    """
+
+    def __init__(self) -> None:
+        self.logger = logging.getLogger(__name__)
+        self._market_risk_parameters: Dict[str, Tuple[float, float]] = {}
+
+    def update_risk(
+        self, position: Position, market_price: float, account_balance: float
+    ) -> Position:
+        """Get the risk metrics of a position.
+
+        Args:
+            position: The position to get the risk metrics.
+            market_price: The market price to calculate the unrealized PnL.
+            account_balance: The account balance.
+        Returns:
+            The updated position with the risk metrics.
+        """
+        leverage, maintenance_margin_rate = self._get_market_risk_parameters(
+            position.symbol
+        )
+        quantity = position.quantity
+        avg_price = position.avg_price
+        notional_value = quantity * avg_price
+        maintenance_margin = notional_value * maintenance_margin_rate
+
+        position.unrealized_pnl = (market_price - position.entry_price) * quantity
+        position.initial_margin = notional_value / leverage
+        position.maintenance_margin = maintenance_margin
+        position.effective_leverage = notional_value / account_balance
+        position.liquidation_price = (
+            -((account_balance - maintenance_margin) / quantity) + avg_price
+        )
+        return position
+
+    def update_liquidation_price(
+        self, position: Position, account_balance: float
+    ) -> Position:
+        """Get the liquidation price of a position, keeping its other risk metrics.
+
+        It's the formula of UpdatePositionLiquidationPrice, with the
+        maintenance margin of the last update of the position.
+
+        Args:
+            position: The position to get the liquidation price.
+            account_balance: The account balance.
+        Returns:
+            The updated position with the liquidation price.
+        """
+        if position.maintenance_margin is None:
+            raise ValueError(
+                "Maintenance margin is None and it's needed to calculate the liquidation price"
+            )
+        position.liquidation_price = (
+            -((account_balance - position.maintenance_margin) / position.quantity)
+            + position.avg_price
+        )
+        return position
+
+    def _get_market_risk_parameters(self, symbol: str) -> Tuple[float, float]:
+        """Get the market leverage and maintenance margin rate for a symbol.
+
+        This is a temporal implementation. In a real system,
+        this should be fetched from a data repository.
+
+        Args:
+            symbol: The symbol to get the parameters.
+        Returns:
+            The leverage and the maintenance margin rate for the symbol.
+        """
+        parameters = self._market_risk_parameters.get(symbol)
+        if parameters is None:
+            self.logger.debug("Getting market risk parameters for symbol: %s", symbol)
+            if not symbol == Symbol.BTCUSD:
+                raise ValueError(f"Unknown symbol: {symbol}")
+            parameters = (
+                BINANCE_FUTURES_BTC_LEVERAGE,
+                BINANCE_FUTURES_BTC_MAINTENANCE_MARGIN_RATE,
+            )
+            self._market_risk_parameters[symbol] = parameters
+        return parameters
@@ -16,7 +16,9 @@ class UpdatePositionUnrealizedPnl:
     def __init__(self) -> None:
         self.logger = logging.getLogger(__name__)
 
-    def update_unrealized_pnl(self, position: Position, market_price: float) -> Position:
+    def update_unrealized_pnl(
+        self, position: Position, market_price: float
+    ) -> Position:
         """Get the unrealized PnL of a position.
 
         Args:
@@ -25,15 +27,15 @@ class UpdatePositionUnrealizedPnl:
         Returns:
             The updated position with the unrealized PnL.
         """
-        self.logger.info(
+        self.logger.debug(
             "Calculating unrealized PnL for position %s with market price %s",
             position,
             market_price,
         )
         price_diff = market_price - position.entry_price
-        self.logger.info("Price diff: %s", price_diff)
+        self.logger.debug("Price diff: %s", price_diff)
         unrealized_pnl = price_diff * position.quantity
         self.logger.debug("Unrealized PnL: %s", unrealized_pnl)
         position.unrealized_pnl = unrealized_pnl
-        self.logger.info("Position updated with unrealized PnL: %s", position)
+        self.logger.debug("Position updated with unrealized PnL: %s", position)
         return position
@@ -0,0 +1,77 @@
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.historical_feather_repository import load_concurrently
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+def test_load_concurrently_runs_the_loads_at_once():
+    """Run loads that wait for each other and get their results in order."""
+    barrier = threading.Barrier(3, timeout=5)
+
+    def load(value: int) -> int:
+        barrier.wait()
+        return value
+
+    assert load_concurrently(*(lambda i=i: load(i) for i in range(3))) == [0, 1, 2]
+
+
+def test_load_concurrently_raises_once_all_the_loads_are_done():
+    """Raise the error of a load after joining the others."""
+    done = threading.Event()
+
+    def failing_load():
+        raise ValueError("Invalid data")
+
+    def slow_load():
+        done.wait(0.05)
+        done.set()
+
+    with pytest.raises(ValueError, match="Invalid data"):
+        load_concurrently(failing_load, slow_load)
+    assert done.is_set()
+
+
+def test_load_concurrently_in_a_load():
+    """Load a batch inside a load of a batch without waiting for the pool."""
+
+    def load_batch() -> list:
+        return load_concurrently(lambda: 1, lambda: 2)
+
+    assert load_concurrently(*([load_batch] * 8)) == [[1, 2]] * 8
+
+
+def test_get_historical_data_async():
+    """Get the same OHLCV series and funding rates loading them asynchronously."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+    ohlcv_repository = OHLCVRepository(TEST_DATA_PATH)
+    funding_rate_repository = FundingRateRepository(TEST_DATA_PATH)
+
+    ohlcv_series_future = ohlcv_repository.get_historical_series_async(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+    funding_rate_df_future = funding_rate_repository.get_historical_dataframe_async(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+
+    expected_ohlcv_series = ohlcv_repository.get_historical_series(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+    ohlcv_series = ohlcv_series_future.result()
+    assert np.array_equal(ohlcv_series.ts, expected_ohlcv_series.ts)
+    assert np.array_equal(ohlcv_series.close, expected_ohlcv_series.close)
+    pd.testing.assert_frame_equal(
+        funding_rate_df_future.result(),
+        funding_rate_repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+        ),
+    )
@@ -109,6 +109,54 @@ def test_since_with_missing_date(indexed_ohlcv_df):
         data_service.since(indexed_ohlcv_df, date)
 
 
+def test_since_with_nearest_date(indexed_ohlcv_df):
+    """Test filtering the raw data since a date between bars, starting at the next bar."""
+    # Arrange
+    data_service = DataProcessingService()
+    date = "2022-01-01 00:01:30"
+
+    # Act
+    filtered_df = data_service.since(indexed_ohlcv_df, date, _nearest=True)
+
+    # Assert
+    assert filtered_df.index[0] == pd.to_datetime("2022-01-01 00:02:00")
+    assert len(filtered_df) == 8
+
+
+def test_since_with_nearest_date_after_last_bar(indexed_ohlcv_df):
+    """Test filtering the raw data since a date after the last bar."""
+    # Arrange
+    data_service = DataProcessingService()
+    date = "2022-01-04"
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="The date 2022-01-04 is not in _df."):
+        data_service.since(indexed_ohlcv_df, date, _nearest=True)
+
+
+def test_between_with_valid_df(indexed_ohlcv_df):
+    """Test slicing the raw data in [start date, end date) without copying it."""
+    # Arrange
+    data_service = DataProcessingService()
+    start_date = "2022-01-01 00:01:00"
+    end_date = "2022-01-01 00:04:00"
+
+    # Act
+    sliced_df = data_service.between(indexed_ohlcv_df, start_date, end_date)
+
+    # Assert
+    assert (
+        sliced_df.index.tolist()
+        == pd.date_range(
+            start_date, periods=3, freq=Timeframe.to_pd(Timeframe.ONE_MIN)
+        ).tolist()
+    )
+    assert sliced_df["close"].tolist() == [220, 320, 420]
+    assert np.shares_memory(
+        sliced_df["close"].to_numpy(), indexed_ohlcv_df["close"].to_numpy()
+    )
+
+
 def test_resample_to_with_valid_df(indexed_ohlcv_df):
     """Test resampling the raw data to a given timeframe with a valid DataFrame."""
     # Arrange
@@ -169,3 +217,103 @@ def test_pct_change_with_valid_df(indexed_ohlcv_df):
     # Assert
     expected_df = indexed_ohlcv_df / indexed_ohlcv_df.shift(1) - 1
     pd.testing.assert_frame_equal(change_df, expected_df)
+
+
+def test_normalize_raw_df_to_canonical_layout():
+    """Normalize an unsorted dump with duplicated dates, string dates, integer
+    columns and a gap to contiguous float64 bars with UTC dates."""
+    # Arrange
+    raw_df = pd.DataFrame(
+        {
+            "date": [
+                "2022-01-01 00:02:00",
+                "2022-01-01 00:00:00",
+                "2022-01-01 00:01:00",
+                "2022-01-01 00:00:00",
+                "2022-01-01 00:05:00",
+            ],
+            "open": [3, 1, 2, 0, 6],
+            "volume": [30, 10, 20, 0, 60],
+        }
+    )
+
+    # Act
+    canonical_df = DataProcessingService.normalize_raw_df(raw_df, Timeframe.ONE_MIN)
+
+    # Assert
+    assert str(canonical_df["date"].dtype) == "datetime64[ns, UTC]"
+    assert canonical_df["date"].tolist() == list(
+        pd.date_range("2022-01-01", periods=6, freq="1min", tz="UTC")
+    )
+    assert (canonical_df.dtypes.iloc[1:] == np.float64).all()
+    np.testing.assert_array_equal(
+        canonical_df["open"].to_numpy(), [0.0, 2.0, 3.0, np.nan, np.nan, 6.0]
+    )
+    DataProcessingService.validate_canonical_df(canonical_df, Timeframe.ONE_MIN)
+
+
+def test_normalize_raw_df_from_epoch_milliseconds():
+    """Normalize the dates of a dump in epoch milliseconds to UTC."""
+    raw_df = pd.DataFrame({"date": [1640995260000, 1640995200000], "open": [2.0, 1.0]})
+
+    canonical_df = DataProcessingService.normalize_raw_df(raw_df, Timeframe.ONE_MIN)
+
+    assert canonical_df["date"].tolist() == list(
+        pd.date_range("2022-01-01", periods=2, freq="1min", tz="UTC")
+    )
+    assert canonical_df["open"].tolist() == [1.0, 2.0]
+
+
+def test_normalize_raw_df_with_dates_off_the_timeframe():
+    """Raise if the dates of the dump are not at the timeframe."""
+    raw_df = pd.DataFrame(
+        {"date": ["2022-01-01 00:00:00", "2022-01-01 00:00:30"], "open": [1.0, 2.0]}
+    )
+
+    with pytest.raises(ValueError, match="not at the timeframe"):
+        DataProcessingService.normalize_raw_df(raw_df, Timeframe.ONE_MIN)
+
+
+def test_validate_canonical_df_with_a_gap(raw_ohlcv_df):
+    """Raise if the raw data is not float64 with UTC dates or has gaps."""
+    with pytest.raises(ValueError, match="not datetime64"):
+        DataProcessingService.validate_canonical_df(raw_ohlcv_df, Timeframe.ONE_MIN)
+
+    canonical_df = DataProcessingService.normalize_raw_df(
+        raw_ohlcv_df, Timeframe.ONE_MIN
+    )
+    with pytest.raises(ValueError, match="not contiguous"):
+        DataProcessingService.validate_canonical_df(
+            canonical_df.drop(index=3), Timeframe.ONE_MIN
+        )
+    with pytest.raises(ValueError, match="not float64"):
+        DataProcessingService.validate_canonical_df(
+            canonical_df.astype({"volume": np.int64}), Timeframe.ONE_MIN
+        )
+
+
+@pytest.mark.parametrize(
+    "timeframe", [Timeframe.ONE_MIN, Timeframe.FIVE_MIN, Timeframe.ONE_HOUR]
+)
+def test_resample_to_canonical_df(raw_ohlcv_df, timeframe):
+    """Resample canonical bars with gaps to their own timeframe without
+    aggregating them, with the same result as aggregating them."""
+    canonical_df = DataProcessingService.normalize_raw_df(
+        raw_ohlcv_df.drop(index=[3, 4]), Timeframe.ONE_MIN
+    ).set_index("date")
+
+    resampled_df = DataProcessingService.resample_to(canonical_df, timeframe)
+
+    expected_df = canonical_df.resample(Timeframe.to_pd(timeframe)).agg(
+        {
+            "open": "first",
+            "high": "max",
+            "low": "min",
+            "close": "last",
+            "volume": "sum",
+        }
+    )
+    assert DataProcessingService.is_at_timeframe(canonical_df, timeframe) == (
+        timeframe == Timeframe.ONE_MIN
+    )
+    pd.testing.assert_frame_equal(resampled_df, expected_df)
@@ -0,0 +1,157 @@
+# pylint: disable=redefined-outer-name
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.dataframe_cache import (
+    DataFrameCache,
+    get_default_dataframe_cache,
+)
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
+from perp_simulation.main import (
+    setup_run_parameter_sweep_use_case,
+    setup_run_simulation_pool_use_case,
+    setup_run_simulation_use_case,
+)
+
+TEST_DATA_BASE_PATH = "./tests/data"
+
+
+def create_dataframe(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"close": np.arange(rows, dtype=np.float64)},
+        index=pd.date_range(
+            "2024-01-22", periods=rows, freq="1min", tz="UTC", name="date"
+        ),
+    )
+
+
+def test_get_historical_dataframe_from_memory(mocker):
+    """Get read-only OHLCV and funding rate dataframes from a shared cache without loading the files."""
+    dataframe_cache = DataFrameCache()
+    data_base_path = f"{TEST_DATA_BASE_PATH}/binance-futures"
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    for repository_class in [OHLCVRepository, FundingRateRepository]:
+        repository = repository_class(data_base_path, dataframe_cache=dataframe_cache)
+        load_data_spy = mocker.spy(repository, "_load_data")
+
+        cold_df = repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+        warm_df = repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+
+        assert load_data_spy.call_count == 1
+        expected_df = repository_class(data_base_path).get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+        pd.testing.assert_frame_equal(warm_df, expected_df)
+        with pytest.raises(ValueError):
+            warm_df.iloc[0, 0] = 0.0
+        with pytest.raises(ValueError):
+            warm_df.index.values[0] = warm_df.index.values[-1]
+        cold_df["new_column"] = 0.0
+        assert (
+            "new_column"
+            not in repository.get_historical_dataframe(
+                Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+            ).columns
+        )
+
+    assert dataframe_cache.get_stats()["hits"] == 4
+    assert dataframe_cache.get_stats()["misses"] == 2
+    assert dataframe_cache.get_stats()["entries"] == 2
+
+
+def test_evict_least_recently_used_dataframes():
+    """Evict the least recently used dataframes when the cache exceeds its memory budget."""
+    _df = create_dataframe(1000)
+    size_bytes = int(_df.memory_usage(index=True, deep=True).sum())
+    dataframe_cache = DataFrameCache(max_size_bytes=2 * size_bytes)
+
+    dataframe_cache.put("a", _df)
+    dataframe_cache.put("b", _df)
+    assert dataframe_cache.get("a") is not None
+    dataframe_cache.put("c", _df)
+
+    assert dataframe_cache.get("b") is None
+    assert dataframe_cache.get("a") is not None
+    assert dataframe_cache.get("c") is not None
+    assert dataframe_cache.get_stats() == {
+        "hits": 3,
+        "misses": 1,
+        "evictions": 1,
+        "entries": 2,
+        "size_bytes": 2 * size_bytes,
+    }
+
+
+def test_get_and_put_from_many_threads():
+    """Get and put dataframes from many threads keeping the counters consistent."""
+    dataframe_cache = DataFrameCache()
+    _df = create_dataframe(100)
+
+    def get_or_put(i: int) -> float:
+        key = i % 10
+        cached_df = dataframe_cache.get(key)
+        if cached_df is None:
+            cached_df = dataframe_cache.put(key, _df)
+        return cached_df["close"].sum()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(get_or_put, range(1000)))
+
+    stats = dataframe_cache.get_stats()
+    assert results == [_df["close"].sum()] * 1000
+    assert stats["hits"] + stats["misses"] == 1000
+    assert stats["entries"] == 10
+
+
+def test_setup_use_cases_share_the_default_dataframe_cache(mocker, tmp_path):
+    """Load the data once for the use cases set up by main with the default
+    DataFrame cache, and pass the processed data cache to the pool workers."""
+    # pylint: disable=protected-access
+    data_base_path = f"{TEST_DATA_BASE_PATH}/binance-futures"
+    dataframe_cache = get_default_dataframe_cache()
+    dataframe_cache.clear()
+    processed_data_cache = ProcessedDataCache(str(tmp_path))
+    run_simulation = setup_run_simulation_use_case(
+        data_base_path, processed_data_cache=processed_data_cache
+    )
+    run_parameter_sweep = setup_run_parameter_sweep_use_case(data_base_path)
+    run_simulation_pool = setup_run_simulation_pool_use_case(
+        data_base_path, processed_data_cache=processed_data_cache
+    )
+    repositories = [
+        run_simulation._ohlcv_repository,
+        run_parameter_sweep._ohlcv_repository,
+        run_simulation_pool._ohlcv_repository,
+    ]
+    assert get_default_dataframe_cache() is dataframe_cache
+    assert all(
+        repository._dataframe_cache is dataframe_cache for repository in repositories
+    )
+    assert (
+        run_simulation._ohlcv_repository._processed_data_cache is processed_data_cache
+    )
+    assert (
+        run_simulation_pool._run_simulation_factory.keywords["processed_data_cache"]
+        is processed_data_cache
+    )
+
+    load_data_spies = [
+        mocker.spy(repository, "_load_data") for repository in repositories
+    ]
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    for repository in repositories:
+        repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+    assert sum(spy.call_count for spy in load_data_spies) == 1
@@ -72,3 +72,58 @@ def test_get_historical_data_funding_rate_8h_five_bars(
     data = list(iterator)
     assert len(data) == 2
     assert data[0].ts == start_date.timestamp()
+
+
+def test_get_historical_data_funding_rate_1min_between_settlements(
+    funding_rate_historical_feather_repository: FundingRateRepository,
+):
+    """Get historical funding rate, 1min, from a start time between settlements until an end time."""
+    symbol = Symbol.BTCUSD
+    timeframe = Timeframe.ONE_MIN
+    start_date = datetime(2024, 1, 22, 7, 50, tzinfo=timezone.utc)
+    end_date = datetime(2024, 1, 22, 8, 10, tzinfo=timezone.utc)
+    data = list(
+        funding_rate_historical_feather_repository.get_historical_data(
+            symbol=symbol, start_time=start_date, timeframe=timeframe, end_time=end_date
+        )
+    )
+    assert len(data) == 1
+    assert data[0].ts == datetime(2024, 1, 22, 8, tzinfo=timezone.utc).timestamp()
+    assert data[0].rate is not None
+
+
+@pytest.mark.parametrize(
+    "timeframe", [Timeframe.ONE_MIN, Timeframe.ONE_HOUR, Timeframe.ONE_DAY]
+)
+def test_get_historical_dataframe_funding_rate_sparse_settlements(
+    funding_rate_historical_feather_repository: FundingRateRepository,
+    timeframe: str,
+):
+    """Get historical funding rate with a row per settlement, whatever the timeframe is."""
+    start_date = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    df = funding_rate_historical_feather_repository.get_historical_dataframe(
+        symbol=Symbol.BTCUSD, start_time=start_date, timeframe=timeframe
+    )
+    assert len(df) == 3
+    assert df.index.tolist() == [
+        datetime(2024, 1, 22, hour, tzinfo=timezone.utc) for hour in (0, 8, 16)
+    ]
+    assert not df["funding_rate"].isna().any()
+
+
+def test_get_historical_dataframe_funding_rate_reads_the_open_column(
+    mocker, funding_rate_historical_feather_repository: FundingRateRepository
+):
+    """Load only the date and open columns of the funding rate file."""
+    load_data_spy = mocker.spy(funding_rate_historical_feather_repository, "_load_data")
+    start_date = datetime(2024, 1, 22, tzinfo=timezone.utc)
+
+    df = funding_rate_historical_feather_repository.get_historical_dataframe(
+        symbol=Symbol.BTCUSD, start_time=start_date, timeframe=Timeframe.ONE_MIN
+    )
+
+    # The loaded DataFrame is indexed by date in place by the processing
+    assert load_data_spy.spy_return.index.name == "date"
+    assert list(load_data_spy.spy_return.columns) == ["open"]
+    assert list(df.columns) == ["funding_rate"]
+    assert len(df) == 3
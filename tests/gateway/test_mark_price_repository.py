@@ -0,0 +1,89 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.mark_price_repository import MarkPriceRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+# The mark price bars start 10 minutes after the OHLCV bars
+MISSING_MARK_PRICE_BARS = 10
+
+
+@pytest.fixture
+def mark_price_repository(tmp_path: Path) -> MarkPriceRepository:
+    """Mark price bars of the test day in the layout of the OHLCV files,
+    0.05% above the last price."""
+    df = pd.read_feather(f"{TEST_DATA_PATH}/BTC_USDT_USDT-1m-futures.feather")
+    df = df.iloc[MISSING_MARK_PRICE_BARS:].reset_index(drop=True)
+    for column in ("open", "high", "low", "close"):
+        df[column] = df[column] * 1.0005
+    df.to_feather(tmp_path / "BTC_USDT_USDT-1m-mark.feather")
+    return MarkPriceRepository(str(tmp_path))
+
+
+def test_get_historical_dataframe_mark_price_1min(
+    mark_price_repository: MarkPriceRepository,
+):
+    """Get the mark price bars from the first bar since the start time."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+
+    df = mark_price_repository.get_historical_dataframe(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+
+    assert len(df) == 1440 - MISSING_MARK_PRICE_BARS
+    assert df.index[0] == pd.Timestamp("2024-01-22T00:10:00Z")
+    assert list(df.columns) == ["open", "high", "low", "close", "volume"]
+
+
+def test_get_historical_timeline_with_mark_price(
+    mark_price_repository: MarkPriceRepository,
+):
+    """Align the mark price bars loaded with the OHLCV bars and the funding
+    rates, falling back to the last price where they are missing."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+    ohlcv_repository = OHLCVRepository(TEST_DATA_PATH)
+    funding_rate_repository = FundingRateRepository(TEST_DATA_PATH)
+
+    market_timeline = MarketTimelineRepository(
+        ohlcv_repository, funding_rate_repository, mark_price_repository
+    ).get_historical_timeline(Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time)
+    expected_market_timeline = MarketTimelineRepository(
+        ohlcv_repository, funding_rate_repository
+    ).get_historical_timeline(Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time)
+
+    close = market_timeline.ohlcv_series.close
+    assert np.array_equal(market_timeline.ts, expected_market_timeline.ts)
+    assert np.array_equal(
+        market_timeline.funding_rate_index, expected_market_timeline.funding_rate_index
+    )
+    assert np.isnan(market_timeline.mark_price[:MISSING_MARK_PRICE_BARS]).all()
+    assert np.allclose(
+        market_timeline.mark_price[MISSING_MARK_PRICE_BARS:],
+        close[MISSING_MARK_PRICE_BARS:] * 1.0005,
+    )
+    assert np.allclose(
+        market_timeline.mark_price_low[MISSING_MARK_PRICE_BARS:],
+        market_timeline.ohlcv_series.low[MISSING_MARK_PRICE_BARS:] * 1.0005,
+    )
+    mark_prices = market_timeline.get_mark_prices()
+    assert np.array_equal(
+        mark_prices[:MISSING_MARK_PRICE_BARS], close[:MISSING_MARK_PRICE_BARS]
+    )
+    assert np.array_equal(
+        mark_prices[MISSING_MARK_PRICE_BARS:],
+        market_timeline.mark_price[MISSING_MARK_PRICE_BARS:],
+    )
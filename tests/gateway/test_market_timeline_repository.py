@@ -0,0 +1,168 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+@pytest.fixture
+def market_timeline_repository() -> MarketTimelineRepository:
+    return MarketTimelineRepository(
+        OHLCVRepository(TEST_DATA_PATH), FundingRateRepository(TEST_DATA_PATH)
+    )
+
+
+@pytest.fixture
+def ohlcv_series_10_bars() -> OHLCVSeries:
+    close = np.linspace(100.0, 109.0, 10)
+    return OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=np.arange(10, dtype=np.int64) * 60,
+        open=close,
+        high=close,
+        low=close,
+        close=close,
+        volume=np.ones(10),
+    )
+
+
+def test_get_historical_timeline_1min(
+    market_timeline_repository: MarketTimelineRepository,
+):
+    """Align a day of 1m bars with the funding rate settlements of the day."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+
+    market_timeline = market_timeline_repository.get_historical_timeline(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+
+    assert len(market_timeline) == 1440
+    assert market_timeline.symbol == Symbol.BTCUSD
+    settlement_bars = np.flatnonzero(market_timeline.funding_rate_index >= 0)
+    assert settlement_bars.tolist() == [0, 480, 960]
+    assert np.array_equal(
+        market_timeline.ts[settlement_bars], market_timeline.funding_rate_ts
+    )
+    assert not np.any(np.isnan(market_timeline.funding_rate))
+    assert market_timeline.mark_price is None
+
+    funding_rates = [
+        funding_rate for _, funding_rate in market_timeline if funding_rate is not None
+    ]
+    assert [funding_rate.ts for funding_rate in funding_rates] == (
+        market_timeline.funding_rate_ts.tolist()
+    )
+
+
+def test_align_drops_events_out_of_period(ohlcv_series_10_bars: OHLCVSeries):
+    """Drop NaN funding rates and events out of the bars, and align the mark price."""
+    market_timeline = MarketTimelineRepository.align(
+        ohlcv_series_10_bars,
+        Timeframe.ONE_MIN,
+        np.array([-60, 0, 120, 300, 600]),
+        np.array([0.1, 0.2, np.nan, 0.3, 0.4]),
+        mark_price_ts=np.array([0, 60, 540]),
+        mark_price=np.array([1.0, 2.0, 3.0]),
+    )
+
+    assert market_timeline.funding_rate_ts.tolist() == [0, 300]
+    assert market_timeline.funding_rate.tolist() == [0.2, 0.3]
+    assert market_timeline.funding_rate_index.tolist() == [
+        0,
+        -1,
+        -1,
+        -1,
+        -1,
+        1,
+        -1,
+        -1,
+        -1,
+        -1,
+    ]
+    assert np.array_equal(
+        market_timeline.mark_price,
+        [1.0, 2.0] + [np.nan] * 7 + [3.0],
+        equal_nan=True,
+    )
+
+
+def test_align_mark_price_bars_for_intrabar_liquidation(
+    ohlcv_series_10_bars: OHLCVSeries,
+):
+    """Align the low and high of the mark price bars and use them to liquidate
+    inside the bars, or the ones of the OHLCV bars where they are missing."""
+    ohlcv_series_10_bars.low = ohlcv_series_10_bars.close - 1.0
+    ohlcv_series_10_bars.high = ohlcv_series_10_bars.close + 1.0
+
+    market_timeline = MarketTimelineRepository.align(
+        ohlcv_series_10_bars,
+        Timeframe.ONE_MIN,
+        np.array([], dtype=np.int64),
+        np.array([]),
+        mark_price_ts=np.array([60, 120]),
+        mark_price=np.array([101.0, 102.0]),
+        mark_price_low=np.array([100.5, 101.5]),
+        mark_price_high=np.array([101.5, 102.5]),
+    )
+    low_price, high_price = market_timeline.get_liquidation_prices()
+
+    assert np.array_equal(
+        market_timeline.mark_price_low,
+        [np.nan, 100.5, 101.5] + [np.nan] * 7,
+        equal_nan=True,
+    )
+    assert low_price.tolist() == [99.0, 100.5, 101.5] + list(
+        ohlcv_series_10_bars.low[3:]
+    )
+    assert high_price.tolist() == [101.0, 101.5, 102.5] + list(
+        ohlcv_series_10_bars.high[3:]
+    )
+
+
+def test_align_settles_the_funding_rates_of_a_bar_together(
+    ohlcv_series_10_bars: OHLCVSeries,
+):
+    """Settle the funding rates contained in a bar at its open, adding them up."""
+    ohlcv_series_10_bars.ts = np.arange(10, dtype=np.int64) * 86400
+
+    market_timeline = MarketTimelineRepository.align(
+        ohlcv_series_10_bars,
+        Timeframe.ONE_DAY,
+        np.arange(6, dtype=np.int64) * 28800,
+        np.array([0.1, 0.2, 0.3, 0.4, np.nan, 0.6]),
+    )
+
+    assert market_timeline.funding_rate_ts.tolist() == [0, 86400]
+    assert np.allclose(market_timeline.funding_rate, [0.1 + 0.2 + 0.3, 0.4 + 0.6])
+    assert market_timeline.funding_rate_index.tolist() == [0, 1] + [-1] * 8
+
+
+@pytest.mark.parametrize(
+    "funding_rate_ts",
+    [np.array([0, 300]), np.array([60, 0])],
+)
+def test_align_misaligned_funding_rate(
+    ohlcv_series_10_bars: OHLCVSeries, funding_rate_ts: np.ndarray
+):
+    """Raise if a funding rate is in a gap of the bars or the events are not sorted."""
+    # Bars from 04:00 to 10:00 are missing
+    ohlcv_series_10_bars.ts = np.concatenate([np.arange(4), np.arange(10, 16)]) * 60
+
+    with pytest.raises(ValueError):
+        MarketTimelineRepository.align(
+            ohlcv_series_10_bars,
+            Timeframe.ONE_MIN,
+            funding_rate_ts,
+            np.array([0.1, 0.2]),
+        )
@@ -0,0 +1,69 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.multi_resolution_timeline_repository import (
+    MultiResolutionTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+@pytest.fixture
+def ohlcv_repository() -> OHLCVRepository:
+    return OHLCVRepository(TEST_DATA_PATH)
+
+
+@pytest.fixture
+def funding_rate_repository() -> FundingRateRepository:
+    return FundingRateRepository(TEST_DATA_PATH)
+
+
+def test_get_historical_timelines_1h(
+    ohlcv_repository: OHLCVRepository, funding_rate_repository: FundingRateRepository
+):
+    """Resample a day of 1m bars to 1h and load the 1m bars of a 1h bar."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+    multi_resolution_timeline_repository = MultiResolutionTimelineRepository(
+        ohlcv_repository, funding_rate_repository
+    )
+
+    market_timeline, fine_timeline_loader = (
+        multi_resolution_timeline_repository.get_historical_timelines(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_HOUR, end_time
+        )
+    )
+    fine_market_timeline = MarketTimelineRepository(
+        ohlcv_repository, funding_rate_repository
+    ).get_historical_timeline(Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time)
+
+    assert len(market_timeline) == 24
+    assert len(fine_timeline_loader) == 1440
+    assert fine_timeline_loader.timeframe == Timeframe.ONE_MIN
+    assert np.flatnonzero(market_timeline.funding_rate_index >= 0).tolist() == [
+        0,
+        8,
+        16,
+    ]
+    assert fine_timeline_loader.get_bar_range(8) == (480, 540)
+
+    fine_timeline = fine_timeline_loader.load_bar(8)
+    fine_close = fine_market_timeline.ohlcv_series.close[480:540]
+    assert np.array_equal(fine_timeline.ts, fine_market_timeline.ts[480:540])
+    assert np.array_equal(fine_timeline.ohlcv_series.close, fine_close)
+    assert market_timeline.ohlcv_series.close[8] == fine_close[-1]
+    assert market_timeline.ohlcv_series.low[8] == fine_timeline.ohlcv_series.low.min()
+    assert np.flatnonzero(fine_timeline.funding_rate_index >= 0).tolist() == [0]
+    assert fine_timeline.funding_rate.tolist() == (
+        market_timeline.funding_rate[1:2].tolist()
+    )
+    assert len(fine_timeline_loader.load_bar(9).funding_rate) == 0
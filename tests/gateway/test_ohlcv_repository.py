@@ -1,6 +1,9 @@
 # pylint: disable=redefined-outer-name
 from datetime import datetime, timezone
+from pathlib import Path
 
+import pandas as pd
+import pyarrow.feather as feather
 import pytest
 
 from perp_simulation.constant import Symbol, Timeframe
@@ -53,3 +56,125 @@ def test_get_historical_data_ohlcv_1min_five_bars(
     data = list(iterator)
     assert len(data) == 5
     assert data[0].ts == start_date.timestamp()
+
+
+def test_get_historical_series_ohlcv_1min_five_bars(
+    ohlcv_historical_feather_repository: OHLCVRepository,
+):
+    """Get historical OHLCV series, 1min, five bars of data, matching the dataframe."""
+    symbol = Symbol.BTCUSD
+    timeframe = Timeframe.ONE_MIN
+    start_date = datetime(2024, 1, 22, 23, 55, tzinfo=timezone.utc)
+    df = ohlcv_historical_feather_repository.get_historical_dataframe(
+        symbol=symbol, start_time=start_date, timeframe=timeframe
+    )
+    series = ohlcv_historical_feather_repository.get_historical_series(
+        symbol=symbol, start_time=start_date, timeframe=timeframe
+    )
+    assert len(series) == 5
+    assert series.ts.dtype == "int64"
+    assert series.ts.tolist() == [int(index.timestamp()) for index in df.index]
+    assert series.close.tolist() == df["close"].tolist()
+
+
+def test_get_historical_iterator_ohlcv_1min_five_bars(
+    ohlcv_historical_feather_repository: OHLCVRepository,
+):
+    """Get historical OHLCV iterator, 1min, five bars of data, with native values."""
+    symbol = Symbol.BTCUSD
+    timeframe = Timeframe.ONE_MIN
+    start_date = datetime(2024, 1, 22, 23, 55, tzinfo=timezone.utc)
+    df = ohlcv_historical_feather_repository.get_historical_dataframe(
+        symbol=symbol, start_time=start_date, timeframe=timeframe
+    )
+    data = list(
+        ohlcv_historical_feather_repository.get_historical_iterator(
+            symbol=symbol, start_time=start_date, timeframe=timeframe
+        )
+    )
+    for ohlcv, (index, values) in zip(data, df.iterrows()):
+        assert isinstance(ohlcv.ts, int)
+        assert ohlcv.ts == int(index.timestamp())
+        assert ohlcv.symbol == symbol
+        assert ohlcv.open == values.open
+        assert ohlcv.high == values.high
+        assert ohlcv.low == values.low
+        assert ohlcv.close == values.close
+        assert ohlcv.volume == values.volume
+
+
+def test_get_historical_data_ohlcv_1min_until_end_time(
+    ohlcv_historical_feather_repository: OHLCVRepository,
+):
+    """Get historical OHLCV, 1min, ten bars of data in [start time, end time)."""
+    symbol = Symbol.BTCUSD
+    timeframe = Timeframe.ONE_MIN
+    start_date = datetime(2024, 1, 22, 7, 50, tzinfo=timezone.utc)
+    end_date = datetime(2024, 1, 22, 8, tzinfo=timezone.utc)
+    data = list(
+        ohlcv_historical_feather_repository.get_historical_data(
+            symbol=symbol, start_time=start_date, timeframe=timeframe, end_time=end_date
+        )
+    )
+    assert len(data) == 10
+    assert data[0].ts == start_date.timestamp()
+    assert data[-1].ts == end_date.timestamp() - 60
+
+
+@pytest.mark.parametrize(
+    "start_time_str, end_time_str",
+    [
+        ("2024-01-22T10:05:00+00:00", "2024-01-22T10:45:00+00:00"),
+        ("2024-01-22T03:20:30+00:00", "2024-01-22T19:00:00+00:00"),
+        ("2024-01-21T00:00:00+00:00", "2024-01-22T00:50:00"),
+        ("2024-01-22T12:00:00+00:00", None),
+        ("2024-01-22T12:00:00+00:00", "2024-01-22T12:00:00+00:00"),
+        ("2024-01-23T00:00:00+00:00", None),
+    ],
+)
+def test_load_data_projection_and_range(
+    tmp_path: Path, start_time_str: str, end_time_str: str
+):
+    """Load the columns and the rows in [start time, end time) of a file with
+    many record batches, the same as slicing the whole file."""
+    df = pd.read_feather(
+        f"{TEST_DATA_BASE_PATH}/binance-futures/BTC_USDT_USDT-1m-futures.feather"
+    )
+    path = tmp_path / "BTC_USDT_USDT-1m-futures.feather"
+    feather.write_feather(df, path, chunksize=100)
+    repository = OHLCVRepository(str(tmp_path))
+
+    loaded_df = repository._load_data(
+        path, ("date", "close"), start_time_str, end_time_str
+    )
+
+    dates = df["date"]
+    mask = dates >= pd.Timestamp(start_time_str)
+    if end_time_str is not None:
+        mask &= dates < pd.Timestamp(end_time_str).tz_localize(None).tz_localize("UTC")
+    expected_df = df.loc[mask, ["date", "close"]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(loaded_df, expected_df)
+
+
+def test_get_historical_dataframe_ohlcv_1min_window_of_many_batches(
+    tmp_path: Path, ohlcv_historical_feather_repository: OHLCVRepository
+):
+    """Get the same window of OHLCV bars from a file with many record batches."""
+    df = pd.read_feather(
+        f"{TEST_DATA_BASE_PATH}/binance-futures/BTC_USDT_USDT-1m-futures.feather"
+    )
+    feather.write_feather(
+        df, tmp_path / "BTC_USDT_USDT-1m-futures.feather", chunksize=100
+    )
+    start_time = datetime(2024, 1, 22, 6, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 22, 7, tzinfo=timezone.utc)
+
+    window_df = OHLCVRepository(str(tmp_path)).get_historical_dataframe(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+
+    expected_df = ohlcv_historical_feather_repository.get_historical_dataframe(
+        Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+    )
+    assert len(window_df) == 60
+    pd.testing.assert_frame_equal(window_df, expected_df)
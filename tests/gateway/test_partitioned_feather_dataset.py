@@ -0,0 +1,196 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.dataframe_cache import DataFrameCache
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.partitioned_feather_dataset import (
+    FeatherPartition,
+    PartitionedFeatherDataset,
+)
+
+FILE_NAME = "BTC_USDT_USDT-1h-futures.feather"
+
+
+def create_ohlcv_df(start: str, periods: int) -> pd.DataFrame:
+    """Raw 1h OHLCV bars with the close of every bar being its position."""
+    close = np.arange(periods, dtype=np.float64)
+    return pd.DataFrame(
+        {
+            "date": pd.date_range(start, periods=periods, freq="1h", tz="UTC"),
+            "open": close,
+            "high": close + 1.0,
+            "low": close - 1.0,
+            "close": close,
+            "volume": np.ones(periods),
+        }
+    )
+
+
+@pytest.fixture
+def ohlcv_df() -> pd.DataFrame:
+    """January, February and March 2024 of 1h bars."""
+    return create_ohlcv_df("2024-01-01", (31 + 29 + 31) * 24)
+
+
+@pytest.fixture
+def dataset(tmp_path: Path, ohlcv_df: pd.DataFrame) -> PartitionedFeatherDataset:
+    dataset = PartitionedFeatherDataset.from_file_path(tmp_path / FILE_NAME)
+    dataset.append(ohlcv_df)
+    return dataset
+
+
+def test_append_partitions_by_month(tmp_path: Path, dataset: PartitionedFeatherDataset):
+    """Write a file per month and a manifest with the ts range and rows of every partition."""
+    assert dataset.path == tmp_path / "BTC_USDT_USDT-1h-futures"
+    assert dataset.get_partitions() == [
+        FeatherPartition(
+            file_name="2024-01.feather",
+            min_ts=int(datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()),
+            max_ts=int(datetime(2024, 1, 31, 23, tzinfo=timezone.utc).timestamp()),
+            rows=31 * 24,
+        ),
+        FeatherPartition(
+            file_name="2024-02.feather",
+            min_ts=int(datetime(2024, 2, 1, tzinfo=timezone.utc).timestamp()),
+            max_ts=int(datetime(2024, 2, 29, 23, tzinfo=timezone.utc).timestamp()),
+            rows=29 * 24,
+        ),
+        FeatherPartition(
+            file_name="2024-03.feather",
+            min_ts=int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp()),
+            max_ts=int(datetime(2024, 3, 31, 23, tzinfo=timezone.utc).timestamp()),
+            rows=31 * 24,
+        ),
+    ]
+    assert len(pd.read_feather(dataset.path / "2024-02.feather")) == 29 * 24
+
+
+def test_append_new_month_without_rewriting_history(
+    dataset: PartitionedFeatherDataset,
+):
+    """Append a month writing only its partition and the manifest."""
+    mtimes = {
+        path.name: path.stat().st_mtime_ns for path in dataset.path.glob("*.feather")
+    }
+
+    partitions = dataset.append(create_ohlcv_df("2024-04-01", 30 * 24))
+
+    assert [partition.file_name for partition in partitions] == [
+        "2024-01.feather",
+        "2024-02.feather",
+        "2024-03.feather",
+        "2024-04.feather",
+    ]
+    assert dataset.get_partitions() == partitions
+    for name, mtime in mtimes.items():
+        assert (dataset.path / name).stat().st_mtime_ns == mtime
+
+
+def test_append_merges_the_rows_of_a_month(mocker, dataset: PartitionedFeatherDataset):
+    """Merge the rows of a month with a partition into a new version of its file,
+    replacing the rows with the same date, and delete the replaced version after
+    the manifest."""
+    appended_df = create_ohlcv_df("2024-03-31T22:00:00", 4)
+    appended_df["close"] = -1.0
+    write_manifest = dataset._write_manifest  # pylint: disable=protected-access
+
+    def _write_manifest(partitions):
+        # The replaced versions are still there for the readers of the previous manifest
+        for partition in dataset.get_partitions():
+            assert (dataset.path / partition.file_name).is_file()
+        write_manifest(partitions)
+
+    mocker.patch.object(dataset, "_write_manifest", side_effect=_write_manifest)
+
+    partitions = dataset.append(appended_df)
+
+    assert [partition.file_name for partition in partitions[-2:]] == [
+        "2024-03.1.feather",
+        "2024-04.feather",
+    ]
+    march_df = pd.read_feather(dataset.path / "2024-03.1.feather")
+    assert len(march_df) == 31 * 24
+    assert march_df["close"].iloc[-2:].tolist() == [-1.0, -1.0]
+    assert march_df["date"].is_monotonic_increasing
+    assert partitions[-1].rows == 2
+    assert not (dataset.path / "2024-03.feather").exists()
+
+    partitions = dataset.append(appended_df.iloc[:1])
+
+    assert partitions[-2].file_name == "2024-03.2.feather"
+    assert sorted(path.name for path in dataset.path.glob("*.feather")) == [
+        "2024-01.feather",
+        "2024-02.feather",
+        "2024-03.2.feather",
+        "2024-04.feather",
+    ]
+
+
+def test_get_historical_dataframe_from_overlapping_partitions(
+    mocker, tmp_path: Path, ohlcv_df: pd.DataFrame, dataset: PartitionedFeatherDataset
+):
+    """Get the same bars from the partitions overlapping the range as from a single file."""
+    monolithic_path = tmp_path / "monolithic"
+    monolithic_path.mkdir()
+    ohlcv_df.to_feather(monolithic_path / FILE_NAME)
+    repository = OHLCVRepository(str(tmp_path))
+    read_table_spy = mocker.spy(repository, "_read_table")
+
+    for start_time, end_time, partition_names in [
+        (
+            datetime(2024, 2, 10, tzinfo=timezone.utc),
+            datetime(2024, 2, 10, 1, tzinfo=timezone.utc),
+            ["2024-02.feather"],
+        ),
+        (
+            datetime(2024, 1, 31, 23, tzinfo=timezone.utc),
+            datetime(2024, 3, 1, 1, tzinfo=timezone.utc),
+            ["2024-01.feather", "2024-02.feather", "2024-03.feather"],
+        ),
+        (datetime(2024, 3, 31, tzinfo=timezone.utc), None, ["2024-03.feather"]),
+    ]:
+        read_table_spy.reset_mock()
+        df = repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_HOUR, end_time
+        )
+
+        expected_df = OHLCVRepository(str(monolithic_path)).get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_HOUR, end_time
+        )
+        pd.testing.assert_frame_equal(df, expected_df)
+        assert [call.args[0] for call in read_table_spy.call_args_list] == [
+            dataset.path / name for name in partition_names
+        ]
+
+
+def test_get_historical_dataframe_after_appending_a_month(
+    tmp_path: Path, dataset: PartitionedFeatherDataset
+):
+    """Get the bars of an appended month from the DataFrame cache keyed by the manifest."""
+    repository = OHLCVRepository(str(tmp_path), dataframe_cache=DataFrameCache())
+    start_time = datetime(2024, 3, 31, tzinfo=timezone.utc)
+    assert (
+        len(
+            repository.get_historical_dataframe(
+                Symbol.BTCUSD, start_time, Timeframe.ONE_HOUR
+            )
+        )
+        == 24
+    )
+
+    dataset.append(create_ohlcv_df("2024-04-01", 24))
+
+    assert (
+        len(
+            repository.get_historical_dataframe(
+                Symbol.BTCUSD, start_time, Timeframe.ONE_HOUR
+            )
+        )
+        == 48
+    )
@@ -0,0 +1,133 @@
+# pylint: disable=redefined-outer-name
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.processed_data_cache import ProcessedDataCache
+
+TEST_DATA_BASE_PATH = "./tests/data"
+
+
+@pytest.fixture
+def data_base_path(tmp_path: Path) -> Path:
+    data_base_path = tmp_path / "binance-futures"
+    shutil.copytree(f"{TEST_DATA_BASE_PATH}/binance-futures", data_base_path)
+    return data_base_path
+
+
+@pytest.fixture
+def processed_data_cache(tmp_path: Path) -> ProcessedDataCache:
+    return ProcessedDataCache(str(tmp_path / "cache"))
+
+
+def test_get_historical_dataframe_from_cache(
+    mocker, data_base_path: Path, processed_data_cache: ProcessedDataCache
+):
+    """Get the same OHLCV and funding rate dataframes from the cache without loading the files."""
+    start_time = datetime(2024, 1, 22, 8, tzinfo=timezone.utc)
+    for repository_class in [OHLCVRepository, FundingRateRepository]:
+        repository = repository_class(str(data_base_path), processed_data_cache)
+        load_data_spy = mocker.spy(repository, "_load_data")
+
+        cold_df = repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+        warm_df = repository.get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+
+        assert load_data_spy.call_count == 1
+        pd.testing.assert_frame_equal(warm_df, cold_df, check_freq=False)
+        expected_df = repository_class(str(data_base_path)).get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN
+        )
+        pd.testing.assert_frame_equal(warm_df, expected_df, check_freq=False)
+
+
+def test_cache_is_invalidated_when_the_source_changes(
+    mocker, data_base_path: Path, processed_data_cache: ProcessedDataCache
+):
+    """Process the data again when the source file is modified."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    repository = OHLCVRepository(str(data_base_path), processed_data_cache)
+    load_data_spy = mocker.spy(repository, "_load_data")
+    repository.get_historical_dataframe(Symbol.BTCUSD, start_time, Timeframe.ONE_MIN)
+
+    source_path = data_base_path / "BTC_USDT_USDT-1m-futures.feather"
+    source_stat = source_path.stat()
+    os.utime(source_path, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns + 1))
+    repository.get_historical_dataframe(Symbol.BTCUSD, start_time, Timeframe.ONE_MIN)
+
+    assert load_data_spy.call_count == 2
+
+
+def test_evict_least_recently_used_entries(data_base_path: Path, tmp_path: Path):
+    """Evict the least recently used entries when the cache exceeds its maximum size."""
+    source_path = data_base_path / "BTC_USDT_USDT-1m-futures.feather"
+    _df = pd.DataFrame(
+        {"close": range(1000)},
+        index=pd.date_range(
+            "2024-01-22", periods=1000, freq="1min", tz="UTC", name="date"
+        ),
+    )
+    _df.reset_index().to_feather(tmp_path / "entry.feather")
+    entry_size = (tmp_path / "entry.feather").stat().st_size
+    cache = ProcessedDataCache(str(tmp_path / "cache"), max_size_bytes=2 * entry_size)
+    since_dates = ["2024-01-22T00:00:00", "2024-01-22T01:00:00", "2024-01-22T02:00:00"]
+
+    for mtime, since_date in enumerate(since_dates[:2], start=1):
+        cache.put(source_path, Timeframe.ONE_MIN, since_date, None, "1", _df)
+        entry_path = cache._get_entry_path(  # pylint: disable=protected-access
+            source_path, Timeframe.ONE_MIN, since_date, None, "1"
+        )
+        os.utime(entry_path, (mtime, mtime))
+    # Use the first entry so the second one is the least recently used
+    assert (
+        cache.get(source_path, Timeframe.ONE_MIN, since_dates[0], None, "1") is not None
+    )
+    cache.put(source_path, Timeframe.ONE_MIN, since_dates[2], None, "1", _df)
+
+    assert len(list((tmp_path / "cache").glob("*.feather"))) == 2
+    assert (
+        cache.get(source_path, Timeframe.ONE_MIN, since_dates[0], None, "1") is not None
+    )
+    assert cache.get(source_path, Timeframe.ONE_MIN, since_dates[1], None, "1") is None
+    assert (
+        cache.get(source_path, Timeframe.ONE_MIN, since_dates[2], None, "1") is not None
+    )
+
+
+def test_put_the_same_entry_from_threads(data_base_path: Path, tmp_path: Path):
+    """Put the same entry from several threads of a process at once, each
+    thread writing its own temporary file."""
+    source_path = data_base_path / "BTC_USDT_USDT-1m-futures.feather"
+    _df = pd.DataFrame(
+        {"close": range(100_000)},
+        index=pd.date_range(
+            "2024-01-22", periods=100_000, freq="1min", tz="UTC", name="date"
+        ),
+    )
+    cache = ProcessedDataCache(str(tmp_path / "cache"))
+    since_date = "2024-01-22T00:00:00"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [
+            executor.submit(
+                cache.put, source_path, Timeframe.ONE_MIN, since_date, None, "1", _df
+            )
+            for _ in range(32)
+        ]
+        for future in futures:
+            future.result()
+
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+    cached_df = cache.get(source_path, Timeframe.ONE_MIN, since_date, None, "1")
+    pd.testing.assert_frame_equal(cached_df, _df, check_freq=False)
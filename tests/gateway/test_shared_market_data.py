@@ -0,0 +1,103 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.gateway.data_service import DataProcessingService
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.gateway.shared_market_data import SharedMarketData
+
+TEST_DATA_BASE_PATH = "./tests/data"
+
+
+@pytest.fixture
+def shared_market_data_1min(tmp_path: Path) -> SharedMarketData:
+    symbol = Symbol.BTCUSD
+    timeframe = Timeframe.ONE_MIN
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    data_base_path = f"{TEST_DATA_BASE_PATH}/binance-futures"
+    ohlcv_series = OHLCVRepository(data_base_path).get_historical_series(
+        symbol, start_time, timeframe
+    )
+    funding_rate_df = FundingRateRepository(data_base_path).get_historical_dataframe(
+        symbol, start_time, timeframe
+    )
+    market_timeline = MarketTimelineRepository.align(
+        ohlcv_series,
+        timeframe,
+        DataProcessingService.index_to_ts(funding_rate_df),
+        funding_rate_df["funding_rate"].to_numpy(),
+    )
+    return SharedMarketData.create(market_timeline, base_path=str(tmp_path))
+
+
+def test_attach_shared_market_data(shared_market_data_1min: SharedMarketData):
+    """Attach to shared market data and read the same read-only arrays."""
+    with shared_market_data_1min:
+        attached = SharedMarketData.attach(shared_market_data_1min.handle)
+        series = attached.get_ohlcv_series()
+        expected_series = shared_market_data_1min.get_ohlcv_series()
+
+        assert series.symbol == Symbol.BTCUSD
+        assert len(series) == 1440
+        for name in SharedMarketData.OHLCV_COLUMNS:
+            assert np.array_equal(getattr(series, name), getattr(expected_series, name))
+        assert not series.close.flags.writeable
+        attached.close()
+        assert Path(shared_market_data_1min.handle.path).exists()
+
+    assert not Path(shared_market_data_1min.handle.path).exists()
+
+
+def test_get_market_timeline_matches_repository(
+    shared_market_data_1min: SharedMarketData,
+):
+    """Get the same market timeline from the shared market data as from the
+    repository, aligned to the bars without aligning it again."""
+    expected_market_timeline = MarketTimelineRepository(
+        OHLCVRepository(f"{TEST_DATA_BASE_PATH}/binance-futures"),
+        FundingRateRepository(f"{TEST_DATA_BASE_PATH}/binance-futures"),
+    ).get_historical_timeline(
+        Symbol.BTCUSD, datetime(2024, 1, 22, tzinfo=timezone.utc), Timeframe.ONE_MIN
+    )
+
+    with shared_market_data_1min:
+        attached = SharedMarketData.attach(shared_market_data_1min.handle)
+        market_timeline = attached.get_market_timeline()
+
+        for name in SharedMarketData.FUNDING_RATE_COLUMNS:
+            assert np.array_equal(
+                getattr(market_timeline, name),
+                getattr(expected_market_timeline, name),
+                equal_nan=True,
+            )
+        assert list(market_timeline) == list(expected_market_timeline)
+        assert len(market_timeline.funding_rate) == 3
+        attached.close()
+
+
+def test_create_shared_market_data_rejects_mark_price(tmp_path: Path):
+    """Reject a market timeline with mark prices instead of dropping them."""
+    ohlcv_series = OHLCVRepository(
+        f"{TEST_DATA_BASE_PATH}/binance-futures"
+    ).get_historical_series(
+        Symbol.BTCUSD, datetime(2024, 1, 22, tzinfo=timezone.utc), Timeframe.ONE_MIN
+    )
+    market_timeline = MarketTimelineRepository.align(
+        ohlcv_series,
+        Timeframe.ONE_MIN,
+        np.array([], dtype=np.int64),
+        np.array([]),
+        ohlcv_series.ts,
+        ohlcv_series.close,
+    )
+
+    with pytest.raises(ValueError, match="doesn't support the mark price"):
+        SharedMarketData.create(market_timeline, base_path=str(tmp_path))
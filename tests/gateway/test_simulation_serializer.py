@@ -1,4 +1,6 @@
 # pylint: disable=redefined-outer-name
+import json
+from dataclasses import replace
 from datetime import datetime
 
 import pytest
@@ -6,8 +8,10 @@ import pytest
 from perp_simulation.constant import Symbol, Timeframe
 from perp_simulation.entity.account import Account
 from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
 from perp_simulation.entity.position import Position
 from perp_simulation.entity.simulation import Simulation
+from perp_simulation.entity.simulation_profile import PhaseProfile, SimulationProfile
 from perp_simulation.entity.trade import Trade
 from perp_simulation.gateway.simulation_serializer import SimulationSerializer
 
@@ -141,3 +145,45 @@ def test_serialize_simulation_to_json(
     )
     # TODO: Add assertions
     assert True
+
+
+def test_serialize_simulation_with_account_snapshot_store_to_json(
+    simulation_20240122T075800_20240122T080200_1min_account_4_long_500usd: Simulation,
+):
+    simulation = simulation_20240122T075800_20240122T080200_1min_account_4_long_500usd
+    account_snapshot_store = AccountSnapshotStore()
+    for account_snapshot in simulation.account_snapshots:
+        account_snapshot_store.append(account_snapshot)
+    simulation_with_store = replace(
+        simulation, account_snapshots=account_snapshot_store
+    )
+
+    assert SimulationSerializer.to_json(
+        simulation_with_store
+    ) == SimulationSerializer.to_json(simulation)
+
+
+def test_serialize_simulation_with_profile_to_json(
+    simulation_20240122T075800_20240122T080200_1min_account_4_long_500usd: Simulation,
+):
+    simulation = replace(
+        simulation_20240122T075800_20240122T080200_1min_account_4_long_500usd,
+        profile=SimulationProfile(
+            bars=5,
+            phases={
+                SimulationProfile.SIMULATE: PhaseProfile(calls=1, total_ns=2_000_000),
+                SimulationProfile.SETTLE: PhaseProfile(calls=1, total_ns=3_000),
+                SimulationProfile.SNAPSHOT: PhaseProfile(calls=5, total_ns=10_000),
+            },
+        ),
+    )
+
+    data = json.loads(SimulationSerializer.to_json(simulation))
+
+    assert data["profile"]["bars_per_second"] == 2500.0
+    assert data["profile"]["phases"][SimulationProfile.SNAPSHOT] == {
+        "calls": 5,
+        "total_ns": 10_000,
+        "mean_ns": 2_000.0,
+    }
+    assert Simulation.from_dict(data).profile == simulation.profile
@@ -0,0 +1,217 @@
+# pylint: disable=redefined-outer-name
+import json
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.simulation import Simulation
+from perp_simulation.gateway.simulation_writer import (
+    ArrowSimulationReader,
+    ArrowSimulationWriter,
+    NDJSONSimulationReader,
+    NDJSONSimulationWriter,
+    SimulationWriter,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+from tests.use_case.conftest import create_account
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+@pytest.fixture
+def run_day_simulation() -> Callable[..., Simulation]:
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+
+    def _run(
+        leverage: float,
+        writer: Optional[SimulationWriter] = None,
+        profile: bool = False,
+        fast_forward: bool = True,
+    ) -> Simulation:
+        return setup_run_simulation_use_case(
+            TEST_DATA_PATH, profile=profile, fast_forward=fast_forward
+        ).run(
+            start_time,
+            end_time,
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            create_account(100.0, leverage, 41000.0),
+            writer,
+        )
+
+    return _run
+
+
+@pytest.mark.parametrize("leverage", [2.0, 50.0])
+def test_write_simulation_to_ndjson_matches_run_simulation(
+    run_day_simulation: Callable[..., Simulation],
+    tmp_path,
+    leverage: float,
+):
+    """Write the snapshots of a day of simulation to NDJSON as they are made and
+    read the same simulation as without writing them."""
+    path = tmp_path / "simulation_result.ndjson"
+
+    with NDJSONSimulationWriter(path) as writer:
+        written_simulation = run_day_simulation(leverage, writer, profile=True)
+    # The account is liquidated with 50x and the rest of the day is fast-forwarded
+    expected_simulation = run_day_simulation(leverage, fast_forward=False)
+    result_simulation = NDJSONSimulationReader(path).read()
+
+    assert written_simulation.account_snapshots is None
+    assert result_simulation.name == expected_simulation.name
+    assert result_simulation.run_end_ts == written_simulation.run_end_ts
+    assert result_simulation.profile == written_simulation.profile
+    assert len(result_simulation.account_snapshots) == 1440
+    assert list(result_simulation.account_snapshots) == list(
+        expected_simulation.account_snapshots
+    )
+    assert list(NDJSONSimulationReader(path).iter_snapshots()) == list(
+        expected_simulation.account_snapshots
+    )
+    with open(path, encoding="UTF-8") as file:
+        records = [json.loads(line) for line in file]
+    assert records[0]["type"] == NDJSONSimulationWriter.HEADER
+    assert records[-1] == {
+        "type": NDJSONSimulationWriter.FOOTER,
+        "run_end_ts": written_simulation.run_end_ts,
+        "snapshot_count": 1440,
+        "profile": written_simulation.profile.to_dict(),
+    }
+
+
+def test_read_interrupted_simulation(tmp_path):
+    account = create_account(100.0, 5.0, 50000.0)
+    path = tmp_path / "simulation_result.ndjson"
+    simulation = Simulation(
+        name="interrupted",
+        simulation_start_ts=0,
+        simulation_end_ts=120,
+        timeframe=Timeframe.ONE_MIN,
+        symbol=Symbol.BTCUSD,
+    )
+    writer = NDJSONSimulationWriter(path)
+    with pytest.raises(ValueError):
+        writer.write_snapshot(account, 60)
+
+    with writer:
+        writer.write_header(simulation)
+        writer.write_snapshot(account, 60)
+
+    with pytest.raises(ValueError):
+        NDJSONSimulationReader(path).read()
+    assert [
+        snapshot.account for snapshot in NDJSONSimulationReader(path).iter_snapshots()
+    ] == [account]
+
+
+@pytest.mark.parametrize(
+    "leverage, batch_size",
+    [(2.0, ArrowSimulationWriter.DEFAULT_BATCH_SIZE), (50.0, 1000), (2.0, 100)],
+)
+def test_write_simulation_to_arrow_matches_run_simulation(
+    run_day_simulation: Callable[..., Simulation],
+    tmp_path,
+    leverage: float,
+    batch_size: int,
+):
+    """Write a day of simulation to the columnar format in batches as it is
+    simulated and read the same simulation from the memory-mapped file."""
+    path = tmp_path / "simulation_result.arrow"
+
+    with ArrowSimulationWriter(path, batch_size) as writer:
+        written_simulation = run_day_simulation(leverage, writer, profile=True)
+    # The account is liquidated with 50x and the rest of the day is fast-forwarded
+    expected_simulation = run_day_simulation(leverage, fast_forward=False)
+    result_simulation = ArrowSimulationReader(path).read()
+
+    assert written_simulation.account_snapshots is None
+    assert result_simulation.name == expected_simulation.name
+    assert result_simulation.run_start_ts == written_simulation.run_start_ts
+    assert result_simulation.run_end_ts == written_simulation.run_end_ts
+    assert result_simulation.profile == written_simulation.profile
+    with pa.memory_map(str(path), "r") as source:
+        assert pa.ipc.open_file(source).num_record_batches == -(-1440 // batch_size)
+    account_snapshots = result_simulation.account_snapshots
+    assert len(account_snapshots) == 1440
+    assert account_snapshots[-1] == expected_simulation.account_snapshots[-1]
+    assert list(account_snapshots) == list(expected_simulation.account_snapshots)
+    # The columns are used in place
+    assert not account_snapshots.balance.flags.writeable
+    snapshots_df = account_snapshots.to_frame()
+    assert np.shares_memory(
+        snapshots_df["balance"].to_numpy(), account_snapshots.balance
+    )
+    positions_df = account_snapshots.positions_to_frame()
+    assert positions_df["ts"].tolist() == [
+        snapshot.ts
+        for snapshot in expected_simulation.account_snapshots
+        for _ in snapshot.account.positions
+    ]
+
+
+def test_read_interrupted_arrow_simulation(tmp_path):
+    """Write the snapshots recorded in a last batch if the writer is closed
+    before the footer, and reject the file as incomplete."""
+    account = create_account(100.0, 5.0, 50000.0)
+    path = tmp_path / "simulation_result.arrow"
+    simulation = Simulation(
+        name="interrupted",
+        simulation_start_ts=0,
+        simulation_end_ts=600,
+        timeframe=Timeframe.ONE_MIN,
+        symbol=Symbol.BTCUSD,
+    )
+
+    with pytest.raises(RuntimeError):
+        with ArrowSimulationWriter(path, batch_size=2) as writer:
+            writer.write_header(simulation)
+            for ts in range(60, 360, 60):
+                writer.write_snapshot(account, ts)
+            raise RuntimeError("Interrupted")
+
+    with pytest.raises(ValueError, match="Incomplete simulation file"):
+        ArrowSimulationReader(path).read()
+    with pa.memory_map(str(path), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.column("ts").to_pylist() == [60, 120, 180, 240, 300]
+
+
+def test_write_simulation_with_snapshot_list_to_arrow(tmp_path):
+    """Write a simulation with a list of snapshots and an account without
+    positions to the columnar format and record more snapshots after reading it."""
+    path = tmp_path / "simulation_result.arrow"
+    account = create_account(100.0, 5.0, 50000.0)
+    account.positions[0].unrealized_pnl = -1.5
+    account.positions[0].add_funding_rate_cost(0.05)
+    account_snapshots = [
+        AccountSnapshot(ts=60, account=Account(balance=100.0)),
+        AccountSnapshot(ts=120, account=account),
+        AccountSnapshot(ts=180, account=Account(balance=10.0, positions=[])),
+    ]
+    simulation = Simulation(
+        name="snapshot_list",
+        simulation_start_ts=0,
+        simulation_end_ts=180,
+        timeframe=Timeframe.ONE_MIN,
+        symbol=Symbol.BTCUSD,
+        run_start_ts=1,
+        run_end_ts=2,
+        account_snapshots=account_snapshots,
+    )
+
+    ArrowSimulationWriter.write(simulation, path)
+    result_simulation = ArrowSimulationReader(path).read()
+
+    assert result_simulation.profile is None
+    assert list(result_simulation.account_snapshots) == account_snapshots
+    result_simulation.account_snapshots.record(Account(balance=5.0), 240)
+    assert result_simulation.account_snapshots.at(240).account == Account(balance=5.0)
+    assert result_simulation.account_snapshots[1] == account_snapshots[1]
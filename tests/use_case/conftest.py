@@ -1,12 +1,48 @@
 # pylint: disable=redefined-outer-name, missing-module-docstring, missing-function-docstring
 from datetime import datetime
+from typing import Callable, Iterator, Optional
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from perp_simulation.constant import BINANCE_FUTURES_BTC_LEVERAGE, BINANCE_FUTURES_BTC_MAINTENANCE_MARGIN_RATE, BINANCE_FUTURES_TAKER_FEE_PCT, Symbol
+from perp_simulation.constant import (
+    BINANCE_FUTURES_BTC_LEVERAGE,
+    BINANCE_FUTURES_BTC_MAINTENANCE_MARGIN_RATE,
+    BINANCE_FUTURES_TAKER_FEE_PCT,
+    Symbol,
+    Timeframe,
+)
 from perp_simulation.entity.account import Account
+from perp_simulation.entity.funding_rate import FundingRate
+from perp_simulation.entity.ohlcv import OHLCV
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
 from perp_simulation.entity.position import Position
+from perp_simulation.entity.simulation import Simulation
 from perp_simulation.entity.trade import Trade
+from perp_simulation.trace import Tracer
+from perp_simulation.use_case.liquidate_positions import LiquidatePositions
+from perp_simulation.use_case.make_account_snapshot import MakeAccountSnapshot
+from perp_simulation.use_case.open_cross_margin_position import OpenCrossMarginPosition
+from perp_simulation.use_case.run_simulation import RunSimulation
+from perp_simulation.use_case.run_vectorized_simulation import RunVectorizedSimulation
+from perp_simulation.use_case.settle_funding_rate_costs import SettleFundingRateCosts
+from perp_simulation.use_case.update_position_effective_leverage import (
+    UpdatePositionEffectiveLeverage,
+)
+from perp_simulation.use_case.update_position_initial_margin import (
+    UpdatePositionInitialMargin,
+)
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
+from perp_simulation.use_case.update_position_unrealized_pnl import (
+    UpdatePositionUnrealizedPnl,
+)
 
 # TODO: Change to UTC
 BOY_2024_TS = datetime.strptime("2024-01-01 00:00:00", "%Y-%m-%d %H:%M:%S").timestamp()
@@ -84,10 +120,16 @@ def account_10k_no_positions() -> Account:
 def account_100_long_500usd(
     account_100_no_positions: Account, position_long_500usd: Position
 ) -> Account:
-    position_notional_value = position_long_500usd.quantity * position_long_500usd.avg_price
+    position_notional_value = (
+        position_long_500usd.quantity * position_long_500usd.avg_price
+    )
     position_initial_margin = position_notional_value / BINANCE_FUTURES_BTC_LEVERAGE
-    position_maintenance_margin = position_notional_value * BINANCE_FUTURES_BTC_MAINTENANCE_MARGIN_RATE
-    position_effective_leverage = position_notional_value / account_100_no_positions.balance
+    position_maintenance_margin = (
+        position_notional_value * BINANCE_FUTURES_BTC_MAINTENANCE_MARGIN_RATE
+    )
+    position_effective_leverage = (
+        position_notional_value / account_100_no_positions.balance
+    )
     position_liquidation_price = 40200.0
     # Update position
     position_long_500usd.initial_margin = position_initial_margin
@@ -97,3 +139,203 @@ def account_100_long_500usd(
     # Add position to account
     account_100_no_positions.add_position(position_long_500usd)
     return account_100_no_positions
+
+
+def create_ohlcv_iterator(
+    start_ts: int,
+    end_ts: int,
+    timeframe: str,
+    price_start: float,
+    price_pct_change: float,
+    price_pct_variance: float,
+) -> Iterator[OHLCV]:
+    # Adding first bar
+    ohlcv_data = [
+        OHLCV(
+            ts=start_ts,
+            symbol=Symbol.BTCUSD,
+            open=price_start,
+            high=price_start + price_pct_variance * price_start,
+            low=price_start - price_pct_variance * price_start,
+            close=price_start + price_pct_change * price_start,
+            volume=10.0,
+        )
+    ]
+    # Looping from second bar
+    period_seconds = Timeframe.to_seconds(timeframe)
+    second_bar_ts = int(start_ts + period_seconds)
+    last_bar_ts = int(end_ts)
+    for ts in range(second_bar_ts, last_bar_ts, period_seconds):
+        prev_ohlcv = ohlcv_data[-1]
+        ohlcv = OHLCV(
+            ts=ts,
+            symbol=Symbol.BTCUSD,
+            open=prev_ohlcv.close,
+            high=prev_ohlcv.close + price_pct_variance * prev_ohlcv.close,
+            low=prev_ohlcv.close - price_pct_variance * prev_ohlcv.close,
+            close=prev_ohlcv.close + price_pct_change * prev_ohlcv.close,
+            volume=10.0,
+        )
+        ohlcv_data.append(ohlcv)
+    return iter(ohlcv_data)
+
+
+@pytest.fixture
+def create_mocked_run_simulation_use_case(
+    mocker,
+) -> Callable[[Iterator[OHLCV], Iterator[FundingRate]], RunSimulation]:
+    def _factory(
+        ohlcv_iterator,
+        funding_rate_iterator,
+        update_position_risk_use_case: Optional[UpdatePositionRisk] = None,
+        tracer: Optional[Tracer] = None,
+        profile: bool = False,
+        fast_forward: bool = True,
+        intrabar_liquidation: bool = False,
+        mark_price_iterator: Optional[Iterator[OHLCV]] = None,
+    ):
+        # Mocks. To add the returning value in the test.
+        ohlcv_data = list(ohlcv_iterator)
+        funding_rate_data = list(funding_rate_iterator)
+        ohlcv_repository = mocker.Mock()
+        ohlcv_repository.get_historical_series.return_value = OHLCVSeries(
+            symbol=ohlcv_data[0].symbol,
+            ts=np.array([ohlcv.ts for ohlcv in ohlcv_data]),
+            open=np.array([ohlcv.open for ohlcv in ohlcv_data]),
+            high=np.array([ohlcv.high for ohlcv in ohlcv_data]),
+            low=np.array([ohlcv.low for ohlcv in ohlcv_data]),
+            close=np.array([ohlcv.close for ohlcv in ohlcv_data]),
+            volume=np.array([ohlcv.volume for ohlcv in ohlcv_data]),
+        )
+        funding_rate_repository = mocker.Mock()
+        funding_rate_repository.get_historical_dataframe.return_value = pd.DataFrame(
+            {"funding_rate": [funding_rate.rate for funding_rate in funding_rate_data]},
+            index=pd.DatetimeIndex(
+                pd.to_datetime(
+                    [funding_rate.ts for funding_rate in funding_rate_data], unit="s"
+                ),
+                name="date",
+            ),
+        )
+
+        mark_price_repository = None
+        if mark_price_iterator is not None:
+            mark_price_data = list(mark_price_iterator)
+            mark_price_repository = mocker.Mock()
+            mark_price_repository.get_historical_dataframe.return_value = pd.DataFrame(
+                {
+                    "open": [ohlcv.open for ohlcv in mark_price_data],
+                    "high": [ohlcv.high for ohlcv in mark_price_data],
+                    "low": [ohlcv.low for ohlcv in mark_price_data],
+                    "close": [ohlcv.close for ohlcv in mark_price_data],
+                    "volume": [ohlcv.volume for ohlcv in mark_price_data],
+                },
+                index=pd.DatetimeIndex(
+                    pd.to_datetime([ohlcv.ts for ohlcv in mark_price_data], unit="s"),
+                    name="date",
+                ),
+            )
+
+        update_position_initial_margin_use_case = UpdatePositionInitialMargin()
+        update_position_maintenance_margin_use_case = UpdatePositionMaintenanceMargin()
+        update_position_effective_leverage_use_case = UpdatePositionEffectiveLeverage()
+        update_position_liquidation_price_use_case = UpdatePositionLiquidationPrice()
+        update_position_unrealized_pnl_use_case = UpdatePositionUnrealizedPnl()
+        open_cross_margin_position_use_case = OpenCrossMarginPosition(
+            update_position_initial_margin_use_case=update_position_initial_margin_use_case,
+            update_position_maintenance_margin_use_case=update_position_maintenance_margin_use_case,
+            update_position_effective_leverage_use_case=update_position_effective_leverage_use_case,
+            update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
+        )
+        liquidate_position_use_case = LiquidatePositions(
+            update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
+            update_position_unrealized_pnl_use_case=update_position_unrealized_pnl_use_case,
+            update_position_risk_use_case=update_position_risk_use_case,
+        )
+        run_simulation_use_case = RunSimulation(
+            ohlcv_repository=ohlcv_repository,
+            funding_rate_repository=funding_rate_repository,
+            open_cross_margin_position_use_case=open_cross_margin_position_use_case,
+            settle_funding_rate_costs_use_case=SettleFundingRateCosts(),
+            update_position_unrealized_pnl_use_case=UpdatePositionUnrealizedPnl(),
+            update_position_initial_margin_use_case=update_position_initial_margin_use_case,
+            update_position_maintenance_margin_use_case=update_position_maintenance_margin_use_case,
+            update_position_effective_leverage_use_case=update_position_effective_leverage_use_case,
+            update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
+            liquidate_position_use_case=liquidate_position_use_case,
+            make_account_snapshot_use_case=MakeAccountSnapshot(),
+            update_position_risk_use_case=update_position_risk_use_case,
+            tracer=tracer,
+            profile=profile,
+            fast_forward=fast_forward,
+            intrabar_liquidation=intrabar_liquidation,
+            mark_price_repository=mark_price_repository,
+        )
+        return run_simulation_use_case
+
+    return _factory
+
+
+@pytest.fixture
+def funding_rate_btc_20240122T075000_20240122T081000_1min_iterator():
+    funding_rate_data = [
+        FundingRate(
+            # TODO: Change to UTC
+            ts=datetime.fromisoformat("2024-01-22T08:00:00").timestamp(),
+            symbol=Symbol.BTCUSD,
+            rate=0.0001,
+        )
+    ]
+    return iter(funding_rate_data)
+
+
+@pytest.fixture
+def ohlcv_series_btc_3_days_1min() -> OHLCVSeries:
+    bars = 3 * 24 * 60
+    rng = np.random.default_rng(7)
+    close = 40000.0 * np.exp(np.cumsum(rng.normal(0.0, 0.002, bars)))
+    return OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=1705881600 + np.arange(bars, dtype=np.int64) * 60,
+        open=close,
+        high=close,
+        low=close,
+        close=close,
+        volume=np.zeros(bars),
+    )
+
+
+def create_account(balance: float, leverage: float, entry_price: float) -> Account:
+    quantity = balance * leverage / entry_price
+    trade = Trade(
+        ts=0,
+        symbol=Symbol.BTCUSD,
+        type=Trade.BUY,
+        quantity=quantity,
+        price=entry_price,
+        fee=balance * leverage * BINANCE_FUTURES_TAKER_FEE_PCT,
+    )
+    return Account(balance=balance, positions=[Position.from_trade(trade)])
+
+
+@pytest.fixture
+def run_vectorized_simulation_use_case(mocker) -> RunVectorizedSimulation:
+    return RunVectorizedSimulation(
+        ohlcv_repository=mocker.Mock(),
+        funding_rate_repository=mocker.Mock(),
+        update_position_unrealized_pnl_use_case=UpdatePositionUnrealizedPnl(),
+        update_position_initial_margin_use_case=UpdatePositionInitialMargin(),
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+        update_position_liquidation_price_use_case=UpdatePositionLiquidationPrice(),
+    )
+
+
+def assert_simulations_equal(result: Simulation, expected: Simulation) -> None:
+    assert result.name == expected.name
+    assert result.simulation_start_ts == expected.simulation_start_ts
+    assert result.simulation_end_ts == expected.simulation_end_ts
+    assert len(result.account_snapshots) == len(expected.account_snapshots)
+    for snapshot, expected_snapshot in zip(
+        result.account_snapshots, expected.account_snapshots
+    ):
+        assert snapshot == expected_snapshot
@@ -0,0 +1,142 @@
+# pylint: disable=redefined-outer-name
+import numpy as np
+import pytest
+
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.liquidation_horizon_index import LiquidationHorizonIndex
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.entity.position import Position
+from perp_simulation.use_case.find_liquidation_horizon import FindLiquidationHorizon
+from perp_simulation.use_case.run_vectorized_simulation import RunVectorizedSimulation
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from tests.use_case.conftest import create_account
+
+
+@pytest.fixture
+def find_liquidation_horizon_use_case() -> FindLiquidationHorizon:
+    return FindLiquidationHorizon(
+        update_position_liquidation_price_use_case=UpdatePositionLiquidationPrice()
+    )
+
+
+def scan_first_crossing(
+    prices: np.ndarray, price: float, start: int, is_below: bool
+) -> int:
+    """Find the first bar crossing the price stepping the bars."""
+    for i in range(start, len(prices)):
+        if (prices[i] <= price) if is_below else (prices[i] >= price):
+            return i
+    return -1
+
+
+@pytest.mark.parametrize("bars", [1, 2, 7, 64, 1000])
+def test_index_matches_scanning_the_bars(bars: int):
+    rng = np.random.default_rng(bars)
+    low = 100.0 + np.cumsum(rng.normal(0.0, 1.0, bars))
+    high = low + rng.uniform(0.0, 2.0, bars)
+    index = LiquidationHorizonIndex.from_prices(np.arange(bars) * 60, low, high)
+    price = rng.normal(low.mean(), 3.0 * low.std() + 1.0, 500)
+    start = rng.integers(0, bars + 1, 500)
+
+    first_below = index.first_at_or_below(price, start)
+    first_above = index.first_at_or_above(price, start)
+
+    assert first_below.tolist() == [
+        scan_first_crossing(low, p, s, is_below=True) for p, s in zip(price, start)
+    ]
+    assert first_above.tolist() == [
+        scan_first_crossing(high, p, s, is_below=False) for p, s in zip(price, start)
+    ]
+
+
+def test_index_of_series_uses_the_close_prices():
+    close = np.array([5.0, 4.0, 6.0, 3.0, 7.0])
+    series = OHLCVSeries(
+        symbol="BTCUSD",
+        ts=np.arange(5, dtype=np.int64) * 60,
+        open=close,
+        high=close + 10.0,
+        low=close - 10.0,
+        close=close,
+        volume=np.zeros(5),
+    )
+    index = LiquidationHorizonIndex.from_series(series)
+
+    assert index.first_at_or_below(4.0).tolist() == 1
+    assert index.first_at_or_below(4.0, 2).tolist() == 3
+    assert index.first_at_or_below(2.0).tolist() == -1
+    assert index.first_at_or_above(6.5, np.array([0, 4, 5])).tolist() == [4, 4, -1]
+
+
+def test_find_liquidation_ts_matches_run_vectorized_simulation(
+    find_liquidation_horizon_use_case: FindLiquidationHorizon,
+    run_vectorized_simulation_use_case: RunVectorizedSimulation,
+    ohlcv_series_btc_3_days_1min: OHLCVSeries,
+):
+    """Find the liquidation of a grid of setups on one price path with the same
+    result as simulating every setup without funding rates."""
+    series = ohlcv_series_btc_3_days_1min
+    no_funding_rate_ts = np.array([], dtype=np.int64)
+    no_funding_rate = np.array([])
+    accounts = [
+        create_account(balance, leverage, entry_price)
+        for balance in (100.0, 1000.0)
+        for leverage in (1.0, 2.0, 5.0, 10.0, 20.0, 50.0)
+        for entry_price in (40000.0, 42000.0)
+    ]
+    positions = [
+        UpdatePositionMaintenanceMargin().update_maintenance_margin(
+            account.positions[0]
+        )
+        for account in accounts
+    ]
+
+    liquidation_ts = find_liquidation_horizon_use_case.find_liquidation_ts(
+        LiquidationHorizonIndex.from_series(series),
+        Timeframe.ONE_MIN,
+        positions,
+        np.array([account.balance for account in accounts]),
+    )
+
+    assert (liquidation_ts >= 0).any()
+    assert not (liquidation_ts >= 0).all()
+    for account, ts in zip(accounts, liquidation_ts):
+        equity_curve = run_vectorized_simulation_use_case.compute_equity_curve(
+            account, series, no_funding_rate_ts, no_funding_rate, Timeframe.ONE_MIN
+        )
+        liquidation_index = equity_curve.liquidation_index[0]
+        assert ts == (
+            equity_curve.ts[liquidation_index] if liquidation_index >= 0 else -1
+        )
+
+
+def test_find_liquidation_bar_of_short_positions_from_start_bars(
+    find_liquidation_horizon_use_case: FindLiquidationHorizon,
+    ohlcv_series_btc_3_days_1min: OHLCVSeries,
+):
+    series = ohlcv_series_btc_3_days_1min
+    account = create_account(100.0, 20.0, 40000.0)
+    position = UpdatePositionMaintenanceMargin().update_maintenance_margin(
+        account.positions[0]
+    )
+    position.side = Position.SHORT
+    position.quantity = -position.quantity
+    start_index = np.array([0, 1000, 3000])
+
+    liquidation_bar = find_liquidation_horizon_use_case.find_liquidation_bar(
+        LiquidationHorizonIndex.from_series(series),
+        [position] * 3,
+        account.balance,
+        start_index,
+    )
+
+    assert position.liquidation_price > position.avg_price
+    assert liquidation_bar.tolist() == [
+        scan_first_crossing(series.close, position.liquidation_price, start, False)
+        for start in start_index
+    ]
@@ -0,0 +1,141 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from perp_simulation.constant import DataType, Symbol, Timeframe
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.main import setup_ingest_raw_data_use_case
+from perp_simulation.use_case.ingest_raw_data import IngestRawData, RawDataSource
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+@pytest.fixture
+def raw_data_path(tmp_path: Path) -> Path:
+    """Dumps of the test data: the 1m bars as an unsorted CSV with duplicated
+    rows and string dates, and the funding rates as Feather."""
+    raw_data_path = tmp_path / "raw"
+    raw_data_path.mkdir()
+    ohlcv_df = pd.read_feather(f"{TEST_DATA_PATH}/BTC_USDT_USDT-1m-futures.feather")
+    raw_ohlcv_df = pd.concat([ohlcv_df, ohlcv_df.iloc[100:200]]).sample(
+        frac=1.0, random_state=7
+    )
+    raw_ohlcv_df["date"] = raw_ohlcv_df["date"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    raw_ohlcv_df.to_csv(raw_data_path / "BTC_USDT_USDT-1m-futures.csv", index=False)
+    pd.read_feather(
+        f"{TEST_DATA_PATH}/BTC_USDT_USDT-8h-funding_rate.feather"
+    ).to_feather(raw_data_path / "BTC_USDT_USDT-8h-funding_rate.feather")
+    return raw_data_path
+
+
+def assert_same_historical_data(data_base_path: str) -> None:
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+    for repository_class in [OHLCVRepository, FundingRateRepository]:
+        df = repository_class(data_base_path).get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+        )
+        expected_df = repository_class(TEST_DATA_PATH).get_historical_dataframe(
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+        )
+        pd.testing.assert_frame_equal(df, expected_df, check_freq=False)
+
+
+def test_find_sources(raw_data_path: Path):
+    """Get the symbol, timeframe and data type of the dumps from their names."""
+    (raw_data_path / "README.md").touch()
+
+    sources = IngestRawData.find_sources(str(raw_data_path))
+
+    assert sources == [
+        RawDataSource(
+            str(raw_data_path / "BTC_USDT_USDT-1m-futures.csv"),
+            "BTC_USDT_USDT",
+            Timeframe.ONE_MIN,
+            DataType.OHLCV,
+        ),
+        RawDataSource(
+            str(raw_data_path / "BTC_USDT_USDT-8h-funding_rate.feather"),
+            "BTC_USDT_USDT",
+            Timeframe.EIGHT_HOUR,
+            DataType.FUNDING_RATE,
+        ),
+    ]
+    with pytest.raises(ValueError, match="Invalid timeframe"):
+        RawDataSource.from_path(raw_data_path / "BTC_USDT_USDT-2m-futures.csv")
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_ingest_raw_data_to_canonical_layout(
+    tmp_path: Path, raw_data_path: Path, partitioned: bool
+):
+    """Ingest the dumps on the pool and get the same historical data from the
+    canonical layout as from the original files."""
+    data_base_path = str(tmp_path / "binance-futures")
+    ingest_raw_data_use_case = setup_ingest_raw_data_use_case(
+        data_base_path, max_workers=2, partitioned=partitioned
+    )
+
+    rows = ingest_raw_data_use_case.run(IngestRawData.find_sources(str(raw_data_path)))
+
+    assert rows[0] == 1440
+    assert_same_historical_data(data_base_path)
+    if not partitioned:
+        canonical_df = pd.read_feather(
+            Path(data_base_path) / "BTC_USDT_USDT-1m-futures.feather"
+        )
+        assert str(canonical_df["date"].dtype) == "datetime64[ns, UTC]"
+        assert (canonical_df.dtypes.iloc[1:] == np.float64).all()
+        assert canonical_df["date"].is_monotonic_increasing
+
+
+def test_ingest_raw_data_with_an_invalid_dump(tmp_path: Path, raw_data_path: Path):
+    """Raise the error of an invalid dump once the other dumps are stored."""
+    pd.DataFrame({"date": ["2024-01-22 00:00:30"], "open": [1.0]}).to_csv(
+        raw_data_path / "ETH_USDT_USDT-1m-futures.csv", index=False
+    )
+    data_base_path = tmp_path / "binance-futures"
+    ingest_raw_data_use_case = IngestRawData(str(data_base_path), max_workers=2)
+
+    with pytest.raises(ValueError, match="not at the timeframe"):
+        ingest_raw_data_use_case.run(IngestRawData.find_sources(str(raw_data_path)))
+
+    assert sorted(path.name for path in data_base_path.iterdir()) == [
+        "BTC_USDT_USDT-1m-futures.feather",
+        "BTC_USDT_USDT-8h-funding_rate.feather",
+    ]
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_ingest_raw_data_rejects_dumps_of_the_same_dataset(
+    tmp_path: Path, raw_data_path: Path, partitioned: bool
+):
+    """Reject a CSV and a Feather dump of the same dataset before ingesting
+    any dump, since their jobs would race on the same file or manifest."""
+    pd.read_feather(f"{TEST_DATA_PATH}/BTC_USDT_USDT-1m-futures.feather").to_feather(
+        raw_data_path / "BTC_USDT_USDT-1m-futures.feather"
+    )
+    data_base_path = tmp_path / "binance-futures"
+    ingest_raw_data_use_case = setup_ingest_raw_data_use_case(
+        str(data_base_path), max_workers=2, partitioned=partitioned
+    )
+
+    with pytest.raises(ValueError, match="Duplicated raw data dumps"):
+        IngestRawData.find_sources(str(raw_data_path))
+    with pytest.raises(ValueError, match="Duplicated raw data dumps"):
+        ingest_raw_data_use_case.run(
+            [
+                RawDataSource.from_path(raw_data_path / file_name)
+                for file_name in [
+                    "BTC_USDT_USDT-1m-futures.csv",
+                    "BTC_USDT_USDT-1m-futures.feather",
+                ]
+            ]
+        )
+
+    assert not data_base_path.exists()
@@ -1,11 +1,15 @@
 # pylint: disable=redefined-outer-name
+from copy import deepcopy
+
 import pytest
 
 from perp_simulation.entity.account import Account
+from perp_simulation.entity.position import Position
 from perp_simulation.use_case.liquidate_positions import LiquidatePositions
 from perp_simulation.use_case.update_position_liquidation_price import (
     UpdatePositionLiquidationPrice,
 )
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
 from perp_simulation.use_case.update_position_unrealized_pnl import (
     UpdatePositionUnrealizedPnl,
 )
@@ -51,3 +55,107 @@ def test_liquidate_positions_long_position_to_liquidate(
     )
     assert result_account.balance == position_maintenance_margin
     assert len(result_account.positions) == 0
+
+
+def test_liquidate_positions_long_position_to_liquidate_intrabar(
+    liquidate_positions_use_case: LiquidatePositions, account_100_long_500usd: Account
+) -> None:
+    position_maintenance_margin = account_100_long_500usd.positions[
+        0
+    ].maintenance_margin
+    # Liquidation price for this position is 40200.0, reached by the low of the bar
+    result_account = liquidate_positions_use_case.liquidate(
+        account_100_long_500usd, 41000.0, low_price=40100.0, high_price=41500.0
+    )
+    # Closed at the liquidation price, not at the market price
+    assert result_account.balance == pytest.approx(position_maintenance_margin)
+    assert len(result_account.positions) == 0
+
+
+@pytest.mark.parametrize("side", [Position.LONG, Position.SHORT])
+def test_liquidate_positions_intrabar_with_a_gap(
+    liquidate_positions_use_case: LiquidatePositions,
+    account_100_long_500usd: Account,
+    side: str,
+) -> None:
+    """Close a position at the open price of a bar opening past its
+    liquidation price and at its liquidation price otherwise."""
+    position = account_100_long_500usd.positions[0]
+    if side == Position.SHORT:
+        position.side = Position.SHORT
+        position.quantity = -position.quantity
+    # Liquidation price for this position is 40200.0 if long, 59800.0 if short
+    liquidation_price, gap_open_price, open_price = (
+        (40200.0, 40000.0, 40500.0)
+        if side == Position.LONG
+        else (59800.0, 60000.0, 59500.0)
+    )
+    expected_balances = [
+        position.maintenance_margin
+        + (gap_open_price - liquidation_price) * position.quantity,
+        position.maintenance_margin,
+    ]
+
+    for bar_open_price, expected_balance in zip(
+        [gap_open_price, open_price], expected_balances
+    ):
+        result_account = liquidate_positions_use_case.liquidate(
+            deepcopy(account_100_long_500usd),
+            50000.0,
+            low_price=39900.0,
+            high_price=60100.0,
+            open_price=bar_open_price,
+        )
+        assert result_account.balance == pytest.approx(expected_balance)
+        assert len(result_account.positions) == 0
+
+
+def test_liquidate_positions_short_position_intrabar(
+    liquidate_positions_use_case: LiquidatePositions, account_100_long_500usd: Account
+) -> None:
+    position = account_100_long_500usd.positions[0]
+    position.side = Position.SHORT
+    position.quantity = -position.quantity
+    # Liquidation price for this position is 59800.0
+    result_account = liquidate_positions_use_case.liquidate(
+        account_100_long_500usd, 50000.0, low_price=49000.0, high_price=59000.0
+    )
+    assert len(result_account.positions) == 1
+    assert result_account.positions[0].liquidation_price == pytest.approx(59800.0)
+
+    result_account = liquidate_positions_use_case.liquidate(
+        account_100_long_500usd, 50000.0, low_price=49000.0, high_price=60000.0
+    )
+    assert result_account.balance == pytest.approx(position.maintenance_margin)
+    assert len(result_account.positions) == 0
+
+
+def test_liquidate_positions_with_update_risk_matches_use_cases(
+    liquidate_positions_use_case: LiquidatePositions, account_100_long_500usd: Account
+) -> None:
+    """Liquidate one of two positions with the same accounts with and without the
+    position risk use case, keeping the risk metrics of the position left open."""
+    position = deepcopy(account_100_long_500usd.positions[0])
+    position.quantity = 0.001
+    position.avg_price = position.entry_price = 30000.0
+    position.maintenance_margin = 0.12
+    # Risk metrics of the last position update, e.g. with the mark price
+    position.unrealized_pnl = 10.2
+    position.effective_leverage = 0.3
+    account_100_long_500usd.add_position(position)
+    expected_account = deepcopy(account_100_long_500usd)
+
+    # The long position is liquidated at 40200.0, leaving a balance of 1.0
+    result_account = LiquidatePositions(
+        UpdatePositionLiquidationPrice(),
+        UpdatePositionUnrealizedPnl(),
+        UpdatePositionRisk(),
+    ).liquidate(account_100_long_500usd, 40100.0)
+    expected_account = liquidate_positions_use_case.liquidate(expected_account, 40100.0)
+
+    assert result_account == expected_account
+    assert result_account.balance == pytest.approx(1.0)
+    assert len(result_account.positions) == 1
+    assert result_account.positions[0].unrealized_pnl == 10.2
+    assert result_account.positions[0].effective_leverage == 0.3
+    assert result_account.positions[0].liquidation_price == pytest.approx(29120.0)
@@ -1,9 +1,11 @@
 # pylint: disable=redefined-outer-name
 from datetime import datetime
 
+import numpy as np
 import pytest
 
 from perp_simulation.entity.account import Account
+from perp_simulation.entity.account_snapshot_store import AccountSnapshotStore
 from perp_simulation.use_case.make_account_snapshot import MakeAccountSnapshot
 
 
@@ -38,3 +40,100 @@ def test_make_account_snapshot_account_one_position(
     assert account_snapshot.ts == ts
     assert len(account_snapshot.account.positions) == 1
     assert account_snapshot.account == account_100_long_500usd
+
+
+def test_record_account_snapshot_account_one_position(
+    make_account_snapshot_use_case: MakeAccountSnapshot,
+    account_100_long_500usd: Account,
+):
+    # TODO: Change to UTC
+    ts = datetime.fromisoformat("2024-03-01T00:00:00").timestamp()
+    account_snapshot_store = AccountSnapshotStore()
+    expected_account_snapshot = make_account_snapshot_use_case.make(
+        account=account_100_long_500usd, ts=ts
+    )
+    make_account_snapshot_use_case.record(
+        account=account_100_long_500usd,
+        ts=ts,
+        account_snapshot_store=account_snapshot_store,
+    )
+    # Changes after the snapshot are not recorded
+    account_100_long_500usd.positions[0].unrealized_pnl = -1.0
+    account_100_long_500usd.positions[0].add_funding_rate_cost(0.05)
+    account_100_long_500usd.update_balance(-0.05)
+
+    assert len(account_snapshot_store) == 1
+    assert account_snapshot_store.ts.tolist() == [ts]
+    assert account_snapshot_store.balance.tolist() == [100.0]
+    assert account_snapshot_store[0] == expected_account_snapshot
+    assert account_snapshot_store.at(ts) == expected_account_snapshot
+
+
+def test_record_account_snapshots_grow_store(
+    make_account_snapshot_use_case: MakeAccountSnapshot,
+    account_100_long_500usd: Account,
+):
+    account_snapshot_store = AccountSnapshotStore(capacity=2)
+    expected_account_snapshots = []
+    for ts in range(10):
+        account_100_long_500usd.positions[0].add_funding_rate_cost(0.01 * ts)
+        account_100_long_500usd.update_balance(-0.01 * ts)
+        expected_account_snapshots.append(
+            make_account_snapshot_use_case.make(account=account_100_long_500usd, ts=ts)
+        )
+        make_account_snapshot_use_case.record(
+            account=account_100_long_500usd,
+            ts=ts,
+            account_snapshot_store=account_snapshot_store,
+        )
+    account_100_long_500usd.remove_position(account_100_long_500usd.positions[0])
+    expected_account_snapshots.append(
+        make_account_snapshot_use_case.make(account=account_100_long_500usd, ts=10)
+    )
+    make_account_snapshot_use_case.record(
+        account=account_100_long_500usd,
+        ts=10,
+        account_snapshot_store=account_snapshot_store,
+    )
+
+    assert len(account_snapshot_store) == 11
+    assert list(account_snapshot_store) == expected_account_snapshots
+    assert account_snapshot_store[-1].account.positions == []
+    assert account_snapshot_store[2:4] == expected_account_snapshots[2:4]
+
+
+def test_record_flat_account_snapshots(
+    make_account_snapshot_use_case: MakeAccountSnapshot,
+    account_100_long_500usd: Account,
+):
+    account_snapshot_store = AccountSnapshotStore(capacity=2)
+    make_account_snapshot_use_case.record(
+        account=account_100_long_500usd,
+        ts=60,
+        account_snapshot_store=account_snapshot_store,
+    )
+    account_100_long_500usd.remove_position(account_100_long_500usd.positions[0])
+    make_account_snapshot_use_case.record_flat(
+        account=account_100_long_500usd,
+        ts=np.arange(120, 420, 60),
+        account_snapshot_store=account_snapshot_store,
+    )
+    make_account_snapshot_use_case.record_flat(
+        account=Account(balance=100.0),
+        ts=np.array([420]),
+        account_snapshot_store=account_snapshot_store,
+    )
+
+    assert len(account_snapshot_store) == 7
+    assert account_snapshot_store.ts.tolist() == list(range(60, 480, 60))
+    assert len(account_snapshot_store[0].account.positions) == 1
+    assert [snapshot.account for snapshot in account_snapshot_store[1:6]] == [
+        account_100_long_500usd
+    ] * 5
+    assert account_snapshot_store[-1].account.positions is None
+    with pytest.raises(ValueError):
+        make_account_snapshot_use_case.record_flat(
+            account=account_snapshot_store[0].account,
+            ts=np.array([480]),
+            account_snapshot_store=account_snapshot_store,
+        )
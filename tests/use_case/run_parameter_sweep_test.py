@@ -0,0 +1,231 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
+)
+from perp_simulation.main import setup_run_simulation_use_case
+from perp_simulation.use_case.run_parameter_sweep import RunParameterSweep
+from perp_simulation.use_case.run_vectorized_simulation import RunVectorizedSimulation
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from tests.use_case.conftest import create_account
+
+
+@pytest.fixture
+def run_parameter_sweep_use_case(mocker) -> RunParameterSweep:
+    return RunParameterSweep(
+        ohlcv_repository=mocker.Mock(),
+        funding_rate_repository=mocker.Mock(),
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+        chunk_size=4,
+    )
+
+
+def test_sweep_matches_run_vectorized_simulation(
+    run_parameter_sweep_use_case: RunParameterSweep,
+    run_vectorized_simulation_use_case: RunVectorizedSimulation,
+    ohlcv_series_btc_3_days_1min: OHLCVSeries,
+):
+    """Sweep a grid with the same result as simulating every configuration."""
+    series = ohlcv_series_btc_3_days_1min
+    funding_rate_ts = series.ts[::480]
+    funding_rate = np.full(len(funding_rate_ts), 0.01)
+    funding_rate[1] = np.nan
+
+    parameter_sweep = run_parameter_sweep_use_case.sweep(
+        series,
+        funding_rate_ts,
+        funding_rate,
+        Timeframe.ONE_MIN,
+        balances=np.array([100.0, 1000.0]),
+        leverages=np.array([1.0, 5.0, 20.0]),
+        entry_prices=np.array([40000.0, 42000.0]),
+    )
+
+    assert len(parameter_sweep) == 12
+    assert parameter_sweep.is_liquidated().any()
+    assert not parameter_sweep.is_liquidated().all()
+    for i in range(len(parameter_sweep)):
+        account = create_account(
+            parameter_sweep.balance[i],
+            parameter_sweep.leverage[i],
+            parameter_sweep.entry_price[i],
+        )
+        equity_curve = run_vectorized_simulation_use_case.compute_equity_curve(
+            account, series, funding_rate_ts, funding_rate, Timeframe.ONE_MIN
+        )
+        liquidation_index = equity_curve.liquidation_index[0]
+        expected_liquidation_ts = (
+            equity_curve.ts[liquidation_index] if liquidation_index >= 0 else -1
+        )
+        last_bar = liquidation_index if liquidation_index >= 0 else len(series) - 1
+        expected_funding_paid = equity_curve.funding_rate_costs[
+            : equity_curve.funding_rate_count[last_bar], 0
+        ].sum()
+
+        assert parameter_sweep.final_balance[i] == equity_curve.balance[-1]
+        assert parameter_sweep.liquidation_ts[i] == expected_liquidation_ts
+        assert parameter_sweep.funding_paid[i] == pytest.approx(expected_funding_paid)
+
+
+def test_sweep_grid_order(
+    run_parameter_sweep_use_case: RunParameterSweep,
+    ohlcv_series_btc_3_days_1min: OHLCVSeries,
+):
+    """Make the grid with the balances varying slowest and the entry prices fastest."""
+    parameter_sweep = run_parameter_sweep_use_case.sweep(
+        ohlcv_series_btc_3_days_1min,
+        np.array([], dtype=np.int64),
+        np.array([]),
+        Timeframe.ONE_MIN,
+        balances=np.array([100.0, 200.0]),
+        leverages=np.array([1.0]),
+        entry_prices=np.array([40000.0, 41000.0]),
+    )
+
+    assert parameter_sweep.balance.tolist() == [100.0, 100.0, 200.0, 200.0]
+    assert parameter_sweep.leverage.tolist() == [1.0] * 4
+    assert parameter_sweep.entry_price.tolist() == [40000.0, 41000.0] * 2
+    assert parameter_sweep.funding_paid.tolist() == [0.0] * 4
+
+
+@pytest.mark.parametrize("open_ratio", [1.0, 0.99])
+def test_sweep_intrabar_liquidation_matches_run_simulation(
+    ohlcv_series_btc_3_days_1min: OHLCVSeries, open_ratio: float
+):
+    """Sweep a grid liquidating inside the bars with the same result as
+    RunSimulation with intrabar liquidation, also with bars opening with a
+    gap past the liquidation price."""
+    bars = 24 * 60
+    close = ohlcv_series_btc_3_days_1min.close[:bars]
+    open_price = close * open_ratio
+    series = OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=ohlcv_series_btc_3_days_1min.ts[:bars],
+        open=open_price,
+        high=close * 1.003,
+        low=np.minimum(open_price, close * 0.997),
+        close=close,
+        volume=np.zeros(bars),
+    )
+    funding_rate_ts = series.ts[::480]
+    funding_rate = np.full(len(funding_rate_ts), 0.001)
+    run_parameter_sweep_use_case = RunParameterSweep(
+        ohlcv_repository=None,
+        funding_rate_repository=None,
+        update_position_maintenance_margin_use_case=UpdatePositionMaintenanceMargin(),
+        intrabar_liquidation=True,
+    )
+    run_simulation_use_case = setup_run_simulation_use_case(
+        ".", intrabar_liquidation=True
+    )
+    market_timeline = MarketTimelineRepository.align(
+        series, Timeframe.ONE_MIN, funding_rate_ts, funding_rate
+    )
+    start_time = datetime.fromtimestamp(series.ts[0], timezone.utc)
+    end_time = datetime.fromtimestamp(series.ts[-1] + 60, timezone.utc)
+
+    parameter_sweep = run_parameter_sweep_use_case.sweep(
+        series,
+        funding_rate_ts,
+        funding_rate,
+        Timeframe.ONE_MIN,
+        balances=np.array([100.0, 1000.0]),
+        leverages=np.array([1.0, 5.0, 50.0]),
+        entry_prices=np.array([40000.0]),
+    )
+
+    assert parameter_sweep.is_liquidated().any()
+    assert not parameter_sweep.is_liquidated().all()
+    for i in range(len(parameter_sweep)):
+        simulation = run_simulation_use_case.simulate(
+            start_time,
+            end_time,
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            create_account(
+                parameter_sweep.balance[i],
+                parameter_sweep.leverage[i],
+                parameter_sweep.entry_price[i],
+            ),
+            market_timeline,
+        )
+        account_snapshots = simulation.account_snapshots
+        is_flat = np.diff(account_snapshots.position_offsets) == 0
+        expected_liquidation_ts = (
+            account_snapshots.ts[np.argmax(is_flat)] if is_flat.any() else -1
+        )
+
+        assert parameter_sweep.final_balance[i] == account_snapshots.balance[-1]
+        assert parameter_sweep.liquidation_ts[i] == expected_liquidation_ts
+
+
+def test_engines_settle_the_funding_rates_inside_the_daily_bars(
+    run_parameter_sweep_use_case: RunParameterSweep,
+    run_vectorized_simulation_use_case: RunVectorizedSimulation,
+    ohlcv_series_btc_3_days_1min: OHLCVSeries,
+):
+    """Settle the 00:00, 08:00 and 16:00 funding rates at the open of the daily
+    bar containing them in the three engines."""
+    days = 10
+    close = ohlcv_series_btc_3_days_1min.close[:days]
+    series = OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=ohlcv_series_btc_3_days_1min.ts[0] + np.arange(days, dtype=np.int64) * 86400,
+        open=close,
+        high=close,
+        low=close,
+        close=close,
+        volume=np.zeros(days),
+    )
+    funding_rate_ts = series.ts[0] + np.arange(3 * days, dtype=np.int64) * 28800
+    funding_rate = np.linspace(0.001, 0.002, len(funding_rate_ts))
+    run_simulation_use_case = setup_run_simulation_use_case(".")
+    market_timeline = MarketTimelineRepository.align(
+        series, Timeframe.ONE_DAY, funding_rate_ts, funding_rate
+    )
+    start_time = datetime.fromtimestamp(series.ts[0], timezone.utc)
+    end_time = datetime.fromtimestamp(series.ts[-1] + 86400, timezone.utc)
+    expected_simulation = run_simulation_use_case.simulate(
+        start_time,
+        end_time,
+        Timeframe.ONE_DAY,
+        Symbol.BTCUSD,
+        create_account(1000.0, 5.0, 40000.0),
+        market_timeline,
+    )
+
+    equity_curve = run_vectorized_simulation_use_case.compute_equity_curve(
+        create_account(1000.0, 5.0, 40000.0),
+        series,
+        funding_rate_ts,
+        funding_rate,
+        Timeframe.ONE_DAY,
+    )
+    parameter_sweep = run_parameter_sweep_use_case.sweep(
+        series,
+        funding_rate_ts,
+        funding_rate,
+        Timeframe.ONE_DAY,
+        balances=np.array([1000.0]),
+        leverages=np.array([5.0]),
+        entry_prices=np.array([40000.0]),
+    )
+
+    expected_balance = expected_simulation.account_snapshots.balance[-1]
+    assert equity_curve.funding_rate_count.tolist() == [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert equity_curve.balance[-1] == pytest.approx(expected_balance)
+    assert parameter_sweep.final_balance[0] == pytest.approx(expected_balance)
+    assert parameter_sweep.funding_paid[0] == pytest.approx(
+        equity_curve.funding_rate_costs[:, 0].sum()
+    )
+    assert parameter_sweep.funding_paid[0] == pytest.approx(
+        1000.0 * 5.0 * funding_rate.sum(), rel=0.05
+    )
@@ -0,0 +1,62 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+from functools import partial
+from typing import List
+
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.account import Account
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.main import setup_run_simulation_use_case
+from perp_simulation.use_case.run_simulation_pool import RunSimulationPool
+from tests.use_case.conftest import assert_simulations_equal, create_account
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+@pytest.fixture
+def run_simulation_pool_use_case() -> RunSimulationPool:
+    return RunSimulationPool(
+        ohlcv_repository=OHLCVRepository(TEST_DATA_PATH),
+        funding_rate_repository=FundingRateRepository(TEST_DATA_PATH),
+        run_simulation_factory=partial(setup_run_simulation_use_case, TEST_DATA_PATH),
+        max_workers=2,
+        max_in_flight=2,
+    )
+
+
+@pytest.fixture
+def accounts_long_41000usd() -> List[Account]:
+    return [
+        create_account(balance, leverage, 41000.0)
+        for balance, leverage in [(100.0, 10.0), (100.0, 50.0), (1000.0, 100.0)]
+    ]
+
+
+def test_run_matches_run_simulation(
+    run_simulation_pool_use_case: RunSimulationPool,
+    accounts_long_41000usd: List[Account],
+):
+    """Run a simulation per account on the pool with the same result as RunSimulation."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+    timeframe = Timeframe.ONE_MIN
+    symbol = Symbol.BTCUSD
+
+    result_simulations = run_simulation_pool_use_case.run(
+        start_time, end_time, timeframe, symbol, accounts_long_41000usd
+    )
+
+    run_simulation_use_case = setup_run_simulation_use_case(TEST_DATA_PATH)
+    assert len(result_simulations) == len(accounts_long_41000usd)
+    for result_simulation, account in zip(result_simulations, accounts_long_41000usd):
+        expected_simulation = run_simulation_use_case.run(
+            start_time, end_time, timeframe, symbol, account
+        )
+        assert len(result_simulation.account_snapshots) == 1440
+        assert_simulations_equal(result_simulation, expected_simulation)
+    # The leveraged accounts are liquidated
+    assert result_simulations[0].account_snapshots[-1].account.positions
+    assert not result_simulations[2].account_snapshots[-1].account.positions
@@ -1,120 +1,36 @@
 # pylint: disable=redefined-outer-name,invalid-name
-from datetime import datetime
-from typing import Callable, Iterator
+import logging
+from copy import deepcopy
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Tuple
 
+import numpy as np
+import pandas as pd
 import pytest
 
 from perp_simulation.constant import Symbol, Timeframe
 from perp_simulation.entity.account import Account
 from perp_simulation.entity.account_snapshot import AccountSnapshot
+from perp_simulation.entity.market_timeline import MarketTimeline
 from perp_simulation.entity.funding_rate import FundingRate
 from perp_simulation.entity.ohlcv import OHLCV
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
 from perp_simulation.entity.position import Position
 from perp_simulation.entity.simulation import Simulation
+from perp_simulation.entity.simulation_profile import SimulationProfile
 from perp_simulation.entity.trade import Trade
-from perp_simulation.use_case.liquidate_positions import LiquidatePositions
-from perp_simulation.use_case.make_account_snapshot import MakeAccountSnapshot
-from perp_simulation.use_case.open_cross_margin_position import OpenCrossMarginPosition
-from perp_simulation.use_case.run_simulation import RunSimulation
-from perp_simulation.use_case.settle_funding_rate_costs import SettleFundingRateCosts
-from perp_simulation.use_case.update_position_effective_leverage import (
-    UpdatePositionEffectiveLeverage,
-)
-from perp_simulation.use_case.update_position_initial_margin import (
-    UpdatePositionInitialMargin,
-)
-from perp_simulation.use_case.update_position_liquidation_price import (
-    UpdatePositionLiquidationPrice,
-)
-from perp_simulation.use_case.update_position_maintenance_margin import (
-    UpdatePositionMaintenanceMargin,
+from perp_simulation.gateway.market_timeline_repository import (
+    MarketTimelineRepository,
 )
-from perp_simulation.use_case.update_position_unrealized_pnl import (
-    UpdatePositionUnrealizedPnl,
+from perp_simulation.gateway.multi_resolution_timeline_repository import (
+    FineTimelineLoader,
+    MultiResolutionTimelineRepository,
 )
-
-
-def create_ohlcv_iterator(
-    start_ts: int,
-    end_ts: int,
-    timeframe: str,
-    price_start: float,
-    price_pct_change: float,
-    price_pct_variance: float,
-) -> Iterator[OHLCV]:
-    # Adding first bar
-    ohlcv_data = [
-        OHLCV(
-            ts=start_ts,
-            symbol=Symbol.BTCUSD,
-            open=price_start,
-            high=price_start + price_pct_variance * price_start,
-            low=price_start - price_pct_variance * price_start,
-            close=price_start + price_pct_change * price_start,
-            volume=10.0,
-        )
-    ]
-    # Looping from second bar
-    period_seconds = Timeframe.to_seconds(timeframe)
-    second_bar_ts = int(start_ts + period_seconds)
-    last_bar_ts = int(end_ts)
-    for ts in range(second_bar_ts, last_bar_ts, period_seconds):
-        prev_ohlcv = ohlcv_data[-1]
-        ohlcv = OHLCV(
-            ts=ts,
-            symbol=Symbol.BTCUSD,
-            open=prev_ohlcv.close,
-            high=prev_ohlcv.close + price_pct_variance * prev_ohlcv.close,
-            low=prev_ohlcv.close - price_pct_variance * prev_ohlcv.close,
-            close=prev_ohlcv.close + price_pct_change * prev_ohlcv.close,
-            volume=10.0,
-        )
-        ohlcv_data.append(ohlcv)
-    return iter(ohlcv_data)
-
-
-@pytest.fixture
-def create_mocked_run_simulation_use_case(
-    mocker,
-) -> Callable[[Iterator[OHLCV], Iterator[FundingRate]], RunSimulation]:
-    def _factory(ohlcv_iterator, funding_rate_iterator):
-        # Mocks. To add the returning value in the test.
-        ohlcv_repository = mocker.Mock()
-        ohlcv_repository.get_historical_data.return_value = ohlcv_iterator
-        funding_rate_repository = mocker.Mock()
-        funding_rate_repository.get_historical_data.return_value = funding_rate_iterator
-
-        update_position_initial_margin_use_case = UpdatePositionInitialMargin()
-        update_position_maintenance_margin_use_case = UpdatePositionMaintenanceMargin()
-        update_position_effective_leverage_use_case = UpdatePositionEffectiveLeverage()
-        update_position_liquidation_price_use_case = UpdatePositionLiquidationPrice()
-        update_position_unrealized_pnl_use_case = UpdatePositionUnrealizedPnl()
-        open_cross_margin_position_use_case = OpenCrossMarginPosition(
-            update_position_initial_margin_use_case=update_position_initial_margin_use_case,
-            update_position_maintenance_margin_use_case=update_position_maintenance_margin_use_case,
-            update_position_effective_leverage_use_case=update_position_effective_leverage_use_case,
-            update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
-        )
-        liquidate_position_use_case = LiquidatePositions(
-            update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
-            update_position_unrealized_pnl_use_case=update_position_unrealized_pnl_use_case,
-        )
-        run_simulation_use_case = RunSimulation(
-            ohlcv_repository=ohlcv_repository,
-            funding_rate_repository=funding_rate_repository,
-            open_cross_margin_position_use_case=open_cross_margin_position_use_case,
-            settle_funding_rate_costs_use_case=SettleFundingRateCosts(),
-            update_position_unrealized_pnl_use_case=UpdatePositionUnrealizedPnl(),
-            update_position_initial_margin_use_case=update_position_initial_margin_use_case,
-            update_position_maintenance_margin_use_case=update_position_maintenance_margin_use_case,
-            update_position_effective_leverage_use_case=update_position_effective_leverage_use_case,
-            update_position_liquidation_price_use_case=update_position_liquidation_price_use_case,
-            liquidate_position_use_case=liquidate_position_use_case,
-            make_account_snapshot_use_case=MakeAccountSnapshot(),
-        )
-        return run_simulation_use_case
-
-    return _factory
+from perp_simulation.main import setup_run_simulation_use_case
+from perp_simulation.trace import Tracer
+from perp_simulation.use_case.run_simulation import RunSimulation
+from tests.use_case.conftest import create_account, create_ohlcv_iterator
 
 
 @pytest.fixture
@@ -147,19 +63,6 @@ def ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator():
     return ohlcv_data
 
 
-@pytest.fixture
-def funding_rate_btc_20240122T075000_20240122T081000_1min_iterator():
-    funding_rate_data = [
-        FundingRate(
-            # TODO: Change to UTC
-            ts=datetime.fromisoformat("2024-01-22T08:00:00").timestamp(),
-            symbol=Symbol.BTCUSD,
-            rate=0.0001,
-        )
-    ]
-    return iter(funding_rate_data)
-
-
 @pytest.fixture
 def expected_simulation_20240122T075000_20240122T075500_1min_account_100_long_500usd():
     account_snapshots = [
@@ -1098,7 +1001,7 @@ def test_run_simulation_20240122T075800_20240122T080200_1min_account_4_long_500u
     account_100_long_500usd: Account,
     expected_simulation_20240122T075800_20240122T080200_1min_account_4_long_500usd: Simulation,
 ):
-    """Run a simulation with five bars of data, open position, 
+    """Run a simulation with five bars of data, open position,
     settle funding rate costs, liquidate position."""
     # Test
     run_simulation_use_case = create_mocked_run_simulation_use_case(
@@ -1168,4 +1071,524 @@ def test_run_simulation_20240122T075800_20240122T080200_1min_account_4_long_500u
             assert position.effective_leverage == expected_position.effective_leverage
             assert position.liquidation_price == expected_position.liquidation_price
 
+
 # TODO: do integration test without mocking data or objects
+
+
+class _TraceRecordHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.traces = []
+
+    def emit(self, record):
+        self.traces.append(record.trace)
+
+
+@pytest.mark.parametrize("sample_every", [1, 2])
+def test_run_simulation_traced_every_n_bars(
+    ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator: Iterator[
+        OHLCV
+    ],
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator: Iterator[
+        FundingRate
+    ],
+    create_mocked_run_simulation_use_case: Callable[
+        [Iterator[OHLCV], Iterator[FundingRate]], RunSimulation
+    ],
+    account_100_long_500usd: Account,
+    expected_simulation_20240122T075800_20240122T080200_1min_account_100_long_500usd: Simulation,
+    sample_every: int,
+):
+    """Run a simulation with five bars of data tracing one every n bars."""
+    logger_name = f"{__name__}.trace"
+    handler = _TraceRecordHandler()
+    trace_logger = logging.getLogger(logger_name)
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.DEBUG)
+    try:
+        run_simulation_use_case = create_mocked_run_simulation_use_case(
+            ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator,
+            funding_rate_btc_20240122T075000_20240122T081000_1min_iterator,
+            tracer=Tracer(sample_every, logger_name),
+        )
+        result_simulation = run_simulation_use_case.run(
+            datetime.fromisoformat("2024-01-22T07:58:00"),
+            datetime.fromisoformat("2024-01-22T08:03:00"),
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            account_100_long_500usd,
+        )
+    finally:
+        trace_logger.removeHandler(handler)
+
+    expected_snapshots = (
+        expected_simulation_20240122T075800_20240122T080200_1min_account_100_long_500usd.account_snapshots
+    )
+    assert [snapshot.ts for snapshot in result_simulation.account_snapshots] == [
+        snapshot.ts for snapshot in expected_snapshots
+    ]
+    step_traces = [trace for trace in handler.traces if trace["event"] == "step"]
+    snapshot_traces = [
+        trace for trace in handler.traces if trace["event"] == "snapshot"
+    ]
+    assert [trace["ohlcv"].ts for trace in step_traces] == [
+        snapshot.ts - 60 for snapshot in expected_snapshots[::sample_every]
+    ]
+    assert [trace["ts"] for trace in snapshot_traces] == [
+        snapshot.ts for snapshot in expected_snapshots[::sample_every]
+    ]
+    # The bar at 08:00 settles the funding rate
+    assert any(trace["event"] == "settled" for trace in handler.traces)
+
+
+def test_run_simulation_profiled(
+    ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator: Iterator[
+        OHLCV
+    ],
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator: Iterator[
+        FundingRate
+    ],
+    create_mocked_run_simulation_use_case: Callable[
+        [Iterator[OHLCV], Iterator[FundingRate]], RunSimulation
+    ],
+    account_100_long_500usd: Account,
+):
+    """Run a simulation with five bars of data profiling the phases of the steps
+    with the same account snapshots as without profiling."""
+    ohlcv_data = list(
+        ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator
+    )
+    funding_rate_data = list(
+        funding_rate_btc_20240122T075000_20240122T081000_1min_iterator
+    )
+    simulations = [
+        create_mocked_run_simulation_use_case(
+            iter(ohlcv_data), iter(funding_rate_data), profile=profile
+        ).run(
+            datetime.fromisoformat("2024-01-22T07:58:00"),
+            datetime.fromisoformat("2024-01-22T08:03:00"),
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            deepcopy(account_100_long_500usd),
+        )
+        for profile in (True, False)
+    ]
+    result_simulation, expected_simulation = simulations
+
+    assert list(result_simulation.account_snapshots) == list(
+        expected_simulation.account_snapshots
+    )
+    assert expected_simulation.profile is None
+    result_profile = result_simulation.profile
+    assert result_profile.bars == 5
+    assert {
+        name: phase_profile.calls
+        for name, phase_profile in result_profile.phases.items()
+    } == {
+        SimulationProfile.LOAD: 1,
+        SimulationProfile.SIMULATE: 1,
+        # The bar at 08:00 settles the funding rate
+        SimulationProfile.SETTLE: 1,
+        SimulationProfile.UPDATE: 5,
+        SimulationProfile.LIQUIDATE: 5,
+        SimulationProfile.SIGNAL: 5,
+        SimulationProfile.SNAPSHOT: 5,
+    }
+    assert all(
+        phase_profile.total_ns >= 0 for phase_profile in result_profile.phases.values()
+    )
+    assert result_profile.bars_per_second > 0
+
+
+def test_run_simulation_fast_forward_after_liquidation(
+    ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator: Iterator[
+        OHLCV
+    ],
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator: Iterator[
+        FundingRate
+    ],
+    create_mocked_run_simulation_use_case: Callable[
+        [Iterator[OHLCV], Iterator[FundingRate]], RunSimulation
+    ],
+    account_100_long_500usd: Account,
+    mocker,
+):
+    """Run a simulation with five bars of data, settle funding rate costs,
+    liquidate position and record the rest of the snapshots without stepping the
+    bars, with the same account snapshots as stepping them."""
+    ohlcv_data = list(
+        ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator
+    )
+    funding_rate_data = list(
+        funding_rate_btc_20240122T075000_20240122T081000_1min_iterator
+    )
+    account_100_long_500usd.balance = 3.0
+    simulations = []
+    step_counts = []
+    for fast_forward in (True, False):
+        run_simulation_use_case = create_mocked_run_simulation_use_case(
+            iter(ohlcv_data),
+            iter(funding_rate_data),
+            profile=True,
+            fast_forward=fast_forward,
+        )
+        simulate_step = mocker.spy(run_simulation_use_case, "simulate_step")
+        simulations.append(
+            run_simulation_use_case.run(
+                datetime.fromisoformat("2024-01-22T07:58:00"),
+                datetime.fromisoformat("2024-01-22T08:03:00"),
+                Timeframe.ONE_MIN,
+                Symbol.BTCUSD,
+                deepcopy(account_100_long_500usd),
+            )
+        )
+        step_counts.append(simulate_step.call_count)
+    result_simulation, expected_simulation = simulations
+
+    account_snapshots = list(result_simulation.account_snapshots)
+    assert account_snapshots == list(expected_simulation.account_snapshots)
+    assert len(account_snapshots) == 5
+    assert account_snapshots[-1].account.positions == []
+    # The bars after the liquidation are not stepped
+    assert step_counts[1] == 5
+    # Liquidated in the bar at 08:00
+    assert [len(snapshot.account.positions) for snapshot in account_snapshots] == [
+        1,
+        1,
+        0,
+        0,
+        0,
+    ]
+    assert step_counts[0] == 3
+    # Only the stepped bars are counted as simulated
+    assert result_simulation.profile.bars == 3
+    assert result_simulation.profile.fast_forwarded_bars == 2
+    assert expected_simulation.profile.bars == 5
+    assert expected_simulation.profile.fast_forwarded_bars == 0
+
+
+def test_run_simulation_no_fast_forward_with_a_signal(
+    ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator: Iterator[
+        OHLCV
+    ],
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator: Iterator[
+        FundingRate
+    ],
+    create_mocked_run_simulation_use_case: Callable[
+        [Iterator[OHLCV], Iterator[FundingRate]], RunSimulation
+    ],
+    account_100_long_500usd: Account,
+    mocker,
+):
+    """Run a simulation stepping every bar after the liquidation while there
+    is a signal to open positions."""
+    account_100_long_500usd.balance = 3.0
+    run_simulation_use_case = create_mocked_run_simulation_use_case(
+        ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator,
+        funding_rate_btc_20240122T075000_20240122T081000_1min_iterator,
+        profile=True,
+    )
+    mocker.patch.object(run_simulation_use_case, "_get_signal", return_value=1)
+    mocker.patch.object(
+        run_simulation_use_case._open_cross_margin_position_use_case,  # pylint: disable=protected-access
+        "open",
+        side_effect=lambda account, ohlcv: account,
+    )
+
+    simulation = run_simulation_use_case.run(
+        datetime.fromisoformat("2024-01-22T07:58:00"),
+        datetime.fromisoformat("2024-01-22T08:03:00"),
+        Timeframe.ONE_MIN,
+        Symbol.BTCUSD,
+        account_100_long_500usd,
+    )
+
+    assert simulation.account_snapshots[-1].account.positions == []
+    assert simulation.profile.bars == 5
+    assert simulation.profile.fast_forwarded_bars == 0
+
+
+@pytest.mark.parametrize("has_mark_price_bars", [False, True])
+def test_run_simulation_intrabar_liquidation(
+    ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator: Iterator[
+        OHLCV
+    ],
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator: Iterator[
+        FundingRate
+    ],
+    create_mocked_run_simulation_use_case: Callable[
+        [Iterator[OHLCV], Iterator[FundingRate]], RunSimulation
+    ],
+    account_100_long_500usd: Account,
+    has_mark_price_bars: bool,
+):
+    """Run a simulation with five bars of data, settle funding rate costs and
+    liquidate position when the low of the bar reaches the liquidation price,
+    or the low of the mark price bar if any, at the liquidation price."""
+    # The bars wick 0.2% below the close
+    ohlcv_data = [
+        replace(ohlcv, low=ohlcv.close * 0.998)
+        for ohlcv in ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator
+    ]
+    funding_rate_data = list(
+        funding_rate_btc_20240122T075000_20240122T081000_1min_iterator
+    )
+    account_100_long_500usd.balance = 4.0
+    start_time = datetime.fromisoformat("2024-01-22T07:58:00")
+    end_time = datetime.fromisoformat("2024-01-22T08:03:00")
+    simulations = {}
+    for intrabar_liquidation in (False, True):
+        run_simulation_use_case = create_mocked_run_simulation_use_case(
+            iter(ohlcv_data),
+            iter(funding_rate_data),
+            intrabar_liquidation=intrabar_liquidation,
+        )
+        market_timeline = run_simulation_use_case._market_timeline_repository.get_historical_timeline(  # pylint: disable=protected-access
+            Symbol.BTCUSD, start_time, Timeframe.ONE_MIN, end_time
+        )
+        if has_mark_price_bars:
+            # The mark price bars have no wicks below the close
+            market_timeline = MarketTimelineRepository.align(
+                market_timeline.ohlcv_series,
+                Timeframe.ONE_MIN,
+                market_timeline.funding_rate_ts,
+                market_timeline.funding_rate,
+                mark_price_ts=market_timeline.ts,
+                mark_price=market_timeline.ohlcv_series.close,
+                mark_price_low=market_timeline.ohlcv_series.close,
+                mark_price_high=market_timeline.ohlcv_series.high,
+            )
+        simulations[intrabar_liquidation] = run_simulation_use_case.simulate(
+            start_time,
+            end_time,
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            deepcopy(account_100_long_500usd),
+            market_timeline,
+        )
+
+    def get_position_counts(simulation: Simulation):
+        return [
+            len(snapshot.account.positions) for snapshot in simulation.account_snapshots
+        ]
+
+    # Liquidated in the bar at 08:01 with the close
+    assert get_position_counts(simulations[False]) == [1, 1, 1, 0, 0]
+    if has_mark_price_bars:
+        assert get_position_counts(simulations[True]) == [1, 1, 1, 0, 0]
+    else:
+        # The low of the bar at 08:00 reaches the liquidation price
+        assert get_position_counts(simulations[True]) == [1, 1, 0, 0, 0]
+    liquidated_snapshot = next(
+        snapshot
+        for snapshot in simulations[True].account_snapshots
+        if not snapshot.account.positions
+    )
+    # Closed at the liquidation price, the maintenance margin is left
+    assert liquidated_snapshot.account.balance == pytest.approx(
+        account_100_long_500usd.positions[0].maintenance_margin
+    )
+
+
+@pytest.fixture
+def drill_down_timelines(
+    ohlcv_series_btc_3_days_1min: OHLCVSeries,
+) -> Tuple[MarketTimeline, MarketTimeline, FineTimelineLoader]:
+    bars = 24 * 60
+    close = ohlcv_series_btc_3_days_1min.close[:bars]
+    ts = ohlcv_series_btc_3_days_1min.ts[:bars]
+    ohlcv_df = pd.DataFrame(
+        {
+            "open": close,
+            "high": close * 1.003,
+            "low": close * 0.997,
+            "close": close,
+            "volume": np.zeros(bars),
+        },
+        index=pd.DatetimeIndex(pd.to_datetime(ts, unit="s"), name="date"),
+    )
+    funding_rate_ts = ts[::480]
+    funding_rate = np.full(len(funding_rate_ts), 0.001)
+    series = OHLCVSeries(
+        symbol=Symbol.BTCUSD,
+        ts=ts,
+        open=close,
+        high=close * 1.003,
+        low=close * 0.997,
+        close=close,
+        volume=np.zeros(bars),
+    )
+    market_timeline_1min = MarketTimelineRepository.align(
+        series, Timeframe.ONE_MIN, funding_rate_ts, funding_rate
+    )
+    market_timeline_1h, fine_timeline_loader = MultiResolutionTimelineRepository.build(
+        ohlcv_df, Symbol.BTCUSD, Timeframe.ONE_HOUR, funding_rate_ts, funding_rate
+    )
+    return market_timeline_1min, market_timeline_1h, fine_timeline_loader
+
+
+@pytest.mark.parametrize("intrabar_liquidation", [False, True])
+def test_run_simulation_drill_down_matches_1min(
+    drill_down_timelines: Tuple[MarketTimeline, MarketTimeline, FineTimelineLoader],
+    intrabar_liquidation: bool,
+):
+    """Run a simulation on 1h bars stepping the 1m bars near the liquidation
+    with the same accounts at the end of the 1h bars as on 1m bars."""
+    market_timeline_1min, market_timeline_1h, fine_timeline_loader = (
+        drill_down_timelines
+    )
+    bars = len(market_timeline_1min)
+    ts = market_timeline_1min.ts
+    run_simulation_use_case = setup_run_simulation_use_case(
+        ".", intrabar_liquidation=intrabar_liquidation, drill_down_distance=0.01
+    )
+    start_time = datetime.fromtimestamp(ts[0], timezone.utc)
+    end_time = datetime.fromtimestamp(ts[-1] + 60, timezone.utc)
+
+    drilled_down = False
+    liquidated = 0
+    for leverage in (1.0, 5.0, 20.0, 50.0):
+        account = create_account(100.0, leverage, 40000.0)
+        simulation_1min = run_simulation_use_case.simulate(
+            start_time,
+            end_time,
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            deepcopy(account),
+            market_timeline_1min,
+        )
+        simulation = run_simulation_use_case.simulate(
+            start_time,
+            end_time,
+            Timeframe.ONE_HOUR,
+            Symbol.BTCUSD,
+            deepcopy(account),
+            market_timeline_1h,
+            fine_timeline_loader=fine_timeline_loader,
+        )
+
+        snapshots_1min = simulation_1min.account_snapshots
+        snapshots = simulation.account_snapshots
+        assert np.all(np.diff(snapshots.ts) > 0)
+        index_1min = np.searchsorted(snapshots_1min.ts, snapshots.ts)
+        assert np.array_equal(snapshots_1min.ts[index_1min], snapshots.ts)
+        assert np.array_equal(snapshots_1min.balance[index_1min], snapshots.balance)
+        is_flat_1min = np.diff(snapshots_1min.position_offsets) == 0
+        is_flat = np.diff(snapshots.position_offsets) == 0
+        assert np.array_equal(is_flat_1min[index_1min], is_flat)
+        # The liquidation is found on the 1m bar
+        liquidation_ts = snapshots.ts[is_flat][:1].tolist()
+        assert liquidation_ts == snapshots_1min.ts[is_flat_1min][:1].tolist()
+        assert set(market_timeline_1h.ts + 3600) <= set(snapshots.ts.tolist())
+        drilled_down |= len(market_timeline_1h) < len(snapshots) < bars
+        liquidated += len(liquidation_ts)
+    assert drilled_down
+    assert 0 < liquidated < 4
+
+
+def test_run_simulation_drill_down_threads_the_updated_account(
+    mocker,
+    drill_down_timelines: Tuple[MarketTimeline, MarketTimeline, FineTimelineLoader],
+):
+    """Step every bar, coarse or fine, from the account returned by the
+    previous step and not from the account given to the simulation."""
+    _, market_timeline_1h, fine_timeline_loader = drill_down_timelines
+    run_simulation_use_case = setup_run_simulation_use_case(
+        ".", fast_forward=False, drill_down_distance=0.01
+    )
+    simulate_step = run_simulation_use_case.simulate_step
+    accounts = []
+
+    def _simulate_step(account, *args, **kwargs):
+        accounts.append(account)
+        updated_account = deepcopy(simulate_step(account, *args, **kwargs))
+        accounts.append(updated_account)
+        return updated_account
+
+    mocker.patch.object(
+        run_simulation_use_case, "simulate_step", side_effect=_simulate_step
+    )
+    account = create_account(100.0, 20.0, 40000.0)
+    start_time = datetime.fromtimestamp(market_timeline_1h.ts[0], timezone.utc)
+    end_time = datetime.fromtimestamp(market_timeline_1h.ts[-1] + 3600, timezone.utc)
+    simulation = run_simulation_use_case.simulate(
+        start_time,
+        end_time,
+        Timeframe.ONE_HOUR,
+        Symbol.BTCUSD,
+        account,
+        market_timeline_1h,
+        fine_timeline_loader=fine_timeline_loader,
+    )
+
+    # Drilled down
+    assert len(simulation.account_snapshots) > len(market_timeline_1h)
+    assert accounts[0] is account
+    for updated_account, next_account in zip(accounts[1::2], accounts[2::2]):
+        assert next_account is updated_account
+
+
+def test_run_simulation_drill_down_rejects_mark_price():
+    """Reject the drill down with the mark price instead of ignoring the mark price."""
+    with pytest.raises(ValueError, match="drill down doesn't support the mark price"):
+        setup_run_simulation_use_case(
+            ".", drill_down_distance=0.01, use_mark_price=True
+        )
+
+
+def test_run_simulation_mark_price_liquidation(
+    ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator: Iterator[
+        OHLCV
+    ],
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator: Iterator[
+        FundingRate
+    ],
+    create_mocked_run_simulation_use_case: Callable[
+        [Iterator[OHLCV], Iterator[FundingRate]], RunSimulation
+    ],
+    account_100_long_500usd: Account,
+):
+    """Run a simulation with five bars of data, settle funding rate costs,
+    update the position with the mark price and liquidate it when the mark
+    price reaches the liquidation price."""
+    ohlcv_data = list(
+        ohlcv_btc_20240122T075800_20240122T080200_1min_price_decrease_iterator
+    )
+    # The mark price is 0.1% below the last price, about a bar ahead
+    mark_price_data = [
+        replace(ohlcv, close=ohlcv.close * 0.999) for ohlcv in ohlcv_data
+    ]
+    funding_rate_data = list(
+        funding_rate_btc_20240122T075000_20240122T081000_1min_iterator
+    )
+    account_100_long_500usd.balance = 4.0
+    position = account_100_long_500usd.positions[0]
+    simulations = {}
+    for has_mark_price in (False, True):
+        run_simulation_use_case = create_mocked_run_simulation_use_case(
+            iter(ohlcv_data),
+            iter(funding_rate_data),
+            mark_price_iterator=iter(mark_price_data) if has_mark_price else None,
+        )
+        simulations[has_mark_price] = run_simulation_use_case.run(
+            datetime.fromisoformat("2024-01-22T07:58:00"),
+            datetime.fromisoformat("2024-01-22T08:03:00"),
+            Timeframe.ONE_MIN,
+            Symbol.BTCUSD,
+            deepcopy(account_100_long_500usd),
+        )
+
+    def get_position_counts(simulation: Simulation):
+        return [
+            len(snapshot.account.positions) for snapshot in simulation.account_snapshots
+        ]
+
+    assert get_position_counts(simulations[False]) == [1, 1, 1, 0, 0]
+    assert get_position_counts(simulations[True]) == [1, 1, 0, 0, 0]
+    for has_mark_price, prices in ((False, ohlcv_data), (True, mark_price_data)):
+        first_position = (
+            simulations[has_mark_price].account_snapshots[0].account.positions[0]
+        )
+        assert first_position.unrealized_pnl == pytest.approx(
+            (prices[0].close - position.avg_price) * position.quantity
+        )
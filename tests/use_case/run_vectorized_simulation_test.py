@@ -0,0 +1,121 @@
+# pylint: disable=redefined-outer-name,invalid-name
+from datetime import datetime
+from typing import List
+
+import numpy as np
+import pytest
+
+from perp_simulation.constant import Timeframe
+from perp_simulation.entity.account import Account
+from perp_simulation.entity.funding_rate import FundingRate
+from perp_simulation.entity.ohlcv import OHLCV
+from perp_simulation.entity.ohlcv_series import OHLCVSeries
+from perp_simulation.use_case.run_vectorized_simulation import RunVectorizedSimulation
+from tests.use_case.conftest import assert_simulations_equal, create_ohlcv_iterator
+
+
+def to_ohlcv_series(ohlcv_data: List[OHLCV]) -> OHLCVSeries:
+    return OHLCVSeries(
+        symbol=ohlcv_data[0].symbol,
+        ts=np.array([ohlcv.ts for ohlcv in ohlcv_data]),
+        open=np.array([ohlcv.open for ohlcv in ohlcv_data]),
+        high=np.array([ohlcv.high for ohlcv in ohlcv_data]),
+        low=np.array([ohlcv.low for ohlcv in ohlcv_data]),
+        close=np.array([ohlcv.close for ohlcv in ohlcv_data]),
+        volume=np.array([ohlcv.volume for ohlcv in ohlcv_data]),
+    )
+
+
+@pytest.mark.parametrize(
+    "start, end, balance",
+    [
+        ("2024-01-22T07:50:00", "2024-01-22T07:55:00", 100.0),
+        ("2024-01-22T07:50:00", "2024-01-22T07:55:00", 4.0),
+        ("2024-01-22T07:58:00", "2024-01-22T08:03:00", 100.0),
+        ("2024-01-22T07:58:00", "2024-01-22T08:03:00", 4.0),
+    ],
+)
+def test_simulate_matches_run_simulation(
+    start: str,
+    end: str,
+    balance: float,
+    create_mocked_run_simulation_use_case,
+    run_vectorized_simulation_use_case: RunVectorizedSimulation,
+    account_100_long_500usd: Account,
+    funding_rate_btc_20240122T075000_20240122T081000_1min_iterator,
+):
+    """Simulate five bars of a static book with the same result as the per bar loop."""
+    start_time = datetime.fromisoformat(start)
+    end_time = datetime.fromisoformat(end)
+    timeframe = Timeframe.ONE_MIN
+    ohlcv_data = list(
+        create_ohlcv_iterator(
+            start_time.timestamp(),
+            end_time.timestamp(),
+            timeframe,
+            50000.0,
+            -0.001,
+            0.0005,
+        )
+    )
+    funding_rate_data: List[FundingRate] = list(
+        funding_rate_btc_20240122T075000_20240122T081000_1min_iterator
+    )
+    account_100_long_500usd.balance = balance
+    symbol = ohlcv_data[0].symbol
+
+    result_simulation = run_vectorized_simulation_use_case.simulate(
+        start_time,
+        end_time,
+        timeframe,
+        symbol,
+        account_100_long_500usd,
+        to_ohlcv_series(ohlcv_data),
+        np.array([funding_rate.ts for funding_rate in funding_rate_data]),
+        np.array([funding_rate.rate for funding_rate in funding_rate_data]),
+    )
+    run_simulation_use_case = create_mocked_run_simulation_use_case(
+        iter(ohlcv_data), iter(funding_rate_data)
+    )
+    expected_simulation = run_simulation_use_case.run(
+        start_time, end_time, timeframe, symbol, account_100_long_500usd
+    )
+
+    assert_simulations_equal(result_simulation, expected_simulation)
+
+
+def test_compute_equity_curve_liquidation_and_funding(
+    run_vectorized_simulation_use_case: RunVectorizedSimulation,
+    account_100_long_500usd: Account,
+):
+    """Compute the equity curve settling funding rates and liquidating a position."""
+    ts = np.arange(10) * 60
+    close = np.array([50000.0] * 5 + [40000.0] * 5)
+    series = OHLCVSeries(
+        symbol=account_100_long_500usd.positions[0].symbol,
+        ts=ts,
+        open=close,
+        high=close,
+        low=close,
+        close=close,
+        volume=np.zeros(10),
+    )
+    funding_rate_ts = np.array([120, 180, 240, 420])
+    funding_rate = np.array([0.001, np.nan, 0.001, 0.001])
+
+    equity_curve = run_vectorized_simulation_use_case.compute_equity_curve(
+        account_100_long_500usd,
+        series,
+        funding_rate_ts,
+        funding_rate,
+        Timeframe.ONE_MIN,
+    )
+
+    assert equity_curve.ts.tolist() == (ts + 60).tolist()
+    assert equity_curve.funding_rate_count.tolist() == [0, 0, 1, 1, 2, 2, 2, 3, 3, 3]
+    assert equity_curve.balance[4] == 100.0 - 0.5 - 0.5
+    assert equity_curve.liquidation_index.tolist() == [5]
+    assert equity_curve.is_open()[:, 0].tolist() == [True] * 5 + [False] * 5
+    # Liquidated balance is the maintenance margin plus the loss beyond the liquidation price
+    expected_balance = 99.0 + (40000.0 - 50000.0) * 0.01
+    assert equity_curve.balance[5:].tolist() == [expected_balance] * 5
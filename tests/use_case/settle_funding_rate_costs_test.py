@@ -1,5 +1,7 @@
 # pylint: disable=redefined-outer-name
 
+import logging
+
 import pytest
 
 from perp_simulation.entity.account import Account
@@ -43,3 +45,19 @@ def test_settle_funding_rate_costs_negative_funding_rate(
     assert result_account.balance == 100.1
     assert len(result_account.positions[0].funding_rate_costs) == 1
     assert result_account.positions[0].funding_rate_costs[0] == -0.1
+
+
+def test_settle_funding_rate_costs_logs_only_at_debug(
+    mocker,
+    settle_funding_rate_costs_use_case: SettleFundingRateCosts,
+    account_100_long_500usd: Account,
+) -> None:
+    """Settle without logging nor formatting the account and positions above DEBUG."""
+    logger = mocker.patch.object(settle_funding_rate_costs_use_case, "logger")
+    logger.isEnabledFor.return_value = False
+
+    settle_funding_rate_costs_use_case.settle(account_100_long_500usd, 0.0001)
+
+    logger.isEnabledFor.assert_called_once_with(logging.DEBUG)
+    logger.info.assert_not_called()
+    logger.debug.assert_not_called()
@@ -0,0 +1,127 @@
+# pylint: disable=redefined-outer-name
+from datetime import datetime, timezone
+
+import pytest
+
+from perp_simulation.constant import Symbol, Timeframe
+from perp_simulation.entity.account import Account
+from perp_simulation.gateway.funding_rate_repository import FundingRateRepository
+from perp_simulation.gateway.ohlcv_repository import OHLCVRepository
+from perp_simulation.use_case.update_position_effective_leverage import (
+    UpdatePositionEffectiveLeverage,
+)
+from perp_simulation.use_case.update_position_initial_margin import (
+    UpdatePositionInitialMargin,
+)
+from perp_simulation.use_case.update_position_liquidation_price import (
+    UpdatePositionLiquidationPrice,
+)
+from perp_simulation.use_case.update_position_maintenance_margin import (
+    UpdatePositionMaintenanceMargin,
+)
+from perp_simulation.use_case.update_position_risk import UpdatePositionRisk
+from perp_simulation.use_case.update_position_unrealized_pnl import (
+    UpdatePositionUnrealizedPnl,
+)
+from tests.use_case.conftest import assert_simulations_equal, create_account
+
+TEST_DATA_PATH = "./tests/data/binance-futures"
+
+
+@pytest.fixture
+def update_position_risk_use_case() -> UpdatePositionRisk:
+    return UpdatePositionRisk()
+
+
+@pytest.mark.parametrize(
+    "balance, leverage, entry_price, market_price",
+    [
+        (100.0, 5.0, 50000.0, 50000.0),
+        (100.0, 5.0, 50000.0, 41234.56),
+        (1234.5, 20.0, 41000.0, 43210.98),
+        (10.0, 125.0, 39999.99, 39800.01),
+    ],
+)
+def test_update_risk_matches_use_cases(
+    update_position_risk_use_case: UpdatePositionRisk,
+    balance: float,
+    leverage: float,
+    entry_price: float,
+    market_price: float,
+) -> None:
+    """Update the risk metrics of a position with the same result as the use cases."""
+    position = create_account(balance, leverage, entry_price).positions[0]
+    expected_position = create_account(balance, leverage, entry_price).positions[0]
+
+    result_position = update_position_risk_use_case.update_risk(
+        position, market_price, balance
+    )
+    UpdatePositionUnrealizedPnl().update_unrealized_pnl(expected_position, market_price)
+    UpdatePositionInitialMargin().update_initial_margin(expected_position)
+    UpdatePositionMaintenanceMargin().update_maintenance_margin(expected_position)
+    UpdatePositionEffectiveLeverage().update_effective_leverage(
+        expected_position, balance
+    )
+    UpdatePositionLiquidationPrice().update_liquidation_price(
+        expected_position, balance
+    )
+
+    assert result_position == expected_position
+
+
+def test_update_risk_unknown_symbol(
+    update_position_risk_use_case: UpdatePositionRisk,
+    account_100_long_500usd: Account,
+) -> None:
+    position = account_100_long_500usd.positions[0]
+    position.symbol = "ETH-USDT:USDT"
+    with pytest.raises(ValueError):
+        update_position_risk_use_case.update_risk(position, 50000.0, 100.0)
+
+
+@pytest.mark.parametrize("leverage", [2.0, 50.0])
+def test_run_simulation_with_update_risk_matches_use_cases(
+    create_mocked_run_simulation_use_case,
+    leverage: float,
+) -> None:
+    """Run a simulation updating the positions and liquidating them with the
+    fused risk metrics with the same result as with the use cases."""
+    start_time = datetime(2024, 1, 22, tzinfo=timezone.utc)
+    end_time = datetime(2024, 1, 23, tzinfo=timezone.utc)
+    timeframe = Timeframe.ONE_MIN
+    symbol = Symbol.BTCUSD
+    ohlcv_data = list(
+        OHLCVRepository(TEST_DATA_PATH).get_historical_data(
+            symbol, start_time, timeframe, end_time
+        )
+    )
+    funding_rate_data = list(
+        FundingRateRepository(TEST_DATA_PATH).get_historical_data(
+            symbol, start_time, timeframe, end_time
+        )
+    )
+
+    result_simulation = create_mocked_run_simulation_use_case(
+        iter(ohlcv_data), iter(funding_rate_data), UpdatePositionRisk()
+    ).run(
+        start_time,
+        end_time,
+        timeframe,
+        symbol,
+        create_account(100.0, leverage, 41000.0),
+    )
+    expected_simulation = create_mocked_run_simulation_use_case(
+        iter(ohlcv_data), iter(funding_rate_data)
+    ).run(
+        start_time,
+        end_time,
+        timeframe,
+        symbol,
+        create_account(100.0, leverage, 41000.0),
+    )
+
+    assert_simulations_equal(result_simulation, expected_simulation)
+    # The high leverage account is liquidated during the day
+    assert (len(result_simulation.account_snapshots[-1].account.positions) == 0) == (
+        leverage > 10
+    )